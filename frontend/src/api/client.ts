@@ -7,6 +7,7 @@ import type {
   OhlcvResponse,
   SearchResult,
   OverlayResponse,
+  OverlayDeltaResponse,
   LiveStatus,
 } from "../types/overlay";
 
@@ -27,6 +28,7 @@ export interface GetOhlcvParams {
   to?: number; // epoch seconds，返回 <= to
   countBack?: number; // 返回最近 N 条
   after?: number; // epoch seconds，返回 > after
+  maxPoints?: number; // 范围内 bar 数超过时服务端包络降采样到不超过该行数
 }
 
 export async function getOhlcv(p: GetOhlcvParams): Promise<OhlcvResponse> {
@@ -37,6 +39,7 @@ export async function getOhlcv(p: GetOhlcvParams): Promise<OhlcvResponse> {
   if (p.to !== undefined) qs.set("to", String(p.to));
   if (p.countBack !== undefined) qs.set("countBack", String(p.countBack));
   if (p.after !== undefined) qs.set("after", String(p.after));
+  if (p.maxPoints !== undefined) qs.set("max_points", String(p.maxPoints));
   return fetchJson<OhlcvResponse>(`${BASE}/api/ohlcv?${qs}`);
 }
 
@@ -55,9 +58,21 @@ export interface GetOverlayParams {
   detail?: "min" | "full";
   segment_algo?: "v0" | "v1";
   stroke_mode?: "wide" | "strict";
+  /** 已持有的 overlay 版本：服务端仍保留时只返回增量（视口请求不支持） */
+  since_version?: string | null;
+  /** 视口（epoch 秒）：只返回与之相交的结构 */
+  from?: number;
+  to?: number;
+  /** 细节层级；省略时服务端按 max_items 自动选择 */
+  zoom?: number;
+  max_items?: number;
+  /** 视口内 MACD 点数上限 */
+  max_points?: number;
 }
 
-export async function getOverlay(p: GetOverlayParams): Promise<OverlayResponse> {
+export async function getOverlay(
+  p: GetOverlayParams,
+): Promise<OverlayResponse | OverlayDeltaResponse> {
   const qs = new URLSearchParams();
   qs.set("symbol", p.symbol);
   qs.set("interval", p.interval ?? "1min");
@@ -67,7 +82,12 @@ export async function getOverlay(p: GetOverlayParams): Promise<OverlayResponse>
   qs.set("stroke_mode", p.stroke_mode ?? "wide");
   qs.set("min_strict_sep", "5");
   qs.set("center_sustain_m", "2");
-  return fetchJson<OverlayResponse>(`${BASE}/api/newchan/overlay?${qs}`);
+  if (p.since_version) qs.set("since_version", p.since_version);
+  for (const k of ["from", "to", "zoom", "max_items", "max_points"] as const) {
+    if (p[k] !== undefined) qs.set(k, String(p[k]));
+  }
+  // 服务端带 ETag（no-cache）：未变化时浏览器按 If-None-Match 得到 304，复用缓存的响应
+  return fetchJson<OverlayResponse | OverlayDeltaResponse>(`${BASE}/api/newchan/overlay?${qs}`);
 }
 
 // ── Live 状态 ──
@@ -0,0 +1,70 @@
+/**
+ * 实时 bar 推送（SSE /api/live/stream）
+ *
+ * 同一 symbol/interval/tf 的订阅方共用一条 EventSource（引用计数），
+ * 断线由浏览器按 retry + Last-Event-ID 自动重连、服务端从内存尾部补发。
+ */
+
+import type { OhlcvBar } from "../types/overlay";
+
+export interface LiveHandlers {
+  /** 新窗口的 bar（kind="bar"）或当前窗口更新（kind="update"） */
+  onBar?: (bar: OhlcvBar, kind: "bar" | "update") => void;
+  /** 源数据版本变化（可据此拉取 overlay 增量） */
+  onOverlay?: (version: string) => void;
+  /** 连接建立 / 断开 */
+  onStatus?: (open: boolean) => void;
+}
+
+interface Channel {
+  source: EventSource;
+  handlers: Set<LiveHandlers>;
+}
+
+const channels = new Map<string, Channel>();
+
+function openChannel(key: string, url: string): Channel {
+  const source = new EventSource(url);
+  const channel: Channel = { source, handlers: new Set() };
+  const each = (fn: (h: LiveHandlers) => void) => channel.handlers.forEach(fn);
+
+  for (const kind of ["bar", "update"] as const) {
+    source.addEventListener(kind, (ev) => {
+      const bar = JSON.parse((ev as MessageEvent).data) as OhlcvBar;
+      each((h) => h.onBar?.(bar, kind));
+    });
+  }
+  source.addEventListener("overlay", (ev) => {
+    const { version } = JSON.parse((ev as MessageEvent).data) as { version: string };
+    each((h) => h.onOverlay?.(version));
+  });
+  source.onopen = () => each((h) => h.onStatus?.(true));
+  source.onerror = () => each((h) => h.onStatus?.(false));
+
+  channels.set(key, channel);
+  return channel;
+}
+
+/** 订阅实时 bar，返回取消订阅函数 */
+export function subscribeLive(
+  p: { symbol: string; interval?: string; tf?: string },
+  handlers: LiveHandlers,
+): () => void {
+  const qs = new URLSearchParams();
+  qs.set("symbol", p.symbol);
+  qs.set("interval", p.interval ?? "1min");
+  qs.set("tf", p.tf ?? "1m");
+  const key = qs.toString();
+
+  const channel = channels.get(key) ?? openChannel(key, `/api/live/stream?${key}`);
+  channel.handlers.add(handlers);
+  if (channel.source.readyState === EventSource.OPEN) handlers.onStatus?.(true);
+
+  return () => {
+    channel.handlers.delete(handlers);
+    if (channel.handlers.size === 0) {
+      channel.source.close();
+      channels.delete(key);
+    }
+  };
+}
@@ -1,6 +1,7 @@
 import { useEffect, useRef } from "react";
 import type { IChartApi, ISeriesApi, Time, CandlestickData, HistogramData } from "lightweight-charts";
 import { getOhlcv } from "../api/client";
+import { subscribeLive } from "../api/liveStream";
 import type { OhlcvBar } from "../types/overlay";
 
 /** 将后端 bar 转为 LW Charts 格式 */
@@ -36,7 +37,8 @@ interface DatafeedOptions {
  *
  * - 初始加载最近 500 条
  * - 用户往前翻时自动加载更早数据
- * - 每 15 秒轮询增量更新
+ * - 实时 bar 由 SSE 推送（新 bar / 当前 bar 更新直接 update）
+ * - 推送断开期间每 15 秒轮询增量；重连时补一次缺口
  */
 export function useDatafeed({
   chart,
@@ -117,29 +119,51 @@ export function useDatafeed({
     };
   }, [chart, candleSeries, volumeSeries, symbol, interval, tf]);
 
-  // 实时轮询增量
+  // 实时推送 + 断线期间轮询增量
   useEffect(() => {
     if (!candleSeries || !volumeSeries || !symbol) return;
 
-    pollingRef.current = setInterval(async () => {
+    let live = false;
+
+    function apply(bar: OhlcvBar) {
+      const allData = candleSeries!.data() as CandlestickData<Time>[];
+      if (!allData.length) return; // 初始数据未到：由初始加载覆盖
+      const candle = convertBar(bar);
+      // 早于最后一根的 bar 无法 update（初始加载已包含）
+      if ((candle.time as unknown as number) < (allData[allData.length - 1].time as unknown as number)) return;
+      candleSeries!.update(candle);
+      volumeSeries!.update(convertVolume(bar));
+    }
+
+    async function catchUp() {
       try {
-        const allData = candleSeries.data() as CandlestickData<Time>[];
+        const allData = candleSeries!.data() as CandlestickData<Time>[];
         if (!allData.length) return;
 
         const latest = allData[allData.length - 1].time as unknown as number;
         const res = await getOhlcv({ symbol, interval, tf, after: latest });
         if (!res.data?.length) return;
 
-        for (const bar of res.data) {
-          candleSeries.update(convertBar(bar));
-          volumeSeries.update(convertVolume(bar));
-        }
+        for (const bar of res.data) apply(bar);
       } catch (e) {
         // 静默失败，下次轮询重试
       }
+    }
+
+    const unsubscribe = subscribeLive({ symbol, interval, tf }, {
+      onBar: (bar) => apply(bar),
+      onStatus: (open) => {
+        if (open && !live) catchUp();
+        live = open;
+      },
+    });
+
+    pollingRef.current = setInterval(() => {
+      if (!live) catchUp();
     }, 15_000);
 
     return () => {
+      unsubscribe();
       if (pollingRef.current) clearInterval(pollingRef.current);
     };
   }, [candleSeries, volumeSeries, symbol, interval, tf]);
@@ -2,6 +2,7 @@ import { useEffect, useRef, useState, useCallback } from "react";
 import type {
   ChanEvent,
   WsBarMessage,
+  WsBatchMessage,
   WsServerMessage,
   WsCommand,
   WsEventMessage,
@@ -10,7 +11,8 @@ import { useReplayStore } from "../store/replayStore";
 
 // ── helpers ──
 
-const WS_URL = "ws://localhost:8766/ws/feed";
+// batch=1：每步的 bar / event / status 合并为一个帧（JSON 编码）
+const WS_URL = "ws://localhost:8766/ws/feed?batch=1";
 const RECONNECT_DELAY = 3000;
 
 /** 将 WsEventMessage 的 payload 展开为 ChanEvent */
@@ -45,6 +47,9 @@ export function useEventFeed({ enabled }: UseEventFeedOptions): EventFeedState {
   const reconnectTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
   const enabledRef = useRef(enabled);
   enabledRef.current = enabled;
+  // 断线重连：已绑定的会话与最后收到的 feed_seq
+  const sessionIdRef = useRef<string | null>(null);
+  const lastSeqRef = useRef<number | null>(null);
 
   const pushEvent = useReplayStore((s) => s.pushEvent);
   const updateStatus = useReplayStore((s) => s.updateStatus);
@@ -82,6 +87,13 @@ export function useEventFeed({ enabled }: UseEventFeedOptions): EventFeedState {
 
       ws.onopen = () => {
         setConnected(true);
+        if (sessionIdRef.current !== null && lastSeqRef.current !== null) {
+          ws.send(JSON.stringify({
+            action: "resume",
+            session_id: sessionIdRef.current,
+            last_seq: lastSeqRef.current,
+          } satisfies WsCommand));
+        }
       };
 
       ws.onclose = () => {
@@ -98,15 +110,10 @@ export function useEventFeed({ enabled }: UseEventFeedOptions): EventFeedState {
         // onclose will fire after onerror
       };
 
-      ws.onmessage = (ev) => {
-        let msg: WsServerMessage;
-        try {
-          msg = JSON.parse(ev.data) as WsServerMessage;
-        } catch {
-          console.error("[eventfeed] bad json:", ev.data);
-          return;
+      const handle = (msg: WsServerMessage) => {
+        if ("feed_seq" in msg && msg.feed_seq !== undefined) {
+          lastSeqRef.current = msg.feed_seq;
         }
-
         switch (msg.type) {
           case "bar":
             setLatestBar(msg);
@@ -121,6 +128,10 @@ export function useEventFeed({ enabled }: UseEventFeedOptions): EventFeedState {
             console.log("[eventfeed] snapshot:", msg.bar_idx, "events:", msg.event_count);
             break;
 
+          case "snapshot_delta":
+            console.log("[eventfeed] snapshot delta:", msg.base_version, "->", msg.version);
+            break;
+
           case "replay_status":
             updateStatus({
               mode: msg.mode,
@@ -133,6 +144,36 @@ export function useEventFeed({ enabled }: UseEventFeedOptions): EventFeedState {
           case "error":
             console.error("[eventfeed] server error:", msg.code, msg.message);
             break;
+
+          case "replay_started":
+            sessionIdRef.current = msg.session_id;
+            lastSeqRef.current = 0;
+            break;
+
+          case "resumed":
+            if (msg.snapshot) {
+              console.log("[eventfeed] resume gap too large, full snapshot from seq", msg.to_seq);
+            }
+            break;
+
+          case "feed_config":
+            break;
+        }
+      };
+
+      ws.onmessage = (ev) => {
+        let msg: WsServerMessage | WsBatchMessage;
+        try {
+          msg = JSON.parse(ev.data) as WsServerMessage | WsBatchMessage;
+        } catch {
+          console.error("[eventfeed] bad json:", ev.data);
+          return;
+        }
+
+        if (msg.type === "batch") {
+          msg.messages.forEach(handle);
+        } else {
+          handle(msg);
         }
       };
     }
@@ -1,7 +1,13 @@
 import { useEffect, useRef, useState } from "react";
 import type { ISeriesApi } from "lightweight-charts";
 import { getOverlay } from "../api/client";
-import type { OverlayResponse, OverlayLStar } from "../types/overlay";
+import { subscribeLive } from "../api/liveStream";
+import type {
+  OverlayDeltaResponse,
+  OverlayLStar,
+  OverlayResponse,
+  OverlayStructureKind,
+} from "../types/overlay";
 import { ChanTheoryPrimitive } from "../primitives/ChanTheoryPrimitive";
 
 interface OverlayOptions {
@@ -11,11 +17,64 @@ interface OverlayOptions {
   tf: string;
 }
 
+const STRUCTURE_KEYS: Record<OverlayStructureKind, string> = {
+  strokes: "id",
+  segments: "id",
+  centers: "id",
+  trends: "id",
+  levels: "level",
+  macd: "time",
+};
+
+function isDelta(
+  res: OverlayResponse | OverlayDeltaResponse,
+): res is OverlayDeltaResponse {
+  return "delta" in res && res.delta === true;
+}
+
+function mergeItems<T>(
+  items: T[],
+  key: string,
+  changed: Array<Record<string, unknown>> | undefined,
+  removed: number[] | undefined,
+): T[] {
+  if (!changed?.length && !removed?.length) return items;
+  const byKey = new Map<unknown, T>();
+  for (const it of items) byKey.set((it as Record<string, unknown>)[key], it);
+  for (const k of removed ?? []) byKey.delete(k);
+  for (const it of changed ?? []) byKey.set(it[key], it as T);
+  const keyOf = (it: T) => (it as Record<string, unknown>)[key] as number;
+  return [...byKey.values()].sort((a, b) => keyOf(a) - keyOf(b));
+}
+
+/** 把增量 overlay 合并到 base（未变化的结构保留原对象） */
+export function applyOverlayDelta(
+  base: OverlayResponse,
+  delta: OverlayDeltaResponse,
+): OverlayResponse {
+  const { changed, removed } = delta;
+  const merge = <T,>(kind: OverlayStructureKind, items: T[]) =>
+    mergeItems(items, STRUCTURE_KEYS[kind], changed[kind], removed[kind]);
+  return {
+    ...base,
+    schema_version: delta.schema_version,
+    lstar: delta.lstar,
+    strokes: merge("strokes", base.strokes),
+    segments: merge("segments", base.segments),
+    centers: merge("centers", base.centers),
+    trends: merge("trends", base.trends),
+    levels: merge("levels", base.levels),
+    macd: { ...delta.macd, series: merge("macd", base.macd.series) },
+    version: delta.version,
+  };
+}
+
 /**
  * 缠论 overlay：
  * - ChanTheoryPrimitive 绘制笔线/段线/中枢矩形框
  * - L* 状态供 StatusBadge 显示
- * - 每 60 秒刷新
+ * - 实时推送的 overlay 版本变化时刷新；另每 60 秒兜底（ETag 未变时为 304）
+ * - 刷新带 since_version 只取增量并合并；版本未变时不重绘
  */
 export function useOverlay({ candleSeries, symbol, interval, tf }: OverlayOptions) {
   const [lstar, setLstar] = useState<OverlayLStar | null>(null);
@@ -24,9 +83,11 @@ export function useOverlay({ candleSeries, symbol, interval, tf }: OverlayOption
   const pollingRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const reqSeqRef = useRef(0);
   const latestKeyRef = useRef("");
+  const overlayRef = useRef<OverlayResponse | null>(null);
 
   useEffect(() => {
     latestKeyRef.current = `${symbol}|${interval}|${tf}`;
+    overlayRef.current = null;
   }, [symbol, interval, tf]);
 
   // 创建 / 销毁 primitive
@@ -49,14 +110,26 @@ export function useOverlay({ candleSeries, symbol, interval, tf }: OverlayOption
   async function loadOverlay() {
     ++reqSeqRef.current;
     if (!symbol || !primitiveRef.current) return;
+    const key = `${symbol}|${interval}|${tf}`;
+    const base = overlayRef.current;
     try {
-      const res = await getOverlay({ symbol, interval, tf });
+      const res = await getOverlay({
+        symbol, interval, tf, since_version: base?.version,
+      });
       if (!res.schema_version?.startsWith("newchan_overlay_v")) {
         return;
       }
-      setOverlay(res);
-      setLstar(res.lstar);
-      primitiveRef.current.setData(res);
+      // 请求期间切换了 symbol / tf：丢弃
+      if (latestKeyRef.current !== key || overlayRef.current !== base) return;
+      if (base && res.version !== null && res.version === base.version) return;
+      const next = isDelta(res)
+        ? base ? applyOverlayDelta(base, res) : null
+        : res;
+      if (!next) return;
+      overlayRef.current = next;
+      setOverlay(next);
+      setLstar(next.lstar);
+      primitiveRef.current?.setData(next);
     } catch (e) {
       console.error("[overlay] load failed:", e);
     }
@@ -69,10 +142,18 @@ export function useOverlay({ candleSeries, symbol, interval, tf }: OverlayOption
     // 延迟加载（等 K线 setData 完成）
     const timer = setTimeout(() => loadOverlay(), 800);
 
-    // 每 60 秒刷新
+    // 源数据更新即刷新
+    const unsubscribe = subscribeLive({ symbol, interval, tf }, {
+      onOverlay: (version) => {
+        if (overlayRef.current?.version !== version) loadOverlay();
+      },
+    });
+
+    // 每 60 秒兜底刷新
     pollingRef.current = setInterval(() => loadOverlay(), 60_000);
 
     return () => {
+      unsubscribe();
       clearTimeout(timer);
       if (pollingRef.current) clearInterval(pollingRef.current);
     };
@@ -188,6 +188,7 @@ export interface WsBarMessage {
   v: number | null;
   tf?: string; // 多 TF 标识
   stream_id?: string; // MVP-B0: 流标识
+  feed_seq?: number; // 推送条目序号（仅条目最后一条消息携带）
 }
 
 export interface WsEventMessage {
@@ -201,6 +202,7 @@ export interface WsEventMessage {
   schema_version: number;
   tf?: string; // 多 TF 标识
   stream_id?: string; // MVP-B0: 流标识
+  feed_seq?: number;
 }
 
 export interface WsSnapshotMessage {
@@ -208,6 +210,20 @@ export interface WsSnapshotMessage {
   bar_idx: number;
   strokes: Array<Record<string, unknown>>;
   event_count: number;
+  version: number; // 会话内快照版本
+  feed_seq?: number;
+}
+
+/** 增量快照：相对 base_version，按标识字段（strokes: i0）合并 changed / removed */
+export interface WsSnapshotDeltaMessage {
+  type: "snapshot_delta";
+  version: number;
+  base_version: number;
+  bar_idx: number;
+  event_count: number;
+  changed: Record<string, Array<Record<string, unknown>>>;
+  removed: Record<string, unknown[]>;
+  feed_seq?: number;
 }
 
 export interface WsReplayStatusMessage {
@@ -216,6 +232,23 @@ export interface WsReplayStatusMessage {
   current_idx: number;
   total_bars: number;
   speed: number;
+  feed_seq?: number;
+}
+
+export interface WsReplayStartedMessage {
+  type: "replay_started";
+  session_id: string;
+  total_bars: number;
+}
+
+/** resume 应答：随后补发 from_seq 之后的条目，或（snapshot=true）一份完整快照 */
+export interface WsResumedMessage {
+  type: "resumed";
+  session_id: string;
+  from_seq: number;
+  to_seq: number;
+  replayed: number;
+  snapshot: boolean;
 }
 
 export interface WsErrorMessage {
@@ -224,12 +257,31 @@ export interface WsErrorMessage {
   code: string;
 }
 
+/** 连接后首帧：服务端实际生效的推送格式 */
+export interface WsFeedConfigMessage {
+  type: "feed_config";
+  encoding: "json" | "msgpack";
+  batch: boolean;
+  /** 发送队列溢出策略：合并为新快照 / 丢弃中间帧 */
+  overflow: "coalesce" | "drop";
+}
+
 export type WsServerMessage =
   | WsBarMessage
   | WsEventMessage
   | WsSnapshotMessage
+  | WsSnapshotDeltaMessage
   | WsReplayStatusMessage
-  | WsErrorMessage;
+  | WsErrorMessage
+  | WsFeedConfigMessage
+  | WsReplayStartedMessage
+  | WsResumedMessage;
+
+/** 批量帧：同一步产生的全部消息（连接时 batch=1 启用） */
+export interface WsBatchMessage {
+  type: "batch";
+  messages: WsServerMessage[];
+}
 
 // ── WebSocket 命令（客户端 → 服务端）──
 
@@ -240,13 +292,22 @@ export interface WsCommand {
     | "replay_start"
     | "replay_step"
     | "replay_seek"
+    | "replay_fast_forward"
     | "replay_play"
-    | "replay_pause";
+    | "replay_pause"
+    | "resume";
   symbol?: string;
   tf?: string;
   step_count?: number;
   seek_idx?: number;
   speed?: number;
+  /** replay_fast_forward：目标 bar 索引，缺省为最后一根 */
+  target_idx?: number;
+  /** resume：重连后补发 last_seq 之后的推送 */
+  session_id?: string;
+  last_seq?: number;
+  /** replay_seek / replay_fast_forward / resume：持有的快照版本，服务端据此发送增量快照 */
+  base_version?: number;
 }
 
 // ── 回放状态 ──
@@ -12,6 +12,8 @@ export interface OhlcvBar {
 export interface OhlcvResponse {
   data: OhlcvBar[];
   count: number;
+  /** 降采样时为范围内原始 bar 数（data 为包络 K 线） */
+  source_count?: number;
   error?: string;
 }
 
@@ -168,6 +170,43 @@ export interface OverlayResponse {
     signal: number;
     series: MacdPoint[];
   };
+  /** 数据版本（源文件 mtime）；无法确定版本时为 null */
+  version: string | null;
+  /** 视口请求（带 from/to/zoom 等）时返回：实际使用的细节层级 */
+  viewport?: OverlayViewport;
+}
+
+/** 视口裁剪信息：zoom = 保留的最细层级（0 笔 / 1 线段 / L+1 为递归级别 L） */
+export interface OverlayViewport {
+  from: number | null;
+  to: number | null;
+  zoom: number;
+  max_zoom: number;
+  auto: boolean;
+  items: number;
+}
+
+/** overlay 结构类型（增量响应按类型给出 changed / removed） */
+export type OverlayStructureKind =
+  | "strokes" | "segments" | "centers" | "trends" | "levels" | "macd";
+
+/**
+ * 增量 overlay（请求带 since_version 且服务端仍保留该版本时返回）。
+ * 结构按标识字段合并：strokes/segments/centers/trends 用 id，levels 用 level，
+ * macd 为 macd.series 的点、用 time。
+ */
+export interface OverlayDeltaResponse {
+  schema_version: string;
+  symbol: string;
+  tf: string;
+  detail: string;
+  lstar: OverlayLStar | null;
+  macd: { fast: number; slow: number; signal: number };
+  version: string;
+  base_version: string;
+  delta: true;
+  changed: Partial<Record<OverlayStructureKind, Array<Record<string, unknown>>>>;
+  removed: Partial<Record<OverlayStructureKind, Array<number>>>;
 }
 
 export interface LiveStatus {
@@ -175,4 +214,5 @@ export interface LiveStatus {
   symbols: string[];
   bar_count: number;
   last_error: string | null;
+  tail_seq: number; // 实时推送尾部的最新序号
 }
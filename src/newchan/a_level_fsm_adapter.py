@@ -11,12 +11,24 @@
 索引安全性依据：
   未确认/未结算对象只出现在列表末尾（引擎不变量），
   因此过滤列表索引 = 全列表索引（对已确认部分）。
+
+增量选择（LStarSelector）：
+  三锚判定中只有结算锚的 "last_price ∈ [ZD, ZG]" 依赖最新价，
+  其余均只依赖结构（段/中枢/走势）。结构不变时缓存"去价格"判定，
+  新价格仅需逐中枢比较一次区间，O(#centers)。
 """
 
 from __future__ import annotations
 
 from newchan.a_center_v0 import Center
-from newchan.a_level_fsm_newchan import LevelView, LStar, select_lstar_newchan
+from newchan.a_level_fsm_newchan import (
+    AliveCenter,
+    LevelView,
+    LStar,
+    Regime,
+    classify_center_practical_newchan,
+    select_lstar_newchan,
+)
 from newchan.a_zhongshu_level import LevelZhongshu
 from newchan.a_zhongshu_v1 import Zhongshu
 from newchan.orchestrator.recursive import RecursiveOrchestratorSnapshot
@@ -26,6 +38,7 @@ __all__ = [
     "level_zhongshu_to_center",
     "level_views_from_recursive_snapshot",
     "select_lstar_from_recursive_snapshot",
+    "LStarSelector",
 ]
 
 
@@ -138,3 +151,84 @@ def select_lstar_from_recursive_snapshot(
     if not views:
         return None
     return select_lstar_newchan(views, last_price)
+
+
+# ====================================================================
+# 增量 L* 选择
+# ====================================================================
+
+
+def _structure_key(snap: RecursiveOrchestratorSnapshot) -> tuple:
+    """L* 判定依赖的全部结构（frozen dataclass 元组，可直接比较）。"""
+    return (
+        tuple(snap.seg_snapshot.segments),
+        tuple(snap.zs_snapshot.zhongshus),
+        tuple(snap.move_snapshot.moves),
+        tuple(
+            (rs.level_id, tuple(rs.zhongshus), tuple(rs.moves))
+            for rs in snap.recursive_snapshots
+        ),
+    )
+
+
+class LStarSelector:
+    """L* 增量选择器，结果与 ``select_lstar_from_recursive_snapshot`` 一致。
+
+    结构（_structure_key）与上次相同时复用各中枢的"去价格"判定，
+    仅重判结算锚的价格区间；结构变化时整体重建。
+
+    Usage::
+
+        selector = LStarSelector()
+        lstar = selector.select(snap, last_price)
+    """
+
+    def __init__(self) -> None:
+        self._key: tuple | None = None
+        # [(level, [(center_idx, center, structural AliveCenter)])]，level 降序
+        self._levels: list[tuple[int, list[tuple[int, Center, AliveCenter]]]] = []
+        self.rebuilds = 0
+
+    def reset(self) -> None:
+        self._key = None
+        self._levels = []
+
+    def _rebuild(self, snap: RecursiveOrchestratorSnapshot) -> None:
+        views = sorted(
+            level_views_from_recursive_snapshot(snap),
+            key=lambda v: v.level, reverse=True,
+        )
+        nan = float("nan")  # NaN 使价格区间判定恒为假，只保留结构判定
+        self._levels = [
+            (view.level, [
+                (ci, center, classify_center_practical_newchan(
+                    center=center, center_idx=ci,
+                    segments=view.segments, last_price=nan,
+                ))
+                for ci, center in enumerate(view.centers)
+            ])
+            for view in views
+        ]
+        self.rebuilds += 1
+
+    def select(
+        self, snap: RecursiveOrchestratorSnapshot, last_price: float,
+    ) -> LStar | None:
+        """按最新价选择 L*。"""
+        key = _structure_key(snap)
+        if key != self._key:
+            self._rebuild(snap)
+            self._key = key
+
+        for level, centers in self._levels:
+            alive: list[tuple[Center, int, Regime]] = []
+            for ci, center, structural in centers:
+                if center.kind == "settled" and center.low <= last_price <= center.high:
+                    alive.append((center, ci, Regime.SETTLE_ANCHOR_IN_CORE))
+                elif structural.is_alive:
+                    alive.append((center, ci, structural.regime))
+            if not alive:
+                continue
+            center, ci, regime = max(alive, key=lambda a: (a[0].seg1, a[0].seg0))
+            return LStar(level=level, center_idx=ci, regime=regime)
+        return None
@@ -4,12 +4,18 @@
 的输出组装为前端可消费的 JSON schema。
 
 输出 schema_version: "newchan_overlay_v1"
+
+增量扩展：调用方传入同一个 ``OverlayState`` 反复构建时，与上次输入
+相同的前缀 bar 上的 MACD 序列与区间面积直接复用（MACD 为因果递推），
+只为变化 / 新增的 bar 计算。
 """
 
 from __future__ import annotations
 
 import math
+from dataclasses import dataclass, field
 
+import numpy as np
 import pandas as pd
 
 from newchan.a_inclusion import merge_inclusion
@@ -87,6 +93,66 @@ def _epoch_pair(
     return _ts_to_epoch(raw_index[i0]), _ts_to_epoch(raw_index[i1])
 
 
+# ====================================================================
+# 增量状态
+# ====================================================================
+
+class _MacdAreas:
+    """MACD 区间面积，按 (raw_i0, raw_i1) 记忆。"""
+
+    def __init__(self, df_macd: pd.DataFrame, memo: dict | None = None) -> None:
+        self.df_macd = df_macd
+        self.memo: dict[tuple[int, int], dict] = memo if memo is not None else {}
+
+    def __call__(self, raw_i0: int, raw_i1: int) -> dict:
+        key = (raw_i0, raw_i1)
+        area = self.memo.get(key)
+        if area is None:
+            area = self.memo[key] = macd_area_for_range(self.df_macd, raw_i0, raw_i1)
+        return area
+
+
+@dataclass
+class OverlayState:
+    """build_overlay_newchan 的可复用中间量（同一数据源 + 参数反复构建时传入）。
+
+    记录上次输入的 close / 时间索引；下次构建时与新输入比对出不变的前缀，
+    复用前缀上的 MACD 序列行与区间面积（仅依赖前缀 bar，见 compute_macd）。
+    滑动窗口（limit）或历史数据被改写时前缀自然缩短，退化为全量计算。
+    """
+
+    close: np.ndarray | None = None
+    index: pd.Index | None = None
+    macd_params: tuple[int, int, int] = (0, 0, 0)
+    series: list[dict] = field(default_factory=list)
+    areas: dict[tuple[int, int], dict] = field(default_factory=dict)
+    builds: int = 0
+    reused_bars: int = 0  # 最近一次构建复用的前缀 bar 数
+
+    def stable_prefix(self, df_raw: pd.DataFrame, macd_params: tuple[int, int, int]) -> int:
+        """与上次输入相同（close 与时间戳一致）的前缀 bar 数。"""
+        if self.close is None or macd_params != self.macd_params:
+            return 0
+        n = min(len(self.close), len(df_raw))
+        same = (df_raw["close"].to_numpy(dtype=float)[:n] == self.close[:n]) & (
+            np.asarray(df_raw.index[:n] == self.index[:n])
+        )
+        diff = np.flatnonzero(~same)
+        return int(diff[0]) if len(diff) else n
+
+    def commit(
+        self, df_raw: pd.DataFrame, macd_params: tuple[int, int, int],
+        series: list[dict], areas: dict, reused: int,
+    ) -> None:
+        self.close = df_raw["close"].to_numpy(dtype=float).copy()
+        self.index = df_raw.index
+        self.macd_params = macd_params
+        self.series = series
+        self.areas = areas
+        self.builds += 1
+        self.reused_bars = reused
+
+
 # ====================================================================
 # 主函数
 # ====================================================================
@@ -148,8 +214,12 @@ def build_overlay_newchan(
     macd_fast: int = 12,
     macd_slow: int = 26,
     macd_signal: int = 9,
+    state: OverlayState | None = None,
 ) -> dict:
-    """构建新缠论 overlay 完整输出（schema_version="newchan_overlay_v2"）。"""
+    """构建新缠论 overlay 完整输出（schema_version="newchan_overlay_v2"）。
+
+    state 非 None 时复用其中与本次输入相同前缀的 MACD 结果，并更新 state。
+    """
     if len(df_raw) < 3:
         return _empty_overlay(symbol, tf, detail, macd_fast, macd_slow, macd_signal)
 
@@ -159,6 +229,14 @@ def build_overlay_newchan(
     )
     centers, trends = _resolve_level1(rec_levels, segments, center_sustain_m)
     df_macd = compute_macd(df_raw, fast=macd_fast, slow=macd_slow, signal=macd_signal)
+    macd_params = (macd_fast, macd_slow, macd_signal)
+    reused = state.stable_prefix(df_raw, macd_params) if state is not None else 0
+    if reused:
+        areas = _MacdAreas(df_macd, {k: v for k, v in state.areas.items() if k[1] < reused})
+        macd_prefix = state.series[:reused]
+    else:
+        areas = _MacdAreas(df_macd)
+        macd_prefix = []
 
     last_price = float(df_raw["close"].iloc[-1])
     level_views = levels_to_level_views(rec_levels)
@@ -172,17 +250,22 @@ def build_overlay_newchan(
         segment_algo, stroke_mode, min_strict_sep, center_sustain_m,
     )
 
-    return {
+    result = {
         "schema_version": "newchan_overlay_v2",
         "symbol": symbol, "tf": tf, "detail": detail,
         "lstar": _build_lstar(lstar_obj, centers, segments, last_price, detail),
-        "strokes": _build_strokes(strokes, merged_to_raw, raw_index, df_macd, df_merged),
-        "segments": _build_segments(segments, strokes, merged_to_raw, raw_index, df_macd, df_merged),
-        "centers": _build_centers(centers, segments, merged_to_raw, raw_index, df_macd),
-        "trends": _build_trends(trends, segments, strokes, merged_to_raw, raw_index, df_macd, df_merged),
+        "strokes": _build_strokes(strokes, merged_to_raw, raw_index, areas, df_merged),
+        "segments": _build_segments(segments, strokes, merged_to_raw, raw_index, areas, df_merged),
+        "centers": _build_centers(centers, segments, merged_to_raw, raw_index, areas),
+        "trends": _build_trends(trends, segments, strokes, merged_to_raw, raw_index, areas, df_merged),
         "levels": _build_levels(rec_levels, segments, strokes, merged_to_raw, raw_index, df_macd, df_merged),
-        "macd": _build_macd_series(df_macd, raw_index, macd_fast, macd_slow, macd_signal),
+        "macd": _build_macd_series(
+            df_macd, raw_index, macd_fast, macd_slow, macd_signal, prefix=macd_prefix,
+        ),
     }
+    if state is not None:
+        state.commit(df_raw, macd_params, result["macd"]["series"], areas.memo, reused)
+    return result
 
 
 # ====================================================================
@@ -209,14 +292,14 @@ def _stroke_p0p1(s, merged_highs=None, merged_lows=None):
     return float(s.p0), float(s.p1)
 
 
-def _build_strokes(strokes, m2r, raw_index, df_macd, df_merged):
+def _build_strokes(strokes, m2r, raw_index, areas, df_merged):
     merged_highs = df_merged["high"].values
     merged_lows = df_merged["low"].values
     result = []
     for i, s in enumerate(strokes):
         raw_i0, raw_i1 = _obj_raw_range(s.i0, s.i1, m2r)
         t0, t1 = _epoch_pair(raw_i0, raw_i1, raw_index)
-        area = macd_area_for_range(df_macd, raw_i0, raw_i1)
+        area = areas(raw_i0, raw_i1)
         p0, p1 = _stroke_p0p1(s, merged_highs, merged_lows)
         result.append({
             "id": i, "t0": t0, "t1": t1,
@@ -259,10 +342,10 @@ def _build_stroke_points(seg, strokes, merged_highs, merged_lows, m2r, raw_index
     return stroke_pts
 
 
-def _build_single_segment(i, seg, strokes, merged_highs, merged_lows, m2r, raw_index, df_macd):
+def _build_single_segment(i, seg, strokes, merged_highs, merged_lows, m2r, raw_index, areas):
     """构建单个线段的前端 JSON dict。"""
     raw_i0, raw_i1 = _obj_raw_range(seg.i0, seg.i1, m2r)
-    area = macd_area_for_range(df_macd, raw_i0, raw_i1)
+    area = areas(raw_i0, raw_i1)
     ep0_i, ep1_i, ep0_price, ep1_price, ep0_type, ep1_type, _, _ = _resolve_seg_endpoints(seg)
 
     t0_render = int(_merged_idx_to_epoch(ep0_i, m2r, raw_index))
@@ -290,17 +373,17 @@ def _build_single_segment(i, seg, strokes, merged_highs, merged_lows, m2r, raw_i
     }
 
 
-def _build_segments(segments, strokes, m2r, raw_index, df_macd, df_merged):
+def _build_segments(segments, strokes, m2r, raw_index, areas, df_merged):
     """Map Segment 到前端 JSON：桥接层只做映射，不重算端点。"""
     merged_highs = df_merged["high"].values
     merged_lows = df_merged["low"].values
     return [
-        _build_single_segment(i, seg, strokes, merged_highs, merged_lows, m2r, raw_index, df_macd)
+        _build_single_segment(i, seg, strokes, merged_highs, merged_lows, m2r, raw_index, areas)
         for i, seg in enumerate(segments)
     ]
 
 
-def _build_centers(centers, segments, m2r, raw_index, df_macd):
+def _build_centers(centers, segments, m2r, raw_index, areas):
     result = []
     for i, c in enumerate(centers):
         # center 时间范围取 segments[seg0] .. segments[seg1]
@@ -312,7 +395,7 @@ def _build_centers(centers, segments, m2r, raw_index, df_macd):
         else:
             raw_i0, raw_i1 = 0, 0
         t0, t1 = _epoch_pair(raw_i0, raw_i1, raw_index)
-        area = macd_area_for_range(df_macd, raw_i0, raw_i1)
+        area = areas(raw_i0, raw_i1)
         result.append({
             "id": i, "t0": t0, "t1": t1,
             "ZD": c.low, "ZG": c.high,
@@ -331,7 +414,7 @@ def _build_centers(centers, segments, m2r, raw_index, df_macd):
     return result
 
 
-def _build_trends(trends, segments, strokes, m2r, raw_index, df_macd, df_merged):
+def _build_trends(trends, segments, strokes, m2r, raw_index, areas, df_merged):
     result = []
     for i, tr in enumerate(trends):
         if tr.seg0 < len(segments) and tr.seg1 < len(segments):
@@ -342,7 +425,7 @@ def _build_trends(trends, segments, strokes, m2r, raw_index, df_macd, df_merged)
         else:
             raw_i0, raw_i1 = 0, 0
         t0, t1 = _epoch_pair(raw_i0, raw_i1, raw_index)
-        area = macd_area_for_range(df_macd, raw_i0, raw_i1)
+        area = areas(raw_i0, raw_i1)
         # p0/p1：用段内笔的端点价
         p0, p1 = None, None
         if tr.seg0 < len(segments) and tr.seg1 < len(segments):
@@ -397,19 +480,20 @@ def _build_lstar(lstar_obj, centers, segments, last_price, detail):
     return out
 
 
-def _build_macd_series(df_macd, raw_index, fast, slow, signal):
-    series = []
-    for i in range(len(df_macd)):
-        t = _ts_to_epoch(raw_index[i])
-        row = df_macd.iloc[i]
-        rec = {"time": t}
-        for col in ("macd", "signal", "hist"):
-            v = row[col]
-            if pd.notna(v) and not (isinstance(v, float) and math.isnan(v)):
-                rec[col] = round(float(v), 6)
-            else:
-                rec[col] = 0.0
-        series.append(rec)
+def _macd_value(v: float) -> float:
+    return 0.0 if math.isnan(v) else round(v, 6)
+
+
+def _build_macd_series(df_macd, raw_index, fast, slow, signal, prefix=()):
+    """MACD 序列；prefix 为可复用的前若干行（只计算其后的行）。"""
+    start = len(prefix)
+    cols = [df_macd[c].to_numpy(dtype=float)[start:].tolist() for c in ("macd", "signal", "hist")]
+    series = list(prefix)
+    for ts, m, s, h in zip(raw_index[start:], *cols):
+        series.append({
+            "time": _ts_to_epoch(ts),
+            "macd": _macd_value(m), "signal": _macd_value(s), "hist": _macd_value(h),
+        })
     return {
         "fast": fast, "slow": slow, "signal": signal,
         "series": series,
@@ -0,0 +1,217 @@
+"""进程级 bar 列式缓存
+
+网关每次创建回放会话都要读 parquet → 可选 resample → 转 Bar。
+同一品种被多个会话回放时，这些开销只应付一次：
+
+- ``BarColumns``：一组 bar 的 NumPy 列式表示（UTC 纳秒时间戳 + OHLCV
+  float64 列），``to_bars`` 以整列转换批量构造 Bar，不走 ``iterrows``。
+- ``BarCache``：按 (symbol, interval, tf, 文件 mtime) 缓存 BarColumns，
+  按字节数 LRU 淘汰，记录命中 / 未命中 / 淘汰计数。源文件更新
+  （mtime 变化）后旧条目自然失效。
+
+缓存的是只读列数组；每次取用都构造新的 Bar 列表，
+会话之间不共享可变对象。
+
+- ``FrameCache``：同样的字节 LRU，条目为 DataFrame（图表服务缓存
+  读盘与 resample 后的整段数据）。取用方只读，不得原地修改。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+from newchan.types import Bar
+
+
+@dataclass(frozen=True, slots=True)
+class BarColumns:
+    """bar 序列的列式表示。
+
+    Attributes
+    ----------
+    ts_ns : np.ndarray
+        int64，UTC epoch 纳秒。
+    open, high, low, close : np.ndarray
+        float64。
+    volume : np.ndarray | None
+        float64（缺失为 NaN）；数据无 volume 列时为 None。
+    """
+
+    ts_ns: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.ts_ns)
+
+    @property
+    def nbytes(self) -> int:
+        cols = (self.ts_ns, self.open, self.high, self.low, self.close, self.volume)
+        return sum(c.nbytes for c in cols if c is not None)
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> BarColumns:
+        """OHLCV DataFrame（DatetimeIndex）→ BarColumns。naive 时间视为 UTC。"""
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        ts_ns = index.tz_convert("UTC").as_unit("ns").asi8.copy()
+
+        def col(name: str) -> np.ndarray:
+            return df[name].to_numpy(dtype=np.float64, copy=True)
+
+        volume = col("volume") if "volume" in df.columns else None
+        return cls(
+            ts_ns=ts_ns,
+            open=col("open"),
+            high=col("high"),
+            low=col("low"),
+            close=col("close"),
+            volume=volume,
+        )
+
+    def to_bars(self) -> list[Bar]:
+        """批量构造 Bar 列表（时间为 UTC aware datetime）。"""
+        n = len(self)
+        if n == 0:
+            return []
+        ts = pd.DatetimeIndex(self.ts_ns.view("datetime64[ns]"), tz="UTC").to_pydatetime()
+        if self.volume is None:
+            vol: list = [None] * n
+        else:
+            # NaN → None，与逐行转换语义一致
+            vol = np.where(np.isnan(self.volume), None, self.volume).tolist()
+        return list(map(
+            Bar,
+            ts,
+            self.open.tolist(),
+            self.high.tolist(),
+            self.low.tolist(),
+            self.close.tolist(),
+            vol,
+        ))
+
+
+class BarCache:
+    """线程安全的 BarColumns LRU 缓存（按字节数限额）。
+
+    Parameters
+    ----------
+    max_bytes : int
+        列数组总字节上限；超出时淘汰最久未使用条目。
+        单个条目超过上限时照常返回但不入缓存。
+
+    Usage::
+
+        cache = BarCache(max_bytes=256 << 20)
+        cols = cache.get_or_load(("CL", "1min", "5m", mtime_ns), loader)
+        bars = cols.to_bars()
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024) -> None:
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes 不能为负: {max_bytes}")
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, BarColumns] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> BarColumns | None:
+        """查询并刷新 LRU 位置；未命中返回 None（计入 misses）。"""
+        with self._lock:
+            cols = self._entries.get(key)
+            if cols is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cols
+
+    @staticmethod
+    def _size(value: BarColumns) -> int:
+        return value.nbytes
+
+    def put(self, key: Hashable, cols: BarColumns) -> None:
+        """写入条目并按字节上限淘汰。"""
+        size = self._size(cols)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = cols
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+                self.evictions += 1
+
+    def get_or_load(
+        self, key: Hashable, loader: Callable[[], BarColumns],
+    ) -> BarColumns:
+        """命中直接返回；否则调用 loader（锁外执行）并写入。"""
+        cols = self.get(key)
+        if cols is None:
+            cols = loader()
+            self.put(key, cols)
+        return cols
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除 key 满足 predicate 的条目，返回删除数。"""
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                self._bytes -= self._size(self._entries.pop(k))
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        """导出命中率与占用快照。"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class FrameCache(BarCache):
+    """线程安全的 DataFrame LRU 缓存（按字节数限额，接口同 BarCache）。
+
+    Usage::
+
+        cache = FrameCache(max_bytes=256 << 20)
+        df = cache.get_or_load(("CL_1min_raw", "5m", mtime_ns), loader)
+    """
+
+    @staticmethod
+    def _size(value: pd.DataFrame) -> int:
+        return int(value.memory_usage(index=True, deep=False).sum())
@@ -149,9 +149,22 @@ class BiEngine:
         2. 调用现有纯函数做全量计算
         3. diff 产生事件
         """
-        self._bar_idx += 1
-        self._bar_ohlc.append([bar.open, bar.high, bar.low, bar.close])
-        self._bar_timestamps.append(bar.ts)
+        return self.process_bars([bar])
+
+    def process_bars(self, bars: list[Bar]) -> BiEngineSnapshot:
+        """批量追加多根 K 线，管线只跑一次（快进 / 回填用）。
+
+        不产生逐 bar 快照：返回最后一根 bar 的快照，其 events 为追加前后
+        笔快照的净差分（中间被取代的状态不会出现）。管线是 bars[:n] 的
+        纯函数，结果笔列表与逐根 process_bar 完全一致。
+        """
+        if not bars:
+            raise ValueError("bars 不能为空")
+        for b in bars:
+            self._bar_ohlc.append([b.open, b.high, b.low, b.close])
+            self._bar_timestamps.append(b.ts)
+        self._bar_idx += len(bars)
+        bar = bars[-1]
 
         bar_ts = _dt_to_epoch(bar.ts)
         strokes, fractals, n_merged = self._run_pipeline(bar)
@@ -37,6 +37,30 @@ def load_df(name: str) -> pd.DataFrame | None:
     return pd.read_parquet(path)
 
 
+def cache_mtime_ns(name: str) -> int | None:
+    """缓存文件的修改时间（纳秒），不存在返回 None。"""
+    path = _cache_dir() / f"{name}.parquet"
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def cache_dir_version() -> int:
+    """缓存目录的修改时间（纳秒）：文件新增 / 删除 / 改名时变化，可据此刷新 list_cached 的结果。"""
+    return _cache_dir().stat().st_mtime_ns
+
+
+def cache_rows(name: str) -> int:
+    """缓存文件的行数（只读 parquet 元数据），不存在返回 0。"""
+    path = _cache_dir() / f"{name}.parquet"
+    if not path.exists():
+        return 0
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(path).metadata.num_rows
+
+
 def save_df(name: str, df: pd.DataFrame) -> Path:
     """将 DataFrame 写入缓存，返回文件路径。"""
     path = _cache_dir() / f"{name}.parquet"
@@ -19,6 +19,36 @@ def env_flag(name: str, default: bool = False) -> bool:
 ALPHAVANTAGE_API_KEY: str = os.getenv("ALPHAVANTAGE_API_KEY", "")
 DATABENTO_API_KEY: str = os.getenv("DATABENTO_API_KEY", "")
 CACHE_DIR: str = os.getenv("CACHE_DIR", ".cache")
+# 网关进程级 bar 缓存上限（MB）
+BAR_CACHE_MB: int = int(os.getenv("BAR_CACHE_MB", "256"))
+# 图表服务（server.py）读盘 / resample 结果缓存上限（MB）
+FRAME_CACHE_MB: int = int(os.getenv("FRAME_CACHE_MB", "256"))
+# 图表服务新缠论 overlay 结果缓存条目数（按品种 / tf / 参数 / limit）
+OVERLAY_CACHE_ENTRIES: int = int(os.getenv("OVERLAY_CACHE_ENTRIES", "32"))
+# 图表服务 overlay 视口请求自动选择细节层级时的结构数上限
+OVERLAY_LOD_MAX_ITEMS: int = int(os.getenv("OVERLAY_LOD_MAX_ITEMS", "2000"))
+# 图表服务技术指标流式状态缓存条目数（按品种 / tf / 指标 / 参数）
+INDICATOR_CACHE_ENTRIES: int = int(os.getenv("INDICATOR_CACHE_ENTRIES", "64"))
+# 图表服务历史数据拉取任务：工作线程数、每个数据源并发上限、单次拉取的日期跨度（天）
+FETCH_WORKERS: int = int(os.getenv("FETCH_WORKERS", "2"))
+FETCH_PER_PROVIDER: int = int(os.getenv("FETCH_PER_PROVIDER", "1"))
+FETCH_CHUNK_DAYS: int = int(os.getenv("FETCH_CHUNK_DAYS", "90"))
+
+# 网关回放会话生命周期：最长未访问 / 无客户端空闲时长（秒）、内存预算（MB，0=不限）、
+# 淘汰时是否落盘到 {CACHE_DIR}/sessions 以便恢复
+SESSION_TTL_S: float = float(os.getenv("SESSION_TTL_S", "21600"))
+SESSION_IDLE_S: float = float(os.getenv("SESSION_IDLE_S", "900"))
+SESSION_BUDGET_MB: int = int(os.getenv("SESSION_BUDGET_MB", "1024"))
+SESSION_SPILL: bool = env_flag("SESSION_SPILL", True)
+
+# 网关 WS 每客户端发送队列上限（步数）与默认溢出策略（coalesce / drop）
+WS_SEND_QUEUE: int = int(os.getenv("WS_SEND_QUEUE", "64"))
+WS_OVERFLOW: str = os.getenv("WS_OVERFLOW", "coalesce")
+# 每客户端推送 flush 频率上限（次/秒，0=不限）与自动播放推送帧率上限
+WS_MAX_FPS: float = float(os.getenv("WS_MAX_FPS", "60"))
+PLAY_MAX_FPS: float = float(os.getenv("PLAY_MAX_FPS", "30"))
+# 每会话保留的推送条目数（WS 重连按 feed_seq 增量补发的范围）
+WS_RESUME_LOG: int = int(os.getenv("WS_RESUME_LOG", "4096"))
 
 # IBKR (TWS / IB Gateway) 连接配置
 IB_HOST: str = os.getenv("IB_HOST", "127.0.0.1")
@@ -0,0 +1,92 @@
+"""WebSocket 帧编码 — 批量帧 + 可选二进制编码
+
+客户端在连接时通过查询参数协商推送格式::
+
+    ws://host:8766/ws/feed?batch=1&encoding=msgpack
+
+- ``batch``：为真时，同一步产生的全部消息（bar / event / status）
+  合并为一个 ``{"type": "batch", "messages": [...]}`` 帧；
+  单条消息仍按原样发送。
+- ``encoding``：``json``（默认，文本帧）或 ``msgpack``（二进制帧，
+  需安装可选依赖 ``msgpack``）。不支持或不可用时回退为 ``json``。
+
+服务端在连接后首先以 JSON 文本发送 ``feed_config`` 消息，告知实际生效的格式。
+消息结构与逐条 JSON 推送完全相同，仅帧的打包方式不同。
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+try:  # 可选依赖
+    import msgpack
+except ImportError:  # pragma: no cover - 取决于环境
+    msgpack = None
+
+ENCODINGS = ("json", "msgpack")
+
+_TRUE = {"1", "true", "yes", "on"}
+
+
+def msgpack_available() -> bool:
+    """msgpack 是否可用。"""
+    return msgpack is not None
+
+
+@dataclass(frozen=True, slots=True)
+class FeedFormat:
+    """单个 WS 客户端协商后的推送格式。"""
+
+    encoding: str = "json"
+    batch: bool = False
+
+    @property
+    def binary(self) -> bool:
+        return self.encoding == "msgpack"
+
+    def to_ws(self) -> dict:
+        """``feed_config`` 消息（总以 JSON 文本发送）。"""
+        return {"type": "feed_config", "encoding": self.encoding, "batch": self.batch}
+
+
+JSON_FORMAT = FeedFormat()
+
+
+def negotiate(encoding: str | None = None, batch: str | bool | None = None) -> FeedFormat:
+    """按客户端请求确定推送格式；未知或不可用的编码回退为 json。"""
+    enc = (encoding or "json").strip().lower()
+    if enc not in ENCODINGS or (enc == "msgpack" and msgpack is None):
+        enc = "json"
+    if isinstance(batch, str):
+        batch = batch.strip().lower() in _TRUE
+    return FeedFormat(encoding=enc, batch=bool(batch))
+
+
+def encode(message: Any, fmt: FeedFormat = JSON_FORMAT) -> str | bytes:
+    """编码单个帧：json → str（文本帧），msgpack → bytes（二进制帧）。"""
+    if fmt.binary:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode(data: str | bytes) -> Any:
+    """解码单个帧（测试 / Python 客户端用）。"""
+    if isinstance(data, (bytes, bytearray)):
+        if msgpack is None:
+            raise RuntimeError("收到二进制帧但 msgpack 不可用")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+def batch_message(messages: list[dict]) -> dict:
+    """多条消息 → batch 消息。"""
+    return {"type": "batch", "messages": messages}
+
+
+def encode_frames(messages: list[dict], fmt: FeedFormat = JSON_FORMAT) -> list[str | bytes]:
+    """按格式把一组消息编码为待发送的帧列表。"""
+    if fmt.batch and len(messages) > 1:
+        return [encode(batch_message(messages), fmt)]
+    return [encode(m, fmt) for m in messages]
@@ -53,6 +53,23 @@ class WsSnapshot(BaseModel):
     bar_idx: int
     strokes: list[dict[str, Any]]
     event_count: int
+    version: int = 0  # 会话内快照版本（客户端据此请求增量）
+
+
+class WsSnapshotDelta(BaseModel):
+    """增量快照 — 相对客户端持有的 base_version，只含变化与删除的结构。
+
+    客户端按标识字段（strokes: i0）合并：删除 removed 中的标识，
+    以 changed 中的结构覆盖 / 新增，再按标识排序，即得到 version 的完整状态。
+    """
+
+    type: Literal["snapshot_delta"] = "snapshot_delta"
+    version: int
+    base_version: int
+    bar_idx: int
+    event_count: int
+    changed: dict[str, list[dict[str, Any]]]  # 结构类型 → 新增 / 修改的结构
+    removed: dict[str, list[Any]]  # 结构类型 → 被删除结构的标识
 
 
 class WsReplayStatus(BaseModel):
@@ -65,6 +82,33 @@ class WsReplayStatus(BaseModel):
     speed: float
 
 
+class WsBatch(BaseModel):
+    """批量帧 — 同一步产生的全部消息（客户端以 batch=1 协商启用）。"""
+
+    type: Literal["batch"] = "batch"
+    messages: list[dict[str, Any]]
+
+
+class WsFeedConfig(BaseModel):
+    """连接后首帧 — 告知实际生效的推送格式（总以 JSON 文本发送）。"""
+
+    type: Literal["feed_config"] = "feed_config"
+    encoding: Literal["json", "msgpack"] = "json"
+    batch: bool = False
+    overflow: Literal["coalesce", "drop"] = "coalesce"
+
+
+class WsResumed(BaseModel):
+    """resume 命令的应答 — 随后补发 from_seq 之后的条目，或一份完整快照。"""
+
+    type: Literal["resumed"] = "resumed"
+    session_id: str
+    from_seq: int  # 客户端已收到的最后 feed_seq
+    to_seq: int  # 补发截止的 feed_seq
+    replayed: int  # 补发的条目数
+    snapshot: bool = False  # 缺口超出日志保留范围，改发完整快照
+
+
 class WsError(BaseModel):
     """错误消息。"""
 
@@ -87,14 +131,24 @@ class WsCommand(BaseModel):
         "replay_start",
         "replay_step",
         "replay_seek",
+        "replay_fast_forward",
         "replay_play",
         "replay_pause",
+        "resume",
     ]
     symbol: str = ""
     tf: str = "5m"
     step_count: int = 1
     seek_idx: int = 0
     speed: float = 1.0
+    # replay_fast_forward：目标 bar 索引（缺省为最后一根）
+    target_idx: int | None = None
+    # replay_seek / replay_fast_forward / resume：客户端持有的快照版本（服务端据此发送增量快照）
+    base_version: int | None = None
+    # resume：重连后按最后收到的 feed_seq（或事件 event_id）增量补发
+    session_id: str = ""
+    last_seq: int | None = None
+    last_event_id: str = ""
 
 
 # ════════════════════════════════════════════════
@@ -132,11 +186,25 @@ class ReplayStepResponse(BaseModel):
 class ReplaySeekRequest(BaseModel):
     session_id: str
     target_idx: int
+    base_version: int | None = None  # 持有的快照版本；仍保留时返回增量快照
 
 
 class ReplaySeekResponse(BaseModel):
     bar_idx: int
-    snapshot: WsSnapshot
+    snapshot: WsSnapshot | WsSnapshotDelta
+
+
+class ReplayFastForwardRequest(BaseModel):
+    session_id: str
+    target_idx: int | None = None  # 缺省快进到最后一根 bar
+    base_version: int | None = None  # 持有的快照版本；仍保留时返回增量快照
+
+
+class ReplayFastForwardResponse(BaseModel):
+    bar_idx: int
+    skipped: int  # 快进跨过的 bar 数
+    snapshot: WsSnapshot | WsSnapshotDelta
+    events: list[WsEvent] = []  # 压缩事件摘要：快进前后的净差分
 
 
 class ReplayPlayRequest(BaseModel):
@@ -55,21 +55,15 @@ def tf_to_stream_id(
 ) -> StreamId:
     """从 (symbol, tf, interval) 构造 StreamId。
 
-    查找 SYMBOL_CATALOG 获取 inst_type/exchange，
+    查找品种目录索引获取 inst_type/exchange，
     未知品种使用默认值。
     """
-    from newchan.core.symbol_catalog import SYMBOL_CATALOG
+    from newchan.core.symbol_index import catalog_index
 
     sym = symbol.upper() if symbol else ""
-    inst_type = "STK"
-    exchange = "UNKNOWN"
-
-    if sym:
-        for item in SYMBOL_CATALOG:
-            if item["symbol"] == sym:
-                inst_type = item["type"]
-                exchange = item["exchange"]
-                break
+    item = catalog_index().resolve(sym)
+    inst_type = item["type"] if item else "STK"
+    exchange = item["exchange"] if item else "UNKNOWN"
 
     instrument = InstrumentId(
         symbol=sym or "UNKNOWN",
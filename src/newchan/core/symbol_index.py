@@ -0,0 +1,112 @@
+"""品种搜索索引 — 纯内存，无第三方依赖
+
+输入框逐键搜索时，原实现对目录中每个品种现拼大写字符串再做子串匹配，
+品种解析（``tf_to_stream_id``）也是线性扫描。这里预先建好：
+
+- n-gram 倒排表：可检索文本（默认 symbol / name / cn / exchange 以空格拼接
+  后大写）的全部 1~3 字符子串 → 条目下标（升序）。查询取其 3-gram
+  （不足 3 字符时取整串）的倒排表求交，再对少量候选做一次子串校验，
+  因此结果与逐条 ``q in text`` 完全一致，且保持目录原有顺序。
+- 精确解析字典：大写 symbol → 条目（重复时取第一条，与线性扫描相同）。
+
+``catalog_index()`` 缓存基于 ``SYMBOL_CATALOG`` 的索引，目录条数变化时重建。
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Sequence
+
+_MAX_GRAM = 3
+SEARCH_FIELDS: tuple[str, ...] = ("symbol", "name", "cn", "exchange")
+
+
+def _grams(text: str) -> set[str]:
+    out: set[str] = set()
+    for n in range(1, _MAX_GRAM + 1):
+        for i in range(len(text) - n + 1):
+            out.add(text[i:i + n])
+    return out
+
+
+def _query_grams(q: str) -> set[str]:
+    if len(q) <= _MAX_GRAM:
+        return {q}
+    return {q[i:i + _MAX_GRAM] for i in range(len(q) - _MAX_GRAM + 1)}
+
+
+class SymbolIndex:
+    """品种列表的子串搜索索引 + 精确解析字典。
+
+    Parameters
+    ----------
+    items : Iterable[dict]
+        品种条目（如 ``SYMBOL_CATALOG`` 或缓存品种列表），按期望的结果顺序。
+    fields : Sequence[str]
+        参与搜索的字段，缺失字段按空串处理。
+    key : str
+        精确解析使用的字段。
+
+    Usage::
+
+        index = SymbolIndex(SYMBOL_CATALOG)
+        index.search("原油")     # [{"symbol": "CL", ...}, {"symbol": "BZ", ...}]
+        index.resolve("cl")      # {"symbol": "CL", "type": "FUT", ...} 或 None
+    """
+
+    def __init__(
+        self,
+        items: Iterable[dict],
+        fields: Sequence[str] = SEARCH_FIELDS,
+        key: str = "symbol",
+    ) -> None:
+        self.items: list[dict] = list(items)
+        self._texts: list[str] = [
+            " ".join(str(item.get(f, "")) for f in fields).upper() for item in self.items
+        ]
+        self._exact: dict[str, dict] = {}
+        self._postings: dict[str, list[int]] = {}
+        for i, (item, text) in enumerate(zip(self.items, self._texts)):
+            self._exact.setdefault(str(item.get(key, "")).upper(), item)
+            for g in _grams(text):
+                self._postings.setdefault(g, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def resolve(self, symbol: str) -> dict | None:
+        """按 key 字段精确查找（不区分大小写），未找到返回 None。"""
+        return self._exact.get(symbol.upper()) if symbol else None
+
+    def search(self, query: str, limit: int | None = None) -> list[dict]:
+        """子串搜索（不区分大小写），结果保持条目原有顺序。"""
+        q = query.upper().strip()
+        if not q:
+            return []
+        postings = sorted((self._postings.get(g, ()) for g in _query_grams(q)), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                return []
+        out: list[dict] = []
+        for i in sorted(candidates):
+            if q in self._texts[i]:
+                out.append(self.items[i])
+                if limit is not None and len(out) >= limit:
+                    break
+        return out
+
+
+_catalog_index: SymbolIndex | None = None
+
+
+def catalog_index() -> SymbolIndex:
+    """``SYMBOL_CATALOG`` 的共享索引（首次调用时构建，目录条数变化时重建）。"""
+    global _catalog_index
+    from newchan.core.symbol_catalog import SYMBOL_CATALOG
+
+    if _catalog_index is None or len(_catalog_index) != len(SYMBOL_CATALOG):
+        _catalog_index = SymbolIndex(SYMBOL_CATALOG)
+    return _catalog_index
@@ -53,19 +53,12 @@ _STOCK_TICKERS: set[str] = {
 
 # 品种搜索索引：从 core.symbol_catalog 导入（避免循环依赖 databento 包）
 from newchan.core.symbol_catalog import SYMBOL_CATALOG
+from newchan.core.symbol_index import catalog_index
 
 
 def search_symbols(query: str) -> list[dict]:
     """在品种目录中模糊搜索（匹配 symbol/name/cn/exchange）。"""
-    q = query.upper().strip()
-    if not q:
-        return []
-    results = []
-    for item in SYMBOL_CATALOG:
-        searchable = f"{item['symbol']} {item['name']} {item['cn']} {item['exchange']}".upper()
-        if q in searchable:
-            results.append(item)
-    return results
+    return catalog_index().search(query)
 
 # interval → Databento schema
 _SCHEMA_MAP: dict[str, str] = {
@@ -1,6 +1,7 @@
 """Databento Live 实时数据 — 期货 ohlcv-1m 流式订阅
 
-在后台线程运行 Databento Live 客户端，收到 1min bar 后增量追加到缓存。
+在后台线程运行 Databento Live 客户端，收到 1min bar 后增量追加到缓存，
+再发布到内存尾部 ``tail``（LiveTail），供图表服务实时推送给浏览器。
 与 Historical API 使用同一数据源、同一 symbol、同一展期规则，保证数据一致性。
 
 OHLCVMsg 字段说明：
@@ -21,6 +22,7 @@ import pandas as pd
 from newchan.cache import append_df
 from newchan.config import DATABENTO_API_KEY
 from newchan.data_databento import _FUTURES_MAP
+from newchan.live_tail import LiveTail, make_live_bar
 
 logger = logging.getLogger(__name__)
 
@@ -42,9 +44,12 @@ class DatabentoLiveFeeder:
         self,
         symbols: list[str] | None = None,
         dataset: str = "GLBX.MDP3",
+        tail: LiveTail | None = None,
     ):
         self._symbols = [s.upper() for s in (symbols or DEFAULT_LIVE_SYMBOLS)]
         self._dataset = dataset
+        # 已落盘 bar 的内存尾部（先写缓存再发布，订阅方读盘时不会漏 bar）
+        self.tail = tail if tail is not None else LiveTail()
         self._client: db.Live | None = None
         self._thread: threading.Thread | None = None
         self._running = False
@@ -83,6 +88,7 @@ class DatabentoLiveFeeder:
             "symbols": self._symbols,
             "bar_count": self._bar_count,
             "last_error": self._last_error,
+            "tail_seq": self.tail.seq,
         }
 
     def start(self) -> None:
@@ -179,6 +185,10 @@ class DatabentoLiveFeeder:
             cache_name = self._cache_map[our_sym]
             append_df(cache_name, row)
             self._bar_count += 1
+            self.tail.publish(our_sym, make_live_bar(
+                ts, msg.pretty_open, msg.pretty_high,
+                msg.pretty_low, msg.pretty_close, msg.volume,
+            ))
 
             if self._bar_count <= 5 or self._bar_count % 100 == 0:
                 logger.info(
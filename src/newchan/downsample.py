@@ -0,0 +1,163 @@
+"""宽时间范围的服务端降采样
+
+缩放到数年 1 分钟数据时，``/api/ohlcv`` 与 ``/api/indicator`` 会把每根
+bar 都发给浏览器。带 ``max_points`` 的请求在服务端先降采样（全部 NumPy
+向量化，仅 LTTB 的逐桶选点是按桶循环）：
+
+- OHLC：按行数等分为 ≤ max_points 个桶，每桶合成一根包络 K 线
+  （首 open、最高 high、最低 low、末 close、volume 求和，时间取桶首），
+  极值不会被抽样丢掉。
+- 指标线：LTTB（Largest-Triangle-Three-Buckets）选点，保留形状拐点；
+  多列时各列分摊点数后取并集，NaN（指标预热期）不参与选点。
+- 金字塔：``pyramid_level`` 把整段数据按固定 ``PYRAMID_FACTOR**k`` 行
+  对齐分组预聚合（逐级由上一级再聚合）。``downsample_ohlc`` 选不超过
+  桶宽的最高一级，范围内完整的分组直接取该级的行，首尾不完整的部分
+  各由原始 bar 合成一行，再做一次包络。这样缩小视图的开销只与
+  级别行数相关，各级可由调用方按数据版本缓存。
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+PYRAMID_FACTOR = 8
+
+
+# ── OHLC 包络 ──────────────────────────────────────────────
+
+
+def _aggregate(df: pd.DataFrame, starts: np.ndarray) -> pd.DataFrame:
+    """按起始行 starts（升序，首个为 0）分组合成 K 线。"""
+    ends = np.append(starts[1:], len(df)) - 1
+    out: dict[str, np.ndarray] = {}
+    for col in df.columns:
+        v = df[col].to_numpy()
+        if col == "open":
+            out[col] = v[starts]
+        elif col == "high":
+            out[col] = np.fmax.reduceat(v.astype(float), starts)
+        elif col == "low":
+            out[col] = np.fmin.reduceat(v.astype(float), starts)
+        elif col == "volume":
+            out[col] = np.add.reduceat(np.nan_to_num(v.astype(float)), starts)
+        else:
+            out[col] = v[ends]
+    return pd.DataFrame(out, index=df.index[starts])
+
+
+def envelope(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """OHLC(V) 降到不超过 max_points 行（等行数分桶，每桶一根包络 K 线）。"""
+    if max_points < 1:
+        raise ValueError(f"max_points 必须 ≥ 1: {max_points}")
+    n = len(df)
+    if n <= max_points:
+        return df
+    per = -(-n // max_points)
+    return _aggregate(df, np.arange(0, n, per))
+
+
+def pyramid_level(df: pd.DataFrame, factor: int = PYRAMID_FACTOR) -> pd.DataFrame:
+    """按从第 0 行起对齐的 factor 行一组预聚合（金字塔的一级）。"""
+    if len(df) == 0:
+        return df
+    return _aggregate(df, np.arange(0, len(df), factor))
+
+
+def downsample_ohlc(
+    df: pd.DataFrame,
+    lo: int,
+    hi: int,
+    max_points: int,
+    level: Callable[[int], pd.DataFrame] | None = None,
+) -> pd.DataFrame:
+    """df.iloc[lo:hi] 的包络降采样，可用金字塔加速。
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        整段 OHLC(V)，金字塔以它的第 0 行对齐。
+    lo, hi : int
+        请求范围（行号，左闭右开）。
+    max_points : int
+        返回行数上限。
+    level : Callable[[int], pd.DataFrame] | None
+        ``level(k)`` 返回第 k 级金字塔（每行 ``PYRAMID_FACTOR**k`` 根原始 bar，
+        即对 df 反复 ``pyramid_level``）；None 时直接在原始 bar 上包络。
+    """
+    if max_points < 1:
+        raise ValueError(f"max_points 必须 ≥ 1: {max_points}")
+    n = hi - lo
+    if n <= max_points:
+        return df.iloc[lo:hi]
+    per = -(-n // max_points)
+    k = 0
+    while PYRAMID_FACTOR ** (k + 1) <= per:
+        k += 1
+    f = PYRAMID_FACTOR ** k
+    a, b = -(-lo // f), hi // f
+    if level is None or k == 0 or b <= a:
+        return envelope(df.iloc[lo:hi], max_points)
+    parts = [
+        envelope(df.iloc[lo:a * f], 1),
+        level(k).iloc[a:b],
+        envelope(df.iloc[b * f:hi], 1),
+    ]
+    return envelope(pd.concat([p for p in parts if len(p)]), max_points)
+
+
+# ── 指标线 LTTB ────────────────────────────────────────────
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """LTTB 选点，返回保留点的下标（升序，含首尾）。"""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out <= 2:
+        return np.array([0, n - 1][:max(n_out, 1)])
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # 首尾之外的点等分为 n_out - 2 桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, stops = edges[:-1], edges[1:]
+    counts = stops - starts
+    avg_x = np.add.reduceat(x[:-1], starts) / counts
+    avg_y = np.add.reduceat(y[:-1], starts) / counts
+    # 每桶的"下一桶均值"；最后一桶取末点
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    ax, ay = x[0], y[0]
+    for i, (s, e) in enumerate(zip(starts, stops)):
+        px, py = x[s:e], y[s:e]
+        area = np.abs((ax - next_x[i]) * (py - ay) - (ax - px) * (next_y[i] - ay))
+        j = s + int(np.argmax(area))
+        out[i + 1] = j
+        ax, ay = x[j], y[j]
+    return out
+
+
+def lttb_frame(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """指标 DataFrame 降到不超过 max_points 行（各列 LTTB 选点的并集）。"""
+    if max_points < 1:
+        raise ValueError(f"max_points 必须 ≥ 1: {max_points}")
+    n = len(df)
+    if n <= max_points or len(df.columns) == 0:
+        return df
+    budget = max(max_points // len(df.columns), 1)
+    x = df.index.asi8.astype(float) if isinstance(df.index, pd.DatetimeIndex) else np.arange(n, dtype=float)
+    keep: list[np.ndarray] = []
+    for col in df.columns:
+        y = df[col].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(y))
+        if len(valid):
+            keep.append(valid[lttb_indices(x[valid], y[valid], budget)])
+    if not keep:
+        return df.iloc[lttb_indices(x, np.zeros(n), min(max_points, 2))]
+    idx = np.unique(np.concatenate(keep))
+    return df.iloc[idx]
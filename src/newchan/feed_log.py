@@ -0,0 +1,75 @@
+"""会话推送日志 — WS 断线重连后的增量补发
+
+网关扇出任务按发布顺序给每个推送条目（一步的全部消息，或单条
+snapshot / status）分配会话内单调递增的 ``feed_seq``，并把条目保存在
+有界环形日志中。条目的最后一条消息带 ``feed_seq`` 字段：客户端收到它
+即表示该条目已完整收到。
+
+重连的客户端发送最后收到的 ``feed_seq``（或最后一个事件的
+``event_id``），网关从日志补发其后的条目；缺口超出日志保留范围时
+才回退为完整快照。
+"""
+
+from __future__ import annotations
+
+from collections import deque
+
+
+class FeedLog:
+    """单个会话的有界推送日志。
+
+    Parameters
+    ----------
+    max_items : int
+        保留的条目数上限（≥ 1）；超出时丢弃最旧条目。
+
+    Usage::
+
+        log = FeedLog(max_items=4096)
+        seq = log.append(messages)       # 扇出前分配 feed_seq
+        missing = log.since(last_seq)    # None = 缺口超出保留范围
+    """
+
+    def __init__(self, max_items: int = 4096) -> None:
+        if max_items < 1:
+            raise ValueError(f"max_items 必须 ≥ 1: {max_items}")
+        self.max_items = max_items
+        self._items: deque[tuple[int, list[dict]]] = deque(maxlen=max_items)
+        self.last_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def first_seq(self) -> int:
+        """最旧保留条目的 feed_seq；日志为空时为 last_seq + 1。"""
+        return self._items[0][0] if self._items else self.last_seq + 1
+
+    def append(self, messages: list[dict]) -> int:
+        """追加一个条目，在其最后一条消息上写入 feed_seq 并返回。"""
+        self.last_seq += 1
+        if messages:
+            messages[-1]["feed_seq"] = self.last_seq
+        self._items.append((self.last_seq, messages))
+        return self.last_seq
+
+    def since(self, seq: int) -> list[tuple[int, list[dict]]] | None:
+        """feed_seq > seq 的全部条目（按顺序）。
+
+        seq 之后的第一个条目已被淘汰，或 seq 超过 last_seq（来自其他
+        日志实例，如网关重启）时返回 None。
+        """
+        if seq < 0 or seq > self.last_seq or seq + 1 < self.first_seq:
+            return None
+        skip = seq + 1 - self.first_seq
+        return [self._items[i] for i in range(skip, len(self._items))]
+
+    def seq_of_event(self, event_id: str) -> int | None:
+        """包含 event_id 事件的条目的 feed_seq；不在日志中返回 None。"""
+        if not event_id:
+            return None
+        for seq, messages in reversed(self._items):
+            for m in messages:
+                if m.get("type") == "event" and m.get("event_id") == event_id:
+                    return seq
+        return None
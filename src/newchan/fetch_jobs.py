@@ -0,0 +1,380 @@
+"""历史数据拉取任务调度
+
+``/api/fetch`` 原先每个请求起一个不受限的守护线程，批量接入品种时会同时
+打满网络、API 配额与磁盘。``FetchScheduler`` 统一管理这些任务：
+
+- 有界工作线程池（``workers``），另按数据源限制并发（``per_provider``）；
+  某个数据源已满时，工作线程先取其他数据源的排队任务。同一品种 / 周期
+  写同一个缓存文件，同一时刻只运行一个。
+- 去重：同一 (数据源, 品种, 周期) 已有排队任务时合并日期范围；
+  已在运行且范围覆盖新请求时直接返回该任务。
+- 进度：日期范围按 ``chunk_days`` 切块，逐块调用 ``fetch_and_cache``
+  （每块落盘一次），记录已完成块数与新增行数。
+- 取消：排队任务立即取消；运行中的任务在当前块完成后停止，
+  已落盘的块保留（重新提交时 append_df 去重合并）。
+- 历史：任务进入终态时写入 ``history_path``（JSON），重启后可查询；
+  重启前未完成的任务记为 ``interrupted``。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from newchan.cache import cache_rows
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+FetchFn = Callable[..., tuple[str, int]]  # (symbol, interval, start=, end=) → (cache_name, total_rows)
+
+
+def _default_end() -> str:
+    """历史接口不能访问当天数据：默认 T-1（与 data_databento 一致）。"""
+    return (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def date_chunks(start: str, end: str, chunk_days: int) -> list[tuple[str, str]]:
+    """[start, end) 按 chunk_days 切成相邻的日期区间（YYYY-MM-DD）。"""
+    d0 = date.fromisoformat(start)
+    d1 = date.fromisoformat(end)
+    out: list[tuple[str, str]] = []
+    while d0 < d1:
+        nxt = min(d0 + timedelta(days=chunk_days), d1)
+        out.append((d0.isoformat(), nxt.isoformat()))
+        d0 = nxt
+    return out
+
+
+@dataclass
+class FetchJob:
+    """单个拉取任务（to_dict 为对外 / 落盘格式）。"""
+
+    job_id: str
+    symbol: str
+    interval: str
+    start: str
+    end: str
+    provider: str = "databento"
+    status: str = QUEUED
+    chunks_total: int = 0
+    chunks_done: int = 0
+    rows_added: int = 0
+    total_rows: int = 0
+    cache_name: str = ""
+    error: str | None = None
+    merged: int = 0  # 合并进来的重复请求数
+    created_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return (self.provider, self.symbol, self.interval)
+
+    def covers(self, start: str, end: str) -> bool:
+        return self.start <= start and end <= self.end
+
+    def to_dict(self) -> dict:
+        d = {f.name: getattr(self, f.name) for f in fields(self) if f.name != "cancel"}
+        d["progress"] = round(self.chunks_done / self.chunks_total, 4) if self.chunks_total else 0.0
+        return d
+
+
+class FetchScheduler:
+    """拉取任务队列 + 有界工作线程池。
+
+    Parameters
+    ----------
+    fetch : callable | None
+        ``fetch(symbol, interval, start=, end=) -> (cache_name, total_rows)``；
+        None 时使用 ``data_databento.fetch_and_cache``（首次运行任务时导入）。
+    workers : int
+        工作线程数（≥ 1）。
+    per_provider : int
+        每个数据源的最大并发任务数（≥ 1）。
+    chunk_days : int
+        单次调用 fetch 的日期跨度（天）。
+    history_path : Path | str | None
+        任务历史 JSON 文件；None = 不落盘。
+    keep_history : int
+        保留的终态任务数。
+
+    Usage::
+
+        scheduler = FetchScheduler(workers=2, per_provider=1, history_path=".cache/fetch_jobs.json")
+        job, deduped = scheduler.submit("CL", "1min", start="2020-01-01")
+        scheduler.get(job.job_id).to_dict()
+        scheduler.cancel(job.job_id)
+    """
+
+    def __init__(
+        self,
+        fetch: FetchFn | None = None,
+        workers: int = 2,
+        per_provider: int = 1,
+        chunk_days: int = 90,
+        history_path: Path | str | None = None,
+        keep_history: int = 200,
+    ) -> None:
+        if workers < 1 or per_provider < 1 or chunk_days < 1:
+            raise ValueError(
+                f"workers / per_provider / chunk_days 必须 ≥ 1: {workers}, {per_provider}, {chunk_days}"
+            )
+        self._fetch = fetch
+        self.workers = workers
+        self.per_provider = per_provider
+        self.chunk_days = chunk_days
+        self.history_path = Path(history_path) if history_path is not None else None
+        self.keep_history = keep_history
+        self._jobs: OrderedDict[str, FetchJob] = OrderedDict()
+        self._queue: list[FetchJob] = []
+        self._running: dict[str, int] = {}  # provider → 运行中任务数
+        self._busy: set[tuple[str, str]] = set()  # 运行中的 (品种, 周期)
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+        self.submitted = 0
+        self.deduped = 0
+        self._load_history()
+
+    # ------------------------------------------------------------------
+    # 提交 / 查询 / 取消
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        symbol: str,
+        interval: str = "1min",
+        start: str = "2020-01-01",
+        end: str | None = None,
+        provider: str = "databento",
+    ) -> tuple[FetchJob, bool]:
+        """提交任务，返回 (任务, 是否与已有任务合并)。"""
+        symbol = symbol.upper()
+        end = end or _default_end()
+        if start >= end:
+            raise ValueError(f"start 必须早于 end: {start} >= {end}")
+        with self._cond:
+            self.submitted += 1
+            for job in self._queue:
+                if job.key == (provider, symbol, interval):
+                    # 排队中：合并日期范围
+                    job.start, job.end = min(job.start, start), max(job.end, end)
+                    job.merged += 1
+                    self.deduped += 1
+                    return job, True
+            for job in self._jobs.values():
+                if job.status == RUNNING and job.key == (provider, symbol, interval) \
+                        and job.covers(start, end):
+                    job.merged += 1
+                    self.deduped += 1
+                    return job, True
+            job = FetchJob(
+                job_id=uuid.uuid4().hex[:12],
+                symbol=symbol, interval=interval, start=start, end=end,
+                provider=provider, created_at=time.time(),
+            )
+            self._jobs[job.job_id] = job
+            self._queue.append(job)
+            self._ensure_workers()
+            self._cond.notify_all()
+            return job, False
+
+    def get(self, job_id: str) -> FetchJob | None:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def latest(self, symbol: str, interval: str) -> FetchJob | None:
+        """该品种 / 周期最近提交的任务。"""
+        symbol = symbol.upper()
+        with self._cond:
+            for job in reversed(self._jobs.values()):
+                if job.symbol == symbol and job.interval == interval:
+                    return job
+        return None
+
+    def jobs(self) -> list[FetchJob]:
+        """全部任务（最新在前）。"""
+        with self._cond:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> FetchJob | None:
+        """取消任务：排队中立即取消，运行中在当前块完成后停止。"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return job
+            job.cancel.set()
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED)
+            return job
+
+    def close(self) -> None:
+        """停止接收新任务并取消全部未完成任务。"""
+        with self._cond:
+            self._closed = True
+            for job in list(self._queue):
+                job.cancel.set()
+                self._finish(job, CANCELLED)
+            self._queue.clear()
+            for job in self._jobs.values():
+                job.cancel.set()
+            self._cond.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """等待全部任务结束，返回是否在超时前结束。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(job.active for job in self._jobs.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    # ------------------------------------------------------------------
+    # 工作线程
+    # ------------------------------------------------------------------
+
+    def _ensure_workers(self) -> None:
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._worker, daemon=True, name="fetch-worker")
+            self._threads.append(t)
+            t.start()
+
+    def _take(self) -> FetchJob | None:
+        """取第一个可运行的排队任务（数据源未满、同一缓存无任务在写；持锁调用）。"""
+        for job in self._queue:
+            if self._running.get(job.provider, 0) < self.per_provider \
+                    and (job.symbol, job.interval) not in self._busy:
+                self._queue.remove(job)
+                return job
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._take()
+                while job is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    job = self._take()
+                self._running[job.provider] = self._running.get(job.provider, 0) + 1
+                self._busy.add((job.symbol, job.interval))
+                job.status = RUNNING
+                job.started_at = time.time()
+            try:
+                status, error = self._run(job), None
+            except Exception as e:
+                logger.exception("拉取失败: %s %s", job.symbol, job.interval)
+                status, error = ERROR, str(e)
+            with self._cond:
+                self._running[job.provider] -= 1
+                self._busy.discard((job.symbol, job.interval))
+                job.error = error
+                self._finish(job, status)
+                self._cond.notify_all()
+
+    def _run(self, job: FetchJob) -> str:
+        fetch = self._fetch
+        if fetch is None:
+            from newchan.data_databento import fetch_and_cache as fetch
+        chunks = date_chunks(job.start, job.end, self.chunk_days)
+        job.chunks_total = len(chunks)
+        before = cache_rows(f"{job.symbol}_{job.interval}_raw")
+        for c0, c1 in chunks:
+            if job.cancel.is_set():
+                return CANCELLED
+            cache_name, total = fetch(job.symbol, job.interval, start=c0, end=c1)
+            if total:  # 空块返回 0，缓存不变
+                job.rows_added += max(0, total - before)
+                job.total_rows = before = total
+                job.cache_name = cache_name
+            job.chunks_done += 1
+        return DONE
+
+    def _finish(self, job: FetchJob, status: str) -> None:
+        """进入终态并落盘历史（持锁调用）。"""
+        job.status = status
+        job.finished_at = time.time()
+        finished = [j for j in self._jobs.values() if not j.active]
+        for old in finished[:max(0, len(finished) - self.keep_history)]:
+            del self._jobs[old.job_id]
+        self._save_history()
+        self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # 历史落盘
+    # ------------------------------------------------------------------
+
+    def _save_history(self) -> None:
+        if self.history_path is None:
+            return
+        records = [j.to_dict() for j in self._jobs.values()]
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.history_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.history_path)
+        except OSError as e:
+            logger.warning("任务历史写入失败: %s", e)
+
+    def _load_history(self) -> None:
+        if self.history_path is None or not self.history_path.exists():
+            return
+        try:
+            records = json.loads(self.history_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("任务历史读取失败: %s", e)
+            return
+        names = {f.name for f in fields(FetchJob)} - {"cancel"}
+        for rec in records[-self.keep_history:]:
+            job = FetchJob(**{k: v for k, v in rec.items() if k in names})
+            if job.active:
+                job.status = INTERRUPTED
+            self._jobs[job.job_id] = job
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> dict:
+        with self._cond:
+            by_status: dict[str, int] = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "per_provider": self.per_provider,
+                "queued": len(self._queue),
+                "running": dict(self._running),
+                "submitted": self.submitted,
+                "deduped": self.deduped,
+                "jobs": by_status,
+            }
@@ -4,10 +4,47 @@
 - POST /api/replay/start  — 创建回放会话
 - POST /api/replay/step   — 步进
 - POST /api/replay/seek   — 跳转
+- POST /api/replay/fast_forward — 批量快进（缺省到末尾），只推送最终快照 + 压缩事件摘要
 - POST /api/replay/play   — 自动播放（后台 asyncio.Task）
 - POST /api/replay/pause  — 暂停
 - GET  /api/replay/status  — 查询状态
-- WS   /ws/feed            — WebSocket 双向通信
+- GET  /api/metrics/bar_cache — bar 缓存指标
+- GET  /api/metrics/engine    — 引擎执行器排队 / 计算耗时
+- GET  /api/admin/sessions    — 会话列表与估算内存
+- GET  /api/metrics/ws        — 各 WS 客户端发送队列深度 / 延迟 / 丢弃计数
+- GET  /api/metrics/timelines — 共享计算时间线的复用情况
+- WS   /ws/feed            — WebSocket 双向通信（断线重连可按 feed_seq 增量恢复）
+
+推送链路：
+    引擎调用经 SessionExecutor 在线程池执行（同会话串行队列，seek 可被
+    同会话的新 seek 取消），每一步的 bar / 事件 / 状态消息
+    作为一个列表发布到会话级 AsyncEventBus；每个会话一个扇出任务把帧编码后
+    放入各 WS 客户端的有界发送队列，由每个连接自己的写任务发送（见
+    ws_sender）。引擎计算与 socket I/O 互不阻塞，慢客户端只积压自己的队列。
+    扇出前每个条目分配会话内递增的 feed_seq 并记入有界日志（见 feed_log），
+    重连客户端发送 resume 命令即可补发缺失条目。
+    快照带会话内版本号；客户端持有的版本仍保留时改发增量快照
+    snapshot_delta（见 snapshot_delta），REST seek 以 base_version 请求。
+
+自动播放（见 play_scheduler）：
+    按帧推进而非逐 bar sleep：每帧步进墙钟预算内到期的全部 bar，帧内被取代的
+    中间事件合并后作为一个条目发布；帧率受 PLAY_MAX_FPS 限制。各 WS 客户端的
+    写任务另按 fps（默认 WS_MAX_FPS）限制 flush 频率，一次 flush 发出全部积压。
+
+共享计算（见 shared_replay）：
+    单 TF 会话按 (bar 内容摘要, 笔参数) 共用一条引擎时间线，各会话只持有游标；
+    已被任一会话算过的位置，step / seek 直接取共享快照。
+
+会话生命周期（见 session_lifecycle）：
+    后台任务定期按 TTL / 无客户端空闲时长 / 内存预算淘汰会话；淘汰的会话
+    落盘，再次访问时透明恢复。pickle 读写在引擎执行器中进行（不阻塞事件循环），
+    落盘 / 恢复期间会话视为 busy；新建会话只调度后台巡检，不等待淘汰完成。
+
+推送格式（连接时协商，见 contracts/ws_codec）：
+    /ws/feed?batch=1&encoding=msgpack — 每步一个 batch 帧、msgpack 二进制；
+    缺省为逐条 JSON 文本帧。同格式的客户端共享一次编码结果。
+    overflow=coalesce|drop — 发送队列溢出时合并为一份新快照（默认）或丢弃中间帧。
+    fps=N — 每秒最多 flush 次数（0 = 不限）。
 
 启动方式：
     uvicorn newchan.gateway:app --port 8766
@@ -16,9 +53,13 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import uuid
-from dataclasses import asdict
-from datetime import datetime, timezone
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from dataclasses import fields
+from datetime import timezone
+from functools import cache
 from typing import Any
 
 import pandas as pd
@@ -26,8 +67,25 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
 from newchan.a_stroke import Stroke
-from newchan.bi_engine import BiEngine, BiEngineSnapshot
+from newchan.bar_cache import BarCache, BarColumns
+from newchan.bi_engine import BiEngineSnapshot
+from newchan.config import (
+    BAR_CACHE_MB,
+    CACHE_DIR,
+    PLAY_MAX_FPS,
+    SESSION_BUDGET_MB,
+    SESSION_IDLE_S,
+    SESSION_SPILL,
+    SESSION_TTL_S,
+    WS_MAX_FPS,
+    WS_OVERFLOW,
+    WS_RESUME_LOG,
+    WS_SEND_QUEUE,
+)
+from newchan.contracts.ws_codec import JSON_FORMAT, FeedFormat, encode, encode_frames, negotiate
 from newchan.contracts.ws_messages import (
+    ReplayFastForwardRequest,
+    ReplayFastForwardResponse,
     ReplayPauseRequest,
     ReplayPlayRequest,
     ReplaySeekRequest,
@@ -42,16 +100,38 @@ from newchan.contracts.ws_messages import (
     WsError,
     WsEvent,
     WsReplayStatus,
+    WsResumed,
     WsSnapshot,
+    WsSnapshotDelta,
 )
 from newchan.events import DomainEvent
+from newchan.feed_log import FeedLog
+from newchan.orchestrator.async_bus import AsyncConsumer, AsyncEventBus
 from newchan.orchestrator.timeframes import TFOrchestrator
-from newchan.replay import ReplaySession
+from newchan.play_scheduler import PlayPacer, coalesce_events
+from newchan.replay import ReplaySession, SeekCancelled
+from newchan.session_executor import OperationSuperseded, SessionExecutor
+from newchan.session_lifecycle import SessionLifecycle, read_state, write_state
+from newchan.shared_replay import SharedReplaySession, TimelineRegistry
+from newchan.snapshot_delta import SnapshotVersions
 from newchan.types import Bar
+from newchan.ws_sender import ClientSender, negotiate_overflow
+
+logger = logging.getLogger(__name__)
 
 # ── FastAPI 应用 ──
 
-app = FastAPI(title="NewChan Gateway", version="0.1.0")
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    sweeper = asyncio.create_task(_sweep_loop())
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+
+
+app = FastAPI(title="NewChan Gateway", version="0.1.0", lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -75,6 +155,50 @@ _play_tasks: dict[str, asyncio.Task] = {}
 # WebSocket 连接：session_id -> set[WebSocket]
 _ws_clients: dict[str, set[WebSocket]] = {}
 
+# WS 客户端发送队列（含协商的推送格式）：WebSocket -> ClientSender
+_ws_senders: dict[WebSocket, ClientSender] = {}
+
+# 会话推送总线：session_id -> AsyncEventBus（工作线程发布，扇出任务消费）
+_feeds: dict[str, AsyncEventBus] = {}
+
+# WS 扇出任务：session_id -> asyncio.Task
+_fanout_tasks: dict[str, asyncio.Task] = {}
+
+# 会话推送日志（feed_seq 分配 + 重连补发）：session_id -> FeedLog
+_feed_logs: dict[str, FeedLog] = {}
+
+# 会话快照版本（增量快照）：session_id -> SnapshotVersions
+_snapshot_versions: dict[str, SnapshotVersions] = {}
+
+# 引擎执行器：线程池 + 每会话串行队列（引擎状态非线程安全）
+_executor = SessionExecutor()
+
+# 进程级 bar 列式缓存：(symbol, interval, tf, mtime_ns) -> BarColumns
+_bar_cache = BarCache(max_bytes=BAR_CACHE_MB * 1024 * 1024)
+
+# 共享计算时间线：(bar 内容摘要, bar 数, 笔参数) -> SharedTimeline
+_timelines = TimelineRegistry()
+
+# 会话生命周期（TTL / 空闲 / 内存预算淘汰 + 落盘）
+_lifecycle = SessionLifecycle(
+    ttl_s=SESSION_TTL_S,
+    idle_s=SESSION_IDLE_S,
+    budget_bytes=SESSION_BUDGET_MB * 1024 * 1024,
+    spill_dir=f"{CACHE_DIR}/sessions" if SESSION_SPILL else None,
+)
+
+# 生命周期巡检间隔（秒）
+_SWEEP_INTERVAL_S = 30.0
+
+# 正在落盘的会话：session_id -> 落盘完成时置位的 Future
+_evicting: dict[str, asyncio.Future] = {}
+
+# 正在恢复的会话：session_id -> 恢复任务（并发访问共用）
+_restoring: dict[str, asyncio.Task] = {}
+
+# 新建会话触发的后台巡检任务（持有引用防止被回收）
+_sweep_tasks: set[asyncio.Task] = set()
+
 
 # ════════════════════════════════════════════════
 # 工具函数
@@ -82,10 +206,32 @@ _ws_clients: dict[str, set[WebSocket]] = {}
 
 
 def _load_bars(symbol: str, interval: str, tf: str) -> list[Bar]:
-    """从缓存加载数据，按需 resample，转为 Bar 列表。"""
-    from newchan.cache import load_df
+    """从缓存加载数据，按需 resample，转为 Bar 列表。
+
+    读盘 + resample 的结果以列式数组缓存在进程级 ``_bar_cache``
+    （key 含文件 mtime，源文件更新后自动失效），每次返回新的 Bar 列表。
+    """
+    from newchan.cache import cache_mtime_ns
 
     cache_name = f"{symbol}_{interval}_raw"
+    mtime = cache_mtime_ns(cache_name)
+    if mtime is None:
+        raise ValueError(f"缓存 {cache_name} 不存在，请先拉取数据")
+
+    key = (symbol, interval, tf, mtime)
+    cols = _bar_cache.get(key)
+    if cols is None:
+        cols = _load_columns(cache_name, interval, tf)
+        # 同一 (symbol, interval, tf) 的旧版本不会再命中，直接释放
+        _bar_cache.discard(lambda k: k[:3] == key[:3] and k[3] != mtime)
+        _bar_cache.put(key, cols)
+    return cols.to_bars()
+
+
+def _load_columns(cache_name: str, interval: str, tf: str) -> BarColumns:
+    """读 parquet 并按需 resample，返回列式 bar。"""
+    from newchan.cache import load_df
+
     df_raw = load_df(cache_name)
     if df_raw is None:
         raise ValueError(f"缓存 {cache_name} 不存在，请先拉取数据")
@@ -99,7 +245,7 @@ def _load_bars(symbol: str, interval: str, tf: str) -> list[Bar]:
             # resample 不可用或周期相同，直接使用原始数据
             pass
 
-    return _df_to_bars(df_raw)
+    return BarColumns.from_df(df_raw)
 
 
 def _interval_to_tf(interval: str) -> str:
@@ -109,25 +255,8 @@ def _interval_to_tf(interval: str) -> str:
 
 
 def _df_to_bars(df: pd.DataFrame) -> list[Bar]:
-    """将 OHLCV DataFrame 转为 Bar 列表。"""
-    bars: list[Bar] = []
-    for ts, row in df.iterrows():
-        dt = ts.to_pydatetime() if hasattr(ts, "to_pydatetime") else ts
-        if not isinstance(dt, datetime):
-            dt = pd.Timestamp(dt).to_pydatetime()
-        # 确保有时区信息
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        vol = float(row["volume"]) if "volume" in row.index and pd.notna(row["volume"]) else None
-        bars.append(Bar(
-            ts=dt,
-            open=float(row["open"]),
-            high=float(row["high"]),
-            low=float(row["low"]),
-            close=float(row["close"]),
-            volume=vol,
-        ))
-    return bars
+    """将 OHLCV DataFrame 转为 Bar 列表（naive 时间视为 UTC）。"""
+    return BarColumns.from_df(df).to_bars()
 
 
 def _stroke_to_dict(s: Stroke) -> dict:
@@ -141,43 +270,76 @@ def _stroke_to_dict(s: Stroke) -> dict:
     }
 
 
+_EVENT_META_FIELDS = frozenset(
+    {"event_type", "bar_idx", "bar_ts", "seq", "event_id", "schema_version"},
+)
+
+
+@cache
+def _payload_fields(cls: type) -> tuple[str, ...]:
+    """事件类型的 payload 字段名（域事件字段均为标量，无需 asdict 深拷贝）。"""
+    return tuple(f.name for f in fields(cls) if f.name not in _EVENT_META_FIELDS)
+
+
 def _event_to_ws(ev: DomainEvent, tf: str = "", stream_id: str = "") -> dict:
-    """将域事件转为 WsEvent 消息 dict。"""
-    _exclude = {"event_type", "bar_idx", "bar_ts", "seq", "event_id", "schema_version"}
-    payload = {k: v for k, v in asdict(ev).items() if k not in _exclude}
-    return WsEvent(
-        event_type=ev.event_type,
-        bar_idx=ev.bar_idx,
-        bar_ts=ev.bar_ts,
-        seq=ev.seq,
-        payload=payload,
-        event_id=ev.event_id,
-        schema_version=ev.schema_version,
-        tf=tf,
-        stream_id=stream_id,
-    ).model_dump()
+    """将域事件转为 WsEvent 消息 dict（字段与 WsEvent.model_dump() 一致）。"""
+    return {
+        "type": "event",
+        "event_type": ev.event_type,
+        "bar_idx": ev.bar_idx,
+        "bar_ts": float(ev.bar_ts),
+        "seq": ev.seq,
+        "payload": {k: getattr(ev, k) for k in _payload_fields(type(ev))},
+        "event_id": ev.event_id,
+        "schema_version": ev.schema_version,
+        "tf": tf,
+        "stream_id": stream_id,
+    }
 
 
-def _snapshot_to_ws(snap: BiEngineSnapshot) -> dict:
-    """BiEngineSnapshot -> WsSnapshot 消息 dict。"""
+def _snapshot_to_ws(snap: BiEngineSnapshot | None, versions: SnapshotVersions | None = None) -> dict:
+    """BiEngineSnapshot -> WsSnapshot 消息 dict；给定 versions 时登记并带上版本号。"""
+    strokes = [_stroke_to_dict(s) for s in snap.strokes] if snap is not None else []
     return WsSnapshot(
-        bar_idx=snap.bar_idx,
-        strokes=[_stroke_to_dict(s) for s in snap.strokes],
-        event_count=len(snap.events),
+        bar_idx=snap.bar_idx if snap is not None else 0,
+        strokes=strokes,
+        event_count=len(snap.events) if snap is not None else 0,
+        version=versions.commit({"strokes": strokes}) if versions is not None else 0,
     ).model_dump()
 
 
+def _snapshot_delta_to_ws(full: dict, base_version: int | None, versions: SnapshotVersions) -> dict | None:
+    """完整快照消息 -> 相对 base_version 的 WsSnapshotDelta dict；base 已不保留返回 None。"""
+    delta = versions.delta(base_version, full["version"])
+    if delta is None:
+        return None
+    changed, removed = delta
+    out = WsSnapshotDelta(
+        version=full["version"],
+        base_version=base_version,
+        bar_idx=full["bar_idx"],
+        event_count=full["event_count"],
+        changed=changed,
+        removed=removed,
+    ).model_dump()
+    if "feed_seq" in full:
+        out["feed_seq"] = full["feed_seq"]
+    return out
+
+
 def _bar_to_ws(bar: Bar, idx: int, tf: str = "", stream_id: str = "") -> dict:
-    """Bar -> WsBar 消息 dict。"""
+    """Bar -> WsBar 消息 dict（字段与 WsBar.model_dump() 一致）。"""
     ts_epoch = bar.ts.timestamp() if bar.ts.tzinfo else bar.ts.replace(tzinfo=timezone.utc).timestamp()
-    return WsBar(
-        idx=idx,
-        ts=ts_epoch,
-        o=bar.open, h=bar.high, l=bar.low, c=bar.close,
-        v=bar.volume,
-        tf=tf,
-        stream_id=stream_id,
-    ).model_dump()
+    return {
+        "type": "bar",
+        "idx": idx,
+        "ts": ts_epoch,
+        "o": float(bar.open), "h": float(bar.high),
+        "l": float(bar.low), "c": float(bar.close),
+        "v": float(bar.volume) if bar.volume is not None else None,
+        "tf": tf,
+        "stream_id": stream_id,
+    }
 
 
 def _status_to_ws(session: ReplaySession) -> dict:
@@ -190,25 +352,413 @@ def _status_to_ws(session: ReplaySession) -> dict:
     ).model_dump()
 
 
-def _get_session(session_id: str) -> ReplaySession:
-    """获取会话，不存在则抛出 ValueError。"""
+async def _get_session(session_id: str) -> ReplaySession:
+    """获取会话（正在落盘则等其完成，已落盘则恢复）并刷新访问时间，不存在则抛出 ValueError。"""
+    pending = _evicting.get(session_id)
+    if pending is not None:
+        await asyncio.shield(pending)
     sess = _sessions.get(session_id)
+    if sess is None and (session_id in _restoring or _lifecycle.is_spilled(session_id)):
+        sess = await _restore_session(session_id)
     if sess is None:
         raise ValueError(f"会话 {session_id} 不存在")
+    _lifecycle.touch(session_id)
     return sess
 
 
-async def _broadcast(session_id: str, message: dict) -> None:
-    """向指定会话的所有 WS 客户端广播消息。"""
+# ════════════════════════════════════════════════
+# 会话生命周期
+# ════════════════════════════════════════════════
+
+
+def _register_session(
+    session_id: str,
+    session: ReplaySession,
+    orch: TFOrchestrator | None = None,
+    symbol: str = "",
+    tf: str = "",
+) -> None:
+    """登记新会话，并调度一轮后台巡检（按内存预算淘汰旧会话）。"""
+    _sessions[session_id] = session
+    if orch is not None:
+        _orchestrators[session_id] = orch
+    _lifecycle.register(session_id, orch or session, symbol=symbol, tf=tf)
+    task = asyncio.create_task(_sweep_logged())
+    _sweep_tasks.add(task)
+    task.add_done_callback(_sweep_tasks.discard)
+
+
+def _new_replay_session(
+    session_id: str,
+    bars: list[Bar],
+    stroke_mode: str = "wide",
+    min_strict_sep: int = 5,
+) -> SharedReplaySession:
+    """创建单 TF 回放会话，挂在（可能已被其他会话算过的）共享时间线上。"""
+    timeline = _timelines.acquire(bars, stroke_mode=stroke_mode, min_strict_sep=min_strict_sep)
+    return SharedReplaySession.on(session_id, timeline)
+
+
+async def _restore_session(session_id: str) -> ReplaySession | None:
+    """从落盘文件恢复会话；同一会话的并发访问共用一次恢复。"""
+    task = _restoring.get(session_id)
+    if task is None:
+        task = _restoring[session_id] = asyncio.create_task(_load_spilled(session_id))
+        task.add_done_callback(lambda _t: _restoring.pop(session_id, None))
+    return await asyncio.shield(task)
+
+
+async def _load_spilled(session_id: str) -> ReplaySession | None:
+    """（恢复任务）在执行器中读回 pickle，再在事件循环中挂回在线表。"""
+    path = _lifecycle.take_spill(session_id)
+    state = None
+    if path is not None:
+        state = _lifecycle.mark_restored(
+            session_id, await _executor.run(session_id, read_state, path, kind="restore"),
+        )
+    if state is None:
+        _drop_session_feed(session_id)
+        return None
+    if isinstance(state, TFOrchestrator):
+        _orchestrators[session_id] = state
+        session = state.base_session
+    else:
+        session = state
+        if isinstance(session, SharedReplaySession):
+            _timelines.reattach(session)
+    _sessions[session_id] = session
+    _lifecycle.update_size(session_id, state)
+    return session
+
+
+def _drop_session_feed(session_id: str) -> None:
+    """会话彻底删除时释放其 WS 绑定、推送日志与快照版本。"""
+    _ws_clients.pop(session_id, None)
+    _feed_logs.pop(session_id, None)
+    _snapshot_versions.pop(session_id, None)
+
+
+def _session_busy(session_id: str) -> bool:
+    if session_id in _evicting or session_id in _restoring:
+        return True
+    task = _play_tasks.get(session_id)
+    return (task is not None and not task.done()) or _executor.busy(session_id)
+
+
+def _client_count(session_id: str) -> int:
+    return len(_ws_clients.get(session_id, ()))
+
+
+async def _evict_session(session_id: str, reason: str) -> bool:
+    """淘汰在线会话：可落盘则落盘（保留 WS 绑定），否则彻底删除。
+
+    会话先从在线表摘下，pickle 在执行器中写盘；期间会话视为 busy，
+    访问会等写盘完成后再从磁盘恢复。已变为 busy 或已被淘汰时跳过，返回 False。
+    """
+    if session_id not in _sessions or _session_busy(session_id):
+        return False
+    done = asyncio.get_running_loop().create_future()
+    _evicting[session_id] = done
+    spilled = False
+    try:
+        _cancel_play_task(session_id)
+        _executor.cancel(session_id)
+        orch = _orchestrators.pop(session_id, None)
+        session = _sessions.pop(session_id, None)
+        state = orch or session
+        feed = _feeds.pop(session_id, None)
+        if feed is not None:
+            feed.close()
+        path = _lifecycle.spill_target(session_id) if state is not None else None
+        if path is not None and await _executor.run(session_id, write_state, path, state, kind="spill"):
+            spilled = _lifecycle.mark_spilled(session_id, path)
+        if isinstance(session, SharedReplaySession) and session.timeline is not None:
+            _timelines.release(session.timeline)
+    finally:
+        if not spilled:
+            _lifecycle.forget(session_id)
+            _drop_session_feed(session_id)
+        _lifecycle.record_eviction(reason)
+        del _evicting[session_id]
+        _executor.drop_session(session_id)
+        done.set_result(None)
+    return True
+
+
+async def _sweep() -> list[tuple[str, str]]:
+    """执行一轮生命周期巡检，返回被淘汰的 [(session_id, reason)]。"""
+    for sid, session in list(_sessions.items()):
+        if not _session_busy(sid):
+            _lifecycle.update_size(sid, _orchestrators.get(sid) or session)
+    selected = _lifecycle.select_evictions(
+        busy=_session_busy, has_clients=lambda sid: _client_count(sid) > 0,
+    )
+    evicted = [(sid, reason) for sid, reason in selected if await _evict_session(sid, reason)]
+    for sid in _lifecycle.expired_spills():
+        _lifecycle.forget(sid)
+        _drop_session_feed(sid)
+    return evicted
+
+
+async def _sweep_logged() -> None:
+    """执行一轮巡检，失败只记日志（后台任务用）。"""
+    try:
+        await _sweep()
+    except Exception:
+        logger.exception("会话巡检失败")
+
+
+async def _sweep_loop() -> None:
+    """后台巡检任务（随应用生命周期启停）。"""
+    while True:
+        await asyncio.sleep(_SWEEP_INTERVAL_S)
+        await _sweep_logged()
+
+
+async def _send_frame(ws: WebSocket, frame: str | bytes) -> None:
+    if isinstance(frame, bytes):
+        await ws.send_bytes(frame)
+    else:
+        await ws.send_text(frame)
+
+
+async def _send(ws: WebSocket, message: dict) -> None:
+    """按客户端协商的格式发送单条消息（经发送队列，保持与推送帧的顺序）。"""
+    sender = _ws_senders.get(ws)
+    if sender is None:
+        await _send_frame(ws, encode(message, JSON_FORMAT))
+    else:
+        sender.offer_control([encode(message, sender.fmt)])
+
+
+def _bar_cursor(messages: list[dict]) -> dict[str, int] | None:
+    """一步消息中各 tf 的下一根 bar 索引（重同步补发起点）。"""
+    cursor: dict[str, int] | None = None
+    for m in messages:
+        if m.get("type") == "bar":
+            if cursor is None:
+                cursor = {}
+            cursor[m["tf"]] = m["idx"] + 1
+    return cursor
+
+
+def _broadcast(session_id: str, message: dict | list[dict]) -> None:
+    """把一条或一组（同一步）消息放入会话全部 WS 客户端的发送队列。
+
+    每种推送格式只编码一次，同格式客户端共享帧；不等待 socket。
+    队列溢出进入重同步的客户端随后收到一份当前状态快照。
+    """
+    messages = message if isinstance(message, list) else [message]
+    if not messages:
+        return
     clients = _ws_clients.get(session_id, set())
-    dead: list[WebSocket] = []
-    for ws in clients:
-        try:
-            await ws.send_json(message)
-        except Exception:
-            dead.append(ws)
-    for ws in dead:
-        clients.discard(ws)
+    encoded: dict[tuple[FeedFormat, int | None], list[str | bytes]] = {}
+    cursor = _bar_cursor(messages)
+    snap_at = _snapshot_index(messages)
+    for ws in list(clients):
+        sender = _ws_senders.get(ws)
+        if sender is None or sender.closed:
+            clients.discard(ws)
+            continue
+        if snap_at is not None:
+            # 含快照的条目按客户端持有的版本发送增量，且不受溢出策略丢弃
+            base = _delta_base(session_id, sender, messages[snap_at])
+            key = (sender.fmt, base)
+            frames = encoded.get(key)
+            if frames is None:
+                frames = encoded[key] = encode_frames(
+                    _with_snapshot_delta(session_id, messages, snap_at, base), sender.fmt,
+                )
+            sender.offer_control(frames, cursor)
+            continue
+        key = (sender.fmt, None)
+        frames = encoded.get(key)
+        if frames is None:
+            frames = encoded[key] = encode_frames(messages, sender.fmt)
+        if sender.offer(frames, cursor):
+            task = asyncio.create_task(_resync_client(session_id, sender))
+            _resync_tasks.add(task)
+            task.add_done_callback(_resync_tasks.discard)
+
+
+def _snapshot_index(messages: list[dict]) -> int | None:
+    for i, m in enumerate(messages):
+        if m.get("type") == "snapshot" and m.get("version"):
+            return i
+    return None
+
+
+def _delta_base(session_id: str, sender: ClientSender, snapshot: dict) -> int | None:
+    """客户端可作为增量基准的快照版本（并记录其将持有 snapshot 的版本）。"""
+    held = sender.snapshot_version
+    sender.snapshot_version = snapshot["version"]
+    versions = _snapshot_versions.get(session_id)
+    if held is None or versions is None or held not in versions:
+        return None
+    return held
+
+
+def _with_snapshot_delta(session_id: str, messages: list[dict], snap_at: int, base: int | None) -> list[dict]:
+    """把 messages[snap_at] 的完整快照替换为相对 base 的增量快照。"""
+    if base is None:
+        return messages
+    delta = _snapshot_delta_to_ws(messages[snap_at], base, _snapshot_versions[session_id])
+    if delta is None:
+        return messages
+    return [*messages[:snap_at], delta, *messages[snap_at + 1:]]
+
+
+# 重同步补发的 bar 数上限（每个 tf）
+_RESYNC_MAX_BARS = 5000
+
+# 进行中的重同步任务（持有引用，防止被回收）
+_resync_tasks: set[asyncio.Task] = set()
+
+
+class _Resync:
+    """发布到会话总线的定向重同步条目（只投递给 sender）。"""
+
+    __slots__ = ("sender", "messages", "cursor")
+
+    def __init__(self, sender: ClientSender, messages: list[dict], cursor: dict[str, int]) -> None:
+        self.sender = sender
+        self.messages = messages
+        self.cursor = cursor
+
+
+def _publish_resync(feed: AsyncEventBus, session: ReplaySession, orch: TFOrchestrator | None,
+                    sender: ClientSender, versions: SnapshotVersions | None = None) -> None:
+    """（工作线程）生成当前状态快照并经会话总线发布。
+
+    与步进在同一串行队列中执行，因此快照之前发布的步进帧都已被其覆盖、
+    之后发布的步进帧都在其后送达。补发 sender.cursor 之后的 bar，
+    再附最新笔快照与状态。
+    """
+    if orch is None:
+        streams = {"": (session, "")}
+    else:
+        streams = {tf: (orch.sessions[tf], orch._stream_ids.get(tf, "")) for tf in orch.sessions}
+    messages: list[dict] = []
+    cursor: dict[str, int] = {}
+    resume = dict(sender.cursor)
+    for tf, (sess, stream_id) in streams.items():
+        end = sess.current_idx
+        start = max(resume.get(tf, 0), end - _RESYNC_MAX_BARS, 0)
+        messages.extend(
+            _bar_to_ws(sess.bars[i], i, tf=tf, stream_id=stream_id) for i in range(start, end)
+        )
+        cursor[tf] = end
+    if session.event_log:
+        messages.append(_snapshot_to_ws(session.event_log[-1], versions))
+    messages.append(_status_to_ws(session))
+    feed.publish(_Resync(sender, messages, cursor))
+
+
+async def _resync_client(session_id: str, sender: ClientSender) -> None:
+    """为进入重同步的客户端排队生成快照；失败时直接恢复推送。"""
+    session = _sessions.get(session_id)
+    try:
+        if session is None:
+            raise ValueError(f"会话 {session_id} 不存在")
+        feed = _get_feed(session_id)
+        await _run_engine(
+            session_id, _publish_resync, feed, session, _orchestrators.get(session_id), sender,
+            _versions_for(session_id), kind="resync",
+        )
+    except Exception:
+        sender.offer_resync([])
+
+
+# ════════════════════════════════════════════════
+# 会话推送总线 + 工作线程执行
+# ════════════════════════════════════════════════
+
+
+def _get_feed(session_id: str) -> AsyncEventBus:
+    """获取会话推送总线，不存在则创建并启动扇出任务（须在事件循环内调用）。"""
+    feed = _feeds.get(session_id)
+    if feed is None:
+        feed = AsyncEventBus(asyncio.get_running_loop())
+        _feeds[session_id] = feed
+        _fanout_tasks[session_id] = asyncio.create_task(
+            _fanout_loop(session_id, feed.consumer()),
+        )
+    return feed
+
+
+def _versions_for(session_id: str) -> SnapshotVersions:
+    versions = _snapshot_versions.get(session_id)
+    if versions is None:
+        versions = _snapshot_versions[session_id] = SnapshotVersions()
+    return versions
+
+
+def _feed_log(session_id: str) -> FeedLog:
+    log = _feed_logs.get(session_id)
+    if log is None:
+        log = _feed_logs[session_id] = FeedLog(max_items=WS_RESUME_LOG)
+    return log
+
+
+def _publish(session_id: str, message: dict) -> None:
+    """经会话总线广播一条消息（与工作线程已发布的帧保持顺序）。"""
+    _get_feed(session_id).publish(message)
+
+
+async def _fanout_loop(session_id: str, consumer: AsyncConsumer) -> None:
+    """扇出任务：按发布顺序给条目分配 feed_seq、记入日志并推送给会话的 WS 客户端。"""
+    log = _feed_log(session_id)
+    try:
+        async for item in consumer:
+            if isinstance(item, _Resync):
+                # 快照覆盖到目前为止已扇出的全部条目
+                item.messages[-1]["feed_seq"] = log.last_seq
+                sender = item.sender
+                messages = item.messages
+                snap_at = _snapshot_index(messages)
+                if snap_at is not None:
+                    base = _delta_base(session_id, sender, messages[snap_at])
+                    messages = _with_snapshot_delta(session_id, messages, snap_at, base)
+                sender.offer_resync(encode_frames(messages, sender.fmt), item.cursor)
+                continue
+            messages = item if isinstance(item, list) else [item]
+            if not messages:
+                continue
+            log.append(messages)
+            _broadcast(session_id, messages)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        _fanout_tasks.pop(session_id, None)
+
+
+async def _run_engine(session_id: str, fn: Callable, *args: Any, kind: str = "call") -> Any:
+    """在工作线程执行引擎调用，同一会话严格串行（见 SessionExecutor）。"""
+    return await _executor.run(session_id, fn, *args, kind=kind)
+
+
+async def _run_seek(session_id: str, seek: Callable, target_idx: int) -> Any:
+    """执行可取消的 seek：同会话后到的 seek 会取消尚未完成的旧 seek。
+
+    被取消时抛出 SeekCancelled（已开始重跑）或 OperationSuperseded（仍在排队）。
+    """
+    return await _executor.run_latest(session_id, "seek", seek, target_idx)
+
+
+def _snaps_to_ws(
+    out: list[dict],
+    session: ReplaySession,
+    snaps: list[BiEngineSnapshot],
+    tf: str = "",
+    stream_id: str = "",
+) -> list[dict]:
+    """（工作线程）按 bar → 事件顺序把一组快照的消息追加到 out。"""
+    for snap in snaps:
+        bar_idx = snap.bar_idx
+        if bar_idx < session.total_bars:
+            out.append(_bar_to_ws(session.bars[bar_idx], bar_idx, tf=tf, stream_id=stream_id))
+        out.extend(_event_to_ws(ev, tf=tf, stream_id=stream_id) for ev in snap.events)
+    return out
 
 
 # ════════════════════════════════════════════════
@@ -242,18 +792,14 @@ async def replay_start(req: ReplayStartRequest):
             min_strict_sep=req.min_strict_sep,
             symbol=req.symbol,
         )
-        _orchestrators[session_id] = orch
         # 也注册 base session 以兼容 _get_session
-        _sessions[session_id] = orch.base_session
+        _register_session(session_id, orch.base_session, orch, symbol=req.symbol, tf=req.tf)
     else:
-        # 单 TF：走原有路径
-        engine = BiEngine(stroke_mode=req.stroke_mode, min_strict_sep=req.min_strict_sep)
-        session = ReplaySession(
-            session_id=session_id,
-            bars=bars,
-            engine=engine,
+        # 单 TF：共享时间线
+        session = _new_replay_session(
+            session_id, bars, stroke_mode=req.stroke_mode, min_strict_sep=req.min_strict_sep,
         )
-        _sessions[session_id] = session
+        _register_session(session_id, session, symbol=req.symbol, tf=req.tf)
 
     return ReplayStartResponse(
         session_id=session_id,
@@ -262,8 +808,8 @@ async def replay_start(req: ReplayStartRequest):
     )
 
 
-async def _step_multi_tf(req, session, orch):
-    """多 TF 步进，返回 ReplayStepResponse。"""
+def _step_multi_tf(feed, req, session, orch):
+    """（工作线程）多 TF 步进并发布帧，返回 ReplayStepResponse。"""
     tf_snapshots = orch.step(req.count)
     base_snaps = tf_snapshots.get(orch.base_tf, [])
     if not base_snaps:
@@ -276,16 +822,11 @@ async def _step_multi_tf(req, session, orch):
             for ev in snap.events:
                 events_ws.append(WsEvent(**_event_to_ws(ev, tf=tf, stream_id=sid)))
 
+    messages: list[dict] = []
     for tf, snaps in tf_snapshots.items():
-        tf_session = orch.sessions[tf]
-        sid = orch._stream_ids.get(tf, "")
-        for snap in snaps:
-            bar_idx = snap.bar_idx
-            if bar_idx < tf_session.total_bars:
-                await _broadcast(req.session_id, _bar_to_ws(tf_session.bars[bar_idx], bar_idx, tf=tf, stream_id=sid))
-            for ev in snap.events:
-                await _broadcast(req.session_id, _event_to_ws(ev, tf=tf, stream_id=sid))
-    await _broadcast(req.session_id, _status_to_ws(session))
+        _snaps_to_ws(messages, orch.sessions[tf], snaps, tf=tf, stream_id=orch._stream_ids.get(tf, ""))
+    messages.append(_status_to_ws(session))
+    feed.publish(messages)
 
     last_snap = base_snaps[-1]
     last_bar_idx = session.current_idx - 1
@@ -294,8 +835,8 @@ async def _step_multi_tf(req, session, orch):
     return ReplayStepResponse(bar_idx=last_snap.bar_idx, bar=ws_bar, events=events_ws)
 
 
-async def _step_single_tf(req, session):
-    """单 TF 步进，返回 ReplayStepResponse。"""
+def _step_single_tf(feed, req, session):
+    """（工作线程）单 TF 步进并发布帧，返回 ReplayStepResponse。"""
     snapshots = session.step(req.count)
     if not snapshots:
         return ReplayStepResponse(bar_idx=session.current_idx - 1)
@@ -307,13 +848,9 @@ async def _step_single_tf(req, session):
     bar = session.bars[last_bar_idx] if last_bar_idx < session.total_bars else None
     ws_bar = WsBar(**_bar_to_ws(bar, last_bar_idx)) if bar else None
 
-    for snap in snapshots:
-        bar_idx = snap.bar_idx
-        if bar_idx < session.total_bars:
-            await _broadcast(session.session_id, _bar_to_ws(session.bars[bar_idx], bar_idx))
-        for ev in snap.events:
-            await _broadcast(session.session_id, _event_to_ws(ev))
-    await _broadcast(session.session_id, _status_to_ws(session))
+    messages = _snaps_to_ws([], session, snapshots)
+    messages.append(_status_to_ws(session))
+    feed.publish(messages)
 
     return ReplayStepResponse(bar_idx=last_snap.bar_idx, bar=ws_bar, events=events_ws)
 
@@ -322,46 +859,97 @@ async def _step_single_tf(req, session):
 async def replay_step(req: ReplayStepRequest):
     """步进指定数量的 bar。"""
     try:
-        session = _get_session(req.session_id)
+        session = await _get_session(req.session_id)
     except ValueError as e:
         return WsError(message=str(e), code="session_not_found").model_dump()
 
+    feed = _get_feed(req.session_id)
     orch = _orchestrators.get(req.session_id)
     if orch is not None:
-        return await _step_multi_tf(req, session, orch)
-    return await _step_single_tf(req, session)
+        return await _run_engine(req.session_id, _step_multi_tf, feed, req, session, orch, kind="step")
+    return await _run_engine(req.session_id, _step_single_tf, feed, req, session, kind="step")
 
 
 @app.post("/api/replay/seek", response_model=ReplaySeekResponse)
 async def replay_seek(req: ReplaySeekRequest):
     """跳转到指定位置。"""
     try:
-        session = _get_session(req.session_id)
+        session = await _get_session(req.session_id)
     except ValueError as e:
         return WsError(message=str(e), code="session_not_found").model_dump()
 
     _cancel_play_task(req.session_id)
 
     orch = _orchestrators.get(req.session_id)
+    try:
+        if orch is not None:
+            # 多 TF seek
+            tf_snaps = await _run_seek(req.session_id, orch.seek, req.target_idx)
+            base_snap = tf_snaps.get(orch.base_tf)
+        else:
+            base_snap = await _run_seek(req.session_id, session.seek, req.target_idx)
+    except (SeekCancelled, OperationSuperseded):
+        return WsError(message="seek 已被后续 seek 取代", code="seek_cancelled").model_dump()
+
+    versions = _versions_for(req.session_id)
+    snapshot_ws = _snapshot_to_ws(base_snap, versions)
+    delta_ws = _snapshot_delta_to_ws(snapshot_ws, req.base_version, versions)
+
+    _publish(req.session_id, snapshot_ws)
+    _publish(req.session_id, _status_to_ws(session))
+
+    return ReplaySeekResponse(
+        bar_idx=base_snap.bar_idx if base_snap else 0,
+        snapshot=WsSnapshotDelta(**delta_ws) if delta_ws is not None else WsSnapshot(**snapshot_ws),
+    )
+
+
+def _fast_forward(feed, session, orch, target_idx: int | None, versions: SnapshotVersions):
+    """（工作线程）批量快进，作为一个条目发布：压缩事件摘要 + 最终快照 + 状态。
+
+    不发布中间 bar / 快照 / 事件。返回 (跨过的 bar 数, 摘要事件消息, 完整快照消息)。
+    """
+    start = session.current_idx
     if orch is not None:
-        # 多 TF seek
-        tf_snaps = orch.seek(req.target_idx)
+        tf_snaps = orch.fast_forward(target_idx)
         base_snap = tf_snaps.get(orch.base_tf)
+        streams = [(tf, snap, orch._stream_ids.get(tf, "")) for tf, snap in tf_snaps.items()]
     else:
-        base_snap = session.seek(req.target_idx)
+        base_snap = session.fast_forward(target_idx)
+        streams = [("", base_snap, "")] if base_snap is not None else []
+    if base_snap is None and session.event_log:
+        base_snap = session.event_log[-1]
 
-    snapshot_ws = WsSnapshot(
-        bar_idx=base_snap.bar_idx if base_snap else 0,
-        strokes=[_stroke_to_dict(s) for s in (base_snap.strokes if base_snap else [])],
-        event_count=len(base_snap.events) if base_snap else 0,
-    )
+    events = [_event_to_ws(ev, tf=tf, stream_id=sid) for tf, snap, sid in streams for ev in snap.events]
+    snapshot_ws = _snapshot_to_ws(base_snap, versions)
+    feed.publish([*events, snapshot_ws, _status_to_ws(session)])
+    return session.current_idx - start, events, snapshot_ws
 
-    await _broadcast(req.session_id, snapshot_ws.model_dump())
-    await _broadcast(req.session_id, _status_to_ws(session))
 
-    return ReplaySeekResponse(
-        bar_idx=base_snap.bar_idx if base_snap else 0,
-        snapshot=snapshot_ws,
+@app.post("/api/replay/fast_forward", response_model=ReplayFastForwardResponse)
+async def replay_fast_forward(req: ReplayFastForwardRequest):
+    """批量快进到 target_idx（缺省为末尾），之后可照常 step / play。"""
+    try:
+        session = await _get_session(req.session_id)
+    except ValueError as e:
+        return WsError(message=str(e), code="session_not_found").model_dump()
+
+    _cancel_play_task(req.session_id)
+    if session.mode == "playing":
+        session.mode = "paused"
+
+    versions = _versions_for(req.session_id)
+    skipped, events, snapshot_ws = await _run_engine(
+        req.session_id, _fast_forward, _get_feed(req.session_id), session,
+        _orchestrators.get(req.session_id), req.target_idx, versions, kind="fast_forward",
+    )
+    delta_ws = _snapshot_delta_to_ws(snapshot_ws, req.base_version, versions)
+
+    return ReplayFastForwardResponse(
+        bar_idx=snapshot_ws["bar_idx"],
+        skipped=skipped,
+        snapshot=WsSnapshotDelta(**delta_ws) if delta_ws is not None else WsSnapshot(**snapshot_ws),
+        events=[WsEvent(**e) for e in events],
     )
 
 
@@ -369,7 +957,7 @@ async def replay_seek(req: ReplaySeekRequest):
 async def replay_play(req: ReplayPlayRequest):
     """启动自动播放。"""
     try:
-        session = _get_session(req.session_id)
+        session = await _get_session(req.session_id)
     except ValueError as e:
         return WsError(message=str(e), code="session_not_found").model_dump()
 
@@ -390,7 +978,7 @@ async def replay_play(req: ReplayPlayRequest):
 async def replay_pause(req: ReplayPauseRequest):
     """暂停自动播放。"""
     try:
-        session = _get_session(req.session_id)
+        session = await _get_session(req.session_id)
     except ValueError as e:
         return WsError(message=str(e), code="session_not_found").model_dump()
 
@@ -398,7 +986,7 @@ async def replay_pause(req: ReplayPauseRequest):
     if session.mode == "playing":
         session.mode = "paused"
 
-    await _broadcast(session.session_id, _status_to_ws(session))
+    _publish(req.session_id, _status_to_ws(session))
     return _status_to_ws(session)
 
 
@@ -406,13 +994,54 @@ async def replay_pause(req: ReplayPauseRequest):
 async def replay_status(session_id: str):
     """查询回放状态。"""
     try:
-        session = _get_session(session_id)
+        session = await _get_session(session_id)
     except ValueError as e:
         return WsError(message=str(e), code="session_not_found").model_dump()
 
     return ReplayStatusResponse(**session.get_status())
 
 
+@app.get("/api/metrics/bar_cache")
+async def bar_cache_metrics():
+    """进程级 bar 缓存命中率与占用。"""
+    return _bar_cache.metrics()
+
+
+@app.get("/api/metrics/engine")
+async def engine_metrics():
+    """引擎执行器：按操作类型的排队等待 / 计算耗时与各会话排队深度。"""
+    return _executor.metrics()
+
+
+@app.get("/api/metrics/ws")
+async def ws_metrics():
+    """各会话 WS 客户端发送队列：深度、发送延迟、丢弃 / 合并计数。"""
+    return {
+        "sessions": {
+            sid: [_ws_senders[ws].metrics() for ws in clients if ws in _ws_senders]
+            for sid, clients in _ws_clients.items()
+        },
+        "clients": len(_ws_senders),
+        "max_queue": WS_SEND_QUEUE,
+        "default_overflow": WS_OVERFLOW,
+        "default_max_fps": WS_MAX_FPS,
+    }
+
+
+@app.get("/api/metrics/timelines")
+async def timeline_metrics():
+    """共享计算时间线：活跃 / 空闲数量、命中次数、各时间线计算与复用的 bar 数。"""
+    return _timelines.metrics()
+
+
+@app.get("/api/admin/sessions")
+async def admin_sessions(sweep: bool = False):
+    """会话列表（在线 / 已落盘）与估算内存；sweep=true 先执行一轮巡检。"""
+    if sweep:
+        await _sweep()
+    return _lifecycle.listing(has_clients=_client_count)
+
+
 # ════════════════════════════════════════════════
 # 自动播放
 # ════════════════════════════════════════════════
@@ -425,72 +1054,69 @@ def _cancel_play_task(session_id: str) -> None:
         task.cancel()
 
 
-async def _play_multi_tf(session_id: str, session, orch) -> bool:
-    """多 TF 播放一步。返回 False 表示应停止。"""
-    tf_snapshots = orch.step(1)
+def _play_multi_tf(feed, session, orch, count: int = 1) -> bool:
+    """（工作线程）多 TF 播放 count 步，作为一个条目发布。返回 False 表示应停止。"""
+    tf_snapshots = orch.step(count)
     if not tf_snapshots.get(orch.base_tf):
         return False
+    messages: list[dict] = []
     for tf, snaps in tf_snapshots.items():
-        tf_session = orch.sessions[tf]
-        sid = orch._stream_ids.get(tf, "")
-        for snap in snaps:
-            bi = snap.bar_idx
-            if bi < tf_session.total_bars:
-                await _broadcast(session_id, _bar_to_ws(tf_session.bars[bi], bi, tf=tf, stream_id=sid))
-            for ev in snap.events:
-                await _broadcast(session_id, _event_to_ws(ev, tf=tf, stream_id=sid))
+        _snaps_to_ws(messages, orch.sessions[tf], snaps, tf=tf, stream_id=orch._stream_ids.get(tf, ""))
+    if count > 1:
+        messages = coalesce_events(messages)
+    messages.append(_status_to_ws(session))
+    feed.publish(messages)
     return True
 
 
-async def _play_single_tf(session_id: str, session) -> bool:
-    """单 TF 播放一步。返回 False 表示应停止。"""
-    bar_idx = session.current_idx
-    snapshots = session.step(1)
+def _play_single_tf(feed, session, count: int = 1) -> bool:
+    """（工作线程）单 TF 播放 count 步，作为一个条目发布。返回 False 表示应停止。"""
+    snapshots = session.step(count)
     if not snapshots:
         return False
-    snap = snapshots[0]
-    bar = session.bars[bar_idx] if bar_idx < session.total_bars else None
-    if bar is not None:
-        await _broadcast(session_id, _bar_to_ws(bar, bar_idx))
-    for ev in snap.events:
-        await _broadcast(session_id, _event_to_ws(ev))
+    messages = _snaps_to_ws([], session, snapshots)
+    if count > 1:
+        messages = coalesce_events(messages)
+    messages.append(_status_to_ws(session))
+    feed.publish(messages)
     return True
 
 
 async def _play_loop(session_id: str) -> None:
-    """自动播放后台循环，按 speed 控制推送间隔。"""
+    """自动播放后台循环：按帧推进，每帧步进墙钟预算内到期的全部 bar。"""
     try:
         session = _sessions.get(session_id)
         if session is None:
             return
 
         orch = _orchestrators.get(session_id)
+        feed = _get_feed(session_id)
+        pacer = PlayPacer(session.speed, max_fps=PLAY_MAX_FPS)
 
         while session.mode == "playing" and session.current_idx < session.total_bars:
-            interval = 1.0 / max(session.speed, 0.1)
-            await asyncio.sleep(interval)
+            await asyncio.sleep(pacer.interval)
 
             if session.mode != "playing":
                 break
 
+            n = pacer.take()
             if orch is not None:
-                ok = await _play_multi_tf(session_id, session, orch)
+                ok = await _run_engine(session_id, _play_multi_tf, feed, session, orch, n, kind="play")
             else:
-                ok = await _play_single_tf(session_id, session)
+                ok = await _run_engine(session_id, _play_single_tf, feed, session, n, kind="play")
 
             if not ok:
                 break
 
-            await _broadcast(session_id, _status_to_ws(session))
-
         if session.mode == "playing":
             session.mode = "done"
-            await _broadcast(session_id, _status_to_ws(session))
+            feed.publish(_status_to_ws(session))
 
     except asyncio.CancelledError:
         pass
     finally:
         _play_tasks.pop(session_id, None)
+        _lifecycle.touch(session_id)
 
 
 # ════════════════════════════════════════════════
@@ -498,14 +1124,38 @@ async def _play_loop(session_id: str) -> None:
 # ════════════════════════════════════════════════
 
 
+def _negotiate_fps(value: str | None) -> float:
+    """客户端请求的 flush 频率上限；缺省或非法值回退为 WS_MAX_FPS。"""
+    try:
+        fps = float(value) if value is not None else WS_MAX_FPS
+    except ValueError:
+        return WS_MAX_FPS
+    return fps if fps >= 0 else WS_MAX_FPS
+
+
 @app.websocket("/ws/feed")
 async def ws_feed(ws: WebSocket):
     """WebSocket 双向通信。
 
-    服务端推送：bar, event, snapshot, replay_status, error
-    客户端发送：WsCommand（subscribe, replay_start, replay_step, etc.）
+    服务端推送：feed_config（首帧）, bar, event, snapshot, replay_status, error,
+    batch（batch=1 时同一步的消息合并）, resumed
+    客户端发送：WsCommand（subscribe, replay_start, replay_step, resume, etc.）
+    每个推送条目的最后一条消息带 feed_seq；重连后发送
+    {"action": "resume", "session_id": ..., "last_seq": N} 补发缺失条目。
+    查询参数：batch=1 / encoding=json|msgpack（见 contracts/ws_codec），
+    overflow=coalesce|drop（发送队列溢出策略，见 ws_sender），
+    fps=N（每秒最多 flush 次数，0 = 不限）
     """
     await ws.accept()
+    fmt = negotiate(ws.query_params.get("encoding"), ws.query_params.get("batch"))
+    overflow = negotiate_overflow(ws.query_params.get("overflow"), WS_OVERFLOW)
+    await ws.send_json({**fmt.to_ws(), "overflow": overflow})
+    sender = ClientSender(
+        lambda frame: _send_frame(ws, frame), fmt, maxsize=WS_SEND_QUEUE, policy=overflow,
+        max_fps=_negotiate_fps(ws.query_params.get("fps")),
+    )
+    sender.start()
+    _ws_senders[ws] = sender
     bound_session_id: str | None = None
 
     try:
@@ -514,10 +1164,17 @@ async def ws_feed(ws: WebSocket):
             try:
                 cmd = WsCommand(**data)
             except Exception as e:
-                await ws.send_json(WsError(message=f"无效命令: {e}", code="invalid_command").model_dump())
+                await _send(ws, WsError(message=f"无效命令: {e}", code="invalid_command").model_dump())
                 continue
 
             try:
+                if cmd.action == "resume":
+                    resumed = await _handle_ws_resume(ws, cmd)
+                    if resumed is not None:
+                        if bound_session_id and bound_session_id != resumed:
+                            _ws_clients.get(bound_session_id, set()).discard(ws)
+                        bound_session_id = resumed
+                    continue
                 await _handle_ws_command(ws, cmd, bound_session_id)
                 # 绑定会话（首次 replay_start 后）
                 if cmd.action == "replay_start" and bound_session_id is None:
@@ -527,20 +1184,23 @@ async def ws_feed(ws: WebSocket):
                             bound_session_id = sid
                             break
             except Exception as e:
-                await ws.send_json(WsError(message=str(e), code="handler_error").model_dump())
+                await _send(ws, WsError(message=str(e), code="handler_error").model_dump())
 
     except WebSocketDisconnect:
         pass
     finally:
         # 清理 WS 连接
+        _ws_senders.pop(ws, None)
+        sender.close()
         if bound_session_id and bound_session_id in _ws_clients:
             _ws_clients[bound_session_id].discard(ws)
+            _lifecycle.touch(bound_session_id)
 
 
 async def _ws_require_session(ws: WebSocket, bound_session_id: str | None) -> str | None:
     """检查 WS 是否绑定了会话，未绑定则发送错误。返回 session_id 或 None。"""
     if bound_session_id is None:
-        await ws.send_json(WsError(message="未绑定会话", code="no_session").model_dump())
+        await _send(ws, WsError(message="未绑定会话", code="no_session").model_dump())
         return None
     return bound_session_id
 
@@ -550,43 +1210,90 @@ async def _handle_ws_replay_start(ws: WebSocket, cmd: WsCommand) -> str | None:
     try:
         bars = _load_bars(cmd.symbol.upper(), "1min", cmd.tf)
     except ValueError as e:
-        await ws.send_json(WsError(message=str(e), code="data_error").model_dump())
+        await _send(ws, WsError(message=str(e), code="data_error").model_dump())
         return None
 
     if not bars:
-        await ws.send_json(WsError(message="数据为空", code="data_error").model_dump())
+        await _send(ws, WsError(message="数据为空", code="data_error").model_dump())
         return None
 
     session_id = str(uuid.uuid4())
-    engine = BiEngine()
-    session = ReplaySession(session_id=session_id, bars=bars, engine=engine)
-    _sessions[session_id] = session
+    session = _new_replay_session(session_id, bars, stroke_mode="new")
+    _register_session(session_id, session, symbol=cmd.symbol.upper(), tf=cmd.tf)
 
     _ws_clients.setdefault(session_id, set()).add(ws)
 
-    await ws.send_json({
+    await _send(ws, {
         "type": "replay_started",
         "session_id": session_id,
         "total_bars": session.total_bars,
     })
-    await ws.send_json(_status_to_ws(session))
+    await _send(ws, _status_to_ws(session))
     return session_id
 
 
+async def _handle_ws_resume(ws: WebSocket, cmd: WsCommand) -> str | None:
+    """处理 resume 命令：重新绑定会话并补发 last_seq 之后的推送条目。
+
+    缺口仍在推送日志内时逐条补发（与之后的实时推送顺序衔接）；
+    否则改发完整快照（自最近 bar 起补发 + 笔快照 + 状态）。返回绑定的 session_id。
+    """
+    sid = cmd.session_id
+    try:
+        await _get_session(sid)
+    except ValueError as e:
+        await _send(ws, WsError(message=str(e), code="session_not_found").model_dump())
+        return None
+
+    sender = _ws_senders[ws]
+    if cmd.base_version is not None:
+        sender.snapshot_version = cmd.base_version
+    log = _feed_log(sid)
+    last = cmd.last_seq
+    if last is None and cmd.last_event_id:
+        seq = log.seq_of_event(cmd.last_event_id)
+        # 事件所在条目可能只收到一部分：从该条目起重发（客户端按 event_id 去重）
+        last = seq - 1 if seq is not None else None
+    missing = log.since(last) if last is not None else None
+
+    # 同步完成绑定与补发入队，之后扇出的条目自然排在补发之后
+    _ws_clients.setdefault(sid, set()).add(ws)
+    _get_feed(sid)
+    _lifecycle.touch(sid)
+    if missing is None:
+        await _send(ws, WsResumed(
+            session_id=sid, from_seq=last if last is not None else -1,
+            to_seq=log.last_seq, replayed=0, snapshot=True,
+        ).model_dump())
+        sender.cursor = {}
+        sender.begin_resync()
+        task = asyncio.create_task(_resync_client(sid, sender))
+        _resync_tasks.add(task)
+        task.add_done_callback(_resync_tasks.discard)
+        return sid
+
+    await _send(ws, WsResumed(
+        session_id=sid, from_seq=last, to_seq=log.last_seq, replayed=len(missing),
+    ).model_dump())
+    for _seq, messages in missing:
+        snap_at = _snapshot_index(messages)
+        if snap_at is not None:
+            base = _delta_base(sid, sender, messages[snap_at])
+            messages = _with_snapshot_delta(sid, messages, snap_at, base)
+        sender.offer_control(encode_frames(messages, sender.fmt), _bar_cursor(messages))
+    return sid
+
+
 async def _handle_ws_replay_step(ws: WebSocket, bound_session_id: str | None) -> None:
     """处理 replay_step 命令：步进并广播 bar/event/status。"""
     sid = await _ws_require_session(ws, bound_session_id)
     if sid is None:
         return
-    session = _get_session(sid)
-    snapshots = session.step(1)
-    for snap in snapshots:
-        bar_idx = snap.bar_idx
-        if bar_idx < session.total_bars:
-            await _broadcast(sid, _bar_to_ws(session.bars[bar_idx], bar_idx))
-        for ev in snap.events:
-            await _broadcast(sid, _event_to_ws(ev))
-    await _broadcast(sid, _status_to_ws(session))
+    session = await _get_session(sid)
+    feed = _get_feed(sid)
+    ok = await _run_engine(sid, _play_single_tf, feed, session, kind="step")
+    if not ok:
+        feed.publish(_status_to_ws(session))
 
 
 async def _handle_ws_replay_seek(ws: WebSocket, cmd: WsCommand, bound_session_id: str | None) -> None:
@@ -594,12 +1301,37 @@ async def _handle_ws_replay_seek(ws: WebSocket, cmd: WsCommand, bound_session_id
     sid = await _ws_require_session(ws, bound_session_id)
     if sid is None:
         return
-    session = _get_session(sid)
+    session = await _get_session(sid)
     _cancel_play_task(sid)
-    snap = session.seek(cmd.seek_idx)
+    if cmd.base_version is not None:
+        _ws_senders[ws].snapshot_version = cmd.base_version
+    try:
+        snap = await _run_seek(sid, session.seek, cmd.seek_idx)
+    except (SeekCancelled, OperationSuperseded):
+        # 已被同会话更新的 seek 取代，由后者推送结果
+        return
     if snap:
-        await _broadcast(sid, _snapshot_to_ws(snap))
-    await _broadcast(sid, _status_to_ws(session))
+        _publish(sid, _snapshot_to_ws(snap, _versions_for(sid)))
+    _publish(sid, _status_to_ws(session))
+
+
+async def _handle_ws_replay_fast_forward(
+    ws: WebSocket, cmd: WsCommand, bound_session_id: str | None,
+) -> None:
+    """处理 replay_fast_forward 命令：批量快进并广播摘要事件 + snapshot + status。"""
+    sid = await _ws_require_session(ws, bound_session_id)
+    if sid is None:
+        return
+    session = await _get_session(sid)
+    _cancel_play_task(sid)
+    if session.mode == "playing":
+        session.mode = "paused"
+    if cmd.base_version is not None:
+        _ws_senders[ws].snapshot_version = cmd.base_version
+    await _run_engine(
+        sid, _fast_forward, _get_feed(sid), session, _orchestrators.get(sid),
+        cmd.target_idx, _versions_for(sid), kind="fast_forward",
+    )
 
 
 async def _handle_ws_replay_play(ws: WebSocket, cmd: WsCommand, bound_session_id: str | None) -> None:
@@ -607,13 +1339,13 @@ async def _handle_ws_replay_play(ws: WebSocket, cmd: WsCommand, bound_session_id
     sid = await _ws_require_session(ws, bound_session_id)
     if sid is None:
         return
-    session = _get_session(sid)
+    session = await _get_session(sid)
     _cancel_play_task(sid)
     session.speed = cmd.speed
     session.mode = "playing"
     task = asyncio.create_task(_play_loop(sid))
     _play_tasks[sid] = task
-    await _broadcast(sid, _status_to_ws(session))
+    _publish(sid, _status_to_ws(session))
 
 
 async def _handle_ws_replay_pause(ws: WebSocket, bound_session_id: str | None) -> None:
@@ -621,11 +1353,11 @@ async def _handle_ws_replay_pause(ws: WebSocket, bound_session_id: str | None) -
     sid = await _ws_require_session(ws, bound_session_id)
     if sid is None:
         return
-    session = _get_session(sid)
+    session = await _get_session(sid)
     _cancel_play_task(sid)
     if session.mode == "playing":
         session.mode = "paused"
-    await _broadcast(sid, _status_to_ws(session))
+    _publish(sid, _status_to_ws(session))
 
 
 async def _handle_ws_command(ws: WebSocket, cmd: WsCommand, bound_session_id: str | None) -> None:
@@ -640,6 +1372,8 @@ async def _handle_ws_command(ws: WebSocket, cmd: WsCommand, bound_session_id: st
         await _handle_ws_replay_step(ws, bound_session_id)
     elif cmd.action == "replay_seek":
         await _handle_ws_replay_seek(ws, cmd, bound_session_id)
+    elif cmd.action == "replay_fast_forward":
+        await _handle_ws_replay_fast_forward(ws, cmd, bound_session_id)
     elif cmd.action == "replay_play":
         await _handle_ws_replay_play(ws, cmd, bound_session_id)
     elif cmd.action == "replay_pause":
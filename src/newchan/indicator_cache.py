@@ -0,0 +1,165 @@
+"""技术指标增量缓存
+
+``/api/indicator`` 原先每次请求都对整段 resample 结果重算指标。这里按
+(缓存名, tf, 指标, 参数) 缓存注册表流式实现（``IndicatorStream``）的状态
+与已算出的输出列：
+
+- 输入是同一个 DataFrame 对象（图表服务的 frame 缓存按源文件 mtime 复用）
+  时直接返回上次结果。
+- 否则与上次输入比对出不变的前缀（close 与时间戳一致）。状态只消费到
+  上次输入的倒数第二根 bar —— 末根可能是仍在变化的周期 bar，每次都从
+  状态副本上重新计算。前缀覆盖状态时，只把新增 bar 逐根喂给状态（每根
+  O(1)），输出为缓存前缀 + 新行。
+- 前缀不足（历史被改写、滑窗、参数变化）或冷启动时走批量向量化计算，
+  并用 ``seed`` 恢复状态。
+- 注册表未声明 ``stream`` 的指标每次批量计算（不缓存）。
+- 同一键的并发请求串行计算（每条目一把锁）；条目数 LRU 淘汰。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Hashable
+
+import numpy as np
+import pandas as pd
+
+from newchan.indicators import INDICATOR_REGISTRY, IndicatorStream, resolve_params
+
+
+@dataclass
+class _Entry:
+    frame: pd.DataFrame | None = None
+    close: np.ndarray | None = None
+    index: pd.Index | None = None
+    stream: IndicatorStream | None = None  # 已消费前 len(close) - 1 根 bar
+    values: dict[str, np.ndarray] = field(default_factory=dict)
+    result: pd.DataFrame | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def stable_prefix(self, df: pd.DataFrame, close: np.ndarray) -> int:
+        """与上次输入相同（close 与时间戳一致）的前缀 bar 数。"""
+        if self.close is None:
+            return 0
+        n = min(len(self.close), len(close))
+        same = (close[:n] == self.close[:n]) & np.asarray(df.index[:n] == self.index[:n])
+        diff = np.flatnonzero(~same)
+        return int(diff[0]) if len(diff) else n
+
+
+class IndicatorCache:
+    """线程安全的流式指标状态 LRU 缓存。
+
+    Parameters
+    ----------
+    max_entries : int
+        保留的条目数上限（≥ 1）。
+
+    Usage::
+
+        cache = IndicatorCache(max_entries=64)
+        out = cache.compute((cache_name, tf), "MACD", resampled, {"fast": "8"})
+    """
+
+    def __init__(self, max_entries: int = 64) -> None:
+        if max_entries < 1:
+            raise ValueError(f"max_entries 必须 ≥ 1: {max_entries}")
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.incremental_builds = 0
+        self.streamed_bars = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, key: Hashable) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._entries.move_to_end(key)
+            return entry
+
+    def compute(
+        self,
+        key: Hashable,
+        name: str,
+        df: pd.DataFrame,
+        params: dict | None = None,
+    ) -> pd.DataFrame:
+        """计算指标（结果与 compute_indicator 一致）；未知指标 / 参数抛出 ValueError。
+
+        返回的 DataFrame 被后续请求共享，只读。
+        """
+        p = resolve_params(name, params)
+        reg = INDICATOR_REGISTRY[name]
+        stream_cls = reg.get("stream")
+        if stream_cls is None:
+            return reg["func"](df, **p)
+
+        entry = self._entry((key, name, tuple(sorted(p.items()))))
+        with entry.lock:
+            if entry.frame is df and entry.result is not None:
+                with self._lock:
+                    self.hits += 1
+                return entry.result
+
+            close = df["close"].to_numpy(dtype=float)
+            n = len(close)
+            consumed = len(entry.close) - 1 if entry.close is not None else 0
+            if entry.stream is not None and 0 < consumed < n and entry.stable_prefix(df, close) >= consumed:
+                stream = entry.stream
+                rows = [stream.update(float(c)) for c in close[consumed:n - 1]]
+                tail = stream.copy()
+                rows.append(tail.update(float(close[n - 1])))
+                new = np.asarray(rows, dtype=float).reshape(len(rows), len(stream.columns))
+                values = {
+                    col: np.concatenate([entry.values[col][:consumed], new[:, j]])
+                    for j, col in enumerate(stream.columns)
+                }
+                incremental = n - consumed
+            else:
+                out = reg["func"](df, **p)
+                stream = stream_cls(**p)
+                stream.seed(df["close"].iloc[:max(n - 1, 0)])
+                values = {col: out[col].to_numpy(dtype=float) for col in stream.columns}
+                incremental = 0
+
+            result = pd.DataFrame(values, index=df.index)
+            entry.frame, entry.close, entry.index = df, close, df.index
+            entry.stream, entry.values, entry.result = stream, values, result
+            with self._lock:
+                self.builds += 1
+                if incremental:
+                    self.incremental_builds += 1
+                    self.streamed_bars += incremental
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        """导出命中 / 全量计算 / 增量计算计数。"""
+        with self._lock:
+            lookups = self.hits + self.builds
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "builds": self.builds,
+                "incremental_builds": self.incremental_builds,
+                "streamed_bars": self.streamed_bars,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,7 +1,20 @@
-"""技术指标计算 + 指标注册表"""
+"""技术指标计算 + 指标注册表
+
+每个指标有两种实现：
+
+- 批量（``func``）：对整段 DataFrame 向量化计算，用于冷启动。
+- 流式（``stream``）：``IndicatorStream`` 子类，逐 bar O(1) 更新状态并给出
+  当根输出；``seed`` 从一段 close 向量化恢复状态。实时 bar 追加时只需
+  把新 bar 喂给缓存的状态（见 indicator_cache）。
+
+两者按相同递推公式实现，输出在浮点误差内一致。
+"""
 
 from __future__ import annotations
 
+import copy
+import math
+from collections import deque
 from typing import Any
 
 import pandas as pd
@@ -62,6 +75,200 @@ def calc_bollinger(
     )
 
 
+# =====================================================================
+# 流式实现
+# =====================================================================
+
+_NAN = float("nan")
+
+
+class IndicatorStream:
+    """流式指标基类：``update`` 消费一根 bar 的 close，返回当根各列输出。
+
+    子类的构造参数与对应批量函数相同；``columns`` 与批量函数输出列一致。
+    """
+
+    columns: tuple[str, ...] = ()
+
+    def update(self, close: float) -> tuple[float, ...]:
+        raise NotImplementedError
+
+    def seed(self, close: pd.Series) -> None:
+        """从 close 序列（向量化）恢复"已消费这些 bar"之后的状态。"""
+        raise NotImplementedError
+
+    def copy(self) -> "IndicatorStream":
+        return copy.deepcopy(self)
+
+
+def _ewm_last(values: pd.Series, alpha: float) -> float | None:
+    """adjust=False 指数平均的最后一个值（空序列为 None）。"""
+    if values.empty:
+        return None
+    return float(values.ewm(alpha=alpha, adjust=False).mean().iloc[-1])
+
+
+class EmaStream(IndicatorStream):
+    columns = ("ema",)
+
+    def __init__(self, period: int = 20) -> None:
+        self.alpha = 2.0 / (period + 1)
+        self.value: float | None = None
+
+    def update(self, close: float) -> tuple[float, ...]:
+        if self.value is None:
+            self.value = close
+        else:
+            self.value += self.alpha * (close - self.value)
+        return (self.value,)
+
+    def seed(self, close: pd.Series) -> None:
+        self.value = _ewm_last(close, self.alpha)
+
+
+class MacdStream(IndicatorStream):
+    columns = ("macd", "signal", "histogram")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9) -> None:
+        self.fast = EmaStream(fast)
+        self.slow = EmaStream(slow)
+        self.signal = EmaStream(signal)
+
+    def update(self, close: float) -> tuple[float, ...]:
+        (ef,), (es,) = self.fast.update(close), self.slow.update(close)
+        macd = ef - es
+        (sig,) = self.signal.update(macd)
+        return (macd, sig, macd - sig)
+
+    def seed(self, close: pd.Series) -> None:
+        ema_fast = close.ewm(alpha=self.fast.alpha, adjust=False).mean()
+        ema_slow = close.ewm(alpha=self.slow.alpha, adjust=False).mean()
+        self.fast.value = float(ema_fast.iloc[-1]) if len(close) else None
+        self.slow.value = float(ema_slow.iloc[-1]) if len(close) else None
+        self.signal.value = _ewm_last(ema_fast - ema_slow, self.signal.alpha)
+
+
+class _WindowStats:
+    """滑动窗口的均值 / 平方和（Welford 增删）。
+
+    增删累积的舍入误差在窗口每完整轮换一次时按窗口内数据重算一次，
+    均摊仍为 O(1)。
+    """
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.window: deque[float] = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._since_sync = 0
+
+    def push(self, x: float) -> None:
+        self.window.append(x)
+        n = len(self.window)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+        if n > self.period:
+            y = self.window.popleft()
+            n -= 1
+            delta = y - self.mean
+            self.mean -= delta / n
+            self.m2 -= delta * (y - self.mean)
+        self._since_sync += 1
+        if self._since_sync >= self.period:
+            self._sync()
+
+    def _sync(self) -> None:
+        n = len(self.window)
+        self.mean = math.fsum(self.window) / n
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in self.window)
+        self._since_sync = 0
+
+    def full(self) -> bool:
+        return len(self.window) == self.period
+
+    def std(self) -> float:
+        n = len(self.window)
+        return math.sqrt(max(self.m2, 0.0) / (n - 1)) if n > 1 else _NAN
+
+    def seed(self, close: pd.Series) -> None:
+        self.window = deque(float(v) for v in close.iloc[-self.period:])
+        if self.window:
+            self._sync()
+        else:
+            self.mean = self.m2 = 0.0
+            self._since_sync = 0
+
+
+class SmaStream(IndicatorStream):
+    columns = ("sma",)
+
+    def __init__(self, period: int = 20) -> None:
+        self.stats = _WindowStats(period)
+
+    def update(self, close: float) -> tuple[float, ...]:
+        self.stats.push(close)
+        return (self.stats.mean if self.stats.full() else _NAN,)
+
+    def seed(self, close: pd.Series) -> None:
+        self.stats.seed(close)
+
+
+class BollingerStream(IndicatorStream):
+    columns = ("bb_mid", "bb_upper", "bb_lower")
+
+    def __init__(self, period: int = 20, std: float = 2.0) -> None:
+        self.stats = _WindowStats(period)
+        self.k = std
+
+    def update(self, close: float) -> tuple[float, ...]:
+        self.stats.push(close)
+        if not self.stats.full():
+            return (_NAN, _NAN, _NAN)
+        mid = self.stats.mean
+        band = self.stats.std() * self.k
+        return (mid, mid + band, mid - band)
+
+    def seed(self, close: pd.Series) -> None:
+        self.stats.seed(close)
+
+
+class RsiStream(IndicatorStream):
+    columns = ("rsi",)
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self.alpha = 1.0 / period
+        self.prev: float | None = None
+        self.avg_gain: float | None = None
+        self.avg_loss: float | None = None
+        self.count = 0  # 已计入的涨跌幅个数
+
+    def update(self, close: float) -> tuple[float, ...]:
+        if self.prev is not None:
+            delta = close - self.prev
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if self.avg_gain is None:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += self.alpha * (gain - self.avg_gain)
+                self.avg_loss += self.alpha * (loss - self.avg_loss)
+            self.count += 1
+        self.prev = close
+        if self.count < self.period:
+            return (_NAN,)
+        if self.avg_loss == 0:
+            return (_NAN if self.avg_gain == 0 else 100.0,)
+        return (100 - 100 / (1 + self.avg_gain / self.avg_loss),)
+
+    def seed(self, close: pd.Series) -> None:
+        delta = close.diff().iloc[1:]
+        self.prev = float(close.iloc[-1]) if len(close) else None
+        self.avg_gain = _ewm_last(delta.clip(lower=0), self.alpha)
+        self.avg_loss = _ewm_last((-delta).clip(lower=0), self.alpha)
+        self.count = len(delta)
+
+
 # =====================================================================
 # 指标注册表
 # =====================================================================
@@ -69,10 +276,12 @@ def calc_bollinger(
 # display: "overlay" = 叠加主图, "subchart" = 独立子图面板
 # params: 参数定义 [{name, label, default, type}]
 # series: 输出序列描述 [{key, color, type(line/histogram)}]
+# stream: 流式实现（IndicatorStream 子类，构造参数同 func）
 
 INDICATOR_REGISTRY: dict[str, dict[str, Any]] = {
     "MACD": {
         "func": calc_macd,
+        "stream": MacdStream,
         "display": "subchart",
         "params": [
             {"name": "fast", "label": "Fast", "default": 12, "type": "int"},
@@ -87,6 +296,7 @@ INDICATOR_REGISTRY: dict[str, dict[str, Any]] = {
     },
     "SMA": {
         "func": calc_sma,
+        "stream": SmaStream,
         "display": "overlay",
         "params": [
             {"name": "period", "label": "Period", "default": 20, "type": "int"},
@@ -97,6 +307,7 @@ INDICATOR_REGISTRY: dict[str, dict[str, Any]] = {
     },
     "EMA": {
         "func": calc_ema,
+        "stream": EmaStream,
         "display": "overlay",
         "params": [
             {"name": "period", "label": "Period", "default": 20, "type": "int"},
@@ -107,6 +318,7 @@ INDICATOR_REGISTRY: dict[str, dict[str, Any]] = {
     },
     "RSI": {
         "func": calc_rsi,
+        "stream": RsiStream,
         "display": "subchart",
         "params": [
             {"name": "period", "label": "Period", "default": 14, "type": "int"},
@@ -117,6 +329,7 @@ INDICATOR_REGISTRY: dict[str, dict[str, Any]] = {
     },
     "Bollinger": {
         "func": calc_bollinger,
+        "stream": BollingerStream,
         "display": "overlay",
         "params": [
             {"name": "period", "label": "Period", "default": 20, "type": "int"},
@@ -131,10 +344,8 @@ INDICATOR_REGISTRY: dict[str, dict[str, Any]] = {
 }
 
 
-def compute_indicator(
-    name: str, df: pd.DataFrame, params: dict | None = None,
-) -> pd.DataFrame:
-    """通用入口：按名称计算指标。"""
+def resolve_params(name: str, params: dict | None = None) -> dict:
+    """按注册表默认值补全并转换参数类型；未知指标抛出 ValueError。"""
     reg = INDICATOR_REGISTRY.get(name)
     if reg is None:
         raise ValueError(f"未知指标 '{name}'，可用: {list(INDICATOR_REGISTRY.keys())}")
@@ -143,4 +354,12 @@ def compute_indicator(
         for k, v in params.items():
             if k in p:
                 p[k] = type(p[k])(v)
-    return reg["func"](df, **p)
+    return p
+
+
+def compute_indicator(
+    name: str, df: pd.DataFrame, params: dict | None = None,
+) -> pd.DataFrame:
+    """通用入口：按名称计算指标。"""
+    p = resolve_params(name, params)
+    return INDICATOR_REGISTRY[name]["func"](df, **p)
@@ -0,0 +1,181 @@
+"""实时 bar 内存尾部 — Live feeder → 浏览器推送
+
+``DatabentoLiveFeeder`` 收到 bar 后先追加到 parquet 缓存，再发布到
+``LiveTail``。图表服务的推送通道（SSE）直接从这里取新 bar，不再让前端
+每隔几十秒重新拉取整段历史：
+
+- ``LiveTail``：按全局递增序号保存最近 ``maxlen`` 条 bar 消息（各品种共用
+  一个环形缓冲），``wait`` 阻塞等待指定序号之后的新消息。同一品种同一
+  时间戳的再次发布视为该 bar 的更新（进行中的 bar），同样分配新序号。
+  断线重连时按 ``Last-Event-ID`` 从缓冲补发；序号已被淘汰时只能从当前继续。
+- ``LiveBarAggregator``：把 1 分钟 bar 聚合为显示周期的当前 bar
+  （窗口划分与 ``resample_ohlc`` 一致），以图表服务按 mtime 缓存的
+  resample 结果为种子，新 bar 只做 O(1) 合并。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Any
+
+import pandas as pd
+
+from newchan.b_timeframe import resample_ohlc
+
+LiveBar = dict[str, Any]  # {"ts": pd.Timestamp, "open", "high", "low", "close", "volume"}
+
+
+def make_live_bar(ts, open_: float, high: float, low: float, close: float, volume: float | None) -> LiveBar:
+    return {
+        "ts": pd.Timestamp(ts),
+        "open": float(open_), "high": float(high), "low": float(low), "close": float(close),
+        "volume": float(volume) if volume is not None else 0.0,
+    }
+
+
+class LiveTail:
+    """线程安全的实时 bar 环形缓冲。
+
+    Parameters
+    ----------
+    maxlen : int
+        保留的消息条数（所有品种合计）。
+
+    Usage::
+
+        tail = LiveTail()
+        tail.publish("CL", make_live_bar(ts, o, h, l, c, v))      # feeder 线程
+        items = tail.wait("CL", after_seq, timeout=15.0)         # 推送线程
+        for seq, bar in items: ...
+    """
+
+    def __init__(self, maxlen: int = 4096) -> None:
+        if maxlen < 1:
+            raise ValueError(f"maxlen 必须 ≥ 1: {maxlen}")
+        self.maxlen = maxlen
+        self._items: deque[tuple[int, str, LiveBar]] = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.seq = 0  # 最新消息序号（0 = 尚无消息）
+        self.updates = 0
+
+    def publish(self, symbol: str, bar: LiveBar) -> int:
+        """发布一条 bar 消息，返回其序号并唤醒等待者。"""
+        symbol = symbol.upper()
+        with self._cond:
+            for _seq, sym, prev in reversed(self._items):
+                if sym == symbol:
+                    if prev["ts"] == bar["ts"]:
+                        self.updates += 1
+                    break
+            self.seq += 1
+            self._items.append((self.seq, symbol, bar))
+            self._cond.notify_all()
+            return self.seq
+
+    def since(self, symbol: str, after_seq: int) -> list[tuple[int, LiveBar]]:
+        """序号 > after_seq 的该品种消息（按序）。"""
+        symbol = symbol.upper()
+        with self._cond:
+            return self._since(symbol, after_seq)
+
+    def _since(self, symbol: str, after_seq: int) -> list[tuple[int, LiveBar]]:
+        out: list[tuple[int, LiveBar]] = []
+        for seq, sym, bar in reversed(self._items):
+            if seq <= after_seq:
+                break
+            if sym == symbol:
+                out.append((seq, bar))
+        out.reverse()
+        return out
+
+    def wait(self, symbol: str, after_seq: int, timeout: float) -> list[tuple[int, LiveBar]]:
+        """阻塞至多 timeout 秒，返回序号 > after_seq 的该品种消息（超时为空）。"""
+        symbol = symbol.upper()
+        with self._cond:
+            items = self._since(symbol, after_seq)
+            if items:
+                return items
+            self._cond.wait_for(lambda: self.seq > after_seq and self._since(symbol, after_seq), timeout)
+            return self._since(symbol, after_seq)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "seq": self.seq,
+                "buffered": len(self._items),
+                "maxlen": self.maxlen,
+                "updates": self.updates,
+            }
+
+
+def _merge(agg: LiveBar | None, bar: LiveBar) -> LiveBar:
+    if agg is None:
+        return dict(bar)
+    return {
+        "ts": agg["ts"],
+        "open": agg["open"],
+        "high": max(agg["high"], bar["high"]),
+        "low": min(agg["low"], bar["low"]),
+        "close": bar["close"],
+        "volume": agg["volume"] + bar["volume"],
+    }
+
+
+def bucket_label(ts: pd.Timestamp, tf: str) -> pd.Timestamp:
+    """ts 所在的 tf 窗口标签（与 resample_ohlc 的输出索引一致）。"""
+    if tf == "1m":
+        return ts
+    row = pd.DataFrame({"open": [0.0], "high": [0.0], "low": [0.0], "close": [0.0]}, index=[ts])
+    return resample_ohlc(row, tf).index[0]
+
+
+class LiveBarAggregator:
+    """1 分钟实时 bar → 显示周期当前 bar。
+
+    Parameters
+    ----------
+    tf : str
+        显示周期（SUPPORTED_TF）。
+    seed : LiveBar | None
+        连接时 resample 结果的最后一根（已包含截至 seed_last_ts 的全部 1 分钟 bar）。
+    seed_last_ts : pd.Timestamp | None
+        种子覆盖到的最后一根 1 分钟 bar 的时间；不晚于它的实时 bar 视为已计入。
+
+    Usage::
+
+        agg = LiveBarAggregator("5m", seed=last_5m_bar, seed_last_ts=raw.index[-1])
+        out = agg.push(bar)   # None（已计入）或 ("bar" | "update", 当前 tf bar)
+    """
+
+    def __init__(
+        self,
+        tf: str,
+        seed: LiveBar | None = None,
+        seed_last_ts: pd.Timestamp | None = None,
+    ) -> None:
+        self.tf = tf
+        self._label: pd.Timestamp | None = seed["ts"] if seed is not None else None
+        self._closed: LiveBar | None = dict(seed) if seed is not None else None
+        self._last: LiveBar | None = None
+        self._seed_last_ts = seed_last_ts
+
+    def push(self, bar: LiveBar) -> tuple[str, LiveBar] | None:
+        """合并一根 1 分钟 bar（或其更新），返回事件类型与显示周期当前 bar。"""
+        ts = bar["ts"]
+        if self._seed_last_ts is not None and ts <= self._seed_last_ts:
+            return None
+        if self._last is not None and ts < self._last["ts"]:
+            return None  # 乱序的旧 bar
+        label = bucket_label(ts, self.tf)
+        if label != self._label:
+            kind = "bar"
+            self._label, self._closed, self._last = label, None, bar
+        else:
+            kind = "update"
+            if self._last is not None and self._last["ts"] != ts:
+                self._closed = _merge(self._closed, self._last)
+            self._last = bar
+        current = _merge(self._closed, self._last)
+        current["ts"] = label
+        return kind, current
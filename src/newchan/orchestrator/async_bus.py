@@ -0,0 +1,200 @@
+"""AsyncEventBus — 工作线程 → asyncio 事件循环的事件桥
+
+引擎在工作线程中逐 bar 计算，通过 ``push`` / ``publish`` 发布；
+事件循环内的异步消费者（如网关的 WS 扇出任务）各自持有独立队列，
+按发布顺序取出。引擎计算与 socket I/O 由此解耦，互不阻塞。
+
+- ``push(tf, events, stream_id)``：域事件，经内部 ``EventBus``
+  （capacity=0，纯推送不缓冲）订阅回调转为 ``list[TaggedEvent]``；
+  若提供 ``encode``，在发布线程内逐个编码（如转 WS dict），
+  消费者收到编码后的列表，序列化开销不落在事件循环上。
+- ``publish(item)``：任意帧（bar / status / snapshot dict 等）。
+- 两条路径共用 ``loop.call_soon_threadsafe`` 的 FIFO，
+  同一线程内的发布顺序在消费端保持不变。
+
+Usage::
+
+    feed = AsyncEventBus(asyncio.get_running_loop())
+    consumer = feed.consumer()
+
+    # 工作线程
+    feed.publish(bar_msg)
+    feed.push("5m", snap.events, stream_id=sid)
+
+    # 事件循环
+    async for item in consumer:
+        ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Callable
+
+from newchan.events import DomainEvent
+from newchan.orchestrator.bus import EventBus, TaggedEvent
+
+# 消费者关闭哨兵
+_CLOSED = object()
+
+
+class AsyncConsumer:
+    """单个异步消费者的有界队列。
+
+    队列满时丢弃最旧的条目（``dropped`` 计数），保证发布端永不阻塞。
+    """
+
+    def __init__(self, owner: AsyncEventBus, maxsize: int = 0) -> None:
+        self._owner = owner
+        self._maxsize = maxsize
+        # 队列本身不设上限，由 _offer 执行丢弃策略（关闭哨兵总能入队）
+        self._queue: asyncio.Queue[Any] = asyncio.Queue()
+        self._closed = False
+        self.dropped = 0
+
+    @property
+    def qsize(self) -> int:
+        """当前积压条目数。"""
+        return self._queue.qsize()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _offer(self, item: Any) -> None:
+        """（事件循环线程内）投递一个条目。"""
+        if self._closed:
+            return
+        if self._maxsize and self._queue.qsize() >= self._maxsize:
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    async def get(self) -> Any:
+        """取出下一个条目；消费者关闭后抛出 ``StopAsyncIteration``。"""
+        item = await self._queue.get()
+        if item is _CLOSED:
+            raise StopAsyncIteration
+        return item
+
+    def close(self) -> None:
+        """关闭消费者：注销并唤醒等待中的 ``get``。"""
+        if self._closed:
+            return
+        self._owner._remove(self)
+        self._closed = True
+        self._queue.put_nowait(_CLOSED)
+
+    def __aiter__(self) -> AsyncConsumer:
+        return self
+
+    async def __anext__(self) -> Any:
+        return await self.get()
+
+
+class AsyncEventBus:
+    """线程安全的发布端 + 事件循环内的多消费者扇出。
+
+    Parameters
+    ----------
+    loop : asyncio.AbstractEventLoop
+        消费者所在的事件循环。
+    encode : callable | None
+        ``push`` 路径上 TaggedEvent 的编码函数（在发布线程执行）。
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        encode: Callable[[TaggedEvent], Any] | None = None,
+    ) -> None:
+        self._loop = loop
+        self._encode = encode
+        self._lock = threading.Lock()
+        self._bus = EventBus(capacity=0, overflow="drop_newest")
+        self._bus.subscribe(self._on_events)
+        self._consumers: list[AsyncConsumer] = []
+        self._published = 0
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    # 发布端（任意线程）
+    # ------------------------------------------------------------------
+
+    def push(self, tf: str, events: list[DomainEvent], stream_id: str = "") -> None:
+        """发布一批域事件，消费者收到 ``list[TaggedEvent]``（或编码后的列表）。"""
+        with self._lock:
+            self._bus.push(tf, events, stream_id=stream_id)
+
+    def publish(self, item: Any) -> None:
+        """发布任意帧。"""
+        with self._lock:
+            self._dispatch(item)
+
+    def attach(
+        self,
+        bus: EventBus,
+        *,
+        tf: str | None = None,
+        stream_id: str | None = None,
+    ) -> int:
+        """将引擎侧 ``EventBus`` 的匹配批次转发到本总线，返回订阅 token。"""
+        return bus.subscribe(self.publish, tf=tf, stream_id=stream_id)
+
+    def _on_events(self, batch: list[TaggedEvent]) -> None:
+        if self._encode is not None:
+            self._dispatch([self._encode(te) for te in batch])
+        else:
+            self._dispatch(batch)
+
+    def _dispatch(self, item: Any) -> None:
+        if self._closed:
+            return
+        self._published += 1
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, item)
+        except RuntimeError:
+            # 事件循环已关闭：丢弃
+            self._closed = True
+
+    # ------------------------------------------------------------------
+    # 消费端（事件循环线程）
+    # ------------------------------------------------------------------
+
+    def consumer(self, maxsize: int = 0) -> AsyncConsumer:
+        """注册一个新的异步消费者（只接收注册之后发布的条目）。"""
+        c = AsyncConsumer(self, maxsize)
+        self._consumers.append(c)
+        return c
+
+    def _remove(self, consumer: AsyncConsumer) -> None:
+        if consumer in self._consumers:
+            self._consumers.remove(consumer)
+
+    def _fanout(self, item: Any) -> None:
+        for c in self._consumers:
+            c._offer(item)
+
+    def close(self) -> None:
+        """关闭总线及全部消费者。"""
+        self._closed = True
+        for c in list(self._consumers):
+            c.close()
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def metrics(self) -> dict:
+        """导出发布计数与各消费者积压。"""
+        return {
+            "published": self._published,
+            "consumers": [
+                {"backlog": c.qsize, "dropped": c.dropped} for c in self._consumers
+            ],
+        }
@@ -1,15 +1,44 @@
-"""EventBus — 按 TF 分区的事件收集器
+"""EventBus — 按 TF / stream_id / 递归级别分区的事件收集器
 
 从各 TF 的 BiEngine 快照中收集事件，附加 TF 标签，
-支持按 TF 或全局排序取出。
+支持按 TF、stream_id、级别或全局顺序取出。
+
+存储结构：
+- 每次 push 的一批事件存为一个 ``_Batch``（同一批共享 tf / stream_id），
+  push 不再为每个事件创建 TaggedEvent，仅在 ``drain()`` 时按需包装。
+- 同一 batch 同时挂在三个 deque 上：全局顺序、TF 分区、stream 分区
+  （级别 L{n} 即 TF 分区 ``"L{n}"``）。
+- 按分区取出时直接弹出该分区 deque，O(k)；其它索引中的已取出
+  batch 惰性跳过，死 batch 过多时整体压缩一次（均摊 O(1)）。
+
+容量与溢出：
+- ``capacity=None`` 不限容量（默认，与旧行为一致）。
+- 超出容量时按 ``overflow`` 策略处理：
+  ``"drop_oldest"`` 丢弃最早的缓冲事件；``"drop_newest"`` 丢弃新推入
+  超出部分；``"error"`` 抛出 ``EventBusOverflow``，本批不入缓冲。
+
+订阅：
+- ``subscribe(callback, tf=..., stream_id=..., level=...)`` 注册推送回调，
+  每次 push 匹配时以 ``list[TaggedEvent]`` 调用一次。回调与缓冲相互独立：
+  订阅者总能收到完整批次，缓冲仍按容量策略保留供 drain。
 """
 
 from __future__ import annotations
 
+import logging
+from collections import deque
 from dataclasses import dataclass
+from typing import Callable, Literal
 
 from newchan.events import DomainEvent
 
+logger = logging.getLogger(__name__)
+
+OverflowPolicy = Literal["drop_oldest", "drop_newest", "error"]
+
+# 死 batch 数超过此阈值且多于存活 batch 时触发压缩
+_COMPACT_MIN_DEAD = 64
+
 
 @dataclass(frozen=True, slots=True)
 class TaggedEvent:
@@ -20,9 +49,67 @@ class TaggedEvent:
     stream_id: str = ""  # MVP-B0: 流标识（空串 = 未指定）
 
 
+class EventBusOverflow(RuntimeError):
+    """缓冲已满且溢出策略为 ``"error"``。"""
+
+
+@dataclass(frozen=True, slots=True)
+class Subscription:
+    """订阅句柄。``tf`` / ``stream_id`` 为 None 表示不过滤该维度。"""
+
+    token: int
+    callback: Callable[[list[TaggedEvent]], None]
+    tf: str | None = None
+    stream_id: str | None = None
+
+    def matches(self, tf: str, stream_id: str) -> bool:
+        """该批次是否满足订阅过滤条件。"""
+        if self.tf is not None and self.tf != tf:
+            return False
+        if self.stream_id is not None and self.stream_id != stream_id:
+            return False
+        return True
+
+
+class _Batch:
+    """一次 push 的事件批次（内部存储单元）。
+
+    ``start`` 为已被 drop_oldest 丢弃的前缀长度；``live`` 为 False
+    表示已被取出或整体丢弃，其它索引中的引用惰性跳过。
+    """
+
+    __slots__ = ("tf", "stream_id", "events", "start", "live")
+
+    def __init__(self, tf: str, stream_id: str, events: list[DomainEvent]) -> None:
+        self.tf = tf
+        self.stream_id = stream_id
+        self.events = events
+        self.start = 0
+        self.live = True
+
+    def __len__(self) -> int:
+        return len(self.events) - self.start
+
+    def pending(self) -> list[DomainEvent]:
+        """尚在缓冲中的事件。"""
+        return self.events[self.start:] if self.start else self.events
+
+
+def _level_tf(level_id: int) -> str:
+    """递归级别 → TF 分区键。"""
+    return f"L{level_id}"
+
+
 class EventBus:
     """按 TF / stream_id 分区的事件收集器。
 
+    Parameters
+    ----------
+    capacity : int | None
+        缓冲事件数上限。None = 不限。
+    overflow : str
+        溢出策略：``"drop_oldest"`` / ``"drop_newest"`` / ``"error"``。
+
     Usage::
 
         bus = EventBus()
@@ -31,60 +118,292 @@ class EventBus:
         all_events = bus.drain()       # 取出全部并清空
         tf_events = bus.drain_by_tf("5m")  # 仅取指定 TF
         stream_events = bus.drain_by_stream("CME:BZ/1min@5m:L0/replay")
+
+        token = bus.subscribe(on_events, tf="5m")   # 推送回调
+        bus.metrics()["by_tf"]                      # 分区队列深度
     """
 
-    def __init__(self) -> None:
-        self._events: list[TaggedEvent] = []
+    def __init__(
+        self,
+        capacity: int | None = None,
+        overflow: OverflowPolicy = "drop_oldest",
+    ) -> None:
+        if capacity is not None and capacity < 0:
+            raise ValueError(f"capacity 不能为负: {capacity}")
+        if overflow not in ("drop_oldest", "drop_newest", "error"):
+            raise ValueError(f"未知溢出策略: {overflow}")
+        self._capacity = capacity
+        self._overflow: OverflowPolicy = overflow
+
+        self._order: deque[_Batch] = deque()
+        self._by_tf: dict[str, deque[_Batch]] = {}
+        self._by_stream: dict[str, deque[_Batch]] = {}
+
+        self._count = 0
+        self._tf_depth: dict[str, int] = {}
+        self._stream_depth: dict[str, int] = {}
+        self._n_live = 0
+        self._n_dead = 0
+
+        self._dropped = 0
+        self._high_watermark = 0
+
+        self._subs: dict[int, Subscription] = {}
+        self._next_token = 1
+
+    # ------------------------------------------------------------------
+    # 推入
+    # ------------------------------------------------------------------
 
     def push(self, tf: str, events: list[DomainEvent], stream_id: str = "") -> None:
         """添加一批事件，标记所属 TF 和 stream_id。"""
-        for ev in events:
-            self._events.append(TaggedEvent(tf=tf, event=ev, stream_id=stream_id))
+        if not events:
+            return
+        batch = list(events)
+        if self._overflow == "error" and self._would_overflow(len(batch)):
+            raise EventBusOverflow(
+                f"EventBus 已满（{self._count}/{self._capacity}），"
+                f"无法再推入 {len(batch)} 个事件",
+            )
+        if self._subs:
+            self._notify(tf, stream_id, batch)
+        self._buffer(tf, stream_id, batch)
+
+    def push_level(
+        self, level_id: int, events: list[DomainEvent], stream_id: str = "",
+    ) -> None:
+        """按递归级别推送事件。tf 编码为 'L{level_id}'。"""
+        self.push(_level_tf(level_id), events, stream_id=stream_id)
+
+    def _would_overflow(self, n: int) -> bool:
+        return self._capacity is not None and self._count + n > self._capacity
+
+    def _buffer(self, tf: str, stream_id: str, events: list[DomainEvent]) -> None:
+        """按容量策略写入缓冲。"""
+        if self._would_overflow(len(events)):
+            assert self._capacity is not None
+            if self._overflow == "drop_newest":
+                room = self._capacity - self._count
+                self._dropped += len(events) - room
+                events = events[:room]
+            else:  # drop_oldest
+                if len(events) > self._capacity:
+                    self._dropped += len(events) - self._capacity
+                    events = events[len(events) - self._capacity:]
+                self._evict_oldest(self._count + len(events) - self._capacity)
+                self._maybe_compact()
+            if not events:
+                return
+
+        batch = _Batch(tf, stream_id, events)
+        self._order.append(batch)
+        self._by_tf.setdefault(tf, deque()).append(batch)
+        self._by_stream.setdefault(stream_id, deque()).append(batch)
+
+        n = len(events)
+        self._count += n
+        self._n_live += 1
+        self._tf_depth[tf] = self._tf_depth.get(tf, 0) + n
+        self._stream_depth[stream_id] = self._stream_depth.get(stream_id, 0) + n
+        if self._count > self._high_watermark:
+            self._high_watermark = self._count
+
+    def _evict_oldest(self, n: int) -> None:
+        """从全局顺序头部丢弃 n 个缓冲事件。"""
+        while n > 0 and self._order:
+            batch = self._order[0]
+            if not batch.live:
+                self._order.popleft()
+                continue
+            size = len(batch)
+            if size <= n:
+                self._order.popleft()
+                self._retire(batch)
+                self._dropped += size
+                n -= size
+            else:
+                batch.start += n
+                self._shrink(batch, n)
+                self._dropped += n
+                n = 0
+
+    # ------------------------------------------------------------------
+    # 订阅
+    # ------------------------------------------------------------------
+
+    def subscribe(
+        self,
+        callback: Callable[[list[TaggedEvent]], None],
+        *,
+        tf: str | None = None,
+        stream_id: str | None = None,
+        level: int | None = None,
+    ) -> int:
+        """注册推送回调，返回订阅 token。
+
+        ``level`` 与 ``tf`` 互斥（级别即 TF 分区 ``"L{level}"``）。
+        """
+        if level is not None:
+            if tf is not None:
+                raise ValueError("tf 与 level 不能同时指定")
+            tf = _level_tf(level)
+        token = self._next_token
+        self._next_token += 1
+        self._subs[token] = Subscription(
+            token=token, callback=callback, tf=tf, stream_id=stream_id,
+        )
+        return token
+
+    def unsubscribe(self, token: int) -> bool:
+        """注销订阅。返回是否存在该 token。"""
+        return self._subs.pop(token, None) is not None
+
+    def _notify(self, tf: str, stream_id: str, events: list[DomainEvent]) -> None:
+        """向匹配的订阅者推送本批事件（回调异常不影响其它订阅者和缓冲）。"""
+        tagged: list[TaggedEvent] | None = None
+        for sub in list(self._subs.values()):
+            if not sub.matches(tf, stream_id):
+                continue
+            if tagged is None:
+                tagged = [TaggedEvent(tf=tf, event=ev, stream_id=stream_id) for ev in events]
+            try:
+                sub.callback(tagged)
+            except Exception:
+                logger.exception("EventBus 订阅回调失败 (token=%d)", sub.token)
+
+    # ------------------------------------------------------------------
+    # 取出
+    # ------------------------------------------------------------------
 
     def drain(self) -> list[TaggedEvent]:
         """取出全部事件并清空缓冲。"""
-        result = list(self._events)
-        self._events.clear()
+        result: list[TaggedEvent] = []
+        for batch in self._order:
+            if not batch.live:
+                continue
+            tf, sid = batch.tf, batch.stream_id
+            result.extend(
+                TaggedEvent(tf=tf, event=ev, stream_id=sid) for ev in batch.pending()
+            )
+        self._clear()
         return result
 
     def drain_by_tf(self, tf: str) -> list[DomainEvent]:
         """取出指定 TF 的事件，保留其它 TF 事件。"""
-        matched: list[DomainEvent] = []
-        remaining: list[TaggedEvent] = []
-        for te in self._events:
-            if te.tf == tf:
-                matched.append(te.event)
-            else:
-                remaining.append(te)
-        self._events = remaining
-        return matched
-
-    def push_level(
-        self, level_id: int, events: list[DomainEvent], stream_id: str = "",
-    ) -> None:
-        """按递归级别推送事件。tf 编码为 'L{level_id}'。"""
-        for ev in events:
-            self._events.append(TaggedEvent(
-                tf=f"L{level_id}", event=ev, stream_id=stream_id,
-            ))
+        return self._drain_partition(self._by_tf.pop(tf, None))
 
     def drain_by_level(self, level_id: int) -> list[DomainEvent]:
         """取出指定递归级别的事件，保留其它事件。"""
-        return self.drain_by_tf(f"L{level_id}")
+        return self.drain_by_tf(_level_tf(level_id))
 
     def drain_by_stream(self, stream_id: str) -> list[DomainEvent]:
         """取出指定 stream_id 的事件，保留其它事件。"""
+        return self._drain_partition(self._by_stream.pop(stream_id, None))
+
+    def _drain_partition(self, queue: deque[_Batch] | None) -> list[DomainEvent]:
         matched: list[DomainEvent] = []
-        remaining: list[TaggedEvent] = []
-        for te in self._events:
-            if te.stream_id == stream_id:
-                matched.append(te.event)
-            else:
-                remaining.append(te)
-        self._events = remaining
+        if not queue:
+            return matched
+        for batch in queue:
+            if batch.live:
+                matched.extend(batch.pending())
+                self._retire(batch)
+        self._maybe_compact()
         return matched
 
+    # ------------------------------------------------------------------
+    # 记账
+    # ------------------------------------------------------------------
+
+    def _shrink(self, batch: _Batch, n: int) -> None:
+        """batch 的缓冲事件减少 n 个后更新深度计数。"""
+        self._count -= n
+        self._dec(self._tf_depth, batch.tf, n)
+        self._dec(self._stream_depth, batch.stream_id, n)
+
+    @staticmethod
+    def _dec(depth: dict[str, int], key: str, n: int) -> None:
+        left = depth[key] - n
+        if left:
+            depth[key] = left
+        else:
+            del depth[key]
+
+    def _retire(self, batch: _Batch) -> None:
+        """标记 batch 已离开缓冲。"""
+        self._shrink(batch, len(batch))
+        batch.live = False
+        self._n_live -= 1
+        self._n_dead += 1
+
+    def _maybe_compact(self) -> None:
+        """死 batch 过多时重建各索引，回收惰性删除的引用。"""
+        if self._n_dead < _COMPACT_MIN_DEAD or self._n_dead <= self._n_live:
+            return
+        self._order = deque(b for b in self._order if b.live)
+        for index in (self._by_tf, self._by_stream):
+            for key in list(index):
+                queue = deque(b for b in index[key] if b.live)
+                if queue:
+                    index[key] = queue
+                else:
+                    del index[key]
+        self._n_dead = 0
+
+    def _clear(self) -> None:
+        self._order.clear()
+        self._by_tf.clear()
+        self._by_stream.clear()
+        self._tf_depth.clear()
+        self._stream_depth.clear()
+        self._count = 0
+        self._n_live = 0
+        self._n_dead = 0
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
     @property
     def count(self) -> int:
         """当前缓冲中的事件数。"""
-        return len(self._events)
+        return self._count
+
+    @property
+    def capacity(self) -> int | None:
+        """缓冲容量上限（None = 不限）。"""
+        return self._capacity
+
+    @property
+    def dropped(self) -> int:
+        """因溢出被丢弃的事件累计数。"""
+        return self._dropped
+
+    def depth(
+        self,
+        *,
+        tf: str | None = None,
+        stream_id: str | None = None,
+        level: int | None = None,
+    ) -> int:
+        """指定分区的缓冲深度（O(1)）。不指定分区时返回总深度。"""
+        if level is not None:
+            tf = _level_tf(level)
+        if tf is not None:
+            return self._tf_depth.get(tf, 0)
+        if stream_id is not None:
+            return self._stream_depth.get(stream_id, 0)
+        return self._count
+
+    def metrics(self) -> dict:
+        """导出队列深度指标快照。"""
+        return {
+            "depth": self._count,
+            "capacity": self._capacity,
+            "overflow": self._overflow,
+            "dropped": self._dropped,
+            "high_watermark": self._high_watermark,
+            "subscribers": len(self._subs),
+            "by_tf": dict(self._tf_depth),
+            "by_stream": dict(self._stream_depth),
+        }
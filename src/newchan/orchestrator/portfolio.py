@@ -0,0 +1,307 @@
+"""PortfolioReplay — 多品种按全局时间戳同步回放
+
+TFOrchestrator 只对齐同一品种的多个级别。组合研究需要把
+CL / GC / ES / NQ 及其比价序列放在同一条时间轴上回放：
+
+- 各品种 bar 序列按 (时间戳, 品种注册顺序, bar 索引) 做 k 路堆归并，
+  得到全局步进计划（``heapq.merge``，O(N log k)）；同一时间戳的
+  bar 按品种注册顺序处理，结果确定。
+- 每个品种一套独立的 RecursiveOrchestrator 递归栈；每步只驱动
+  计划中对应品种的栈，事件以 stream_id 标签推入统一的 ``bus``，
+  全局顺序即推入顺序。
+- step / seek / mode / speed / get_status 语义与 ReplaySession 一致，
+  索引为全局步进序号（0-based）。
+- 检查点：前进过程中每 ``checkpoint_every`` 步把全部递归栈序列化一次；
+  seek 从不超过目标的最近检查点（或当前位置，取较近者）恢复后前进，
+  不必从头重跑。seek 过程中的事件不进入 ``bus``。检查点数超过
+  ``max_checkpoints`` 时间隔加倍、只保留新间隔倍数上的检查点（隔一个
+  删一个），内存随回放长度对数增长而不是线性增长。
+
+比价序列先由 ``equivalence.make_ratio_kline`` 生成 bar，
+再作为一个普通 stream 传入即可。
+"""
+
+from __future__ import annotations
+
+import heapq
+import pickle
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Literal, Mapping
+
+from newchan.core.stream import StreamId
+from newchan.orchestrator.bus import EventBus
+from newchan.orchestrator.recursive import (
+    RecursiveOrchestrator,
+    RecursiveOrchestratorSnapshot,
+)
+from newchan.types import Bar
+
+
+def _epoch(dt: datetime) -> float:
+    """datetime → epoch 秒。naive datetime 视为 UTC。"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+@dataclass(frozen=True, slots=True)
+class PortfolioTick:
+    """全局时间轴上的一步。
+
+    Attributes
+    ----------
+    seq : int
+        全局步进序号（0-based）。
+    stream_id : str
+        本步驱动的品种。
+    bar_idx : int
+        该 bar 在其品种序列中的索引。
+    bar : Bar
+    snapshot : RecursiveOrchestratorSnapshot
+        该品种递归栈处理本 bar 后的快照。
+    """
+
+    seq: int
+    stream_id: str
+    bar_idx: int
+    bar: Bar
+    snapshot: RecursiveOrchestratorSnapshot
+
+
+class PortfolioReplay:
+    """多品种全局时间同步回放。
+
+    Parameters
+    ----------
+    session_id : str
+        会话标识。
+    streams : Mapping[StreamId | str, list[Bar]]
+        品种 → bar 序列（各自按时间升序）。注册顺序决定同时间戳的处理顺序。
+    max_levels, stroke_mode, min_strict_sep
+        透传给每个品种的 RecursiveOrchestrator。
+    checkpoint_every : int
+        初始检查点间隔（全局步数）；0 = 不做检查点（seek 从头重跑）。
+    max_checkpoints : int
+        检查点数上限（≥ 1）；超过时间隔加倍并抽稀已有检查点。
+
+    Usage::
+
+        replay = PortfolioReplay("pf", {sid_cl: bars_cl, sid_gc: bars_gc})
+        ticks = replay.step(100)
+        events = replay.bus.drain()      # 全局有序、带 stream_id
+        replay.seek(5000)                # 从最近检查点恢复
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        streams: Mapping[StreamId | str, list[Bar]],
+        max_levels: int = 6,
+        stroke_mode: str = "wide",
+        min_strict_sep: int = 5,
+        checkpoint_every: int = 500,
+        max_checkpoints: int = 32,
+    ) -> None:
+        if not streams:
+            raise ValueError("streams 不能为空")
+        if checkpoint_every < 0:
+            raise ValueError(f"checkpoint_every 不能为负: {checkpoint_every}")
+        if max_checkpoints < 1:
+            raise ValueError(f"max_checkpoints 必须 ≥ 1: {max_checkpoints}")
+
+        self.session_id = session_id
+        self.stream_ids = [
+            k.value if isinstance(k, StreamId) else k for k in streams
+        ]
+        self._bars = [list(bars) for bars in streams.values()]
+        self._engine_args = dict(
+            max_levels=max_levels,
+            stroke_mode=stroke_mode,
+            min_strict_sep=min_strict_sep,
+        )
+        self.checkpoint_every = checkpoint_every
+        self.max_checkpoints = max_checkpoints
+        self.mode: Literal["idle", "playing", "paused", "done"] = "idle"
+        self.speed = 1.0
+        self.bus = EventBus()
+
+        self._build_schedule()
+        self._stacks = self._new_stacks()
+        self._cursors = [0] * len(self._bars)
+        self.current_idx = 0
+        # 全局位置 → 序列化的 (递归栈, 各品种游标)（位置 0 即初始状态，无需保存）
+        self._checkpoints: dict[int, bytes] = {}
+        # 当前检查点间隔（checkpoint_every 的 2 的幂倍）
+        self._checkpoint_spacing = checkpoint_every
+
+    # ------------------------------------------------------------------
+    # __init__ helpers
+    # ------------------------------------------------------------------
+
+    def _build_schedule(self) -> None:
+        """k 路堆归并各品种时间轴，生成全局步进计划。"""
+        runs = [
+            [(_epoch(bar.ts), k, i) for i, bar in enumerate(bars)]
+            for k, bars in enumerate(self._bars)
+        ]
+        self._sched_ts: list[float] = []
+        self._sched_stream: list[int] = []
+        self._sched_bar: list[int] = []
+        for ts, k, i in heapq.merge(*runs):
+            self._sched_ts.append(ts)
+            self._sched_stream.append(k)
+            self._sched_bar.append(i)
+
+    def _new_stacks(self) -> list[RecursiveOrchestrator]:
+        return [
+            RecursiveOrchestrator(stream_id=sid, **self._engine_args)
+            for sid in self.stream_ids
+        ]
+
+    # ------------------------------------------------------------------
+    # 状态
+    # ------------------------------------------------------------------
+
+    @property
+    def total_bars(self) -> int:
+        """全局步数（各品种 bar 数之和）。"""
+        return len(self._sched_ts)
+
+    def stack(self, stream_id: StreamId | str) -> RecursiveOrchestrator:
+        """返回品种的递归栈（只读使用）。"""
+        key = stream_id.value if isinstance(stream_id, StreamId) else stream_id
+        return self._stacks[self.stream_ids.index(key)]
+
+    def index_at(self, ts: datetime | float) -> int:
+        """全局时间轴上最后一个时间戳 ≤ ts 的步进序号；无则 -1。"""
+        t = _epoch(ts) if isinstance(ts, datetime) else float(ts)
+        return bisect_right(self._sched_ts, t) - 1
+
+    def get_status(self) -> dict:
+        """返回当前回放状态摘要（含各品种已处理 bar 数）。"""
+        return {
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "current_idx": self.current_idx,
+            "total_bars": self.total_bars,
+            "speed": self.speed,
+            "streams": dict(zip(self.stream_ids, self._cursors)),
+            "checkpoints": len(self._checkpoints),
+            "checkpoint_spacing": self._checkpoint_spacing,
+        }
+
+    # ------------------------------------------------------------------
+    # 步进
+    # ------------------------------------------------------------------
+
+    def _advance(self, publish: bool) -> PortfolioTick:
+        """处理全局计划中的下一根 bar。"""
+        seq = self.current_idx
+        k = self._sched_stream[seq]
+        i = self._sched_bar[seq]
+        orch = self._stacks[k]
+        bar = self._bars[k][i]
+        snap = orch.process_bar(bar)
+        tagged = orch.bus.drain()
+        if publish and tagged:
+            sid = self.stream_ids[k]
+            # 连续同 tf 的事件合并为一批推入
+            start = 0
+            for j in range(1, len(tagged) + 1):
+                if j == len(tagged) or tagged[j].tf != tagged[start].tf:
+                    self.bus.push(
+                        tagged[start].tf,
+                        [te.event for te in tagged[start:j]],
+                        stream_id=sid,
+                    )
+                    start = j
+        self._cursors[k] = i + 1
+        self.current_idx = seq + 1
+        if (
+            self._checkpoint_spacing
+            and self.current_idx % self._checkpoint_spacing == 0
+            and self.current_idx not in self._checkpoints
+        ):
+            self._checkpoints[self.current_idx] = pickle.dumps(
+                (self._stacks, self._cursors),
+            )
+            if len(self._checkpoints) > self.max_checkpoints:
+                self._thin_checkpoints()
+        return PortfolioTick(
+            seq=seq, stream_id=self.stream_ids[k], bar_idx=i, bar=bar, snapshot=snap,
+        )
+
+    def _thin_checkpoints(self) -> None:
+        """间隔加倍，丢弃不在新间隔倍数上的检查点，直到不超过上限。"""
+        while len(self._checkpoints) > self.max_checkpoints:
+            self._checkpoint_spacing *= 2
+            self._checkpoints = {
+                pos: blob for pos, blob in self._checkpoints.items()
+                if pos % self._checkpoint_spacing == 0
+            }
+
+    def step(self, count: int = 1) -> list[PortfolioTick]:
+        """按全局时间顺序步进 count 根 bar。
+
+        剩余不足 count 根时处理到末尾，到达末尾后 mode 变为 "done"。
+        事件按处理顺序推入 ``bus``。
+        """
+        ticks: list[PortfolioTick] = []
+        for _ in range(count):
+            if self.current_idx >= self.total_bars:
+                break
+            ticks.append(self._advance(publish=True))
+        if self.current_idx >= self.total_bars:
+            self.mode = "done"
+        return ticks
+
+    def seek(self, target_idx: int) -> PortfolioTick | None:
+        """跳转到全局序号 target_idx（含该步）。
+
+        从不超过 target_idx 的最近检查点恢复（若当前位置更近且未越过目标，
+        则直接从当前位置前进），再静默前进到目标。
+        返回目标步的 tick；total_bars 为 0 时返回 None。
+        """
+        if self.total_bars == 0:
+            return None
+        target_idx = max(0, min(target_idx, self.total_bars - 1))
+
+        # 位置 p 表示前 p 步已处理；取 p ≤ target_idx 保证至少前进一步
+        positions = sorted(self._checkpoints)
+        n = bisect_left(positions, target_idx + 1)
+        best = positions[n - 1] if n else 0
+        if not best <= self.current_idx <= target_idx:
+            if best:
+                self._stacks, self._cursors = pickle.loads(self._checkpoints[best])
+            else:
+                self._stacks = self._new_stacks()
+                self._cursors = [0] * len(self._bars)
+            self.current_idx = best
+
+        tick: PortfolioTick | None = None
+        while self.current_idx <= target_idx:
+            tick = self._advance(publish=False)
+
+        if self.current_idx >= self.total_bars:
+            self.mode = "done"
+        elif self.mode == "done":
+            self.mode = "paused"
+        return tick
+
+    def seek_ts(self, ts: datetime | float) -> PortfolioTick | None:
+        """跳转到时间戳 ts（含 ts 上的全部 bar）；ts 早于首根 bar 时重置到起点。"""
+        idx = self.index_at(ts)
+        if idx < 0:
+            self.reset()
+            return None
+        return self.seek(idx)
+
+    def reset(self) -> None:
+        """回到起点（保留检查点与 bus 中未取走的事件）。"""
+        self._stacks = self._new_stacks()
+        self._cursors = [0] * len(self._bars)
+        self.current_idx = 0
+        if self.mode == "done":
+            self.mode = "paused"
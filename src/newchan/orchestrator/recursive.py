@@ -9,10 +9,17 @@ BiEngine → SegmentEngine → ZhongshuEngine → MoveEngine
                                             RecursiveStack
                                                   ↓
                                         (自动递归至终止)
+
+L* 惰性计算：process_bar 不再立即选择 L*，快照在首次读取
+``snap.lstar`` 时才计算并缓存；计算经 LStarSelector 增量进行，
+结构未变（仅最新价变化）时不重建 LevelView / 中枢判定。快照只以弱引用
+指向所属调度器：调度器已回收或快照经 pickle 往返后，按 ``last_price``
+直接选择（结果相同，只是不走增量路径）。
 """
 
 from __future__ import annotations
 
+import weakref
 from dataclasses import dataclass, field
 
 from newchan.bi_engine import BiEngine, BiEngineSnapshot
@@ -37,6 +44,7 @@ class RecursiveOrchestratorSnapshot:
     """一次 process_bar 后的完整快照。
 
     包含 level=1 五层管线快照 + 递归层快照。
+    ``lstar`` 为惰性属性：首次读取时计算并缓存在本快照上。
     """
 
     bar_idx: int
@@ -48,7 +56,40 @@ class RecursiveOrchestratorSnapshot:
     bsp_snapshot: BuySellPointSnapshot
     recursive_snapshots: list[RecursiveLevelSnapshot] = field(default_factory=list)
     all_events: list[DomainEvent] = field(default_factory=list)
-    lstar: LStar | None = None
+    last_price: float | None = None
+    _lstar_owner: weakref.ref[RecursiveOrchestrator] | None = field(
+        default=None, repr=False, compare=False,
+    )
+    _lstar: LStar | None = field(default=None, init=False, repr=False, compare=False)
+    _lstar_resolved: bool = field(default=False, init=False, repr=False, compare=False)
+
+    @property
+    def lstar(self) -> LStar | None:
+        """唯一裁决级别 L*（首次访问时计算）。"""
+        if not self._lstar_resolved:
+            owner = self._lstar_owner() if self._lstar_owner is not None else None
+            if self.last_price is None:
+                self._lstar = None
+            elif owner is not None:
+                self._lstar = owner._select_lstar(self, self.last_price)
+            else:
+                from newchan.a_level_fsm_adapter import select_lstar_from_recursive_snapshot
+                self._lstar = select_lstar_from_recursive_snapshot(self, self.last_price)
+            self._lstar_resolved = True
+            self._lstar_owner = None
+        return self._lstar
+
+    @lstar.setter
+    def lstar(self, value: LStar | None) -> None:
+        self._lstar = value
+        self._lstar_resolved = True
+        self._lstar_owner = None
+
+    def __getstate__(self) -> dict:
+        """pickle 时去掉指向调度器的弱引用（恢复后按 last_price 直接选择）。"""
+        state = self.__dict__.copy()
+        state["_lstar_owner"] = None
+        return state
 
 
 class RecursiveOrchestrator:
@@ -96,6 +137,9 @@ class RecursiveOrchestrator:
         # 事件总线
         self.bus = EventBus()
 
+        # L* 增量选择器（首次读取 snap.lstar 时创建）
+        self._lstar_selector = None
+
     @property
     def max_levels(self) -> int:
         """最大递归深度。"""
@@ -109,6 +153,18 @@ class RecursiveOrchestrator:
         self._move_engine.reset()
         self._bsp_engine.reset()
         self._recursive_stack.reset()
+        if self._lstar_selector is not None:
+            self._lstar_selector.reset()
+
+    def _select_lstar(
+        self, snap: RecursiveOrchestratorSnapshot, last_price: float,
+    ) -> LStar | None:
+        """经增量选择器计算 L*（snap.lstar 的惰性求值入口）。"""
+        if self._lstar_selector is None:
+            # 延迟导入避免循环依赖（adapter → recursive → adapter）
+            from newchan.a_level_fsm_adapter import LStarSelector
+            self._lstar_selector = LStarSelector()
+        return self._lstar_selector.select(snap, last_price)
 
     def _collect_events(
         self,
@@ -179,10 +235,7 @@ class RecursiveOrchestrator:
             bsp_snapshot=bsp_snap,
             recursive_snapshots=recursive_snaps,
             all_events=all_events,
-            lstar=None,
+            last_price=bar.close,
         )
-        # 延迟导入避免循环依赖（adapter → recursive → adapter）
-        from newchan.a_level_fsm_adapter import select_lstar_from_recursive_snapshot  # noqa: E402
-
-        snap.lstar = select_lstar_from_recursive_snapshot(snap, bar.close)
+        snap._lstar_owner = weakref.ref(self)
         return snap
@@ -11,18 +11,20 @@
 
 from __future__ import annotations
 
+import threading
 from datetime import datetime, timezone
 
 import pandas as pd
 
 from newchan.b_timeframe import resample_ohlc
+from newchan.bar_cache import BarColumns
 from newchan.bi_engine import BiEngine, BiEngineSnapshot
 from newchan.core.recursion.buysellpoint_engine import BuySellPointEngine
 from newchan.core.recursion.move_engine import MoveEngine
 from newchan.core.recursion.segment_engine import SegmentEngine
 from newchan.core.recursion.zhongshu_engine import ZhongshuEngine
 from newchan.orchestrator.bus import EventBus
-from newchan.replay import ReplaySession
+from newchan.replay import ReplaySession, SeekCancelled
 from newchan.types import Bar
 
 
@@ -49,24 +51,8 @@ def _bars_to_df(bars: list[Bar]) -> pd.DataFrame:
 
 
 def _df_to_bars(df: pd.DataFrame) -> list[Bar]:
-    """pandas DataFrame → Bar 列表。"""
-    bars: list[Bar] = []
-    for ts, row in df.iterrows():
-        dt = ts.to_pydatetime() if hasattr(ts, "to_pydatetime") else ts
-        if not isinstance(dt, datetime):
-            dt = pd.Timestamp(dt).to_pydatetime()
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        vol = float(row["volume"]) if "volume" in row.index and pd.notna(row["volume"]) else None
-        bars.append(Bar(
-            ts=dt,
-            open=float(row["open"]),
-            high=float(row["high"]),
-            low=float(row["low"]),
-            close=float(row["close"]),
-            volume=vol,
-        ))
-    return bars
+    """pandas DataFrame → Bar 列表（列式批量构造）。"""
+    return BarColumns.from_df(df).to_bars()
 
 
 class TFOrchestrator:
@@ -279,11 +265,17 @@ class TFOrchestrator:
             for snap in tf_snaps:
                 self._run_pipeline(tf, snap)
 
-    def seek(self, target_idx: int) -> dict[str, BiEngineSnapshot | None]:
+    def seek(
+        self,
+        target_idx: int,
+        cancel: threading.Event | None = None,
+    ) -> dict[str, BiEngineSnapshot | None]:
         """Seek base TF 到 target_idx。
 
         高 TF 按时间戳对齐 seek 到对应位置。
         返回各 TF 的最终快照。
+        cancel 被置位时 base TF 停在已重跑到的位置，高 TF 对齐到该位置后
+        抛出 SeekCancelled。
         """
         result: dict[str, BiEngineSnapshot | None] = {}
 
@@ -295,7 +287,15 @@ class TFOrchestrator:
             self._bsp_engines[tf].reset()
 
         # base TF seek
-        base_snap = self.base_session.seek(target_idx)
+        try:
+            base_snap = self.base_session.seek(target_idx, cancel=cancel)
+        except SeekCancelled as e:
+            if e.reached_idx > 0:
+                self._align_higher_tfs(e.reached_idx - 1, {})
+            else:
+                for tf in self.timeframes[1:]:
+                    self.sessions[tf].seek(0)
+            raise
         result[self.base_tf] = base_snap
 
         if target_idx <= 0:
@@ -304,6 +304,42 @@ class TFOrchestrator:
                 result[tf] = None
             return result
 
+        self._align_higher_tfs(target_idx, result)
+        return result
+
+    def fast_forward(self, target_idx: int | None = None) -> dict[str, BiEngineSnapshot]:
+        """批量快进 base TF 到 target_idx（缺省为末尾），高 TF 按时间戳对齐。
+
+        各 TF 只跑一次笔管线（见 ReplaySession.fast_forward），四层引擎
+        不重置、只处理一次最终快照，所得事件即快进前后的净差分。
+        返回实际快进了的 TF → 最终快照（事件为压缩摘要）；base TF 未前进时为空。
+        """
+        result: dict[str, BiEngineSnapshot] = {}
+        base_snap = self.base_session.fast_forward(target_idx)
+        if base_snap is None:
+            return result
+        self._run_pipeline(self.base_tf, base_snap)
+        result[self.base_tf] = base_snap
+
+        for tf in self.timeframes[1:]:
+            sess = self.sessions[tf]
+            tf_target = -1
+            for i in range(sess.current_idx, sess.total_bars):
+                if _dt_to_epoch(sess.bars[i].ts) > base_snap.bar_ts:
+                    break
+                tf_target = i
+            if tf_target < 0:
+                continue
+            snap = sess.fast_forward(tf_target)
+            if snap is not None:
+                self._run_pipeline(tf, snap)
+                result[tf] = snap
+        return result
+
+    def _align_higher_tfs(
+        self, target_idx: int, result: dict[str, BiEngineSnapshot | None],
+    ) -> None:
+        """高 TF seek 到 base TF 第 target_idx 根 bar 的时间位置。"""
         # 计算 base TF 到达 target_idx 时的时间戳
         base_bar = self.base_session.bars[min(target_idx, self.total_bars - 1)]
         base_ts = _dt_to_epoch(base_bar.ts)
@@ -324,8 +360,6 @@ class TFOrchestrator:
                 sess.seek(0)
                 result[tf] = None
 
-        return result
-
     def get_status(self) -> dict[str, dict]:
         """返回各 TF 的状态。"""
         return {tf: sess.get_status() for tf, sess in self.sessions.items()}
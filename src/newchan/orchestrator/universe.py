@@ -0,0 +1,354 @@
+"""UniverseOrchestrator — 多品种分片调度器
+
+每个 stream 一套完整的 RecursiveOrchestrator 递归栈。多品种
+（20+ 期货/股票）场景下按 stream 分片到固定数量的 worker 进程：
+
+- 每个分片 = 一个单进程 ``ProcessPoolExecutor``，stream 的引擎栈
+  常驻该进程（进程内 ``_WORKER_STACKS`` 注册表），状态不跨进程搬运。
+- 新 stream 分配给当前 stream 数最少的分片；``migrate`` 可在分片间
+  迁移引擎栈（pickle 整个 RecursiveOrchestrator）用于再平衡。
+- ``process`` 一次提交一批带 StreamId 标签的 bar：各分片并行计算，
+  结果按 stream 首次出现顺序合并，stream 内保持 bar 顺序。
+- ``shard_stats`` 报告每个分片的 stream 数、bar 数、计算耗时与往返延迟。
+
+``inline=True`` 时各分片在当前进程内联执行（同一代码路径，便于调试/测试）。
+"""
+
+from __future__ import annotations
+
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from time import monotonic, perf_counter
+from typing import Iterable
+
+from newchan.core.stream import StreamId
+from newchan.events import DomainEvent
+from newchan.orchestrator.bus import EventBus, TaggedEvent
+from newchan.orchestrator.recursive import RecursiveOrchestrator
+from newchan.types import Bar
+
+
+@dataclass(frozen=True, slots=True)
+class UniverseConfig:
+    """透传给每个 RecursiveOrchestrator 的引擎参数。"""
+
+    max_levels: int = 6
+    stroke_mode: str = "wide"
+    min_strict_sep: int = 5
+
+
+@dataclass(frozen=True, slots=True)
+class StreamResult:
+    """单个 stream 在一次批处理中的产出。
+
+    ``events`` 为 (tf, events) 分组，保持 RecursiveOrchestrator
+    事件总线中的推入顺序与级别标签（``"L1"`` / ``"L{n}"``）。
+    """
+
+    stream_id: str
+    bars: int
+    last_bar_idx: int
+    events: list[tuple[str, list[DomainEvent]]]
+
+
+@dataclass
+class ShardStats:
+    """单个分片的负载与延迟指标。"""
+
+    shard: int
+    streams: int = 0
+    bars_processed: int = 0
+    batches: int = 0
+    compute_ms_total: float = 0.0
+    last_compute_ms: float = 0.0
+    last_latency_ms: float = 0.0
+    _latency_ms_total: float = field(default=0.0, repr=False)
+
+    def record(self, bars: int, compute_ms: float, latency_ms: float) -> None:
+        self.bars_processed += bars
+        self.batches += 1
+        self.compute_ms_total += compute_ms
+        self.last_compute_ms = compute_ms
+        self.last_latency_ms = latency_ms
+        self._latency_ms_total += latency_ms
+
+    def snapshot(self) -> dict:
+        """导出当前指标快照。"""
+        avg_latency = self._latency_ms_total / self.batches if self.batches else 0.0
+        per_bar = self.compute_ms_total / self.bars_processed if self.bars_processed else 0.0
+        return {
+            "shard": self.shard,
+            "streams": self.streams,
+            "bars_processed": self.bars_processed,
+            "batches": self.batches,
+            "compute_ms_total": round(self.compute_ms_total, 3),
+            "compute_ms_per_bar": round(per_bar, 3),
+            "last_compute_ms": round(self.last_compute_ms, 3),
+            "last_latency_ms": round(self.last_latency_ms, 3),
+            "avg_latency_ms": round(avg_latency, 3),
+        }
+
+
+# ════════════════════════════════════════════════
+# worker 进程侧
+# ════════════════════════════════════════════════
+
+# 进程内引擎栈注册表：stream_id -> RecursiveOrchestrator
+_WORKER_STACKS: dict[str, RecursiveOrchestrator] = {}
+_WORKER_CONFIG = UniverseConfig()
+
+
+def _init_worker(config: UniverseConfig) -> None:
+    global _WORKER_CONFIG
+    _WORKER_CONFIG = config
+    _WORKER_STACKS.clear()
+
+
+def _stack_for(stream_id: str) -> RecursiveOrchestrator:
+    orch = _WORKER_STACKS.get(stream_id)
+    if orch is None:
+        orch = RecursiveOrchestrator(
+            stream_id=stream_id,
+            max_levels=_WORKER_CONFIG.max_levels,
+            stroke_mode=_WORKER_CONFIG.stroke_mode,
+            min_strict_sep=_WORKER_CONFIG.min_strict_sep,
+        )
+        _WORKER_STACKS[stream_id] = orch
+    return orch
+
+
+def _group_by_tf(tagged: list[TaggedEvent]) -> list[tuple[str, list[DomainEvent]]]:
+    """连续同 tf 的 TaggedEvent 合并为一组。"""
+    groups: list[tuple[str, list[DomainEvent]]] = []
+    for te in tagged:
+        if groups and groups[-1][0] == te.tf:
+            groups[-1][1].append(te.event)
+        else:
+            groups.append((te.tf, [te.event]))
+    return groups
+
+
+def _process_shard_batch(
+    batch: list[tuple[str, list[Bar]]],
+) -> tuple[list[StreamResult], float]:
+    """（worker）逐 stream 驱动引擎栈，返回结果与计算耗时 ms。"""
+    t0 = perf_counter()
+    results: list[StreamResult] = []
+    for stream_id, bars in batch:
+        orch = _stack_for(stream_id)
+        last_idx = -1
+        for bar in bars:
+            last_idx = orch.process_bar(bar).bar_idx
+        results.append(StreamResult(
+            stream_id=stream_id,
+            bars=len(bars),
+            last_bar_idx=last_idx,
+            events=_group_by_tf(orch.bus.drain()),
+        ))
+    return results, (perf_counter() - t0) * 1000
+
+
+def _export_stack(stream_id: str) -> bytes | None:
+    """（worker）取出并序列化 stream 的引擎栈。"""
+    orch = _WORKER_STACKS.pop(stream_id, None)
+    return pickle.dumps(orch) if orch is not None else None
+
+
+def _import_stack(stream_id: str, blob: bytes) -> None:
+    """（worker）安装迁入的引擎栈。"""
+    _WORKER_STACKS[stream_id] = pickle.loads(blob)
+
+
+class _InlineShard:
+    """inline 模式的进程内分片（与 worker 共用同一套函数）。
+
+    每个分片持有自己的注册表，调用期间临时换入模块级全局。
+    """
+
+    def __init__(self, config: UniverseConfig) -> None:
+        self._config = config
+        self._stacks: dict[str, RecursiveOrchestrator] = {}
+
+    def submit(self, fn, *args) -> Future:
+        global _WORKER_CONFIG, _WORKER_STACKS
+        saved = (_WORKER_CONFIG, _WORKER_STACKS)
+        _WORKER_CONFIG, _WORKER_STACKS = self._config, self._stacks
+        fut: Future = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        finally:
+            _WORKER_CONFIG, _WORKER_STACKS = saved
+        return fut
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stacks.clear()
+
+
+# ════════════════════════════════════════════════
+# 调度端
+# ════════════════════════════════════════════════
+
+
+def _key(stream_id: StreamId | str) -> str:
+    return stream_id.value if isinstance(stream_id, StreamId) else stream_id
+
+
+class UniverseOrchestrator:
+    """多品种分片调度器。
+
+    Parameters
+    ----------
+    n_workers : int
+        分片（worker 进程）数。
+    inline : bool
+        True = 分片在当前进程内联执行，不启动 worker 进程。
+    max_levels, stroke_mode, min_strict_sep
+        透传给每个 stream 的 RecursiveOrchestrator。
+
+    Usage::
+
+        with UniverseOrchestrator(n_workers=4) as uni:
+            results = uni.process([(sid_cl, bar), (sid_gc, bar), ...])
+            events = uni.bus.drain_by_stream(sid_cl.value)
+            uni.shard_stats()
+    """
+
+    def __init__(
+        self,
+        n_workers: int = 4,
+        max_levels: int = 6,
+        stroke_mode: str = "wide",
+        min_strict_sep: int = 5,
+        inline: bool = False,
+    ) -> None:
+        if n_workers < 1:
+            raise ValueError(f"n_workers 至少为 1: {n_workers}")
+        self._config = UniverseConfig(
+            max_levels=max_levels,
+            stroke_mode=stroke_mode,
+            min_strict_sep=min_strict_sep,
+        )
+        if inline:
+            self._shards: list = [_InlineShard(self._config) for _ in range(n_workers)]
+        else:
+            self._shards = [
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    initializer=_init_worker,
+                    initargs=(self._config,),
+                )
+                for _ in range(n_workers)
+            ]
+        self._assignment: dict[str, int] = {}
+        self._stats = [ShardStats(shard=i) for i in range(n_workers)]
+        self.bus = EventBus()
+
+    # ------------------------------------------------------------------
+    # 分片分配
+    # ------------------------------------------------------------------
+
+    @property
+    def n_shards(self) -> int:
+        return len(self._shards)
+
+    @property
+    def streams(self) -> list[str]:
+        """已分配的 stream 列表（按分配顺序）。"""
+        return list(self._assignment)
+
+    def shard_of(self, stream_id: StreamId | str) -> int:
+        """返回 stream 所在分片；未分配则分配到 stream 最少的分片。"""
+        key = _key(stream_id)
+        shard = self._assignment.get(key)
+        if shard is None:
+            shard = min(range(self.n_shards), key=lambda i: (self._stats[i].streams, i))
+            self._assignment[key] = shard
+            self._stats[shard].streams += 1
+        return shard
+
+    def migrate(self, stream_id: StreamId | str, shard: int) -> None:
+        """将 stream 的引擎栈迁移到指定分片（再平衡用）。"""
+        if not 0 <= shard < self.n_shards:
+            raise ValueError(f"分片 {shard} 不存在（共 {self.n_shards} 个）")
+        key = _key(stream_id)
+        src = self.shard_of(key)
+        if src == shard:
+            return
+        blob = self._shards[src].submit(_export_stack, key).result()
+        if blob is not None:
+            self._shards[shard].submit(_import_stack, key, blob).result()
+        self._assignment[key] = shard
+        self._stats[src].streams -= 1
+        self._stats[shard].streams += 1
+
+    # ------------------------------------------------------------------
+    # 批处理
+    # ------------------------------------------------------------------
+
+    def process(
+        self, tagged_bars: Iterable[tuple[StreamId | str, Bar]],
+    ) -> list[StreamResult]:
+        """处理一批带 stream 标签的 bar。
+
+        各分片并行计算；返回按 stream 首次出现顺序合并的结果，
+        事件同时按相同顺序推入 ``self.bus``（tf 标签为级别 ``"L{n}"``）。
+        """
+        per_stream: dict[str, list[Bar]] = {}
+        for stream_id, bar in tagged_bars:
+            per_stream.setdefault(_key(stream_id), []).append(bar)
+        if not per_stream:
+            return []
+
+        per_shard: dict[int, list[tuple[str, list[Bar]]]] = {}
+        for key, bars in per_stream.items():
+            per_shard.setdefault(self.shard_of(key), []).append((key, bars))
+
+        # 完成时刻在各分片自己的完成回调里记录：按序 result() 等待时，
+        # 快分片的延迟不会被排在前面的慢分片拉长
+        submitted: dict[int, tuple[Future, float]] = {}
+        done_at: dict[int, float] = {}
+        for shard, batch in per_shard.items():
+            t_submit = monotonic()
+            fut = self._shards[shard].submit(_process_shard_batch, batch)
+            fut.add_done_callback(lambda _f, shard=shard: done_at.__setitem__(shard, monotonic()))
+            submitted[shard] = (fut, t_submit)
+
+        by_stream: dict[str, StreamResult] = {}
+        for shard, (fut, t_submit) in submitted.items():
+            results, compute_ms = fut.result()
+            latency_ms = (done_at.get(shard, monotonic()) - t_submit) * 1000
+            self._stats[shard].record(
+                bars=sum(r.bars for r in results),
+                compute_ms=compute_ms,
+                latency_ms=latency_ms,
+            )
+            for r in results:
+                by_stream[r.stream_id] = r
+
+        ordered = [by_stream[key] for key in per_stream]
+        for r in ordered:
+            for tf, events in r.events:
+                self.bus.push(tf, events, stream_id=r.stream_id)
+        return ordered
+
+    # ------------------------------------------------------------------
+    # 指标 / 生命周期
+    # ------------------------------------------------------------------
+
+    def shard_stats(self) -> list[dict]:
+        """各分片负载与延迟快照。"""
+        return [s.snapshot() for s in self._stats]
+
+    def close(self) -> None:
+        """关闭全部 worker。"""
+        for shard in self._shards:
+            shard.shutdown(wait=True)
+
+    def __enter__(self) -> UniverseOrchestrator:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,192 @@
+"""新缠论 overlay 结果缓存
+
+前端约每 60 秒轮询一次 ``/api/newchan/overlay``，实时数据追加期间源文件
+每分钟变化一次，其余时间同一请求的结果完全相同。按
+(缓存名, tf, 参数, limit) 缓存构建结果：
+
+- 版本号 = 源文件 mtime（纳秒，十六进制串）。版本未变直接返回缓存结果；
+  客户端携带的版本与当前一致时，接口只回 ``unchanged``，不重发整份 overlay。
+- 版本变化时带着上次的 ``OverlayState`` 重建：新 bar 追加 / 末根 bar 更新
+  时，未变前缀上的 MACD 序列与区间面积直接复用，只计算新增部分
+  （见 ab_bridge_newchan 模块说明）。
+- 每条目保留最近 ``keep_versions`` 个版本的结构索引（strokes / segments /
+  centers / trends / levels / MACD 点，按 ``OVERLAY_STRUCTURE_KEYS`` 的标识
+  字段）。客户端声明持有的版本（``since_version``）仍在保留范围内时，
+  ``delta`` 给出新增 / 修改与删除的结构，接口只下发这部分
+  （差分与存储复用 snapshot_delta，未变化的结构在版本间共享同一对象）。
+- 同一键的并发请求串行构建（每条目一把锁），不会重复计算。
+- 条目数 LRU 淘汰。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Hashable
+
+from newchan.ab_bridge_newchan import OverlayState
+from newchan.snapshot_delta import Structures, diff, index_structures
+
+# overlay 结构类型 → 标识字段（macd 为 macd.series 的点）
+OVERLAY_STRUCTURE_KEYS: dict[str, str] = {
+    "strokes": "id",
+    "segments": "id",
+    "centers": "id",
+    "trends": "id",
+    "levels": "level",
+    "macd": "time",
+}
+
+
+def source_version(mtime_ns: int) -> str:
+    """源文件 mtime → overlay 版本号。"""
+    return format(mtime_ns, "x")
+
+
+def overlay_structures(result: dict) -> Structures:
+    """overlay 结果 → 按类型分组的结构列表（供版本索引 / 差分）。"""
+    out = {kind: result[kind] for kind in OVERLAY_STRUCTURE_KEYS if kind != "macd"}
+    out["macd"] = result["macd"]["series"]
+    return out
+
+
+@dataclass
+class _Entry:
+    version: str | None = None
+    result: dict | None = None
+    state: OverlayState = field(default_factory=OverlayState)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # 版本 → 结构索引（最近 keep_versions 个）
+    history: OrderedDict = field(default_factory=OrderedDict)
+
+
+class OverlayCache:
+    """线程安全的 overlay 结果 LRU 缓存。
+
+    Parameters
+    ----------
+    max_entries : int
+        保留的条目数上限（≥ 1）。
+    keep_versions : int
+        每条目保留的版本数（用于增量下发，≥ 1）。
+
+    Usage::
+
+        cache = OverlayCache(max_entries=32)
+        result = cache.get_or_build(
+            (cache_name, tf, params, limit), source_version(mtime_ns),
+            lambda state: build_overlay_newchan(df, ..., state=state),
+        )
+        delta = cache.delta(key, client_version, version)  # None = 下发完整结果
+    """
+
+    def __init__(self, max_entries: int = 32, keep_versions: int = 8) -> None:
+        if max_entries < 1:
+            raise ValueError(f"max_entries 必须 ≥ 1: {max_entries}")
+        if keep_versions < 1:
+            raise ValueError(f"keep_versions 必须 ≥ 1: {keep_versions}")
+        self.max_entries = max_entries
+        self.keep_versions = keep_versions
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.incremental_builds = 0
+        self.reused_bars = 0
+        self.evictions = 0
+        self.deltas = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, key: Hashable) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get_or_build(
+        self,
+        key: Hashable,
+        version: str,
+        build: Callable[[OverlayState], dict],
+    ) -> dict:
+        """版本一致返回缓存结果；否则以条目的增量状态调用 build 并写入。
+
+        build 抛出异常时条目保持原样（旧版本结果不会被当作新版本返回）。
+        返回的 dict 被后续请求共享，只读。
+        """
+        entry = self._entry(key)
+        with entry.lock:
+            if entry.version == version and entry.result is not None:
+                with self._lock:
+                    self.hits += 1
+                return entry.result
+            result = build(entry.state)
+            base = entry.history.get(entry.version)
+            entry.history[version] = index_structures(
+                overlay_structures(result), base, OVERLAY_STRUCTURE_KEYS,
+            )
+            entry.history.move_to_end(version)
+            while len(entry.history) > self.keep_versions:
+                entry.history.popitem(last=False)
+            entry.version = version
+            entry.result = result
+            with self._lock:
+                self.builds += 1
+                if entry.state.reused_bars:
+                    self.incremental_builds += 1
+                    self.reused_bars += entry.state.reused_bars
+            return result
+
+    def version(self, key: Hashable) -> str | None:
+        """条目当前缓存的版本（无条目返回 None，不刷新 LRU）。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.version if entry is not None else None
+
+    def delta(
+        self, key: Hashable, base_version: str | None, version: str,
+    ) -> tuple[Structures, dict[str, list]] | None:
+        """base_version → version 的 (changed, removed)；任一版本已不保留返回 None。"""
+        if not base_version:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        with entry.lock:
+            old = entry.history.get(base_version)
+            new = entry.history.get(version)
+        if old is None or new is None:
+            return None
+        with self._lock:
+            self.deltas += 1
+        return diff(old, new)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        """导出命中 / 构建 / 增量复用计数。"""
+        with self._lock:
+            lookups = self.hits + self.builds
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "builds": self.builds,
+                "incremental_builds": self.incremental_builds,
+                "reused_bars": self.reused_bars,
+                "evictions": self.evictions,
+                "deltas": self.deltas,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,117 @@
+"""新缠论 overlay 的视口 / 细节层级裁剪
+
+overlay 缓存（overlay_cache）保存的是整段历史的完整结果；长历史下整份
+下发的体积随历史长度线性增长。带视口参数的请求只从缓存结果中裁出：
+
+- 视口：t0/t1 与 [t_from, t_to]（epoch 秒）相交的结构；MACD 点取落在
+  视口内的部分，可再按 ``max_points`` 以 LTTB 选点（见 downsample）。
+- 细节层级（zoom）：结构按粒度分层 —— 笔为第 0 层、线段第 1 层、
+  递归级别 L 的中枢 / 走势为第 L + 1 层（顶层 centers / trends 即级别 1，
+  第 2 层）。zoom = z 时只保留层号 ≥ z 的结构；超过最高层时按最高层处理，
+  保证最粗的结构总会显示。
+- 未指定 zoom 时自动选择：取视口内结构总数不超过 ``max_items`` 的
+  最细层级（都超过时取最高层），下发体积与历史长度无关。
+
+裁剪只做列表过滤，不复制结构对象（结果与缓存共享，只读）。
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from newchan.downsample import lttb_indices
+
+# 顶层 centers / trends 的层号（= 递归级别 1）
+_CENTER_TIER = 2
+
+
+def max_zoom(result: dict) -> int:
+    """overlay 结果的最高层号。"""
+    return max([_CENTER_TIER] + [lvl["level"] + 1 for lvl in result["levels"]])
+
+
+def _visible(items: list[dict], lo: float, hi: float) -> list[dict]:
+    return [x for x in items if x["t0"] <= hi and x["t1"] >= lo]
+
+
+def _macd_window(series: list[dict], lo: float, hi: float, max_points: int | None) -> list[dict]:
+    i0 = bisect_left(series, lo, key=lambda p: p["time"])
+    i1 = bisect_right(series, hi, key=lambda p: p["time"])
+    window = series[i0:i1]
+    if max_points is None or len(window) <= max_points:
+        return window
+    x = np.fromiter((p["time"] for p in window), dtype=float, count=len(window))
+    budget = max(max_points // 2, 1)
+    keep = np.unique(np.concatenate([
+        lttb_indices(x, np.fromiter((p[col] for p in window), dtype=float, count=len(window)), budget)
+        for col in ("macd", "hist")
+    ]))
+    return [window[i] for i in keep]
+
+
+def overlay_viewport(
+    result: dict,
+    t_from: float | None = None,
+    t_to: float | None = None,
+    zoom: int | None = None,
+    max_items: int = 2000,
+    max_points: int | None = None,
+) -> dict:
+    """按视口与细节层级裁剪 overlay 结果。
+
+    Parameters
+    ----------
+    result : dict
+        build_overlay_newchan 的完整结果（不修改）。
+    t_from, t_to : float | None
+        视口时间范围（epoch 秒，闭区间）；None 表示不限。
+    zoom : int | None
+        细节层级（≥ 0）；None 时按 max_items 自动选择。
+    max_items : int
+        自动选择层级时视口内结构数上限。
+    max_points : int | None
+        视口内 MACD 点数上限（LTTB 选点）；None 不降采样。
+    """
+    if zoom is not None and zoom < 0:
+        raise ValueError(f"zoom 必须 ≥ 0: {zoom}")
+    lo = -math.inf if t_from is None else t_from
+    hi = math.inf if t_to is None else t_to
+    top = max_zoom(result)
+
+    strokes = _visible(result["strokes"], lo, hi)
+    segments = _visible(result["segments"], lo, hi)
+    centers = _visible(result["centers"], lo, hi)
+    trends = _visible(result["trends"], lo, hi)
+    levels = [
+        {**lvl, "centers": _visible(lvl["centers"], lo, hi), "trends": _visible(lvl["trends"], lo, hi)}
+        for lvl in result["levels"]
+    ]
+
+    def count(z: int) -> int:
+        n = (len(strokes) if z <= 0 else 0) + (len(segments) if z <= 1 else 0)
+        if z <= _CENTER_TIER:
+            n += len(centers) + len(trends)
+        return n + sum(len(lvl["centers"]) + len(lvl["trends"]) for lvl in levels if lvl["level"] + 1 >= z)
+
+    auto = zoom is None
+    if auto:
+        zoom = next((z for z in range(top + 1) if count(z) <= max_items), top)
+    zoom = min(zoom, top)
+
+    return {
+        **result,
+        "strokes": strokes if zoom <= 0 else [],
+        "segments": segments if zoom <= 1 else [],
+        "centers": centers if zoom <= _CENTER_TIER else [],
+        "trends": trends if zoom <= _CENTER_TIER else [],
+        "levels": [lvl for lvl in levels if lvl["level"] + 1 >= zoom],
+        "macd": {**result["macd"], "series": _macd_window(result["macd"]["series"], lo, hi, max_points)},
+        "viewport": {
+            "from": t_from, "to": t_to,
+            "zoom": zoom, "max_zoom": top, "auto": auto,
+            "items": count(zoom),
+        },
+    }
@@ -0,0 +1,139 @@
+"""自动播放调度 — 按墙钟预算批量步进 + 事件合并
+
+逐 bar sleep + 逐 bar 推送在高倍速下会把浏览器淹没：每秒上千帧，
+绝大多数在渲染前就已过时。``PlayPacer`` 把播放改为按帧推进：
+
+- 帧间隔 = max(1 / max_fps, 1 / speed)，低倍速时仍是一帧一根 bar；
+- 每帧按实际流逝的墙钟时间 × speed 累积应播放的 bar 数（含引擎计算
+  耗时），一次步进全部到期的 bar，播放速度与帧率、计算耗时无关；
+- 积压上限 ``max_lag_s``：引擎跟不上时丢弃超出部分的积压，
+  播放实际变慢，但不会越积越多。
+
+``coalesce_events`` 在一帧内合并被后续事件取代的中间事件
+（如同一笔的一串 stroke_extended 合并为一条），客户端收到的是最新状态。
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable
+
+
+class PlayPacer:
+    """自动播放的帧节拍器。
+
+    Parameters
+    ----------
+    speed : float
+        倍速（bar / 秒）。
+    max_fps : float
+        推送帧率上限。
+    max_lag_s : float
+        允许积压的墙钟时长（秒）；超出部分的 bar 不再补播。
+    clock : callable
+        单调时钟（测试可注入）。
+
+    Usage::
+
+        pacer = PlayPacer(speed=500, max_fps=30)
+        while playing:
+            await asyncio.sleep(pacer.interval)
+            n = pacer.take()          # 本帧应步进的 bar 数
+    """
+
+    def __init__(
+        self,
+        speed: float,
+        max_fps: float = 30.0,
+        max_lag_s: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.speed = max(speed, 0.1)
+        self.max_fps = max_fps
+        self.max_lag_s = max_lag_s
+        self._clock = clock
+        self._last = clock()
+        self._credit = 0.0
+        self.frames = 0
+        self.bars = 0
+        self.lag_dropped = 0
+
+    @property
+    def interval(self) -> float:
+        """帧间隔（秒）。"""
+        per_bar = 1.0 / self.speed
+        return max(per_bar, 1.0 / self.max_fps) if self.max_fps > 0 else per_bar
+
+    @property
+    def max_batch(self) -> int:
+        """单帧最多步进的 bar 数。"""
+        return max(1, math.ceil(self.speed * self.max_lag_s))
+
+    def take(self) -> int:
+        """结算自上次以来到期的 bar 数（至少 1）。"""
+        now = self._clock()
+        self._credit += (now - self._last) * self.speed
+        self._last = now
+        if self._credit > self.max_batch:
+            # 积压超限：不再补播（不跳过 bar，只是实际播放变慢）
+            self.lag_dropped += int(self._credit - self.max_batch)
+            self._credit = float(self.max_batch)
+        n = max(1, int(self._credit))
+        self._credit = max(0.0, self._credit - n)
+        self.frames += 1
+        self.bars += n
+        return n
+
+
+# 可合并的事件类型 → 同一对象的标识字段
+_COALESCE_ID = {
+    "stroke_candidate": "stroke_id",
+    "stroke_extended": "stroke_id",
+}
+
+
+def _merge(prev: dict, new: dict) -> dict:
+    """同一对象的两条可合并事件 → 一条（保留最早的起点、最新的终点）。"""
+    if new["event_type"] != "stroke_extended":
+        return new
+    payload = dict(new["payload"])
+    payload["old_i1"] = prev["payload"]["old_i1"]
+    payload["old_p1"] = prev["payload"]["old_p1"]
+    return {**new, "payload": payload}
+
+
+def coalesce_events(messages: list[dict]) -> list[dict]:
+    """合并一帧消息中被后续事件取代的中间事件（WS 消息 dict）。
+
+    同一 (tf, stream_id, 事件类型, 对象 id) 的连续 stroke_candidate /
+    stroke_extended 只保留最后一条（extended 链保留最初的 old_i1 / old_p1），
+    位置在最后一条处，与其他消息的相对顺序不变。同一对象之间夹有其他类型
+    的事件（如 stroke_settled）时不跨越合并。非事件消息原样保留。
+    """
+    out: list[dict | None] = []
+    pending: dict[tuple, int] = {}
+    for m in messages:
+        if m.get("type") != "event":
+            out.append(m)
+            continue
+        et = m["event_type"]
+        id_field = _COALESCE_ID.get(et)
+        obj_id = m["payload"].get(id_field or "stroke_id")
+        scope = (m.get("tf", ""), m.get("stream_id", ""), obj_id)
+        if id_field is None:
+            # 屏障：同一对象的其他事件打断合并链
+            for key in [k for k in pending if k[:3] == scope]:
+                del pending[key]
+            out.append(m)
+            continue
+        key = (*scope, et)
+        at = pending.get(key)
+        if at is not None:
+            m = _merge(out[at], m)
+            out[at] = None
+        for other in [k for k in pending if k[:3] == scope and k != key]:
+            del pending[other]
+        pending[key] = len(out)
+        out.append(m)
+    return [m for m in out if m is not None]
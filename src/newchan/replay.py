@@ -1,11 +1,12 @@
 """回放会话管理 — 逐 bar 重放引擎状态
 
-通过 BiEngine 逐 bar 驱动，支持步进、跳转、自动播放。
+通过 BiEngine 逐 bar 驱动，支持步进、跳转、自动播放与批量快进。
 每个 ReplaySession 绑定一组固定的 bar 数据和一个独立的引擎实例。
 """
 
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass, field
 from typing import Literal
 
@@ -13,6 +14,17 @@ from newchan.bi_engine import BiEngine, BiEngineSnapshot
 from newchan.types import Bar
 
 
+class SeekCancelled(Exception):
+    """seek 在重跑途中被取消。
+
+    会话停在已重跑到的位置（状态自洽，等价于从头步进到该处）。
+    """
+
+    def __init__(self, reached_idx: int) -> None:
+        super().__init__(f"seek 已取消（停在 {reached_idx}）")
+        self.reached_idx = reached_idx
+
+
 @dataclass
 class ReplaySession:
     """管理单个回放会话的状态。
@@ -71,11 +83,16 @@ class ReplaySession:
 
         return snapshots
 
-    def seek(self, target_idx: int) -> BiEngineSnapshot | None:
+    def seek(
+        self,
+        target_idx: int,
+        cancel: threading.Event | None = None,
+    ) -> BiEngineSnapshot | None:
         """跳转到指定位置。重置引擎，从头重跑到 target_idx。
 
         target_idx 是目标 bar 索引（0-based，含该 bar）。
         返回跳转后的最终快照；如果 target_idx <= 0 则只重置，返回 None。
+        cancel 被置位时在下一根 bar 前中止，抛出 SeekCancelled。
         """
         # 限制范围
         target_idx = max(0, min(target_idx, self.total_bars - 1))
@@ -88,16 +105,42 @@ class ReplaySession:
         # 从头重跑到 target_idx（含）
         snap: BiEngineSnapshot | None = None
         for i in range(target_idx + 1):
+            if cancel is not None and cancel.is_set():
+                raise SeekCancelled(self.current_idx)
             snap = self.engine.process_bar(self.bars[i])
             self.current_idx = i + 1
             self.event_log.append(snap)
 
-        # 更新模式
+        self._after_jump()
+        return snap
+
+    def _fast_forward_end(self, target_idx: int | None) -> int:
+        """快进目标 → 快进后的 current_idx（缺省为末尾）。"""
+        if target_idx is None:
+            return self.total_bars
+        return max(0, min(target_idx, self.total_bars - 1)) + 1
+
+    def _after_jump(self) -> None:
         if self.current_idx >= self.total_bars:
             self.mode = "done"
         elif self.mode == "done":
             self.mode = "paused"
 
+    def fast_forward(self, target_idx: int | None = None) -> BiEngineSnapshot | None:
+        """批量快进到 target_idx（含；缺省为最后一根 bar），只向前。
+
+        与 step / seek 不同，不逐 bar 产生快照：引擎对剩余 bar 只跑一次管线
+        （见 BiEngine.process_bars），返回快照的 events 是快进前后笔快照的
+        净差分（压缩事件摘要）。快进后可照常 step / play。
+        目标不在当前位置之后时不做任何事，返回 None。
+        """
+        end = self._fast_forward_end(target_idx)
+        if end <= self.current_idx:
+            return None
+        snap = self.engine.process_bars(self.bars[self.current_idx:end])
+        self.current_idx = end
+        self.event_log.append(snap)
+        self._after_jump()
         return snap
 
     def get_status(self) -> dict:
@@ -3,15 +3,35 @@
 from __future__ import annotations
 
 import json
-import threading
 import traceback
 from pathlib import Path
+from typing import Iterator
+
+import numpy as np
 import pandas as pd
 from bottle import Bottle, request, response, static_file
 
 from newchan.b_timeframe import SUPPORTED_TF, resample_ohlc
-from newchan.cache import list_cached, load_df, save_df
-from newchan.indicators import INDICATOR_REGISTRY, compute_indicator
+from newchan.bar_cache import FrameCache
+from newchan.cache import cache_dir_version, cache_mtime_ns, list_cached, load_df, save_df
+from newchan.config import (
+    CACHE_DIR,
+    FETCH_CHUNK_DAYS,
+    FETCH_PER_PROVIDER,
+    FETCH_WORKERS,
+    FRAME_CACHE_MB,
+    INDICATOR_CACHE_ENTRIES,
+    OVERLAY_CACHE_ENTRIES,
+    OVERLAY_LOD_MAX_ITEMS,
+)
+from newchan.core.symbol_index import SymbolIndex, catalog_index
+from newchan.downsample import PYRAMID_FACTOR, downsample_ohlc, lttb_frame, pyramid_level
+from newchan.fetch_jobs import FetchScheduler
+from newchan.indicator_cache import IndicatorCache
+from newchan.indicators import INDICATOR_REGISTRY
+from newchan.live_tail import LiveBarAggregator, LiveTail, make_live_bar
+from newchan.overlay_cache import OverlayCache, source_version
+from newchan.overlay_lod import overlay_viewport
 
 app = Bottle()
 
@@ -26,25 +46,200 @@ def _json_resp(data, status=200):
 
 
 
-def _df_to_records(df: pd.DataFrame) -> list[dict]:
+_TIME_FMT = "%Y-%m-%d %H:%M:%S"
+_EPOCH = pd.Timestamp("1970-01-01")
+
+# 行数超过 _STREAM_ROWS 的结果按 _CHUNK_ROWS 行分块流式返回
+_STREAM_ROWS = 50_000
+_CHUNK_ROWS = 10_000
+
+DATA_FORMATS = ("records", "columns")
+TIME_MODES = ("str", "epoch")
+
+
+def _utc_naive(index: pd.Index) -> pd.Index:
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        return index.tz_convert("UTC").tz_localize(None)
+    return index
+
+
+def _time_column(index: pd.Index, time_mode: str = "str") -> list:
+    """索引 -> 时间列（批量转换）：``str`` 为 UTC 时间字符串，``epoch`` 为 epoch 秒整数。"""
+    index = _utc_naive(index)
+    if not isinstance(index, pd.DatetimeIndex):
+        return [str(ts) for ts in index]
+    if time_mode == "epoch":
+        return ((index - _EPOCH) // pd.Timedelta(seconds=1)).tolist()
+    return index.strftime(_TIME_FMT).tolist()
+
+
+def _value_columns(df: pd.DataFrame) -> tuple[dict[str, list], np.ndarray]:
+    """DataFrame -> ({列名: 值列表}, 每行是否含 NaN)，保留 6 位小数，NaN -> None。"""
+    values = np.round(df.to_numpy(dtype=float, na_value=np.nan), 6)
+    nan = np.isnan(values)
+    cols: dict[str, list] = {}
+    for j, name in enumerate(df.columns):
+        col = values[:, j].tolist()
+        for i in np.flatnonzero(nan[:, j]):
+            col[i] = None
+        cols[str(name)] = col
+    return cols, nan.any(axis=1)
+
+
+# 读盘 + resample 结果缓存：key = (缓存名, tf, 文件 mtime)，tf 为 None 表示原始数据。
+# 源文件更新（mtime 变化）后旧条目不再命中并被释放。缓存的 DataFrame 只读。
+_frame_cache = FrameCache(max_bytes=FRAME_CACHE_MB * 1024 * 1024)
+
+
+def _cached_frame(key: tuple, loader):
+    df = _frame_cache.get(key)
+    if df is None:
+        df = loader()
+        if df is None:
+            return None
+        # 同一缓存文件的旧版本（任意 tf）不会再命中，直接释放
+        name, _tf, mtime = key
+        _frame_cache.discard(lambda k: k[0] == name and k[2] != mtime)
+        _frame_cache.put(key, df)
+    return df
+
+
+def _load_resampled(cache_name: str, tf: str) -> pd.DataFrame | None:
+    """读缓存并 resample 到 tf（结果按文件 mtime 缓存）；缓存不存在返回 None。
+
+    resample 失败抛出 ValueError。返回的 DataFrame 可能被其他请求共享，只读。
+    """
+    mtime = cache_mtime_ns(cache_name)
+    if mtime is None:
+        # 无版本可依（文件不存在或非文件来源）：不缓存
+        df = load_df(cache_name)
+        return resample_ohlc(df, tf) if df is not None else None
+    df = _cached_frame((cache_name, None, mtime), lambda: load_df(cache_name))
+    if df is None:
+        return None
+    return _cached_frame((cache_name, tf, mtime), lambda: resample_ohlc(df, tf))
+
+
+def _page_bounds(
+    index: pd.Index, to_ts: str = "", after_ts: str = "", count_back: str = "",
+) -> tuple[int, int]:
+    """按时间范围 / 条数求分页的行号区间 [lo, hi)（有序索引上 searchsorted）。"""
+    lo, hi = 0, len(index)
+
+    def _ts(epoch: str) -> pd.Timestamp:
+        ts = pd.Timestamp(int(epoch), unit="s")
+        return ts.tz_localize("UTC") if getattr(index, "tz", None) is not None else ts
+
+    if to_ts:
+        hi = int(index.searchsorted(_ts(to_ts), side="right"))
+    if after_ts:
+        lo = int(index.searchsorted(_ts(after_ts), side="right"))
+    if count_back:
+        n = int(count_back)
+        if n > 0:
+            lo = max(lo, hi - n)
+    return lo, max(lo, hi)
+
+
+def _page(df: pd.DataFrame, to_ts: str = "", after_ts: str = "", count_back: str = "") -> pd.DataFrame:
+    """按时间范围 / 条数分页（有序索引上 searchsorted 切片，不构造全量布尔掩码）。"""
+    lo, hi = _page_bounds(df.index, to_ts, after_ts, count_back)
+    return df.iloc[lo:hi]
+
+
+def _max_points() -> int | None:
+    """查询参数 max_points（降采样上限）；未提供返回 None，非法值抛出 ValueError。"""
+    raw = request.query.get("max_points", "")
+    if not raw:
+        return None
+    n = int(raw)
+    if n < 1:
+        raise ValueError(f"max_points 必须 ≥ 1: {raw}")
+    return n
+
+
+def _pyramid(cache_name: str, tf: str, base: pd.DataFrame):
+    """返回 level(k)：base 的第 k 级降采样金字塔（按源文件 mtime 缓存）。"""
+    mtime = cache_mtime_ns(cache_name)
+
+    def level(k: int) -> pd.DataFrame:
+        prev = base if k == 1 else level(k - 1)
+        if mtime is None:
+            return pyramid_level(prev)
+        key = (cache_name, f"{tf}/{PYRAMID_FACTOR ** k}", mtime)
+        return _cached_frame(key, lambda: pyramid_level(prev))
+
+    return level
+
+
+def _df_to_records(df: pd.DataFrame, time_mode: str = "str") -> list[dict]:
     """DataFrame -> list of {time, open, high, low, close, volume, ...}。
 
-    统一转 UTC 后去掉时区标记，确保和实时数据时间戳一致。
+    统一转 UTC 后去掉时区标记，确保和实时数据时间戳一致；NaN 字段省略。
     """
-    out = df.copy()
-    if hasattr(out.index, "tz") and out.index.tz is not None:
-        out.index = out.index.tz_convert("UTC").tz_localize(None)
-    records = []
-    for ts, row in out.iterrows():
-        rec = {"time": ts.strftime("%Y-%m-%d %H:%M:%S") if hasattr(ts, "strftime") else str(ts)}
-        for col in row.index:
-            v = row[col]
-            if pd.notna(v):
-                rec[col] = round(float(v), 6)
-        records.append(rec)
+    times = _time_column(df.index, time_mode)
+    cols, row_nan = _value_columns(df)
+    keys = ("time", *cols)
+    records = [dict(zip(keys, row)) for row in zip(times, *cols.values())]
+    for i in np.flatnonzero(row_nan):
+        records[i] = {k: v for k, v in records[i].items() if v is not None}
     return records
 
 
+def _df_to_columns(df: pd.DataFrame, time_mode: str = "str") -> dict[str, list]:
+    """DataFrame -> 列式 {"time": [...], "open": [...], ...}；NaN 为 null。"""
+    cols, _ = _value_columns(df)
+    return {"time": _time_column(df.index, time_mode), **cols}
+
+
+def _iter_json_array(values: list) -> Iterator[str]:
+    """按 _CHUNK_ROWS 分块输出 JSON 数组。"""
+    yield "["
+    for start in range(0, len(values), _CHUNK_ROWS):
+        body = json.dumps(values[start:start + _CHUNK_ROWS], ensure_ascii=False)[1:-1]
+        yield ("," if start else "") + body
+    yield "]"
+
+
+def _iter_data_json(df: pd.DataFrame, fmt: str, time_mode: str, extra: dict) -> Iterator[str]:
+    """分块生成 {"data": ..., **extra} 的 JSON 文本（大结果流式返回）。"""
+    yield '{"data":'
+    if fmt == "columns":
+        for i, (name, values) in enumerate(_df_to_columns(df, time_mode).items()):
+            yield ("{" if i == 0 else ",") + json.dumps(name) + ":"
+            yield from _iter_json_array(values)
+        yield "}"
+    else:
+        yield "["
+        for start in range(0, len(df), _CHUNK_ROWS):
+            chunk = _df_to_records(df.iloc[start:start + _CHUNK_ROWS], time_mode)
+            yield ("," if start else "") + json.dumps(chunk, ensure_ascii=False)[1:-1]
+        yield "]"
+    tail = json.dumps(extra, ensure_ascii=False)[1:-1]
+    yield ("," + tail if tail else "") + "}"
+
+
+def _data_resp(df: pd.DataFrame, **extra):
+    """按查询参数序列化 DataFrame 结果。
+
+    ``format=records``（默认，逐行对象）或 ``columns``（列式数组）；
+    ``time=str``（默认）或 ``epoch``。超过 _STREAM_ROWS 行时分块流式返回。
+    """
+    fmt = request.query.get("format", "records") or "records"
+    time_mode = request.query.get("time", "str") or "str"
+    if fmt not in DATA_FORMATS:
+        return _json_resp({"error": f"unsupported format: {fmt}"}, 400)
+    if time_mode not in TIME_MODES:
+        return _json_resp({"error": f"unsupported time: {time_mode}"}, 400)
+    if fmt == "columns":
+        extra["format"] = "columns"
+    if len(df) > _STREAM_ROWS:
+        response.content_type = "application/json"
+        return _iter_data_json(df, fmt, time_mode, extra)
+    data = _df_to_columns(df, time_mode) if fmt == "columns" else _df_to_records(df, time_mode)
+    return _json_resp({"data": data, **extra})
+
+
 # ------------------------------------------------------------------
 # 静态资源
 # ------------------------------------------------------------------
@@ -125,6 +320,24 @@ def api_timeframes():
     return _json_resp(SUPPORTED_TF)
 
 
+@app.route("/api/metrics/frame_cache")
+def api_frame_cache_metrics():
+    """读盘 / resample 结果缓存的命中率与占用。"""
+    return _json_resp(_frame_cache.metrics())
+
+
+@app.route("/api/metrics/indicator_cache")
+def api_indicator_cache_metrics():
+    """技术指标流式状态缓存的命中 / 增量计算计数。"""
+    return _json_resp(_indicator_cache.metrics())
+
+
+@app.route("/api/metrics/overlay_cache")
+def api_overlay_cache_metrics():
+    """新缠论 overlay 结果缓存的命中 / 增量构建计数。"""
+    return _json_resp(_overlay_cache.metrics())
+
+
 # ------------------------------------------------------------------
 # API: OHLCV 数据
 # ------------------------------------------------------------------
@@ -141,39 +354,42 @@ def api_ohlcv():
     # 纯缓存只读：历史数据由 Databento CLI (fetch-db) 填充，
     # 实时数据由 Databento Live feeder 增量追加到同一缓存
     cache_name = f"{symbol}_{interval}_raw"
-    df = load_df(cache_name)
+    try:
+        resampled = _load_resampled(cache_name, tf)
+    except ValueError as e:
+        return _json_resp({"error": str(e)}, 400)
 
-    if df is None:
+    if resampled is None:
         return _json_resp({"error": f"{symbol} 无缓存数据，请先运行: python -m newchan.cli fetch-db --symbol {symbol}"}, 404)
 
+    # 分页参数（前端按需加载用）
     try:
-        resampled = resample_ohlc(df, tf)
+        max_points = _max_points()
+        lo, hi = _page_bounds(
+            resampled.index,
+            to_ts=request.query.get("to", ""),
+            after_ts=request.query.get("after", ""),
+            count_back=request.query.get("countBack", ""),
+        )
     except ValueError as e:
         return _json_resp({"error": str(e)}, 400)
 
-    # 分页参数（前端按需加载用）
-    to_ts = request.query.get("to", "")
-    after_ts = request.query.get("after", "")
-    count_back = request.query.get("countBack", "")
-
-    filtered = resampled
-    if to_ts:
-        to_dt = pd.Timestamp(int(to_ts), unit="s")
-        filtered = filtered[filtered.index <= to_dt]
-    if after_ts:
-        after_dt = pd.Timestamp(int(after_ts), unit="s")
-        filtered = filtered[filtered.index > after_dt]
-    if count_back:
-        n = int(count_back)
-        filtered = filtered.iloc[-n:]
-
-    return _json_resp({"data": _df_to_records(filtered), "count": len(filtered)})
+    if max_points is None or hi - lo <= max_points:
+        filtered = resampled.iloc[lo:hi]
+        return _data_resp(filtered, count=len(filtered))
+    # 宽范围：包络降采样（优先使用预聚合金字塔）
+    out = downsample_ohlc(resampled, lo, hi, max_points, _pyramid(cache_name, tf, resampled))
+    return _data_resp(out, count=len(out), source_count=hi - lo)
 
 
 # ------------------------------------------------------------------
 # API: 指标数据
 # ------------------------------------------------------------------
 
+# 指标流式状态缓存：key = (缓存名, tf, 指标, 参数)，新 bar 只增量更新（见 indicator_cache）
+_indicator_cache = IndicatorCache(max_entries=INDICATOR_CACHE_ENTRIES)
+
+
 @app.route("/api/indicator")
 def api_indicator():
     symbol = request.query.get("symbol", "").upper()
@@ -186,66 +402,96 @@ def api_indicator():
         return _json_resp({"error": "missing symbol or name"}, 400)
 
     cache_name = f"{symbol}_{interval}_raw"
-    df = load_df(cache_name)
-    if df is None:
+    try:
+        resampled = _load_resampled(cache_name, tf)
+    except ValueError as e:
+        return _json_resp({"error": str(e)}, 400)
+    if resampled is None:
         return _json_resp({"error": f"缓存 {cache_name} 不存在"}, 404)
 
     try:
-        resampled = resample_ohlc(df, tf)
         params = {}
         if params_str:
             for pair in params_str.split(","):
                 k, v = pair.split("=")
                 params[k.strip()] = v.strip()
-        result = compute_indicator(name, resampled, params)
+        result = _indicator_cache.compute((cache_name, tf), name, resampled, params)
+        max_points = _max_points()
     except (ValueError, KeyError) as e:
         return _json_resp({"error": str(e)}, 400)
 
-    return _json_resp({"data": _df_to_records(result)})
+    if max_points is not None and len(result) > max_points:
+        return _data_resp(lttb_frame(result, max_points), source_count=len(result))
+    return _data_resp(result)
 
 
 # ------------------------------------------------------------------
 # API: 拉取数据（异步）
 # ------------------------------------------------------------------
 
-_fetch_status: dict[str, dict] = {}
+# 拉取任务调度：有界线程池 + 每数据源并发上限 + 去重 + 进度 / 取消，历史落盘
+_fetch_jobs = FetchScheduler(
+    workers=FETCH_WORKERS,
+    per_provider=FETCH_PER_PROVIDER,
+    chunk_days=FETCH_CHUNK_DAYS,
+    history_path=Path(CACHE_DIR) / "fetch_jobs.json",
+)
+
+
+def _find_fetch_job(task_id: str):
+    """按任务 id 查找；兼容旧的 "{SYMBOL}_{interval}" 形式（取该品种最近的任务）。"""
+    job = _fetch_jobs.get(task_id)
+    if job is None and "_" in task_id:
+        symbol, interval = task_id.rsplit("_", 1)
+        job = _fetch_jobs.latest(symbol, interval)
+    return job
 
 
 @app.route("/api/fetch", method="POST")
 def api_fetch():
-    """通过 Databento 异步拉取历史数据到缓存。"""
+    """提交 Databento 历史数据拉取任务（排队执行，重复请求合并）。"""
     body = request.json or {}
     symbol = body.get("symbol", "").upper()
     interval = body.get("interval", "1min")
     start = body.get("start", "2020-01-01")
+    end = body.get("end") or None
 
     if not symbol:
         return _json_resp({"error": "missing symbol"}, 400)
 
-    task_id = f"{symbol}_{interval}"
-    if task_id in _fetch_status and _fetch_status[task_id].get("status") == "running":
-        return _json_resp({"status": "running", "task_id": task_id})
+    try:
+        job, deduped = _fetch_jobs.submit(symbol, interval, start=start, end=end)
+    except ValueError as e:
+        return _json_resp({"error": str(e)}, 400)
+    return _json_resp({
+        "status": job.status, "task_id": job.job_id, "deduped": deduped, "job": job.to_dict(),
+    })
+
 
-    _fetch_status[task_id] = {"status": "running", "symbol": symbol, "interval": interval}
+@app.route("/api/fetch/status")
+def api_fetch_status():
+    job = _find_fetch_job(request.query.get("task_id", ""))
+    if job is None:
+        return _json_resp({"status": "unknown"})
+    return _json_resp(job.to_dict())
 
-    def _do_fetch():
-        try:
-            from newchan.data_databento import fetch_and_cache
-            cache_name, count = fetch_and_cache(symbol, interval, start=start)
-            _fetch_status[task_id] = {"status": "done", "count": count}
-        except Exception as e:
-            _fetch_status[task_id] = {"status": "error", "error": str(e)}
-            traceback.print_exc()
 
-    threading.Thread(target=_do_fetch, daemon=True).start()
-    return _json_resp({"status": "running", "task_id": task_id})
+@app.route("/api/fetch/cancel", method="POST")
+def api_fetch_cancel():
+    body = request.json or {}
+    job = _fetch_jobs.cancel(body.get("task_id", ""))
+    if job is None:
+        return _json_resp({"error": "unknown task_id"}, 404)
+    return _json_resp(job.to_dict())
 
 
-@app.route("/api/fetch/status")
-def api_fetch_status():
-    task_id = request.query.get("task_id", "")
-    info = _fetch_status.get(task_id, {"status": "unknown"})
-    return _json_resp(info)
+@app.route("/api/fetch/jobs")
+def api_fetch_jobs():
+    """全部拉取任务（最新在前）与调度器指标。"""
+    return _json_resp({
+        "jobs": [job.to_dict() for job in _fetch_jobs.jobs()],
+        "metrics": _fetch_jobs.metrics(),
+    })
 
 
 # ------------------------------------------------------------------
@@ -325,6 +571,21 @@ def api_connect():
 # API: 品种搜索（纯缓存 + Databento 已知品种）
 # ------------------------------------------------------------------
 
+# 已缓存品种的搜索索引：缓存目录 mtime 不变（无文件增删）时复用，
+# 避免每次按键都 glob + 正则扫描目录。
+_cached_index: tuple[int, SymbolIndex] | None = None
+
+
+def _cached_symbol_index() -> SymbolIndex:
+    global _cached_index
+    version = cache_dir_version()
+    current = _cached_index
+    if current is None or current[0] != version:
+        current = (version, SymbolIndex(list_cached(), fields=("symbol",)))
+        _cached_index = current
+    return current[1]
+
+
 @app.route("/api/search")
 def api_search():
     q = request.query.get("q", "").strip()
@@ -335,26 +596,21 @@ def api_search():
     seen = set()
 
     # 1. 已缓存品种（优先显示）
-    cached = list_cached()
-    q_upper = q.upper()
-    for item in cached:
-        if q_upper in item["symbol"].upper():
-            sym = item["symbol"]
-            if sym not in seen:
-                results.append({
-                    "symbol": sym,
-                    "secType": "CACHED",
-                    "exchange": "",
-                    "currency": "USD",
-                    "description": f"已缓存 ({item['interval']})",
-                    "source": "cache",
-                })
-                seen.add(sym)
+    for item in _cached_symbol_index().search(q):
+        sym = item["symbol"]
+        if sym not in seen:
+            results.append({
+                "symbol": sym,
+                "secType": "CACHED",
+                "exchange": "",
+                "currency": "USD",
+                "description": f"已缓存 ({item['interval']})",
+                "source": "cache",
+            })
+            seen.add(sym)
 
     # 2. Databento 品种目录搜索（支持中英文、交易所名模糊匹配）
-    from newchan.data_databento import search_symbols
-    db_results = search_symbols(q)
-    for item in db_results:
+    for item in catalog_index().search(q):
         sym = item["symbol"]
         if sym not in seen:
             results.append({
@@ -395,15 +651,78 @@ def api_unsubscribe():
 
 @app.route("/api/realtime")
 def api_realtime():
-    # Databento Live bar 直接写入缓存，前端通过 60s 定时 loadData 自动获取
-    # 这个接口保留为空操作，避免前端轮询报错
-    return _json_resp({"bars": [], "next_since": 0})
+    """Live feeder 内存尾部中 since 序号之后的 1 分钟 bar（推送通道的轮询版）。"""
+    symbol = request.query.get("symbol", "").upper()
+    raw_since = request.query.get("since", "")
+    since = int(raw_since) if raw_since.isdigit() else 0
+    tail = _live_tail
+    if not symbol:
+        return _json_resp({"bars": [], "next_since": tail.seq})
+    items = tail.since(symbol, since)
+    return _json_resp({
+        "bars": [_live_bar_json(bar) for _seq, bar in items],
+        "next_since": items[-1][0] if items else max(since, 0),
+    })
 
 
 # ------------------------------------------------------------------
 # API: 新缠论 overlay（A→B 桥接）
 # ------------------------------------------------------------------
 
+# overlay 结果缓存：key = (缓存名, tf, 参数, limit)，版本 = 源文件 mtime。
+# 新 bar 到达后带着上次的中间状态增量重建（见 overlay_cache）。
+_overlay_cache = OverlayCache(max_entries=OVERLAY_CACHE_ENTRIES)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 是否命中 etag（弱校验比较，忽略 W/ 前缀）。"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _overlay_delta_resp(result: dict, version: str, base_version: str, delta) -> dict:
+    """overlay 增量响应：相对 base_version 新增 / 修改的结构与被删除结构的标识。"""
+    changed, removed = delta
+    return {
+        "schema_version": result["schema_version"],
+        "symbol": result["symbol"], "tf": result["tf"], "detail": result["detail"],
+        "lstar": result["lstar"],
+        "macd": {k: result["macd"][k] for k in ("fast", "slow", "signal")},
+        "version": version,
+        "base_version": base_version,
+        "delta": True,
+        "changed": changed,
+        "removed": removed,
+    }
+
+
+def _overlay_viewport_params() -> dict | None:
+    """视口 / 细节层级查询参数（from、to、zoom、max_items、max_points）。
+
+    均未提供时返回 None（下发完整结果）；zoom 省略或为 auto 时自动选择层级。
+    非法值抛出 ValueError。
+    """
+    q = request.query
+    t_from, t_to = q.get("from", ""), q.get("to", "")
+    zoom, max_items = q.get("zoom", ""), q.get("max_items", "")
+    max_points = _max_points()
+    if not (t_from or t_to or zoom or max_items or max_points):
+        return None
+    items = int(max_items) if max_items else OVERLAY_LOD_MAX_ITEMS
+    if items < 1:
+        raise ValueError(f"max_items 必须 ≥ 1: {max_items}")
+    return {
+        "t_from": int(t_from) if t_from else None,
+        "t_to": int(t_to) if t_to else None,
+        "zoom": int(zoom) if zoom and zoom != "auto" else None,
+        "max_items": items,
+        "max_points": max_points,
+    }
+
+
 @app.route("/api/newchan/overlay")
 def api_newchan_overlay():
     symbol = request.query.get("symbol", "").upper()
@@ -415,28 +734,48 @@ def api_newchan_overlay():
     min_strict_sep = int(request.query.get("min_strict_sep", "5"))
     center_sustain_m = int(request.query.get("center_sustain_m", "2"))
     limit = request.query.get("limit", "")
+    # 客户端已持有的版本：未变化时只回 unchanged
+    client_version = request.query.get("version", "")
+    # 客户端已持有的版本：仍在保留范围内时只回增量
+    since_version = request.query.get("since_version", "")
 
     if not symbol:
         return _json_resp({"error": "missing symbol"}, 400)
+    # 视口请求：从缓存的完整结果中裁出视口内、与缩放相称层级的结构（不走增量）
+    try:
+        viewport = _overlay_viewport_params()
+    except ValueError as e:
+        return _json_resp({"error": str(e)}, 400)
 
     cache_name = f"{symbol}_{interval}_raw"
-    df = load_df(cache_name)
-    if df is None:
-        return _json_resp({"error": f"缓存 {cache_name} 不存在"}, 404)
+    mtime = cache_mtime_ns(cache_name)
+    version = source_version(mtime) if mtime is not None else None
+    if version is not None:
+        etag = f'"{version}"'
+        response.set_header("ETag", etag)
+        response.set_header("Cache-Control", "no-cache")
+        if _etag_matches(request.headers.get("If-None-Match", ""), etag):
+            response.status = 304
+            return ""
+        if client_version == version and viewport is None:
+            return _json_resp({"version": version, "unchanged": True})
 
     try:
-        resampled = resample_ohlc(df, tf)
+        resampled = _load_resampled(cache_name, tf)
     except ValueError as e:
         return _json_resp({"error": str(e)}, 400)
+    if resampled is None:
+        return _json_resp({"error": f"缓存 {cache_name} 不存在"}, 404)
 
     if limit:
         n = int(limit)
         if n > 0:
             resampled = resampled.iloc[-n:]
 
-    try:
-        from newchan.ab_bridge_newchan import build_overlay_newchan
-        result = build_overlay_newchan(
+    from newchan.ab_bridge_newchan import build_overlay_newchan
+
+    def build(state=None):
+        return build_overlay_newchan(
             resampled,
             symbol=symbol,
             tf=tf,
@@ -445,13 +784,28 @@ def api_newchan_overlay():
             stroke_mode=stroke_mode,
             min_strict_sep=min_strict_sep,
             center_sustain_m=center_sustain_m,
+            state=state,
         )
+
+    try:
+        if version is None:
+            # 无版本可依：不缓存
+            result = build()
+        else:
+            params = (detail, segment_algo, stroke_mode, min_strict_sep, center_sustain_m)
+            key = (cache_name, tf, params, limit)
+            result = _overlay_cache.get_or_build(key, version, build)
+            delta = _overlay_cache.delta(key, since_version, version) if viewport is None else None
+            if delta is not None:
+                return _json_resp(_overlay_delta_resp(result, version, since_version, delta))
     except Exception as e:
         import traceback
         traceback.print_exc()
         return _json_resp({"error": str(e)}, 500)
 
-    return _json_resp(result)
+    if viewport is not None:
+        result = overlay_viewport(result, **viewport)
+    return _json_resp({**result, "version": version})
 
 
 # ------------------------------------------------------------------
@@ -463,16 +817,110 @@ def api_newchan_overlay():
 # ------------------------------------------------------------------
 
 _live_feeder = None
+# Live feeder 发布的实时 bar 尾部（不依赖 databento，feeder 未启动时推送通道只发心跳）
+_live_tail = LiveTail()
 
 
 def _get_live_feeder():
     global _live_feeder
     if _live_feeder is None:
         from newchan.data_databento_live import DatabentoLiveFeeder
-        _live_feeder = DatabentoLiveFeeder()
+        _live_feeder = DatabentoLiveFeeder(tail=_live_tail)
     return _live_feeder
 
 
+# 推送通道无新 bar 时的心跳间隔（秒），用于保活并及时发现断开的连接
+_SSE_HEARTBEAT_S = 15.0
+
+
+def _live_bar_json(bar: dict) -> dict:
+    """LiveBar → 与 /api/ohlcv records 相同的 bar 格式。"""
+    return {
+        "time": bar["ts"].strftime(_TIME_FMT),
+        "open": round(bar["open"], 6), "high": round(bar["high"], 6),
+        "low": round(bar["low"], 6), "close": round(bar["close"], 6),
+        "volume": round(bar["volume"], 6),
+    }
+
+
+def _sse(event: str, data, event_id: int | None = None) -> str:
+    """一条 Server-Sent Events 消息。"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _live_seed(cache_name: str, tf: str):
+    """显示周期当前 bar 的种子：(resample 结果最后一根, 已计入的最后一根 1 分钟 bar 时间)。"""
+    try:
+        raw = _load_resampled(cache_name, "1m")
+        frame = raw if tf == "1m" else _load_resampled(cache_name, tf)
+    except ValueError:
+        return None, None
+    if raw is None or frame is None or frame.empty:
+        return None, None
+    last = frame.iloc[-1]
+    seed = make_live_bar(
+        frame.index[-1], last["open"], last["high"], last["low"], last["close"],
+        last["volume"] if "volume" in frame.columns and pd.notna(last["volume"]) else None,
+    )
+    return seed, raw.index[-1]
+
+
+@app.route("/api/live/stream")
+def api_live_stream():
+    """实时 bar 推送（SSE）。
+
+    连接时先发当前 bar（event: bar，来自已落盘数据），此后 Live feeder 每收到
+    一根 1 分钟 bar 即推送聚合到 tf 的当前 bar（新窗口 event: bar，窗口内更新
+    event: update，id 为 LiveTail 序号），并在源文件版本变化时发送
+    event: overlay（{"version"}，客户端据此按 since_version 拉取 overlay 增量）。
+    断线重连（Last-Event-ID / ?after=）从内存尾部补发。
+    """
+    symbol = request.query.get("symbol", "").upper()
+    interval = request.query.get("interval", "1min")
+    tf = request.query.get("tf", "1m")
+    if not symbol:
+        return _json_resp({"error": "missing symbol"}, 400)
+    if tf not in SUPPORTED_TF:
+        return _json_resp({"error": f"不支持的 tf: {tf}"}, 400)
+
+    tail = _live_tail
+    last_id = request.headers.get("Last-Event-ID") or request.query.get("after", "")
+    after = int(last_id) if last_id.isdigit() else tail.seq
+    cache_name = f"{symbol}_{interval}_raw"
+    seed, seed_last_ts = _live_seed(cache_name, tf)
+    agg = LiveBarAggregator(tf, seed=seed, seed_last_ts=seed_last_ts)
+
+    response.content_type = "text/event-stream"
+    response.set_header("Cache-Control", "no-cache")
+    response.set_header("X-Accel-Buffering", "no")
+
+    def stream():
+        nonlocal after
+        sent_version = None
+        yield "retry: 3000\n\n"
+        if seed is not None:
+            yield _sse("bar", _live_bar_json(seed))
+        while True:
+            items = tail.wait(symbol, after, timeout=_SSE_HEARTBEAT_S)
+            if not items:
+                yield ": ping\n\n"
+                continue
+            for seq, bar in items:
+                after = seq
+                out = agg.push(bar)
+                if out is not None:
+                    kind, current = out
+                    yield _sse(kind, _live_bar_json(current), seq)
+            mtime = cache_mtime_ns(cache_name)
+            version = source_version(mtime) if mtime is not None else None
+            if version is not None and version != sent_version:
+                sent_version = version
+                yield _sse("overlay", {"version": version}, after)
+
+    return stream()
+
+
 @app.route("/api/live/status")
 def api_live_status():
     feeder = _get_live_feeder()
@@ -509,6 +957,10 @@ def run_server(port: int = 8765, open_browser: bool = True) -> None:
     print(f"NewChan 图表服务启动: http://localhost:{port}", flush=True)
     print("按 Ctrl+C 停止。", flush=True)
 
+    # 预建品种搜索索引，首个搜索请求无需等待
+    catalog_index()
+    _cached_symbol_index()
+
     # 启动 Databento Live 实时数据（非阻塞，后台线程）
     feeder = _get_live_feeder()
     try:
@@ -0,0 +1,247 @@
+"""SessionExecutor — 网关引擎调用的离线程执行器
+
+引擎状态（ReplaySession / TFOrchestrator）非线程安全，且单次 seek
+可能重跑上万根 bar。所有引擎调用经本执行器派发：
+
+- 计算在线程池中执行，事件循环只负责排队与 I/O；
+- 每个会话一个串行队列（FIFO 的 ``asyncio.Lock``），同会话调用严格按
+  提交顺序执行，不同会话互不阻塞；
+- 可取消操作（``run_latest``）：同会话同类操作只保留最新一次，新提交
+  会置位旧操作的取消令牌。仍在排队的旧操作直接放弃，已在执行的由
+  被调函数在循环中检查令牌后自行中止（如 ``ReplaySession.seek``）；
+- 每次调用分别记录排队等待时间与计算时间，按操作类型汇总。
+
+调用方被取消（如 HTTP 客户端断开）时已开始的计算不会被打断，
+会话队列在计算真正结束后才放行下一项，避免并发修改引擎状态。
+会话删除（``drop_session``）时若仍有调用在执行或排队，队列在最后
+一个持有者 / 等待者离开时才释放。
+
+只提供线程池：引擎状态常驻网关进程，进程池需要往返搬运整套引擎。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Callable
+
+
+@dataclass
+class OpStats:
+    """单类操作的计数与耗时。"""
+
+    count: int = 0
+    cancelled: int = 0
+    failed: int = 0
+    queue_wait_ms_total: float = 0.0
+    compute_ms_total: float = 0.0
+    max_queue_wait_ms: float = 0.0
+    max_compute_ms: float = 0.0
+    last_queue_wait_ms: float = 0.0
+    last_compute_ms: float = 0.0
+
+    def record_wait(self, wait_ms: float) -> None:
+        self.queue_wait_ms_total += wait_ms
+        self.last_queue_wait_ms = wait_ms
+        self.max_queue_wait_ms = max(self.max_queue_wait_ms, wait_ms)
+
+    def record_compute(self, compute_ms: float) -> None:
+        self.count += 1
+        self.compute_ms_total += compute_ms
+        self.last_compute_ms = compute_ms
+        self.max_compute_ms = max(self.max_compute_ms, compute_ms)
+
+    def snapshot(self) -> dict:
+        """导出当前指标快照。"""
+        n = self.count
+        return {
+            "count": n,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "queue_wait_ms_avg": round(self.queue_wait_ms_total / n, 3) if n else 0.0,
+            "queue_wait_ms_max": round(self.max_queue_wait_ms, 3),
+            "queue_wait_ms_last": round(self.last_queue_wait_ms, 3),
+            "compute_ms_avg": round(self.compute_ms_total / n, 3) if n else 0.0,
+            "compute_ms_max": round(self.max_compute_ms, 3),
+            "compute_ms_last": round(self.last_compute_ms, 3),
+        }
+
+
+class OperationSuperseded(Exception):
+    """排队中的可取消操作被同会话的更新提交取代，未执行。"""
+
+
+class SessionExecutor:
+    """按会话串行、跨会话并行的引擎调用执行器。
+
+    Parameters
+    ----------
+    max_workers : int | None
+        线程池大小（None = ThreadPoolExecutor 默认值）。
+
+    Usage::
+
+        executor = SessionExecutor()
+        snaps = await executor.run(sid, session.step, 1, kind="step")
+        snap = await executor.run_latest(sid, "seek", session.seek, 5000)
+        executor.metrics()
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="engine")
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._queued: dict[str, int] = {}
+        self._tokens: dict[tuple[str, str], threading.Event] = {}
+        self._stats: dict[str, OpStats] = {}
+        # 已删除但仍有调用在执行 / 排队的会话（空闲后释放队列）
+        self._dropped: set[str] = set()
+
+    def _stats_for(self, kind: str) -> OpStats:
+        stats = self._stats.get(kind)
+        if stats is None:
+            stats = self._stats[kind] = OpStats()
+        return stats
+
+    # ------------------------------------------------------------------
+    # 执行
+    # ------------------------------------------------------------------
+
+    async def run(
+        self,
+        session_id: str,
+        fn: Callable,
+        *args: Any,
+        kind: str = "call",
+        token: threading.Event | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """在线程池中执行 ``fn(*args, **kwargs)``，同会话严格串行。
+
+        ``token`` 在排队期间被置位时不执行，抛出 ``OperationSuperseded``。
+        """
+        stats = self._stats_for(kind)
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        t_submit = perf_counter()
+        self._queued[session_id] = self._queued.get(session_id, 0) + 1
+        try:
+            await lock.acquire()
+        finally:
+            self._queued[session_id] -= 1
+            if not lock.locked():
+                # 排队期间被取消：可能是已删除会话的最后一个等待者
+                self._release_if_idle(session_id)
+        stats.record_wait((perf_counter() - t_submit) * 1000)
+
+        if token is not None and token.is_set():
+            self._unlock(session_id, lock)
+            stats.cancelled += 1
+            raise OperationSuperseded(kind)
+
+        def timed() -> Any:
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stats.record_compute((perf_counter() - t0) * 1000)
+
+        def done(fut: asyncio.Future) -> None:
+            self._unlock(session_id, lock)
+            if fut.cancelled() or fut.exception() is not None:
+                if token is not None and token.is_set():
+                    stats.cancelled += 1
+                else:
+                    stats.failed += 1
+
+        try:
+            fut = asyncio.get_running_loop().run_in_executor(self._pool, timed)
+        except BaseException:
+            self._unlock(session_id, lock)
+            raise
+        fut.add_done_callback(done)
+        return await asyncio.shield(fut)
+
+    async def run_latest(
+        self,
+        session_id: str,
+        kind: str,
+        fn: Callable,
+        *args: Any,
+    ) -> Any:
+        """执行可取消操作：同会话同 kind 的旧操作被取消，只保留本次。
+
+        ``fn`` 以关键字参数 ``cancel=threading.Event`` 调用，应在长循环中
+        检查 ``cancel.is_set()`` 并自行中止。
+        """
+        key = (session_id, kind)
+        previous = self._tokens.get(key)
+        if previous is not None:
+            previous.set()
+        token = threading.Event()
+        self._tokens[key] = token
+        try:
+            return await self.run(session_id, fn, *args, kind=kind, token=token, cancel=token)
+        finally:
+            if self._tokens.get(key) is token:
+                del self._tokens[key]
+
+    def cancel(self, session_id: str, kind: str | None = None) -> int:
+        """取消会话在途的可取消操作，返回置位的令牌数。"""
+        n = 0
+        for (sid, k), token in list(self._tokens.items()):
+            if sid == session_id and (kind is None or k == kind):
+                token.set()
+                n += 1
+        return n
+
+    def drop_session(self, session_id: str) -> None:
+        """取消会话在途操作并释放其队列（会话删除时调用）。
+
+        仍有调用在执行或排队时只做标记，最后一个离开时释放；
+        否则新提交的调用会拿到另一把锁，与尚未唤醒的等待者并发执行。
+        """
+        self.cancel(session_id)
+        if session_id in self._locks or session_id in self._queued:
+            self._dropped.add(session_id)
+            self._release_if_idle(session_id)
+
+    def _unlock(self, session_id: str, lock: asyncio.Lock) -> None:
+        lock.release()
+        self._release_if_idle(session_id)
+
+    def _release_if_idle(self, session_id: str) -> None:
+        """已删除的会话没有持有者与等待者时释放其队列。"""
+        if session_id not in self._dropped or self._queued.get(session_id):
+            return
+        lock = self._locks.get(session_id)
+        if lock is not None and lock.locked():
+            return
+        self._locks.pop(session_id, None)
+        self._queued.pop(session_id, None)
+        self._dropped.discard(session_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def busy(self, session_id: str) -> bool:
+        """会话是否有调用正在执行或排队。"""
+        lock = self._locks.get(session_id)
+        return bool(self._queued.get(session_id)) or (lock is not None and lock.locked())
+
+    def queue_depth(self, session_id: str) -> int:
+        """会话当前排队（未开始执行）的调用数。"""
+        return self._queued.get(session_id, 0)
+
+    def metrics(self) -> dict:
+        """按操作类型汇总的排队 / 计算耗时，以及各会话排队深度。"""
+        return {
+            "ops": {kind: s.snapshot() for kind, s in sorted(self._stats.items())},
+            "queued": {sid: n for sid, n in self._queued.items() if n},
+            "busy_sessions": sum(1 for lock in self._locks.values() if lock.locked()),
+        }
@@ -0,0 +1,350 @@
+"""回放会话生命周期：TTL / 空闲淘汰、内存预算与落盘
+
+网关的会话（ReplaySession / TFOrchestrator）持有完整 bar 序列与逐 bar
+快照日志，被遗弃后会一直占用内存。``SessionLifecycle`` 只维护元数据与
+淘汰策略，会话对象本身仍由网关持有：
+
+- ``ttl_s``：超过该时长未被访问（REST / WS 命令）即淘汰，不论是否仍有连接；
+- ``idle_s``：没有 WS 客户端、没有播放任务且超过该时长未访问即淘汰；
+  最后一个客户端断开时刷新访问时间，从断开时刻开始计空闲；
+- ``budget_bytes``：全部在线会话估算内存超出预算时，按最久未访问（LRU）
+  淘汰空闲会话，不足时再淘汰有客户端的会话；正在播放的会话不淘汰；
+- ``spill_dir``：设置后淘汰的会话 pickle 落盘，再次访问时原样恢复
+  （步进位置、引擎状态、快照日志均保留）；落盘文件超过 ttl_s 未访问即删除。
+
+内存为估算值（bar 数与快照日志长度 × 经验单价），用于相对排序与预算控制；
+只在快照日志长度变化时重新估算（见 ``size_key``）。
+
+落盘 / 恢复分为元数据步骤（``spill_target`` / ``mark_spilled``、
+``take_spill`` / ``mark_restored``，在事件循环中调用）与 pickle 读写
+（``write_state`` / ``read_state``，不触碰元数据，可放到工作线程执行）；
+``spill`` / ``restore`` 是二者的同步组合。
+"""
+
+from __future__ import annotations
+
+import logging
+import pickle
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# 估算单价（CPython 3.11 实测量级）：Bar(slots) + datetime + 5 个 float
+_BAR_BYTES = 200
+# BiEngineSnapshot 自身 + 每个 stroke 引用对象 + 每个事件
+_SNAP_BYTES = 600
+_STROKE_BYTES = 112
+_EVENT_BYTES = 160
+
+
+def _log_bytes(bars: list, log: list) -> int:
+    n = len(bars) * _BAR_BYTES
+    for snap in log:
+        n += _SNAP_BYTES + len(snap.strokes) * _STROKE_BYTES + len(snap.events) * _EVENT_BYTES
+    return n
+
+
+def _replay_bytes(session: Any) -> int:
+    """单个 ReplaySession 的估算内存。
+
+    共享时间线上的会话（SharedReplaySession）只计引用列表，
+    时间线本身按引用数均摊，在线会话合计即为实际占用；快进后持有私有引擎时
+    另计私有引擎的 bar 副本与快照。
+    """
+    timeline = getattr(session, "timeline", None)
+    if timeline is not None:
+        shared = _log_bytes(timeline.bars, timeline.log) // max(timeline.refs, 1)
+        if session.engine is not None:
+            return shared + _log_bytes(session.bars, session.event_log)
+        return shared + len(session.event_log) * 8
+    return _log_bytes(session.bars, session.event_log)
+
+
+def _replay_key(session: Any) -> tuple:
+    timeline = getattr(session, "timeline", None)
+    if timeline is not None:
+        return (len(session.event_log), session.engine is not None, len(timeline.log), timeline.refs)
+    return (len(session.event_log),)
+
+
+def size_key(state: Any) -> tuple:
+    """决定估算内存的日志长度摘要（O(TF 数)，不遍历日志）。"""
+    sessions = getattr(state, "sessions", None)
+    if isinstance(sessions, dict):
+        return tuple(_replay_key(s) for s in sessions.values())
+    return _replay_key(state)
+
+
+def estimate_session_bytes(state: Any) -> int:
+    """ReplaySession 或 TFOrchestrator（含全部 TF 会话）的估算内存。"""
+    sessions = getattr(state, "sessions", None)
+    if isinstance(sessions, dict):
+        return sum(_replay_bytes(s) for s in sessions.values())
+    return _replay_bytes(state)
+
+
+@dataclass
+class SessionMeta:
+    """单个会话的生命周期元数据。"""
+
+    session_id: str
+    symbol: str = ""
+    tf: str = ""
+    created_at: float = 0.0  # epoch 秒
+    last_access: float = 0.0  # 单调时钟
+    nbytes: int = 0
+    size_key: tuple = ()
+    spill_path: Path | None = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.spill_path is not None
+
+
+class SessionLifecycle:
+    """会话淘汰策略与落盘。
+
+    Parameters
+    ----------
+    ttl_s : float
+        最长未访问时长（秒）。
+    idle_s : float
+        无客户端、未播放状态下的最长未访问时长（秒）。
+    budget_bytes : int
+        在线会话估算内存上限；0 = 不限。
+    spill_dir : Path | str | None
+        淘汰会话的落盘目录；None = 淘汰即丢弃。
+    clock : callable
+        单调时钟（测试可注入）。
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = 6 * 3600,
+        idle_s: float = 15 * 60,
+        budget_bytes: int = 0,
+        spill_dir: Path | str | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.idle_s = idle_s
+        self.budget_bytes = budget_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self._clock = clock
+        self._meta: dict[str, SessionMeta] = {}
+        self.evictions: dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # 元数据
+    # ------------------------------------------------------------------
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._meta
+
+    def register(self, session_id: str, state: Any = None, *, symbol: str = "", tf: str = "") -> None:
+        """登记新会话。"""
+        self._meta[session_id] = SessionMeta(
+            session_id=session_id,
+            symbol=symbol,
+            tf=tf,
+            created_at=time.time(),
+            last_access=self._clock(),
+            nbytes=estimate_session_bytes(state) if state is not None else 0,
+            size_key=size_key(state) if state is not None else (),
+        )
+
+    def touch(self, session_id: str) -> None:
+        """刷新访问时间。"""
+        meta = self._meta.get(session_id)
+        if meta is not None:
+            meta.last_access = self._clock()
+
+    def update_size(self, session_id: str, state: Any) -> None:
+        """日志长度变化时重新估算内存；未变化时保留上次估算。"""
+        meta = self._meta.get(session_id)
+        if meta is None:
+            return
+        key = size_key(state)
+        if key != meta.size_key:
+            meta.nbytes = estimate_session_bytes(state)
+            meta.size_key = key
+
+    def is_spilled(self, session_id: str) -> bool:
+        meta = self._meta.get(session_id)
+        return meta is not None and meta.spilled
+
+    def forget(self, session_id: str) -> None:
+        """删除会话元数据与落盘文件。"""
+        meta = self._meta.pop(session_id, None)
+        if meta is not None and meta.spill_path is not None:
+            meta.spill_path.unlink(missing_ok=True)
+
+    @property
+    def live_bytes(self) -> int:
+        return sum(m.nbytes for m in self._meta.values() if not m.spilled)
+
+    # ------------------------------------------------------------------
+    # 淘汰策略
+    # ------------------------------------------------------------------
+
+    def select_evictions(
+        self,
+        *,
+        busy: Callable[[str], bool],
+        has_clients: Callable[[str], bool],
+    ) -> list[tuple[str, str]]:
+        """选出应淘汰的在线会话，返回 [(session_id, reason)]。
+
+        ``busy(sid)`` 为真（正在播放 / 计算）的会话不淘汰。
+        """
+        now = self._clock()
+        chosen: list[tuple[str, str]] = []
+        picked: set[str] = set()
+        live = [m for m in self._meta.values() if not m.spilled and not busy(m.session_id)]
+
+        for m in live:
+            age = now - m.last_access
+            if age > self.ttl_s:
+                chosen.append((m.session_id, "ttl"))
+            elif age > self.idle_s and not has_clients(m.session_id):
+                chosen.append((m.session_id, "idle"))
+            else:
+                continue
+            picked.add(m.session_id)
+
+        if self.budget_bytes:
+            total = self.live_bytes - sum(self._meta[s].nbytes for s in picked)
+            # 先淘汰无客户端的，再按 LRU
+            order = sorted(
+                (m for m in live if m.session_id not in picked),
+                key=lambda m: (has_clients(m.session_id), m.last_access),
+            )
+            for m in order:
+                if total <= self.budget_bytes:
+                    break
+                chosen.append((m.session_id, "budget"))
+                total -= m.nbytes
+        return chosen
+
+    def record_eviction(self, reason: str) -> None:
+        self.evictions[reason] = self.evictions.get(reason, 0) + 1
+
+    def expired_spills(self) -> list[str]:
+        """落盘后超过 ttl_s 未访问的会话。"""
+        now = self._clock()
+        return [
+            m.session_id for m in self._meta.values()
+            if m.spilled and now - m.last_access > self.ttl_s
+        ]
+
+    # ------------------------------------------------------------------
+    # 落盘 / 恢复
+    # ------------------------------------------------------------------
+
+    def spill(self, session_id: str, state: Any) -> bool:
+        """把会话状态落盘；未配置 spill_dir 或写入失败时返回 False。"""
+        path = self.spill_target(session_id)
+        if path is None or not write_state(path, state):
+            return False
+        return self.mark_spilled(session_id, path)
+
+    def restore(self, session_id: str) -> Any | None:
+        """读回落盘会话并删除文件；无落盘或读取失败返回 None。"""
+        path = self.take_spill(session_id)
+        if path is None:
+            return None
+        return self.mark_restored(session_id, read_state(path))
+
+    def spill_target(self, session_id: str) -> Path | None:
+        """会话的落盘文件路径；未登记或未配置 spill_dir 时返回 None。"""
+        if session_id not in self._meta or self.spill_dir is None:
+            return None
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        return self.spill_dir / f"{session_id}.pkl"
+
+    def mark_spilled(self, session_id: str, path: Path) -> bool:
+        """记录 write_state 已写好的落盘文件；会话在写入期间被删除时丢弃文件。"""
+        meta = self._meta.get(session_id)
+        if meta is None:
+            path.unlink(missing_ok=True)
+            return False
+        meta.spill_path = path
+        return True
+
+    def take_spill(self, session_id: str) -> Path | None:
+        """取出待恢复的落盘文件路径（此后会话不再处于落盘状态）。"""
+        meta = self._meta.get(session_id)
+        if meta is None or meta.spill_path is None:
+            return None
+        path, meta.spill_path = meta.spill_path, None
+        return path
+
+    def mark_restored(self, session_id: str, state: Any | None) -> Any | None:
+        """记录 read_state 的结果：成功则刷新访问时间，失败则删除元数据。"""
+        if state is None:
+            self._meta.pop(session_id, None)
+            return None
+        meta = self._meta.get(session_id)
+        if meta is not None:
+            meta.last_access = self._clock()
+        return state
+
+    # ------------------------------------------------------------------
+    # 管理视图
+    # ------------------------------------------------------------------
+
+    def listing(self, has_clients: Callable[[str], int] | None = None) -> dict:
+        """全部会话及其内存占用（管理端点用）。"""
+        now = self._clock()
+        sessions = []
+        for m in sorted(self._meta.values(), key=lambda m: m.last_access, reverse=True):
+            sessions.append({
+                "session_id": m.session_id,
+                "symbol": m.symbol,
+                "tf": m.tf,
+                "state": "spilled" if m.spilled else "live",
+                "est_bytes": m.nbytes,
+                "idle_s": round(now - m.last_access, 1),
+                "created_at": m.created_at,
+                "clients": has_clients(m.session_id) if has_clients else 0,
+            })
+        return {
+            "sessions": sessions,
+            "live_bytes": self.live_bytes,
+            "budget_bytes": self.budget_bytes,
+            "ttl_s": self.ttl_s,
+            "idle_s": self.idle_s,
+            "evictions": dict(self.evictions),
+        }
+
+
+# ── pickle 读写（不触碰元数据，可在工作线程执行）──────────────
+
+
+def write_state(path: Path, state: Any) -> bool:
+    """原子写入会话状态（先写临时文件再替换）；失败返回 False。"""
+    tmp = path.with_suffix(".tmp")
+    try:
+        with tmp.open("wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+    except Exception:
+        logger.exception("会话落盘失败: %s", path)
+        tmp.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def read_state(path: Path) -> Any | None:
+    """读回会话状态并删除文件；失败返回 None。"""
+    try:
+        with path.open("rb") as f:
+            return pickle.load(f)
+    except Exception:
+        logger.exception("会话恢复失败: %s", path)
+        return None
+    finally:
+        path.unlink(missing_ok=True)
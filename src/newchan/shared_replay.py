@@ -0,0 +1,330 @@
+"""共享回放计算 — 相同数据 + 参数的会话共用一条引擎时间线
+
+多人同时回放同一品种 / 周期 / 笔参数时，各自的 BiEngine 会把同一段
+bar 重复算一遍。按内容寻址共享：
+
+- ``SharedTimeline``：一组 bar + 引擎参数对应的唯一计算结果。引擎只向前
+  推进，逐 bar 快照追加到只增不改的 ``log``；任何会话需要更远的位置时
+  才继续计算（加锁，分块推进以便响应取消）。
+- ``SharedReplaySession``：ReplaySession 的共享版本，只持有自己的游标
+  （``current_idx`` / mode / speed）与对共享快照的引用列表。已被任一会话
+  算过的位置，step / seek 只是切片引用，近乎零成本。快照对象只读，
+  会话之间从不修改共享状态（写时复制退化为"从不写"）。
+- ``TimelineRegistry``：按 (bar 内容摘要, bar 数, 笔参数) 查找或创建
+  时间线，引用计数；无人引用的时间线按 LRU 保留少量以便随后复用。
+
+会话落盘时不序列化时间线，只保存 bar 与游标；恢复时重新挂接
+（时间线仍在则直接复用，否则重新计算到游标处）。
+
+批量快进（``fast_forward``）越过时间线已计算的范围时，会话不逐 bar 推进
+时间线，而是改用私有引擎一次性算到目标处（写时复制），此后 step 由私有
+引擎继续；再次 seek 时丢弃私有引擎、回到共享时间线。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Hashable
+
+from newchan.bi_differ import diff_strokes
+from newchan.bi_engine import BiEngine, BiEngineSnapshot
+from newchan.replay import ReplaySession, SeekCancelled
+from newchan.types import Bar
+
+# 每次持锁推进的 bar 数（兼顾锁竞争与取消响应）
+_CHUNK = 256
+
+_BAR_STRUCT = struct.Struct("<d4d")
+
+
+def bars_digest(bars: list[Bar]) -> str:
+    """bar 序列的内容摘要（时间戳 + OHLC），作为数据版本。"""
+    h = hashlib.blake2b(digest_size=16)
+    pack = _BAR_STRUCT.pack
+    for b in bars:
+        h.update(pack(b.ts.timestamp(), b.open, b.high, b.low, b.close))
+    return h.hexdigest()
+
+
+class SharedTimeline:
+    """一组 bar + 引擎参数的共享逐 bar 计算结果。
+
+    Parameters
+    ----------
+    key : Hashable
+        内容寻址键（由 TimelineRegistry 生成）。
+    bars : list[Bar]
+        bar 序列（只读）。
+    stroke_mode, min_strict_sep
+        透传给 BiEngine。
+    """
+
+    def __init__(
+        self,
+        key: Hashable,
+        bars: list[Bar],
+        stroke_mode: str = "wide",
+        min_strict_sep: int = 5,
+    ) -> None:
+        self.key = key
+        self.bars = bars
+        self.stroke_mode = stroke_mode
+        self.min_strict_sep = min_strict_sep
+        self.log: list[BiEngineSnapshot] = []
+        self.refs = 0
+        self.computed_bars = 0
+        self.reused_bars = 0
+        self._engine: BiEngine | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def computed(self) -> int:
+        """已计算的 bar 数。"""
+        return len(self.log)
+
+    def extend_to(self, n: int, cancel: threading.Event | None = None) -> int:
+        """确保前 n 根 bar 已计算，返回实际达到的位置（被取消时可能 < n）。"""
+        n = min(n, len(self.bars))
+        while len(self.log) < n:
+            if cancel is not None and cancel.is_set():
+                break
+            with self._lock:
+                if self._engine is None:
+                    self._engine = BiEngine(
+                        stroke_mode=self.stroke_mode, min_strict_sep=self.min_strict_sep,
+                    )
+                stop = min(n, len(self.log) + _CHUNK)
+                while len(self.log) < stop:
+                    self.log.append(self._engine.process_bar(self.bars[len(self.log)]))
+                    self.computed_bars += 1
+        return min(n, len(self.log))
+
+    def metrics(self) -> dict:
+        return {
+            "bars": len(self.bars),
+            "computed": len(self.log),
+            "refs": self.refs,
+            "computed_bars": self.computed_bars,
+            "reused_bars": self.reused_bars,
+        }
+
+
+def _next_seq(log: list[BiEngineSnapshot], n: int) -> int:
+    """前 n 个快照之后的下一个事件序号。"""
+    for snap in reversed(log[:n]):
+        if snap.events:
+            return snap.events[-1].seq + 1
+    return 0
+
+
+@dataclass
+class SharedReplaySession(ReplaySession):
+    """共享时间线上的回放会话：只持有游标与快照引用。
+
+    用 ``SharedReplaySession.on(session_id, timeline)`` 创建。``engine`` 通常为
+    None；批量快进越过时间线已计算范围后持有私有引擎（见模块说明）。
+    """
+
+    timeline: SharedTimeline | None = field(default=None, repr=False)
+    timeline_key: Hashable = None
+
+    @classmethod
+    def on(cls, session_id: str, timeline: SharedTimeline) -> SharedReplaySession:
+        return cls(
+            session_id=session_id,
+            bars=timeline.bars,
+            engine=None,
+            timeline=timeline,
+            timeline_key=timeline.key,
+        )
+
+    def _move_to(self, n: int) -> None:
+        """把游标移到 n（前 n 根已计算），同步快照引用列表。"""
+        tl = self.timeline
+        if n >= self.current_idx:
+            self.event_log.extend(tl.log[self.current_idx:n])
+        else:
+            del self.event_log[n:]
+        self.current_idx = n
+
+    def step(self, count: int = 1) -> list[BiEngineSnapshot]:
+        """步进 count 根 bar（已计算的位置直接取共享快照）。"""
+        if self.engine is not None:
+            return super().step(count)
+        tl = self.timeline
+        start = self.current_idx
+        end = min(start + max(count, 0), self.total_bars)
+        tl.reused_bars += max(0, min(end, tl.computed) - start)
+        tl.extend_to(end)
+        snapshots = tl.log[start:end]
+        self._move_to(end)
+        if self.current_idx >= self.total_bars:
+            self.mode = "done"
+        return snapshots
+
+    def seek(
+        self,
+        target_idx: int,
+        cancel: threading.Event | None = None,
+    ) -> BiEngineSnapshot | None:
+        """跳转到 target_idx（含）。已计算的位置为 O(1) 切片，否则推进共享时间线。"""
+        if self.total_bars == 0:
+            return None
+        if self.engine is not None:
+            # 丢弃私有引擎，回到共享时间线
+            self.engine = None
+            self.current_idx = 0
+            self.event_log = []
+        tl = self.timeline
+        target_idx = max(0, min(target_idx, self.total_bars - 1))
+        n = target_idx + 1
+        tl.reused_bars += min(n, tl.computed)
+        reached = tl.extend_to(n, cancel)
+        if reached < n:
+            self._move_to(reached)
+            raise SeekCancelled(reached)
+        self._move_to(n)
+
+        self._after_jump()
+        return tl.log[target_idx]
+
+    def fast_forward(self, target_idx: int | None = None) -> BiEngineSnapshot | None:
+        """批量快进（见 ReplaySession.fast_forward）。
+
+        目标在时间线已计算范围内时直接切片，摘要事件由前后笔快照差分得到；
+        否则改用私有引擎一次性计算（不推进共享时间线）。
+        """
+        end = self._fast_forward_end(target_idx)
+        if end <= self.current_idx:
+            return None
+        tl = self.timeline
+        if self.engine is None and end <= tl.computed:
+            prev = self.event_log[-1].strokes if self.event_log else []
+            tl.reused_bars += end - self.current_idx
+            self._move_to(end)
+            self._after_jump()
+            final = tl.log[end - 1]
+            # 不修改共享快照：摘要放在新的快照对象上
+            return BiEngineSnapshot(
+                bar_idx=final.bar_idx,
+                bar_ts=final.bar_ts,
+                strokes=final.strokes,
+                events=diff_strokes(
+                    prev, final.strokes,
+                    bar_idx=final.bar_idx, bar_ts=final.bar_ts, seq_start=_next_seq(tl.log, end),
+                ),
+                n_merged=final.n_merged,
+                n_fractals=final.n_fractals,
+            )
+        if self.engine is None:
+            # 写时复制：私有引擎先一次性追到当前位置
+            self.engine = BiEngine(stroke_mode=tl.stroke_mode, min_strict_sep=tl.min_strict_sep)
+            if self.current_idx > 0:
+                self.event_log = [self.engine.process_bars(self.bars[:self.current_idx])]
+        return super().fast_forward(target_idx)
+
+    # 落盘：不序列化共享时间线与快照引用，恢复后经 attach 重新挂接
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state["timeline"] = None
+        if self.engine is None:
+            state["event_log"] = []
+        return state
+
+    def attach(self, timeline: SharedTimeline) -> None:
+        """挂接（恢复后的）共享时间线，并重建到当前游标的快照引用。"""
+        self.timeline = timeline
+        self.bars = timeline.bars
+        if self.engine is not None:
+            return
+        n = timeline.extend_to(self.current_idx)
+        self.current_idx = 0
+        self.event_log = []
+        self._move_to(n)
+
+
+class TimelineRegistry:
+    """按内容寻址的共享时间线注册表（引用计数 + 空闲 LRU）。
+
+    Parameters
+    ----------
+    keep_idle : int
+        无人引用后仍保留的时间线数。
+
+    Usage::
+
+        registry = TimelineRegistry()
+        tl = registry.acquire(bars, stroke_mode="wide", min_strict_sep=5)
+        session = SharedReplaySession.on(sid, tl)
+        ...
+        registry.release(tl)
+    """
+
+    def __init__(self, keep_idle: int = 4) -> None:
+        self.keep_idle = keep_idle
+        self._active: dict[Hashable, SharedTimeline] = {}
+        self._idle: OrderedDict[Hashable, SharedTimeline] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(bars: list[Bar], stroke_mode: str = "wide", min_strict_sep: int = 5) -> tuple:
+        return (bars_digest(bars), len(bars), stroke_mode, min_strict_sep)
+
+    def acquire(
+        self,
+        bars: list[Bar],
+        stroke_mode: str = "wide",
+        min_strict_sep: int = 5,
+        key: Hashable = None,
+    ) -> SharedTimeline:
+        """取得（或创建）对应的时间线并增加引用。"""
+        if key is None:
+            key = self.make_key(bars, stroke_mode, min_strict_sep)
+        with self._lock:
+            tl = self._active.get(key)
+            if tl is None:
+                tl = self._idle.pop(key, None)
+                if tl is not None:
+                    self._active[key] = tl
+            if tl is None:
+                self.misses += 1
+                tl = self._active[key] = SharedTimeline(key, bars, stroke_mode, min_strict_sep)
+            else:
+                self.hits += 1
+            tl.refs += 1
+            return tl
+
+    def reattach(self, session: SharedReplaySession) -> None:
+        """为落盘恢复的会话重新取得时间线（按其原内容寻址键）。"""
+        key = session.timeline_key
+        _digest, _n, stroke_mode, min_strict_sep = key
+        session.attach(self.acquire(session.bars, stroke_mode, min_strict_sep, key=key))
+
+    def release(self, timeline: SharedTimeline) -> None:
+        """释放引用；无人引用时转入空闲 LRU。"""
+        with self._lock:
+            timeline.refs -= 1
+            if timeline.refs > 0 or self._active.get(timeline.key) is not timeline:
+                return
+            del self._active[timeline.key]
+            if self.keep_idle <= 0:
+                return
+            self._idle[timeline.key] = timeline
+            while len(self._idle) > self.keep_idle:
+                self._idle.popitem(last=False)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._active),
+                "idle": len(self._idle),
+                "hits": self.hits,
+                "misses": self.misses,
+                "timelines": [tl.metrics() for tl in self._active.values()],
+            }
@@ -0,0 +1,116 @@
+"""快照版本与增量快照
+
+seek / 重同步时推送的 ``WsSnapshot`` 携带完整结构列表；会话状态大时
+每次都全量序列化代价很高。``SnapshotVersions`` 为每个会话保留最近
+若干个快照版本（按结构标识索引），客户端声明自己持有的版本后，
+服务端只发送变化与删除的结构（``snapshot_delta``）；所声明的版本
+已不在保留范围内时仍回退为完整快照。
+
+结构按 ``STRUCTURE_KEYS`` 中的标识字段索引。新增结构类型（线段 / 中枢 /
+走势 / 买卖点等）只需登记其标识字段并在快照中提供同名列表。
+相邻版本间未变化的结构复用同一 dict 对象，保留多个版本的额外内存
+只与变化量成正比。
+
+``index_structures`` / ``diff`` 也供其他按版本增量下发的接口复用
+（如图表服务的 overlay，见 overlay_cache），可传入自己的标识字段表。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+# 结构类型 → 标识字段（同一快照内唯一）
+STRUCTURE_KEYS: dict[str, str] = {
+    "strokes": "i0",
+}
+
+Structures = dict[str, list[dict]]
+_Indexed = dict[str, dict[Any, dict]]
+
+
+def index_structures(
+    structures: Structures,
+    base: _Indexed | None = None,
+    keys: dict[str, str] = STRUCTURE_KEYS,
+) -> _Indexed:
+    """按标识字段（keys）索引；与 base 中相同的结构复用 base 的对象。"""
+    out: _Indexed = {}
+    for kind, items in structures.items():
+        key = keys[kind]
+        prev = base.get(kind, {}) if base is not None else {}
+        table: dict[Any, dict] = {}
+        for item in items:
+            k = item[key]
+            old = prev.get(k)
+            table[k] = old if old == item else item
+        out[kind] = table
+    return out
+
+
+def diff(old: _Indexed, new: _Indexed) -> tuple[Structures, dict[str, list]]:
+    """两个版本之间变化（新增 / 修改）的结构与被删除结构的标识。"""
+    changed: Structures = {}
+    removed: dict[str, list] = {}
+    for kind in new.keys() | old.keys():
+        before = old.get(kind, {})
+        after = new.get(kind, {})
+        ch = [v for k, v in after.items() if before.get(k) is not v and before.get(k) != v]
+        rm = [k for k in before if k not in after]
+        if ch:
+            changed[kind] = ch
+        if rm:
+            removed[kind] = rm
+    return changed, removed
+
+
+class SnapshotVersions:
+    """单个会话最近快照版本的有界存储（线程安全）。
+
+    Parameters
+    ----------
+    keep : int
+        保留的版本数（≥ 1）。
+
+    Usage::
+
+        versions = SnapshotVersions()
+        v = versions.commit({"strokes": stroke_dicts})
+        delta = versions.delta(client_version, v)   # None = 需发送完整快照
+    """
+
+    def __init__(self, keep: int = 16) -> None:
+        if keep < 1:
+            raise ValueError(f"keep 必须 ≥ 1: {keep}")
+        self.keep = keep
+        self._versions: OrderedDict[int, _Indexed] = OrderedDict()
+        self._lock = threading.Lock()
+        self.latest = 0
+
+    def __contains__(self, version: object) -> bool:
+        return version in self._versions
+
+    def commit(self, structures: Structures) -> int:
+        """登记一个快照，返回其版本号；与最新版本内容相同则沿用最新版本号。"""
+        with self._lock:
+            base = self._versions.get(self.latest)
+            indexed = index_structures(structures, base)
+            if base is not None and indexed == base:
+                return self.latest
+            self.latest += 1
+            self._versions[self.latest] = indexed
+            while len(self._versions) > self.keep:
+                self._versions.popitem(last=False)
+            return self.latest
+
+    def delta(self, base_version: int | None, version: int) -> tuple[Structures, dict[str, list]] | None:
+        """base_version → version 的 (changed, removed)；任一版本不在保留范围返回 None。"""
+        if base_version is None:
+            return None
+        with self._lock:
+            old = self._versions.get(base_version)
+            new = self._versions.get(version)
+        if old is None or new is None:
+            return None
+        return diff(old, new)
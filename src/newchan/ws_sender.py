@@ -0,0 +1,288 @@
+"""WS 客户端发送队列 — 每连接一个有界队列 + 独立写任务
+
+扇出任务只把已编码的帧放进各客户端的队列，不等待 socket；每个连接的
+写任务各自发送。慢客户端只会让自己的队列积压，不会拖慢同会话的其他
+客户端，也不会拖慢 ``_play_loop``。
+
+队列按"条目"计数（一步产生的全部帧为一个条目）。超过 ``maxsize`` 时
+按溢出策略处理：
+
+- ``coalesce``（默认）：清空积压的步进条目，进入重同步状态；此后到达的
+  步进条目直接丢弃，直到调用方通过 ``offer_resync`` 送来一份反映当前
+  状态的完整快照（网关从 ``cursor`` 记录的位置补发 bar + 快照 + 状态）。
+- ``drop``：丢弃最旧的步进条目，客户端只会漏掉中间帧。
+
+命令应答、错误等控制消息（``offer_control``）不受溢出策略影响。
+
+``max_fps``：每秒最多 flush 次数。写任务每次 flush 发送当前全部积压，
+两次 flush 之间至少间隔 1 / max_fps 秒，期间到达的条目在下次 flush 一并发出，
+浏览器每个渲染周期最多被唤醒一次。
+
+``cursor``：每个步进条目可附带 {tf: 下一根 bar 索引}，写任务取出条目时
+合并到 ``ClientSender.cursor``，重同步时据此确定需要补发的 bar 起点。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from newchan.contracts.ws_codec import JSON_FORMAT, FeedFormat
+
+OVERFLOW_POLICIES = ("coalesce", "drop")
+
+Frame = str | bytes
+
+
+def negotiate_overflow(policy: str | None, default: str = "coalesce") -> str:
+    """客户端请求的溢出策略；未知值回退为 default。"""
+    p = (policy or "").strip().lower()
+    return p if p in OVERFLOW_POLICIES else default
+
+
+@dataclass(slots=True)
+class _Item:
+    frames: list[Frame]
+    droppable: bool
+    enqueued_at: float
+    cursor: dict[str, int] | None = None
+
+
+class ClientSender:
+    """单个 WS 连接的有界发送队列与写任务。
+
+    Parameters
+    ----------
+    send_frame : callable
+        ``async send_frame(frame)``，发送一个文本 / 二进制帧。
+    fmt : FeedFormat
+        客户端协商的推送格式（扇出端据此编码，本类不编码）。
+    maxsize : int
+        积压步进条目上限（≥ 1）。
+    policy : str
+        溢出策略：``coalesce`` / ``drop``。
+    max_fps : float
+        每秒 flush 次数上限（0 = 不限）。
+    clock : callable
+        计时函数（秒）。
+
+    Usage::
+
+        sender = ClientSender(send_frame, fmt, maxsize=64, policy="coalesce")
+        sender.start()
+        if sender.offer(frames, cursor={"5m": 120}):
+            ...  # 进入重同步：稍后 sender.offer_resync(snapshot_frames)
+        sender.metrics()
+        sender.close()
+    """
+
+    def __init__(
+        self,
+        send_frame: Callable[[Frame], Awaitable[None]],
+        fmt: FeedFormat = JSON_FORMAT,
+        maxsize: int = 64,
+        policy: str = "coalesce",
+        max_fps: float = 0.0,
+        clock: Callable[[], float] = perf_counter,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize 必须 ≥ 1: {maxsize}")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知溢出策略: {policy}")
+        self._send_frame = send_frame
+        self.fmt = fmt
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_fps = max_fps
+        self._min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._last_flush = float("-inf")
+        self._clock = clock
+        self._queue: deque[_Item] = deque()
+        self._pending = 0  # 队列中的步进条目数
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+        self.resyncing = False
+        self.cursor: dict[str, int] = {}
+        # 客户端持有的快照版本（网关据此发送增量快照）
+        self.snapshot_version: int | None = None
+
+        self.items_sent = 0
+        self.flushes = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.resyncs = 0
+        self.max_queue_depth = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.last_send_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """启动写任务（须在事件循环内调用）。"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._writer())
+
+    def close(self) -> None:
+        """停止写任务并丢弃积压。"""
+        self._closed = True
+        self._queue.clear()
+        self._pending = 0
+        self._idle.set()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    async def join(self) -> None:
+        """等待队列清空且当前条目发送完毕。"""
+        await self._idle.wait()
+
+    # ------------------------------------------------------------------
+    # 入队（事件循环线程）
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, item: _Item) -> None:
+        self._queue.append(item)
+        if item.droppable:
+            self._pending += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._idle.clear()
+        self._wakeup.set()
+
+    def offer(self, frames: list[Frame], cursor: dict[str, int] | None = None) -> bool:
+        """放入一步的帧。返回 True 表示本次溢出使客户端进入重同步状态。"""
+        if self._closed or not frames:
+            return False
+        if self.resyncing:
+            self.coalesced += 1
+            return False
+        if self._pending >= self.maxsize:
+            if self.policy == "drop":
+                for i, queued in enumerate(self._queue):
+                    if queued.droppable:
+                        del self._queue[i]
+                        self._pending -= 1
+                        self.dropped += 1
+                        break
+            else:
+                self.coalesced += 1
+                self.begin_resync()
+                return True
+        self._enqueue(_Item(frames, True, self._clock(), cursor))
+        return False
+
+    def begin_resync(self) -> None:
+        """丢弃积压的步进条目并进入重同步状态（等待 ``offer_resync``）。"""
+        kept = deque(it for it in self._queue if not it.droppable)
+        self.coalesced += len(self._queue) - len(kept)
+        self._queue = kept
+        self._pending = 0
+        self.resyncing = True
+        self.resyncs += 1
+        if not self._queue:
+            self._idle.set()
+
+    def offer_control(self, frames: list[Frame], cursor: dict[str, int] | None = None) -> None:
+        """放入控制消息（命令应答 / 错误 / 重连补发），不受溢出策略影响。"""
+        if not self._closed and frames:
+            self._enqueue(_Item(frames, False, self._clock(), cursor))
+
+    def offer_resync(self, frames: list[Frame], cursor: dict[str, int] | None = None) -> None:
+        """放入重同步快照并恢复正常推送；frames 为空时仅恢复推送。"""
+        if not self.resyncing:
+            return
+        self.resyncing = False
+        if not self._closed and frames:
+            self._enqueue(_Item(frames, False, self._clock(), cursor))
+
+    # ------------------------------------------------------------------
+    # 写任务
+    # ------------------------------------------------------------------
+
+    async def _writer(self) -> None:
+        try:
+            while True:
+                while not self._queue:
+                    self._idle.set()
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if self._min_interval:
+                    wait = self._last_flush + self._min_interval - self._clock()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._last_flush = self._clock()
+                self.flushes += 1
+                # 一次 flush 发送当前全部积压
+                for _ in range(len(self._queue)):
+                    if not self._queue:
+                        break
+                    await self._send_item(self._queue.popleft())
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # 连接已断开：停止发送，由持有方移除
+            self._closed = True
+            self._queue.clear()
+            self._pending = 0
+        finally:
+            self._idle.set()
+
+    async def _send_item(self, item: _Item) -> None:
+        if item.droppable:
+            self._pending -= 1
+        if item.cursor:
+            self.cursor.update(item.cursor)
+        t0 = self._clock()
+        for frame in item.frames:
+            await self._send_frame(frame)
+            self.frames_sent += 1
+            self.bytes_sent += len(frame)
+        now = self._clock()
+        self.items_sent += 1
+        self.last_send_ms = (now - t0) * 1000
+        self.last_lag_ms = (now - item.enqueued_at) * 1000
+        self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> dict:
+        """导出队列深度、丢弃 / 合并计数与发送延迟。"""
+        return {
+            "encoding": self.fmt.encoding,
+            "batch": self.fmt.batch,
+            "policy": self.policy,
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_queue_depth,
+            "resyncing": self.resyncing,
+            "max_fps": self.max_fps,
+            "items_sent": self.items_sent,
+            "flushes": self.flushes,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "resyncs": self.resyncs,
+            "lag_ms_last": round(self.last_lag_ms, 3),
+            "lag_ms_max": round(self.max_lag_ms, 3),
+            "send_ms_last": round(self.last_send_ms, 3),
+            "closed": self._closed,
+        }
@@ -0,0 +1,86 @@
+"""测试共用 bar 数据与网关客户端
+
+- zigzag_bars：锯齿形 bar（20 根一个来回，足以产生笔事件），按长度 / 价格偏移参数化
+- client：``_load_bars`` 换成 zigzag_bars(bar_count, bar_offset) 的网关 TestClient，
+  共享时间线注册表每个测试独立；模块可覆盖 bar_count / bar_offset fixture
+- ws_start / ws_step_frames：/ws/feed 上发起回放、按步收帧
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+from unittest.mock import patch
+
+import pytest
+
+from newchan.types import Bar
+
+BASE_TS = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def zigzag_bars(
+    n: int = 80,
+    offset: float = 100.0,
+    amp: float = 2.0,
+    drift: float = 0.0,
+    step_min: int = 1,
+) -> list[Bar]:
+    """锯齿形 bar：中枢价 offset 起 10 根上行、10 根下行，每根另加 i * drift。"""
+    bars: list[Bar] = []
+    for i in range(n):
+        phase = i % 20
+        mid = offset + (phase if phase < 10 else 20 - phase) * amp + i * drift
+        bars.append(Bar(
+            ts=BASE_TS + timedelta(minutes=i * step_min),
+            open=mid, high=mid + 1.0, low=mid - 1.0, close=mid + 0.5,
+        ))
+    return bars
+
+
+def ws_start(ws) -> str:
+    """发送 replay_start（JSON 编码的连接），收下 replay_started 与初始 status，返回 session_id。"""
+    ws.send_json({"action": "replay_start", "symbol": "CL", "tf": "1m"})
+    started = ws.receive_json()
+    assert started["type"] == "replay_started"
+    ws.receive_json()  # 初始 status
+    return started["session_id"]
+
+
+def ws_step_frames(ws, n: int, decode: Callable[[Any], dict] | None = None) -> list[dict]:
+    """发送 n 次 replay_step，按帧收集直到 n 个 status（batch 展开计数）。"""
+    decode = decode or (lambda w: w.receive_json())
+    for _ in range(n):
+        ws.send_json({"action": "replay_step"})
+    frames: list[dict] = []
+    statuses = 0
+    while statuses < n:
+        msg = decode(ws)
+        msgs = msg["messages"] if msg["type"] == "batch" else [msg]
+        frames.append(msg)
+        statuses += sum(m["type"] == "replay_status" for m in msgs)
+    return frames
+
+
+@pytest.fixture
+def bar_count() -> int:
+    return 80
+
+
+@pytest.fixture
+def bar_offset() -> float:
+    return 100.0
+
+
+@pytest.fixture
+def client(bar_count, bar_offset):
+    # 延迟导入：不依赖网关的测试模块不必加载 FastAPI
+    from fastapi.testclient import TestClient
+
+    import newchan.gateway as gw
+    from newchan.shared_replay import TimelineRegistry
+
+    with patch.object(gw, "_load_bars", side_effect=lambda *a, **k: zigzag_bars(bar_count, bar_offset)), \
+            patch.object(gw, "_timelines", TimelineRegistry()):
+        with TestClient(gw.app) as c:
+            yield c
@@ -0,0 +1,117 @@
+"""AsyncEventBus 线程 → 事件循环桥接测试
+
+验证：
+  - 工作线程 publish / push 的顺序在消费端保持不变
+  - encode 在发布线程执行
+  - 多消费者扇出、有界队列丢弃最旧条目
+  - attach 转发引擎侧 EventBus
+  - close 唤醒等待中的消费者
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from newchan.events import DomainEvent
+from newchan.orchestrator.async_bus import AsyncEventBus
+from newchan.orchestrator.bus import EventBus, TaggedEvent
+
+
+def _ev(i: int) -> DomainEvent:
+    return DomainEvent(event_type=f"e{i}", bar_idx=i, bar_ts=float(i), seq=i)
+
+
+async def _collect(consumer, n: int) -> list:
+    return [await asyncio.wait_for(consumer.get(), 1.0) for _ in range(n)]
+
+
+class TestAsyncEventBus:
+    def test_worker_thread_order_preserved(self):
+        async def main():
+            feed = AsyncEventBus(asyncio.get_running_loop())
+            consumer = feed.consumer()
+
+            def worker():
+                for i in range(3):
+                    feed.publish({"bar": i})
+                    feed.push("5m", [_ev(i)], stream_id="s")
+
+            await asyncio.to_thread(worker)
+            return await _collect(consumer, 6)
+
+        items = asyncio.run(main())
+        assert items[0] == {"bar": 0}
+        assert isinstance(items[1], list)
+        assert items[1][0] == TaggedEvent(tf="5m", event=_ev(0), stream_id="s")
+        assert [it["bar"] for it in items[::2]] == [0, 1, 2]
+
+    def test_encode_runs_in_publishing_thread(self):
+        threads: list[int] = []
+
+        def encode(te: TaggedEvent) -> str:
+            threads.append(threading.get_ident())
+            return te.event.event_type
+
+        async def main():
+            feed = AsyncEventBus(asyncio.get_running_loop(), encode=encode)
+            consumer = feed.consumer()
+            worker_id = await asyncio.to_thread(
+                lambda: (feed.push("5m", [_ev(0), _ev(1)]), threading.get_ident())[1],
+            )
+            return worker_id, await _collect(consumer, 1)
+
+        worker_id, items = asyncio.run(main())
+        assert items == [["e0", "e1"]]
+        assert threads == [worker_id, worker_id]
+
+    def test_fanout_and_bounded_consumer(self):
+        async def main():
+            feed = AsyncEventBus(asyncio.get_running_loop())
+            full = feed.consumer()
+            bounded = feed.consumer(maxsize=2)
+            for i in range(5):
+                feed.publish(i)
+            await asyncio.sleep(0)
+            return await _collect(full, 5), await _collect(bounded, 2), bounded.dropped
+
+        full, bounded, dropped = asyncio.run(main())
+        assert full == [0, 1, 2, 3, 4]
+        assert bounded == [3, 4]
+        assert dropped == 3
+
+    def test_attach_engine_bus(self):
+        async def main():
+            feed = AsyncEventBus(asyncio.get_running_loop())
+            consumer = feed.consumer()
+            engine_bus = EventBus()
+            feed.attach(engine_bus, tf="30m")
+            engine_bus.push("5m", [_ev(0)])
+            engine_bus.push("30m", [_ev(1)])
+            return await _collect(consumer, 1), engine_bus.count
+
+        items, buffered = asyncio.run(main())
+        assert items[0][0].event.event_type == "e1"
+        assert buffered == 2  # attach 不消费引擎侧缓冲
+
+    def test_close_stops_iteration(self):
+        async def main():
+            feed = AsyncEventBus(asyncio.get_running_loop())
+            consumer = feed.consumer()
+            seen: list = []
+
+            async def run():
+                async for item in consumer:
+                    seen.append(item)
+
+            task = asyncio.create_task(run())
+            feed.publish("a")
+            await asyncio.sleep(0.01)
+            feed.close()
+            await asyncio.wait_for(task, 1.0)
+            feed.publish("b")  # 关闭后发布被忽略
+            return seen, feed.metrics()
+
+        seen, metrics = asyncio.run(main())
+        assert seen == ["a"]
+        assert metrics["consumers"] == []
@@ -0,0 +1,178 @@
+"""bar_cache 列式缓存测试
+
+验证：
+  - BarColumns 往返：与逐行转换结果一致（时区、NaN volume、无 volume 列）
+  - BarCache 字节 LRU 淘汰、命中 / 未命中计数、超大条目不入缓存
+  - gateway._load_bars 同源重复加载只读盘一次，mtime 变化后失效
+  - FrameCache 按 DataFrame 占用计字节；server 读盘 / resample 结果按 mtime 缓存
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import timezone
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from newchan.bar_cache import BarCache, BarColumns, FrameCache
+
+
+def _df(n: int = 5, volume: bool = True, tz: str | None = None) -> pd.DataFrame:
+    idx = pd.date_range("2025-01-02", periods=n, freq="1min", tz=tz)
+    data = {
+        "open": np.arange(n, dtype=float),
+        "high": np.arange(n, dtype=float) + 1,
+        "low": np.arange(n, dtype=float) - 1,
+        "close": np.arange(n, dtype=float) + 0.5,
+    }
+    if volume:
+        data["volume"] = np.arange(n, dtype=float) * 10
+    return pd.DataFrame(data, index=idx)
+
+
+class TestBarColumns:
+    def test_roundtrip_values(self):
+        df = _df()
+        df.loc[df.index[2], "volume"] = np.nan
+        bars = BarColumns.from_df(df).to_bars()
+        assert len(bars) == 5
+        assert bars[1].open == 1.0 and bars[1].high == 2.0 and bars[1].close == 1.5
+        assert bars[0].ts == pd.Timestamp("2025-01-02", tz="UTC").to_pydatetime()
+        assert bars[0].ts.tzinfo is not None
+        assert bars[1].volume == 10.0
+        assert bars[2].volume is None
+        assert type(bars[1].close) is float
+
+    def test_no_volume_and_tz_aware(self):
+        df = _df(3, volume=False, tz="America/New_York")
+        cols = BarColumns.from_df(df)
+        assert cols.volume is None
+        bars = cols.to_bars()
+        assert bars[0].volume is None
+        assert bars[0].ts == df.index[0].to_pydatetime()
+        assert bars[0].ts.utcoffset() == timezone.utc.utcoffset(None)
+
+    def test_empty(self):
+        assert BarColumns.from_df(_df(0)).to_bars() == []
+
+    def test_nbytes(self):
+        cols = BarColumns.from_df(_df(10))
+        assert cols.nbytes == 6 * 10 * 8
+
+
+class TestBarCache:
+    def test_lru_by_bytes(self):
+        one = BarColumns.from_df(_df(10))  # 480 bytes
+        cache = BarCache(max_bytes=one.nbytes * 2)
+        cache.put("a", one)
+        cache.put("b", one)
+        assert cache.get("a") is one  # a 变为最近使用
+        cache.put("c", one)
+        assert cache.get("b") is None
+        assert cache.get("a") is one and cache.get("c") is one
+        m = cache.metrics()
+        assert m["entries"] == 2
+        assert m["bytes"] == one.nbytes * 2
+        assert m["evictions"] == 1
+        assert (m["hits"], m["misses"]) == (3, 1)
+
+    def test_oversized_not_cached(self):
+        cache = BarCache(max_bytes=10)
+        cols = BarColumns.from_df(_df(10))
+        assert cache.get_or_load("k", lambda: cols) is cols
+        assert len(cache) == 0
+
+    def test_get_or_load_and_discard(self):
+        cache = BarCache()
+        calls = []
+        loader = lambda: calls.append(1) or BarColumns.from_df(_df())
+        cache.get_or_load(("CL", 1), loader)
+        cache.get_or_load(("CL", 1), loader)
+        assert len(calls) == 1
+        assert cache.discard(lambda k: k[0] == "CL") == 1
+        assert cache.nbytes == 0
+
+    def test_invalid_max_bytes(self):
+        with pytest.raises(ValueError):
+            BarCache(max_bytes=-1)
+
+
+class TestGatewayLoadBars:
+    def test_repeated_load_reads_once(self, tmp_path):
+        import newchan.gateway as gw
+        from newchan import cache as cache_mod
+
+        path = tmp_path / "CL_1min_raw.parquet"
+        _df(30).to_parquet(path)
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path), \
+                patch.object(gw, "_bar_cache", BarCache()) as bar_cache, \
+                patch.object(cache_mod, "load_df", wraps=cache_mod.load_df) as load:
+            a = gw._load_bars("CL", "1min", "1m")
+            b = gw._load_bars("CL", "1min", "1m")
+            assert load.call_count == 1
+            assert a == b and a is not b and a[0] is not b[0]
+            assert bar_cache.metrics()["hits"] == 1
+
+            c = gw._load_bars("CL", "1min", "5m")
+            assert len(c) == 6
+            assert load.call_count == 2
+
+            # 源文件更新 → mtime 变化 → 重新加载并释放旧版本
+            _df(40).to_parquet(path)
+            st = path.stat()
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            assert len(gw._load_bars("CL", "1min", "1m")) == 40
+            assert load.call_count == 3
+            assert len(bar_cache) == 2
+
+    def test_missing_cache_raises(self, tmp_path):
+        import newchan.gateway as gw
+        from newchan import cache as cache_mod
+
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path):
+            with pytest.raises(ValueError):
+                gw._load_bars("ZZ", "1min", "1m")
+
+
+class TestFrameCache:
+    def test_bytes_follow_frame_size(self):
+        cache = FrameCache(max_bytes=6_000)
+        df = _df(50)
+        cache.put("a", df)
+        assert cache.nbytes == df.memory_usage(index=True).sum()
+        cache.put("b", _df(100))
+        assert len(cache) == 1 and cache.get("a") is None
+        assert cache.metrics()["evictions"] == 1
+
+
+class TestServerFrameCache:
+    def test_resample_cached_by_mtime(self, tmp_path):
+        import newchan.server as srv
+        from newchan import cache as cache_mod
+
+        path = tmp_path / "CL_1min_raw.parquet"
+        _df(30).to_parquet(path)
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path), \
+                patch.object(srv, "_frame_cache", FrameCache()) as frames, \
+                patch.object(srv, "load_df", wraps=cache_mod.load_df) as load, \
+                patch.object(srv, "resample_ohlc", wraps=srv.resample_ohlc) as resample:
+            a = srv._load_resampled("CL_1min_raw", "5m")
+            b = srv._load_resampled("CL_1min_raw", "5m")
+            assert a is b and len(a) == 6
+            assert load.call_count == 1 and resample.call_count == 1
+
+            srv._load_resampled("CL_1min_raw", "1m")
+            assert load.call_count == 1 and resample.call_count == 2
+
+            _df(40).to_parquet(path)
+            st = path.stat()
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            assert len(srv._load_resampled("CL_1min_raw", "1m")) == 40
+            assert load.call_count == 2
+            # 旧版本（原始 + 两个 tf）已释放
+            assert len(frames) == 2
+
+            assert srv._load_resampled("ZZ_1min_raw", "1m") is None
@@ -0,0 +1,153 @@
+"""服务端降采样测试
+
+验证：
+  - envelope：行数 ≤ max_points；每桶首 open / 最高 high / 最低 low / 末 close /
+    volume 求和，整体极值不丢失；不足 max_points 原样返回
+  - downsample_ohlc：使用金字塔与直接在原始 bar 上包络的整体统计一致，
+    任意范围（含不对齐的首尾）时间不越界
+  - lttb_indices：点数、首尾保留、尖峰保留；lttb_frame 多列并集 ≤ max_points，
+    NaN 预热期不参与选点
+  - /api/ohlcv、/api/indicator 的 max_points 参数；金字塔各级按源文件版本缓存
+"""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from newchan.downsample import (
+    PYRAMID_FACTOR,
+    downsample_ohlc,
+    envelope,
+    lttb_frame,
+    lttb_indices,
+    pyramid_level,
+)
+
+
+def _ohlcv(n: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    spread = rng.uniform(0.1, 2.0, n)
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(1, 100, n).astype(float),
+    }, index=pd.date_range("2020-01-01", periods=n, freq="1min"))
+
+
+def _summary(df: pd.DataFrame) -> tuple:
+    return (df["open"].iloc[0], df["high"].max(), df["low"].min(), df["close"].iloc[-1], df["volume"].sum())
+
+
+class TestEnvelope:
+    def test_buckets(self):
+        df = _ohlcv(1003)
+        out = envelope(df, 100)
+        assert len(out) <= 100
+        assert _summary(out) == pytest.approx(_summary(df))
+        # 第一个桶 = 前 11 根
+        first = df.iloc[:11]
+        assert out.index[0] == df.index[0]
+        assert (out["high"].iloc[0], out["low"].iloc[0], out["close"].iloc[0]) == (
+            first["high"].max(), first["low"].min(), first["close"].iloc[-1],
+        )
+        assert envelope(df, 5000) is df
+        with pytest.raises(ValueError):
+            envelope(df, 0)
+
+    @pytest.mark.parametrize("lo,hi,max_points", [
+        (0, 20000, 300), (137, 19999, 500), (5, 900, 50), (3000, 3050, 10), (0, 20000, 25000),
+    ])
+    def test_pyramid_matches_direct(self, lo, hi, max_points):
+        df = _ohlcv(20000)
+        levels = {1: pyramid_level(df)}
+        for k in range(2, 6):
+            levels[k] = pyramid_level(levels[k - 1])
+        calls: list[int] = []
+
+        def level(k):
+            calls.append(k)
+            return levels[k]
+
+        got = downsample_ohlc(df, lo, hi, max_points, level)
+        want = envelope(df.iloc[lo:hi], max_points)
+        assert len(got) <= max_points
+        assert _summary(got) == pytest.approx(_summary(want))
+        assert got.index[0] == df.index[lo] and got.index[-1] <= df.index[hi - 1]
+        if (hi - lo) // max_points >= PYRAMID_FACTOR:
+            assert calls
+        # 金字塔第 k 级 = 每 8**k 根一组
+        assert levels[2]["volume"].iloc[0] == df["volume"].iloc[:PYRAMID_FACTOR ** 2].sum()
+
+
+class TestLttb:
+    def test_indices(self):
+        x = np.arange(1000, dtype=float)
+        y = np.sin(x / 50)
+        y[437] = 10.0  # 尖峰
+        idx = lttb_indices(x, y, 100)
+        assert len(idx) == 100 and idx[0] == 0 and idx[-1] == 999
+        assert np.all(np.diff(idx) > 0)
+        assert 437 in idx
+        assert list(lttb_indices(x, y, 2000)) == list(range(1000))
+        assert list(lttb_indices(x, y, 2)) == [0, 999]
+
+    def test_frame(self):
+        n = 5000
+        idx = pd.date_range("2020-01-01", periods=n, freq="1min")
+        macd = np.sin(np.arange(n) / 40)
+        sig = np.cos(np.arange(n) / 40)
+        sig[:100] = np.nan
+        df = pd.DataFrame({"macd": macd, "signal": sig}, index=idx)
+        out = lttb_frame(df, 400)
+        assert len(out) <= 400
+        assert out.index[0] == idx[0] and out.index[-1] == idx[-1]
+        assert out.index[out["signal"].notna()][0] == idx[100]
+        assert lttb_frame(df, n) is df
+
+
+def _query(params: dict):
+    mock = MagicMock()
+    mock.get = lambda key, default="": params.get(key, default)
+    return mock
+
+
+class TestRoutes:
+    def test_ohlcv_and_indicator(self, tmp_path):
+        import newchan.server as srv
+        from newchan import cache as cache_mod
+        from newchan.bar_cache import FrameCache
+        from newchan.indicator_cache import IndicatorCache
+
+        _ohlcv(30000).to_parquet(tmp_path / "CL_1min_raw.parquet")
+        frames = FrameCache()
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path), \
+                patch.object(srv, "_frame_cache", frames), \
+                patch.object(srv, "_indicator_cache", IndicatorCache()), \
+                patch.object(srv, "request") as req:
+            req.query = _query({"symbol": "CL", "max_points": "300"})
+            res = json.loads(srv.api_ohlcv())
+            assert res["count"] == len(res["data"]) <= 300
+            assert res["source_count"] == 30000
+            # 金字塔第 1、2 级已按版本缓存
+            assert {k[1] for k in frames._entries if k[1]} >= {"1m/8", "1m/64"}
+
+            req.query = _query({"symbol": "CL", "max_points": "500", "countBack": "300"})
+            res = json.loads(srv.api_ohlcv())
+            assert res["count"] == 300 and "source_count" not in res
+
+            req.query = _query({"symbol": "CL", "max_points": "0"})
+            assert "error" in json.loads(srv.api_ohlcv())
+            assert srv.response.status_code == 400
+
+            req.query = _query({"symbol": "CL", "name": "MACD", "max_points": "600"})
+            res = json.loads(srv.api_indicator())
+            assert len(res["data"]) <= 600 and res["source_count"] == 30000
@@ -0,0 +1,214 @@
+"""EventBus 分区索引 / 订阅 / 容量策略测试
+
+验证：
+  - 分区 drain 与全局 drain 的顺序与互斥
+  - subscribe 过滤与回调异常隔离
+  - capacity + overflow 三种策略
+  - depth / metrics 计数
+  - 惰性删除压缩后索引一致
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from newchan.events import DomainEvent
+from newchan.orchestrator.bus import EventBus, EventBusOverflow, TaggedEvent
+
+
+def _ev(i: int) -> DomainEvent:
+    return DomainEvent(event_type=f"e{i}", bar_idx=i, bar_ts=float(i), seq=i)
+
+
+def _evs(*idx: int) -> list[DomainEvent]:
+    return [_ev(i) for i in idx]
+
+
+def _types(events: list[DomainEvent]) -> list[str]:
+    return [e.event_type for e in events]
+
+
+# ── 分区取出 ──
+
+
+class TestPartitionDrain:
+    def test_drain_preserves_global_order(self):
+        bus = EventBus()
+        bus.push("5m", _evs(0, 1), stream_id="a")
+        bus.push("30m", _evs(2), stream_id="b")
+        bus.push("5m", _evs(3), stream_id="a")
+        tagged = bus.drain()
+        assert [t.event.event_type for t in tagged] == ["e0", "e1", "e2", "e3"]
+        assert tagged[2] == TaggedEvent(tf="30m", event=_ev(2), stream_id="b")
+        assert bus.count == 0
+
+    def test_drain_by_tf_removes_from_other_indexes(self):
+        bus = EventBus()
+        bus.push("5m", _evs(0), stream_id="a")
+        bus.push("30m", _evs(1), stream_id="a")
+        assert _types(bus.drain_by_tf("5m")) == ["e0"]
+        # 已取出的事件不再出现在 stream / 全局视图
+        assert _types(bus.drain_by_stream("a")) == ["e1"]
+        assert bus.drain() == []
+
+    def test_drain_by_stream_then_tf(self):
+        bus = EventBus()
+        bus.push("5m", _evs(0), stream_id="a")
+        bus.push("5m", _evs(1), stream_id="b")
+        assert _types(bus.drain_by_stream("b")) == ["e1"]
+        assert _types(bus.drain_by_tf("5m")) == ["e0"]
+        assert bus.count == 0
+
+    def test_empty_push_is_noop(self):
+        bus = EventBus()
+        bus.push("5m", [])
+        assert bus.count == 0
+        assert bus.metrics()["by_tf"] == {}
+
+    def test_push_copies_event_list(self):
+        bus = EventBus()
+        events = _evs(0)
+        bus.push("5m", events)
+        events.append(_ev(1))
+        assert _types(bus.drain_by_tf("5m")) == ["e0"]
+
+    def test_compaction_keeps_indexes_consistent(self):
+        bus = EventBus()
+        for i in range(200):
+            bus.push(f"tf{i % 2}", _evs(i), stream_id="s")
+            if i % 2 == 1:
+                bus.drain_by_tf("tf1")
+        remaining = bus.drain_by_stream("s")
+        assert _types(remaining) == [f"e{i}" for i in range(0, 200, 2)]
+        assert bus.count == 0
+
+
+# ── 订阅 ──
+
+
+class TestSubscribe:
+    def test_filtered_callback(self):
+        bus = EventBus()
+        got: list[list[TaggedEvent]] = []
+        bus.subscribe(got.append, tf="5m", stream_id="a")
+        bus.push("5m", _evs(0, 1), stream_id="a")
+        bus.push("5m", _evs(2), stream_id="b")
+        bus.push("30m", _evs(3), stream_id="a")
+        assert len(got) == 1
+        assert [t.event.event_type for t in got[0]] == ["e0", "e1"]
+        # 订阅不影响缓冲
+        assert bus.count == 4
+
+    def test_level_subscription(self):
+        bus = EventBus()
+        got: list[list[TaggedEvent]] = []
+        bus.subscribe(got.append, level=2)
+        bus.push_level(2, _evs(0))
+        bus.push_level(3, _evs(1))
+        assert len(got) == 1
+        assert got[0][0].tf == "L2"
+
+    def test_tf_and_level_exclusive(self):
+        with pytest.raises(ValueError):
+            EventBus().subscribe(lambda _: None, tf="5m", level=2)
+
+    def test_unsubscribe(self):
+        bus = EventBus()
+        got: list = []
+        token = bus.subscribe(got.append)
+        assert bus.unsubscribe(token) is True
+        assert bus.unsubscribe(token) is False
+        bus.push("5m", _evs(0))
+        assert got == []
+
+    def test_failing_callback_isolated(self):
+        bus = EventBus()
+        got: list = []
+
+        def _boom(_):
+            raise RuntimeError("boom")
+
+        bus.subscribe(_boom)
+        bus.subscribe(got.append)
+        bus.push("5m", _evs(0))
+        assert len(got) == 1
+        assert bus.count == 1
+
+
+# ── 容量与溢出 ──
+
+
+class TestCapacity:
+    def test_drop_oldest_partial_batch(self):
+        bus = EventBus(capacity=3)
+        bus.push("5m", _evs(0, 1), stream_id="a")
+        bus.push("30m", _evs(2, 3), stream_id="b")
+        assert bus.count == 3
+        assert bus.dropped == 1
+        assert _types(bus.drain_by_tf("5m")) == ["e1"]
+        assert bus.depth(stream_id="a") == 0
+        assert _types(bus.drain_by_stream("b")) == ["e2", "e3"]
+
+    def test_drop_oldest_oversized_batch(self):
+        bus = EventBus(capacity=2)
+        bus.push("5m", _evs(0))
+        bus.push("5m", _evs(1, 2, 3))
+        assert _types(bus.drain_by_tf("5m")) == ["e2", "e3"]
+        assert bus.dropped == 2
+
+    def test_drop_newest(self):
+        bus = EventBus(capacity=2, overflow="drop_newest")
+        bus.push("5m", _evs(0))
+        bus.push("5m", _evs(1, 2))
+        assert _types(bus.drain_by_tf("5m")) == ["e0", "e1"]
+        assert bus.dropped == 1
+
+    def test_error_policy_rejects_batch(self):
+        bus = EventBus(capacity=1, overflow="error")
+        bus.push("5m", _evs(0))
+        with pytest.raises(EventBusOverflow):
+            bus.push("5m", _evs(1))
+        assert _types(bus.drain_by_tf("5m")) == ["e0"]
+
+    def test_subscribers_see_dropped_events(self):
+        bus = EventBus(capacity=0)
+        got: list = []
+        bus.subscribe(got.append)
+        bus.push("5m", _evs(0, 1))
+        assert bus.count == 0
+        assert len(got[0]) == 2
+
+    def test_invalid_config(self):
+        with pytest.raises(ValueError):
+            EventBus(capacity=-1)
+        with pytest.raises(ValueError):
+            EventBus(overflow="block")  # type: ignore[arg-type]
+
+
+# ── 指标 ──
+
+
+class TestMetrics:
+    def test_depth_by_partition(self):
+        bus = EventBus()
+        bus.push("5m", _evs(0, 1), stream_id="a")
+        bus.push_level(2, _evs(2), stream_id="a")
+        assert bus.depth() == 3
+        assert bus.depth(tf="5m") == 2
+        assert bus.depth(level=2) == 1
+        assert bus.depth(stream_id="a") == 3
+        bus.drain_by_level(2)
+        assert bus.depth(stream_id="a") == 2
+
+    def test_metrics_snapshot(self):
+        bus = EventBus(capacity=10)
+        bus.subscribe(lambda _: None)
+        bus.push("5m", _evs(0, 1), stream_id="a")
+        bus.drain_by_tf("5m")
+        m = bus.metrics()
+        assert m["depth"] == 0
+        assert m["high_watermark"] == 2
+        assert m["capacity"] == 10
+        assert m["subscribers"] == 1
+        assert m["by_tf"] == {}
+        assert m["by_stream"] == {}
@@ -0,0 +1,179 @@
+"""批量快进测试
+
+验证：
+  - BiEngine.process_bars：管线只跑一次，笔列表与逐根 process_bar 一致，
+    事件为前后笔快照的净差分
+  - ReplaySession.fast_forward：快进后 step 与逐 bar 会话一致；目标不在前方时不动
+  - SharedReplaySession：已计算范围直接切片；越过范围改用私有引擎，不推进共享时间线；
+    seek 回到共享时间线；落盘恢复保留私有引擎
+  - TFOrchestrator.fast_forward：各 TF 对齐，四层引擎只处理最终快照
+  - 网关：REST / WS 快进只推送摘要事件 + 一个快照 + 状态，不推送中间 bar
+"""
+
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+from newchan.bi_differ import diff_strokes
+from newchan.bi_engine import BiEngine
+from newchan.orchestrator.timeframes import TFOrchestrator
+from newchan.replay import ReplaySession
+from newchan.shared_replay import SharedReplaySession, TimelineRegistry
+from newchan.types import Bar
+from tests.conftest import zigzag_bars
+
+
+def _strokes(snap):
+    return [(s.i0, s.i1, s.direction, s.confirmed) for s in snap.strokes]
+
+
+@pytest.fixture
+def bar_count() -> int:
+    return 150
+
+
+class TestProcessBars:
+    def test_matches_per_bar(self):
+        bars = zigzag_bars(150, drift=0.05)
+        per_bar = BiEngine(stroke_mode="wide")
+        for b in bars:
+            want = per_bar.process_bar(b)
+
+        batch = BiEngine(stroke_mode="wide")
+        mid = batch.process_bars(bars[:40])
+        got = batch.process_bars(bars[40:])
+        assert got.bar_idx == want.bar_idx == len(bars) - 1
+        assert _strokes(got) == _strokes(want)
+        assert batch.bar_count == len(bars)
+
+        net = diff_strokes(mid.strokes, got.strokes, bar_idx=got.bar_idx, bar_ts=got.bar_ts)
+        assert [e.event_type for e in got.events] == [e.event_type for e in net]
+
+    def test_empty_rejected(self):
+        with pytest.raises(ValueError):
+            BiEngine().process_bars([])
+
+
+class TestReplayFastForward:
+    def test_then_step_continues(self):
+        plain = ReplaySession("p", zigzag_bars(150, drift=0.05), BiEngine(stroke_mode="wide"))
+        plain.step(120)
+        fast = ReplaySession("f", zigzag_bars(150, drift=0.05), BiEngine(stroke_mode="wide"))
+        fast.step(10)
+        snap = fast.fast_forward(109)
+        assert fast.current_idx == 110 and snap.bar_idx == 109
+        assert fast.mode != "done"
+        (got,) = fast.step(1)
+        assert fast.current_idx == 111
+        fast.step(9)
+        assert _strokes(fast.event_log[-1]) == _strokes(plain.event_log[-1])
+
+    def test_default_target_is_end(self):
+        s = ReplaySession("s", zigzag_bars(150, drift=0.05), BiEngine(stroke_mode="wide"))
+        snap = s.fast_forward()
+        assert snap.bar_idx == 149
+        assert s.mode == "done" and s.current_idx == s.total_bars
+        assert s.fast_forward() is None
+        assert s.fast_forward(10) is None
+
+
+class TestSharedFastForward:
+    def test_slices_computed_range(self):
+        registry = TimelineRegistry()
+        tl = registry.acquire(zigzag_bars(150, drift=0.05), stroke_mode="wide")
+        a = SharedReplaySession.on("a", tl)
+        a.step(150)
+        b = SharedReplaySession.on("b", registry.acquire(zigzag_bars(150, drift=0.05), stroke_mode="wide"))
+        b.step(5)
+        computed = tl.computed_bars
+        snap = b.fast_forward()
+        assert tl.computed_bars == computed
+        assert b.engine is None and b.current_idx == 150
+        assert _strokes(snap) == _strokes(tl.log[-1])
+        net = diff_strokes(tl.log[4].strokes, snap.strokes, bar_idx=149, bar_ts=snap.bar_ts)
+        assert [e.event_type for e in snap.events] == [e.event_type for e in net]
+        # 共享快照未被改写
+        assert snap is not tl.log[-1]
+
+    def test_private_engine_beyond_timeline(self):
+        registry = TimelineRegistry()
+        tl = registry.acquire(zigzag_bars(150, drift=0.05), stroke_mode="wide")
+        s = SharedReplaySession.on("s", tl)
+        s.step(20)
+        snap = s.fast_forward(129)
+        assert tl.computed == 20
+        assert s.engine is not None and s.current_idx == 130
+
+        plain = ReplaySession("p", zigzag_bars(150, drift=0.05), BiEngine(stroke_mode="wide"))
+        plain.step(140)
+        s.step(10)
+        assert _strokes(s.event_log[-1]) == _strokes(plain.event_log[-1])
+        assert _strokes(snap) == _strokes(plain.event_log[129])
+
+        restored = pickle.loads(pickle.dumps(s))
+        registry.reattach(restored)
+        assert restored.engine is not None and restored.current_idx == 140
+
+        # seek 回到共享时间线
+        s.seek(59)
+        assert s.engine is None and s.current_idx == 60
+        assert len(s.event_log) == 60 and tl.computed == 60
+
+
+class TestOrchestratorFastForward:
+    def test_aligns_higher_tf(self):
+        stepped = TFOrchestrator("a", zigzag_bars(150, drift=0.05), ["1m", "5m"])
+        stepped.step(150)
+        fast = TFOrchestrator("b", zigzag_bars(150, drift=0.05), ["1m", "5m"])
+        fast.step(3)
+        fast.bus.drain()
+        result = fast.fast_forward()
+        assert set(result) == {"1m", "5m"}
+        for tf in ("1m", "5m"):
+            assert fast.sessions[tf].current_idx == stepped.sessions[tf].current_idx
+            assert _strokes(result[tf]) == _strokes(stepped.sessions[tf].event_log[-1])
+        assert fast.bus.drain()
+        assert fast.fast_forward() == {}
+
+
+class TestGatewayFastForward:
+    def test_rest(self, client):
+        sid = client.post("/api/replay/start", json={"symbol": "CL", "tf": "1m"}).json()["session_id"]
+        client.post("/api/replay/step", json={"session_id": sid, "count": 5})
+        r = client.post("/api/replay/fast_forward", json={"session_id": sid}).json()
+        assert r["bar_idx"] == 149 and r["skipped"] == 145
+        assert r["snapshot"]["type"] == "snapshot" and r["snapshot"]["strokes"]
+        assert r["events"]
+        status = client.get("/api/replay/status", params={"session_id": sid}).json()
+        assert status["current_idx"] == 150 and status["mode"] == "done"
+
+        # 已在末尾：不跨过 bar，可按版本取增量快照
+        again = client.post("/api/replay/fast_forward", json={
+            "session_id": sid, "base_version": r["snapshot"]["version"],
+        }).json()
+        assert again["skipped"] == 0 and again["events"] == []
+        assert again["snapshot"]["type"] == "snapshot_delta"
+
+    def test_ws_single_item(self, client):
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "replay_start", "symbol": "CL", "tf": "1m"})
+            ws.receive_json()
+            ws.receive_json()
+            ws.send_json({"action": "replay_fast_forward", "target_idx": 99})
+            got = []
+            while True:
+                m = ws.receive_json()
+                got.append(m)
+                if m["type"] == "replay_status":
+                    break
+        types = [m["type"] for m in got]
+        assert "bar" not in types
+        assert types.count("snapshot") == 1
+        assert types[-2:] == ["snapshot", "replay_status"]
+        assert set(types[:-2]) == {"event"}
+        assert got[-2]["bar_idx"] == 99
+        assert got[-1]["current_idx"] == 100 and got[-1]["mode"] == "idle"
+        assert "feed_seq" in got[-1]
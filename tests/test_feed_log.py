@@ -0,0 +1,129 @@
+"""会话推送日志与 WS 断线恢复测试
+
+验证：
+  - FeedLog 分配递增 feed_seq、有界保留，缺口超范围返回 None
+  - 按 event_id 定位条目
+  - 网关 resume：缺口在日志内时只补发缺失条目，之后实时推送无缝衔接
+  - 缺口超出日志保留范围时改发完整快照（bar + snapshot + status）
+"""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+
+import newchan.gateway as gw
+from newchan.feed_log import FeedLog
+from tests.conftest import ws_start, ws_step_frames
+
+
+class TestFeedLog:
+    def test_append_and_since(self):
+        log = FeedLog(max_items=3)
+        for i in range(5):
+            msgs = [{"type": "bar", "idx": i}, {"type": "replay_status"}]
+            assert log.append(msgs) == i + 1
+            assert msgs[-1]["feed_seq"] == i + 1 and "feed_seq" not in msgs[0]
+        assert len(log) == 3 and log.first_seq == 3 and log.last_seq == 5
+        assert [seq for seq, _ in log.since(3)] == [4, 5]
+        assert log.since(2) is not None and len(log.since(2)) == 3
+        assert log.since(5) == []
+        assert log.since(1) is None  # seq 2 已淘汰
+        assert log.since(9) is None  # 来自其他日志实例
+
+    def test_seq_of_event(self):
+        log = FeedLog()
+        log.append([{"type": "event", "event_id": "a"}])
+        log.append([{"type": "bar"}, {"type": "event", "event_id": "b"}])
+        assert log.seq_of_event("b") == 2
+        assert log.seq_of_event("zz") is None
+        assert log.seq_of_event("") is None
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            FeedLog(max_items=0)
+
+
+class TestWsResume:
+    def test_resume_replays_missing_items(self, client):
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()  # feed_config
+            sid = ws_start(ws)
+            frames = ws_step_frames(ws, 10)
+        last_seq = frames[-1]["feed_seq"]
+        assert last_seq == 10
+
+        # 断线期间继续步进
+        client.post("/api/replay/step", json={"session_id": sid, "count": 5})
+
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "resume", "session_id": sid, "last_seq": last_seq})
+            resumed = ws.receive_json()
+            assert resumed["type"] == "resumed" and not resumed["snapshot"]
+            assert resumed["from_seq"] == 10 and resumed["to_seq"] == 11
+            assert resumed["replayed"] == 1
+            missed = []
+            while True:
+                msg = ws.receive_json()
+                missed.append(msg)
+                if msg["type"] == "replay_status":
+                    break
+            assert [m["idx"] for m in missed if m["type"] == "bar"] == list(range(10, 15))
+            assert missed[-1]["feed_seq"] == 11
+
+            # 绑定已恢复：后续实时推送衔接
+            live = ws_step_frames(ws, 1)
+            assert [m["idx"] for m in live if m["type"] == "bar"] == [15]
+            assert live[-1]["feed_seq"] == 12
+
+    def test_resume_by_event_id(self, client):
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()  # feed_config
+            sid = ws_start(ws)
+            frames = ws_step_frames(ws, 40)
+        event = next(f for f in frames if f["type"] == "event")
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "resume", "session_id": sid, "last_event_id": event["event_id"]})
+            resumed = ws.receive_json()
+            assert not resumed["snapshot"]
+            bars = []
+            for _ in range(resumed["replayed"]):
+                while True:
+                    msg = ws.receive_json()
+                    if msg["type"] == "bar":
+                        bars.append(msg["idx"])
+                    if msg["type"] == "replay_status":
+                        break
+            # 从事件所在条目起重发到末尾
+            assert bars[0] <= event["bar_idx"] and bars[-1] == 39
+
+    def test_gap_beyond_log_sends_snapshot(self, client):
+        with patch.object(gw, "WS_RESUME_LOG", 3):
+            with client.websocket_connect("/ws/feed") as ws:
+                ws.receive_json()  # feed_config
+                sid = ws_start(ws)
+                ws_step_frames(ws, 10)
+            with client.websocket_connect("/ws/feed") as ws:
+                ws.receive_json()
+                ws.send_json({"action": "resume", "session_id": sid, "last_seq": 2})
+                resumed = ws.receive_json()
+                assert resumed["snapshot"] is True and resumed["to_seq"] == 10
+                msgs = []
+                while True:
+                    msg = ws.receive_json()
+                    msgs.append(msg)
+                    if msg["type"] == "replay_status":
+                        break
+                assert [m["idx"] for m in msgs if m["type"] == "bar"] == list(range(10))
+                assert msgs[-2]["type"] == "snapshot"
+                assert msgs[-1]["feed_seq"] == 10
+
+    def test_resume_unknown_session(self, client):
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "resume", "session_id": "nope", "last_seq": 3})
+            err = ws.receive_json()
+            assert err["type"] == "error" and err["code"] == "session_not_found"
@@ -0,0 +1,180 @@
+"""拉取任务调度测试
+
+验证：
+  - date_chunks：按天数切成相邻区间
+  - 进度：逐块调用 fetch，记录完成块数与新增行数
+  - 并发：工作线程数与每数据源并发上限生效；同一品种 / 周期不并行
+  - 去重：排队中合并日期范围；运行中且覆盖新请求时返回同一任务
+  - 取消：排队任务立即取消；运行中的任务在当前块后停止
+  - 异常记为 error；历史落盘，重启后未完成任务记为 interrupted
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from newchan.fetch_jobs import FetchScheduler, date_chunks
+
+
+class FakeFetch:
+    """记录调用与并发度；gate 未打开时每块阻塞。"""
+
+    def __init__(self, rows_per_chunk: int = 10, block: bool = False) -> None:
+        self.calls: list[tuple[str, str, str, str]] = []
+        self.rows: dict[str, int] = {}
+        self.rows_per_chunk = rows_per_chunk
+        self.gate = threading.Event()
+        if not block:
+            self.gate.set()
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, symbol, interval, start, end):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.calls.append((symbol, interval, start, end))
+        try:
+            self.gate.wait(5)
+            key = f"{symbol}_{interval}_raw"
+            with self.lock:
+                self.rows[key] = self.rows.get(key, 0) + self.rows_per_chunk
+                return key, self.rows[key]
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def _no_cache(tmp_path):
+    from newchan import cache as cache_mod
+
+    with patch.object(cache_mod, "_cache_dir", return_value=tmp_path):
+        yield
+
+
+def _wait_until(pred, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not pred():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+class TestChunks:
+    def test_date_chunks(self):
+        assert date_chunks("2024-01-01", "2024-01-10", 4) == [
+            ("2024-01-01", "2024-01-05"), ("2024-01-05", "2024-01-09"), ("2024-01-09", "2024-01-10"),
+        ]
+        assert date_chunks("2024-01-01", "2024-01-01", 4) == []
+
+
+class TestScheduler:
+    def test_progress(self):
+        fetch = FakeFetch()
+        s = FetchScheduler(fetch=fetch, chunk_days=10)
+        job, deduped = s.submit("cl", "1min", start="2024-01-01", end="2024-01-31")
+        assert not deduped and job.symbol == "CL"
+        assert s.join(5)
+        d = job.to_dict()
+        assert d["status"] == "done"
+        assert (d["chunks_done"], d["chunks_total"], d["progress"]) == (3, 3, 1.0)
+        assert d["rows_added"] == 30 and d["total_rows"] == 30
+        assert [c[2:] for c in fetch.calls] == [
+            ("2024-01-01", "2024-01-11"), ("2024-01-11", "2024-01-21"), ("2024-01-21", "2024-01-31"),
+        ]
+        with pytest.raises(ValueError):
+            s.submit("CL", start="2024-02-01", end="2024-01-01")
+
+    def test_provider_limit(self):
+        fetch = FakeFetch(block=True)
+        s = FetchScheduler(fetch=fetch, workers=3, per_provider=1, chunk_days=100)
+        for sym in ("CL", "GC", "ES"):
+            s.submit(sym, start="2024-01-01", end="2024-02-01")
+        s.submit("NQ", start="2024-01-01", end="2024-02-01", provider="other")
+        _wait_until(lambda: fetch.active == 2)
+        assert s.metrics()["running"] == {"databento": 1, "other": 1}
+        fetch.gate.set()
+        assert s.join(5)
+        assert fetch.max_active == 2
+
+    def test_dedup(self):
+        fetch = FakeFetch(block=True)
+        s = FetchScheduler(fetch=fetch, workers=1, chunk_days=1000)
+        running, _ = s.submit("CL", start="2024-01-01", end="2024-06-01")
+        _wait_until(lambda: running.status == "running")
+        # 运行中且覆盖
+        same, deduped = s.submit("CL", start="2024-02-01", end="2024-03-01")
+        assert same is running and deduped
+        # 不覆盖：新排队任务，之后的请求合并到它
+        queued, deduped = s.submit("CL", start="2023-01-01", end="2023-06-01")
+        assert queued is not running and not deduped
+        merged, deduped = s.submit("CL", start="2022-06-01", end="2023-02-01")
+        assert merged is queued and deduped
+        assert (queued.start, queued.end, queued.merged) == ("2022-06-01", "2023-06-01", 1)
+        assert s.metrics()["deduped"] == 2
+        fetch.gate.set()
+        assert s.join(5)
+
+    def test_same_symbol_serialized(self):
+        fetch = FakeFetch(block=True)
+        s = FetchScheduler(fetch=fetch, workers=2, per_provider=2, chunk_days=1000)
+        a, _ = s.submit("CL", start="2024-01-01", end="2024-02-01")
+        _wait_until(lambda: a.status == "running")
+        b, _ = s.submit("CL", start="2023-01-01", end="2023-02-01")
+        time.sleep(0.05)
+        assert b.status == "queued"
+        fetch.gate.set()
+        assert s.join(5)
+        assert fetch.max_active == 1
+
+    def test_cancel(self):
+        fetch = FakeFetch(block=True)
+        s = FetchScheduler(fetch=fetch, workers=1, chunk_days=10)
+        running, _ = s.submit("CL", start="2024-01-01", end="2024-03-01")
+        queued, _ = s.submit("GC", start="2024-01-01", end="2024-03-01")
+        _wait_until(lambda: running.status == "running")
+        assert s.cancel(queued.job_id).status == "cancelled"
+        s.cancel(running.job_id)
+        fetch.gate.set()
+        assert s.join(5)
+        assert running.status == "cancelled" and running.chunks_done == 1
+        assert [c[0] for c in fetch.calls] == ["CL"]
+        assert s.cancel("nope") is None
+
+    def test_error(self):
+        def boom(*a, **k):
+            raise RuntimeError("api down")
+
+        s = FetchScheduler(fetch=boom)
+        job, _ = s.submit("CL", start="2024-01-01", end="2024-01-05")
+        assert s.join(5)
+        assert job.status == "error" and job.error == "api down"
+
+    def test_history(self, tmp_path):
+        path = tmp_path / "jobs.json"
+        fetch = FakeFetch(block=True)
+        s = FetchScheduler(fetch=fetch, workers=1, chunk_days=1000, history_path=path)
+        done, _ = s.submit("CL", start="2024-01-01", end="2024-01-05")
+        pending, _ = s.submit("GC", start="2024-01-01", end="2024-01-05")
+        _wait_until(lambda: done.status == "running")
+        s.cancel(pending.job_id)
+        fetch.gate.set()
+        assert s.join(5)
+        records = json.loads(path.read_text(encoding="utf-8"))
+        assert {r["job_id"]: r["status"] for r in records} == {
+            done.job_id: "done", pending.job_id: "cancelled",
+        }
+
+        # 落盘时仍在运行的任务：重启后记为 interrupted
+        records.append({**records[0], "job_id": "x1", "status": "running"})
+        path.write_text(json.dumps(records), encoding="utf-8")
+        restored = FetchScheduler(fetch=fetch, history_path=path)
+        assert restored.get(done.job_id).total_rows == 10
+        assert restored.get("x1").status == "interrupted"
+        assert restored.latest("cl", "1min").job_id == "x1"
@@ -0,0 +1,118 @@
+"""gateway.py 回放端点集成测试（TestClient，数据源 mock）。
+
+验证：
+  - REST step / seek 在工作线程执行后正确返回
+  - WS 客户端经会话推送总线按 bar → event → status 顺序收到帧
+  - batch / msgpack 推送格式协商，批量帧内容与逐条推送一致
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from newchan.contracts import ws_codec
+from tests.conftest import ws_start, ws_step_frames
+
+
+def _recv_until(ws, msg_type: str, limit: int = 500) -> list[dict]:
+    msgs = []
+    for _ in range(limit):
+        msg = ws.receive_json()
+        msgs.append(msg)
+        if msg["type"] == msg_type:
+            return msgs
+    raise AssertionError(f"未收到 {msg_type}")
+
+
+class TestRestReplay:
+    def test_step_and_seek(self, client):
+        sid = client.post("/api/replay/start", json={"symbol": "CL"}).json()["session_id"]
+        r = client.post("/api/replay/step", json={"session_id": sid, "count": 30})
+        assert r.status_code == 200
+        assert r.json()["bar_idx"] == 29
+
+        r = client.post("/api/replay/seek", json={"session_id": sid, "target_idx": 50})
+        body = r.json()
+        assert body["bar_idx"] == 50
+        assert body["snapshot"]["type"] == "snapshot"
+
+        status = client.get("/api/replay/status", params={"session_id": sid}).json()
+        assert status["current_idx"] == 51
+
+    def test_multi_tf_step(self, client):
+        sid = client.post("/api/replay/start", json={
+            "symbol": "CL", "tf": "1m", "timeframes": ["1m", "5m"],
+        }).json()["session_id"]
+        r = client.post("/api/replay/step", json={"session_id": sid, "count": 40})
+        assert r.json()["bar_idx"] == 39
+
+
+class TestWsFeed:
+    def test_step_frames_in_order(self, client):
+        with client.websocket_connect("/ws/feed") as ws:
+            assert ws.receive_json() == {
+                "type": "feed_config", "encoding": "json", "batch": False, "overflow": "coalesce",
+            }
+            ws.send_json({"action": "replay_start", "symbol": "CL", "tf": "1m"})
+            started = ws.receive_json()
+            assert started["type"] == "replay_started"
+            ws.receive_json()  # 初始 status
+
+            for _ in range(40):
+                ws.send_json({"action": "replay_step"})
+            frames: list[dict] = []
+            for _ in range(40):
+                frames.extend(_recv_until(ws, "replay_status"))
+
+            bars = [f for f in frames if f["type"] == "bar"]
+            assert [b["idx"] for b in bars] == list(range(40))
+            assert any(f["type"] == "event" for f in frames)
+            # 每个事件都紧随其所属 bar 之后
+            last_bar = -1
+            for f in frames:
+                if f["type"] == "bar":
+                    last_bar = f["idx"]
+                elif f["type"] == "event":
+                    assert f["bar_idx"] <= last_bar
+
+
+class TestWsFormats:
+    def _flat(self, frames):
+        out = []
+        for f in frames:
+            out.extend(f["messages"] if f["type"] == "batch" else [f])
+        return out
+
+    def test_batch_frames_match_plain(self, client):
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()
+            ws_start(ws)
+            plain = ws_step_frames(ws, 40)
+        with client.websocket_connect("/ws/feed?batch=1") as ws:
+            assert ws.receive_json()["batch"] is True
+            ws_start(ws)
+            batched = ws_step_frames(ws, 40)
+
+        assert len(batched) == 40
+        assert all(f["type"] == "batch" for f in batched)
+        assert [m["type"] for m in batched[0]["messages"]][0] == "bar"
+        assert batched[0]["messages"][-1]["type"] == "replay_status"
+        assert self._flat(batched) == plain
+
+    def test_msgpack_binary_frames(self, client):
+        pytest.importorskip("msgpack")
+        with client.websocket_connect("/ws/feed?batch=1&encoding=msgpack") as ws:
+            assert ws.receive_json() == {
+                "type": "feed_config", "encoding": "msgpack", "batch": True, "overflow": "coalesce",
+            }
+            ws.send_json({"action": "replay_start", "symbol": "CL", "tf": "1m"})
+            started = ws_codec.decode(ws.receive_bytes())
+            assert started["type"] == "replay_started"
+            ws_codec.decode(ws.receive_bytes())
+            frames = ws_step_frames(ws, 30, lambda w: ws_codec.decode(w.receive_bytes()))
+        bars = [m for m in self._flat(frames) if m["type"] == "bar"]
+        assert [b["idx"] for b in bars] == list(range(30))
+
+    def test_unknown_encoding_falls_back_to_json(self, client):
+        with client.websocket_connect("/ws/feed?encoding=protobuf") as ws:
+            assert ws.receive_json()["encoding"] == "json"
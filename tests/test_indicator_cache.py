@@ -0,0 +1,119 @@
+"""技术指标流式实现 + 增量缓存测试
+
+验证：
+  - 每个注册指标的流式实现：从头逐根更新、或由 seed 恢复后续算，
+    输出与批量函数一致（含 NaN 位置）
+  - IndicatorCache：同一 DataFrame 命中；追加 bar / 末根更新只增量计算且结果与
+    批量一致；历史改写回退批量；参数不同互不影响；未知指标抛 ValueError；
+    未声明 stream 的指标直接批量计算；LRU 淘汰
+"""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from newchan.indicator_cache import IndicatorCache
+from newchan.indicators import INDICATOR_REGISTRY, compute_indicator, resolve_params
+
+
+def _df(n: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    close[40:60] = close[40]  # 平台段：RSI 0/0、布林带零宽
+    idx = pd.date_range("2025-01-02 09:00", periods=n, freq="5min")
+    return pd.DataFrame({
+        "open": close, "high": close + 1, "low": close - 1, "close": close,
+        "volume": np.ones(n),
+    }, index=idx)
+
+
+def _assert_same(got: pd.DataFrame, want: pd.DataFrame) -> None:
+    assert list(got.columns) == list(want.columns)
+    assert got.index.equals(want.index)
+    np.testing.assert_allclose(got.to_numpy(), want.to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+NAMES = list(INDICATOR_REGISTRY)
+
+
+class TestStreams:
+    @pytest.mark.parametrize("name", NAMES)
+    @pytest.mark.parametrize("split", [0, 1, 7, 150])
+    def test_matches_bulk(self, name, split):
+        df = _df(400)
+        reg = INDICATOR_REGISTRY[name]
+        p = resolve_params(name)
+        stream = reg["stream"](**p)
+        stream.seed(df["close"].iloc[:split])
+        rows = [stream.update(float(c)) for c in df["close"].iloc[split:]]
+        got = pd.DataFrame(rows, columns=list(stream.columns), index=df.index[split:])
+        _assert_same(got, compute_indicator(name, df).iloc[split:])
+
+
+class TestCache:
+    @pytest.mark.parametrize("name", NAMES)
+    def test_append_and_update(self, name):
+        cache = IndicatorCache()
+        full = _df(300)
+        df = full.iloc[:200].copy()
+        out = cache.compute("k", name, df)
+        _assert_same(out, compute_indicator(name, df))
+        assert cache.compute("k", name, df) is out
+        assert cache.metrics()["hits"] == 1
+
+        # 末根更新（进行中的周期 bar）
+        df2 = df.copy()
+        df2.iloc[-1, df2.columns.get_loc("close")] += 2.5
+        _assert_same(cache.compute("k", name, df2), compute_indicator(name, df2))
+        # 追加新 bar
+        for n in (201, 230, 300):
+            _assert_same(cache.compute("k", name, full.iloc[:n].copy()), compute_indicator(name, full.iloc[:n]))
+        m = cache.metrics()
+        assert m["builds"] == 5 and m["incremental_builds"] == 4
+        assert m["streamed_bars"] == 1 + 2 + 30 + 71
+
+    def test_rewrite_falls_back(self):
+        cache = IndicatorCache()
+        df = _df(100)
+        cache.compute("k", "EMA", df)
+        changed = df.copy()
+        changed.iloc[10, changed.columns.get_loc("close")] += 1
+        _assert_same(cache.compute("k", "EMA", changed), compute_indicator("EMA", changed))
+        # 缩短同样回退批量
+        _assert_same(cache.compute("k", "EMA", changed.iloc[:50]), compute_indicator("EMA", changed.iloc[:50]))
+        assert cache.metrics()["incremental_builds"] == 0
+
+    def test_params_and_errors(self):
+        cache = IndicatorCache()
+        df = _df(80)
+        a = cache.compute("k", "SMA", df, {"period": "5"})
+        b = cache.compute("k", "SMA", df)
+        _assert_same(a, compute_indicator("SMA", df, {"period": 5}))
+        _assert_same(b, compute_indicator("SMA", df))
+        assert len(cache) == 2
+        with pytest.raises(ValueError):
+            cache.compute("k", "NOPE", df)
+        with pytest.raises(ValueError):
+            cache.compute("k", "SMA", df, {"period": "x"})
+
+    def test_without_stream(self):
+        reg = {**INDICATOR_REGISTRY["SMA"]}
+        del reg["stream"]
+        cache = IndicatorCache()
+        df = _df(50)
+        with patch.dict(INDICATOR_REGISTRY, {"PLAIN": reg}):
+            _assert_same(cache.compute("k", "PLAIN", df), compute_indicator("SMA", df))
+        assert len(cache) == 0
+
+    def test_lru(self):
+        cache = IndicatorCache(max_entries=2)
+        df = _df(80)
+        for key in ("a", "b", "c"):
+            cache.compute(key, "EMA", df)
+        assert len(cache) == 2 and cache.metrics()["evictions"] == 1
+        with pytest.raises(ValueError):
+            IndicatorCache(max_entries=0)
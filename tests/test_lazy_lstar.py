@@ -0,0 +1,181 @@
+"""RecursiveOrchestrator 惰性 L* 与 LStarSelector 增量选择测试
+
+验证：
+  - snap.lstar 与 select_lstar_from_recursive_snapshot 逐 bar 一致（数据会形成中枢，部分快照 L* 非空）
+  - 未读取 snap.lstar 时不做任何 L* 计算
+  - 结构不变、仅价格变化时不重建中枢判定
+  - 乱序读取旧快照结果仍正确；手动赋值覆盖惰性计算
+  - 未解析的快照可 pickle 往返，且不使调度器保持存活
+"""
+
+from __future__ import annotations
+
+import gc
+import pickle
+import weakref
+from datetime import datetime, timedelta, timezone
+
+from newchan.a_level_fsm_adapter import (
+    LStarSelector,
+    select_lstar_from_recursive_snapshot,
+)
+from newchan.a_level_fsm_newchan import Regime
+from newchan.a_segment_v0 import Segment
+from newchan.a_zhongshu_v1 import Zhongshu
+from newchan.bi_engine import BiEngineSnapshot
+from newchan.core.recursion.buysellpoint_state import BuySellPointSnapshot
+from newchan.core.recursion.move_state import MoveSnapshot
+from newchan.core.recursion.segment_state import SegmentSnapshot
+from newchan.core.recursion.zhongshu_state import ZhongshuSnapshot
+from newchan.orchestrator.recursive import (
+    RecursiveOrchestrator,
+    RecursiveOrchestratorSnapshot,
+)
+from newchan.types import Bar
+
+
+# 线段端点：每段由 上/下/上（或 下/上/下）三笔构成，前三段重叠成中枢后
+# 向下离开，再在更低 / 更高处各形成中枢 —— 约 250 根后出现 L*
+_SEGMENT_ENDS = [100, 130, 105, 128, 102, 126, 80, 110, 86, 108, 84, 106, 140, 115, 138, 112, 136, 100, 125]
+
+
+def _bars(n: int | None = None, per_stroke: int = 6) -> list[Bar]:
+    """按线段端点插值生成 bar（每笔 per_stroke 根），取前 n 根。"""
+    points = [float(_SEGMENT_ENDS[0])]
+    for a, b in zip(_SEGMENT_ENDS, _SEGMENT_ENDS[1:]):
+        d = b - a
+        points += [a + 0.6 * d, a + 0.35 * d, b]
+    bars: list[Bar] = []
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    prev = points[0]
+    for a, b in zip(points, points[1:]):
+        for j in range(1, per_stroke + 1):
+            p = a + (b - a) * j / per_stroke
+            bars.append(Bar(
+                ts=base + timedelta(minutes=len(bars)),
+                open=prev, high=max(prev, p) + 0.2, low=min(prev, p) - 0.2, close=p,
+            ))
+            prev = p
+    return bars[:n]
+
+
+class TestLazyLStar:
+    def test_matches_eager_selection(self):
+        orch = RecursiveOrchestrator()
+        resolved = 0
+        for bar in _bars():
+            snap = orch.process_bar(bar)
+            assert snap.last_price == bar.close
+            assert snap.lstar == select_lstar_from_recursive_snapshot(snap, bar.close)
+            resolved += snap.lstar is not None
+        assert resolved > 20
+
+    def test_not_computed_until_accessed(self):
+        orch = RecursiveOrchestrator()
+        for bar in _bars(120):
+            orch.process_bar(bar)
+        assert orch._lstar_selector is None
+
+    def test_old_snapshot_resolved_late(self):
+        orch = RecursiveOrchestrator()
+        snaps = [orch.process_bar(bar) for bar in _bars()]
+        picked = snaps[::3]
+        for snap in reversed(picked):
+            assert snap.lstar == select_lstar_from_recursive_snapshot(snap, snap.last_price)
+        assert any(snap.lstar is not None for snap in picked)
+
+    def test_pickle_roundtrip_unresolved(self):
+        orch = RecursiveOrchestrator()
+        snaps = [orch.process_bar(bar) for bar in _bars()]
+        for snap in snaps[-5:]:
+            restored = pickle.loads(pickle.dumps(snap))
+            assert restored.lstar is not None
+            assert restored.lstar == snap.lstar
+
+    def test_snapshot_does_not_keep_orchestrator_alive(self):
+        orch = RecursiveOrchestrator()
+        snap = None
+        for bar in _bars():
+            snap = orch.process_bar(bar)
+        ref = weakref.ref(orch)
+        del orch
+        gc.collect()
+        assert ref() is None
+        # 调度器已回收：按 last_price 直接选择
+        assert snap.lstar == select_lstar_from_recursive_snapshot(snap, snap.last_price)
+        assert snap.lstar is not None
+
+    def test_setter_overrides(self):
+        orch = RecursiveOrchestrator()
+        snap = orch.process_bar(_bars(1)[0])
+        snap.lstar = None
+        assert snap.lstar is None
+        assert orch._lstar_selector is None
+
+
+def _settled_snap(zd: float = 12.0, zg: float = 18.0):
+    segs = [
+        Segment(s0=i * 3, s1=i * 3 + 2, i0=i * 6, i1=i * 6 + 5,
+                direction="up" if i % 2 == 0 else "down",
+                high=hi, low=lo, confirmed=True)
+        for i, (hi, lo) in enumerate([(20, 10), (18, 8), (22, 12), (19, 9)])
+    ]
+    zs = Zhongshu(
+        zd=zd, zg=zg, seg_start=0, seg_end=2, seg_count=3, settled=True,
+        break_seg=3, break_direction="down", first_seg_s0=0, last_seg_s1=10,
+        gg=22.0, dd=8.0,
+    )
+    return _empty_snap(segs, [zs])
+
+
+def _empty_snap(segments, zhongshus) -> RecursiveOrchestratorSnapshot:
+    return RecursiveOrchestratorSnapshot(
+        bar_idx=0,
+        bar_ts=0.0,
+        bi_snapshot=BiEngineSnapshot(
+            bar_idx=0, bar_ts=0.0, strokes=[], events=[],
+            n_merged=0, n_fractals=0,
+        ),
+        seg_snapshot=SegmentSnapshot(bar_idx=0, bar_ts=0.0, segments=segments, events=[]),
+        zs_snapshot=ZhongshuSnapshot(bar_idx=0, bar_ts=0.0, zhongshus=zhongshus, events=[]),
+        move_snapshot=MoveSnapshot(bar_idx=0, bar_ts=0.0, moves=[], events=[]),
+        bsp_snapshot=BuySellPointSnapshot(bar_idx=0, bar_ts=0.0, buysellpoints=[], events=[]),
+        recursive_snapshots=[],
+    )
+
+
+class TestLStarSelector:
+    def test_price_only_change_reuses_structure(self):
+        snap = _settled_snap()
+        selector = LStarSelector()
+        results = []
+        for price in (5.0, 12.0, 15.0, 18.0, 30.0):
+            got = selector.select(snap, price)
+            assert got == select_lstar_from_recursive_snapshot(snap, price)
+            results.append(got)
+        assert selector.rebuilds == 1
+        assert results[2] is not None
+        assert results[2].regime == Regime.SETTLE_ANCHOR_IN_CORE
+
+    def test_structure_change_rebuilds(self):
+        selector = LStarSelector()
+        selector.select(_settled_snap(), 15.0)
+        # 等值的新快照（新列表对象）不触发重建
+        selector.select(_settled_snap(), 16.0)
+        assert selector.rebuilds == 1
+        moved = _settled_snap(zd=20.0, zg=21.0)
+        assert selector.select(moved, 15.0) == select_lstar_from_recursive_snapshot(moved, 15.0)
+        assert selector.rebuilds == 2
+        selector.reset()
+        selector.select(moved, 15.0)
+        assert selector.rebuilds == 3
+
+    def test_orchestrator_stream_rebuild_count(self):
+        orch = RecursiveOrchestrator()
+        selector = LStarSelector()
+        snaps = [orch.process_bar(bar) for bar in _bars()]
+        for snap in snaps:
+            assert selector.select(snap, snap.last_price) == (
+                select_lstar_from_recursive_snapshot(snap, snap.last_price)
+            )
+        assert selector.rebuilds < len(snaps)
@@ -0,0 +1,200 @@
+"""实时 bar 推送测试
+
+验证：
+  - LiveTail：序号递增、按品种过滤、环形淘汰、同时间戳计为更新；wait 超时返回空、
+    其他线程发布后被唤醒
+  - LiveBarAggregator：以 resample 结果为种子逐根合并，结果与整段 resample_ohlc 一致；
+    已计入种子 / 乱序的 bar 被忽略；同一分钟的更新不重复累计 volume
+  - /api/live/stream：先发当前 bar，新 bar 按 tf 聚合推送（id = 尾部序号），
+    源文件版本变化发 overlay 事件；Last-Event-ID 补发
+  - /api/realtime：返回尾部中 since 之后的 bar
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from newchan.b_timeframe import resample_ohlc
+from newchan.live_tail import LiveBarAggregator, LiveTail, bucket_label, make_live_bar
+
+
+def _df(n: int, start: str = "2025-01-02 09:00") -> pd.DataFrame:
+    idx = pd.date_range(start, periods=n, freq="1min")
+    base = 100.0 + np.sin(np.arange(n) / 3.0) * 5
+    return pd.DataFrame({
+        "open": base, "high": base + 1.0, "low": base - 1.0, "close": base + 0.25,
+        "volume": np.arange(n, dtype=float) + 1,
+    }, index=idx)
+
+
+def _bars(df: pd.DataFrame) -> list[dict]:
+    return [
+        make_live_bar(ts, r.open, r.high, r.low, r.close, r.volume)
+        for ts, r in zip(df.index, df.itertuples())
+    ]
+
+
+class TestLiveTail:
+    def test_since_filters_symbol(self):
+        tail = LiveTail(maxlen=3)
+        b = _bars(_df(4))
+        assert tail.publish("cl", b[0]) == 1
+        tail.publish("GC", b[0])
+        tail.publish("CL", b[1])
+        assert [s for s, _ in tail.since("CL", 0)] == [1, 3]
+        assert [s for s, _ in tail.since("CL", 1)] == [3]
+        tail.publish("CL", b[1])
+        # maxlen=3：序号 1 已淘汰
+        assert [s for s, _ in tail.since("CL", 0)] == [3, 4]
+        assert tail.metrics()["updates"] == 1
+
+    def test_wait(self):
+        tail = LiveTail()
+        assert tail.wait("CL", 0, timeout=0.01) == []
+        bar = _bars(_df(1))[0]
+        threading.Timer(0.05, lambda: tail.publish("CL", bar)).start()
+        got = tail.wait("CL", 0, timeout=5.0)
+        assert [s for s, _ in got] == [1]
+
+
+class TestAggregator:
+    @pytest.mark.parametrize("tf", ["1m", "5m", "1h"])
+    def test_matches_resample(self, tf):
+        df = _df(150)
+        prefix = df.iloc[:37]
+        seed_frame = resample_ohlc(prefix, tf)
+        last = seed_frame.iloc[-1]
+        seed = make_live_bar(seed_frame.index[-1], last.open, last.high, last.low, last.close, last.volume)
+        agg = LiveBarAggregator(tf, seed=seed, seed_last_ts=prefix.index[-1])
+
+        out: dict[pd.Timestamp, dict] = {}
+        for bar in _bars(df):  # 含已计入种子的前缀：应被忽略
+            got = agg.push(bar)
+            if got is not None:
+                out[got[1]["ts"]] = got[1]
+        want = resample_ohlc(df, tf)
+        want = want[want.index >= seed_frame.index[-1]]
+        if tf != "1m":
+            assert list(out) == list(want.index)
+            for ts, row in want.iterrows():
+                got = out[ts]
+                assert (got["open"], got["high"], got["low"], got["close"], got["volume"]) == \
+                    pytest.approx((row.open, row.high, row.low, row.close, row.volume))
+        else:
+            assert list(out) == list(want.index[1:])
+
+    def test_update_same_minute(self):
+        b = _bars(_df(2))
+        agg = LiveBarAggregator("5m")
+        assert agg.push(b[0])[0] == "bar"
+        assert agg.push(b[1])[0] == "update"
+        revised = {**b[1], "close": 200.0, "high": 201.0}
+        kind, cur = agg.push(revised)
+        assert kind == "update"
+        assert cur["volume"] == b[0]["volume"] + b[1]["volume"]
+        assert cur["close"] == 200.0 and cur["high"] == 201.0
+        assert agg.push(b[0]) is None
+
+    def test_bucket_label_week(self):
+        ts = pd.Timestamp("2025-01-02 09:00")
+        assert bucket_label(ts, "1w") == resample_ohlc(_df(1), "1w").index[0]
+
+
+def _query(params: dict):
+    mock = MagicMock()
+    mock.get = lambda key, default="": params.get(key, default)
+    return mock
+
+
+def _events(chunks: list[str]) -> list[tuple[str | None, str, dict]]:
+    out = []
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n") if not line.startswith(":"))
+        if "event" in fields:
+            out.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return out
+
+
+class TestLiveRoutes:
+    def _setup(self, tmp_path, df):
+        import newchan.server as srv
+        from newchan import cache as cache_mod
+        from newchan.bar_cache import FrameCache
+
+        df.to_parquet(tmp_path / "CL_1min_raw.parquet")
+        return srv, [
+            patch.object(cache_mod, "_cache_dir", return_value=tmp_path),
+            patch.object(srv, "_frame_cache", FrameCache()),
+            patch.object(srv, "_live_tail", LiveTail()),
+            patch.object(srv, "_SSE_HEARTBEAT_S", 0.01),
+            patch.object(srv, "request"),
+        ]
+
+    def test_stream(self, tmp_path):
+        df = _df(12)
+        srv, patches = self._setup(tmp_path, df)
+        for p in patches:
+            p.start()
+        try:
+            srv.request.query = _query({"symbol": "CL", "tf": "5m"})
+            srv.request.headers = {}
+            stream = srv.api_live_stream()
+            assert srv.response.content_type.startswith("text/event-stream")
+            assert next(stream).startswith("retry:")
+            (_, kind, bar), = _events([next(stream)])
+            assert kind == "bar" and bar["time"] == "2025-01-02 09:10:00"
+            assert next(stream).startswith(": ping")
+
+            more = _df(14).iloc[12:]
+            _df(14).to_parquet(tmp_path / "CL_1min_raw.parquet")
+            for b in _bars(more):
+                srv._live_tail.publish("CL", b)
+            got = _events([next(stream) for _ in range(3)])
+            assert [(i, k) for i, k, _ in got] == [("1", "update"), ("2", "update"), ("2", "overlay")]
+            want = resample_ohlc(_df(14), "5m").iloc[-1]
+            assert got[1][2]["close"] == pytest.approx(want.close)
+            assert got[1][2]["volume"] == pytest.approx(want.volume)
+            stream.close()
+
+            # 重连：Last-Event-ID 之后的 bar 补发（1m 直接推送）
+            srv.request.query = _query({"symbol": "CL", "tf": "1m"})
+            srv.request.headers = {"Last-Event-ID": "1"}
+            _df(12).to_parquet(tmp_path / "CL_1min_raw.parquet")
+            stream = srv.api_live_stream()
+            got = _events([next(stream) for _ in range(4)])
+            assert [(i, k) for i, k, _ in got][1:] == [("2", "bar"), ("2", "overlay")]
+            assert got[1][2]["time"] == "2025-01-02 09:13:00"
+            stream.close()
+
+            srv.request.query = _query({"symbol": "CL", "tf": "2m"})
+            assert "error" in json.loads(srv.api_live_stream())
+            assert srv.response.status_code == 400
+        finally:
+            for p in reversed(patches):
+                p.stop()
+
+    def test_realtime(self, tmp_path):
+        srv, patches = self._setup(tmp_path, _df(3))
+        for p in patches:
+            p.start()
+        try:
+            for b in _bars(_df(3)):
+                srv._live_tail.publish("CL", b)
+            srv.request.query = _query({"symbol": "CL", "since": "1"})
+            res = json.loads(srv.api_realtime())
+            assert [b["time"][-8:] for b in res["bars"]] == ["09:01:00", "09:02:00"]
+            assert res["next_since"] == 3
+            srv.request.query = _query({"symbol": "CL", "since": "3"})
+            assert json.loads(srv.api_realtime()) == {"bars": [], "next_since": 3}
+            # 非数字 since 按 0 处理（与 Last-Event-ID 的解析一致）
+            srv.request.query = _query({"symbol": "CL", "since": "abc"})
+            assert len(json.loads(srv.api_realtime())["bars"]) == 3
+        finally:
+            for p in reversed(patches):
+                p.stop()
@@ -0,0 +1,257 @@
+"""overlay 结果缓存与增量构建测试
+
+验证：
+  - OverlayState：追加 bar / 末根 bar 更新 / 历史改写后的增量构建与全量构建结果一致，
+    复用的前缀长度正确；MACD 参数变化时不复用
+  - OverlayCache：版本一致命中不重建，版本变化带状态重建，构建失败不写入，条目 LRU
+  - OverlayCache.delta：保留版本间的新增 / 修改 / 删除结构，合并后等于新结果；
+    版本已不保留返回 None
+  - /api/newchan/overlay：响应带 version / ETag；If-None-Match 命中回 304；
+    客户端版本一致只回 unchanged；源文件更新后增量重建，since_version 只回增量
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from newchan.ab_bridge_newchan import OverlayState, build_overlay_newchan
+from newchan.overlay_cache import OverlayCache, source_version
+
+
+def _df(n: int = 200) -> pd.DataFrame:
+    idx = pd.date_range("2025-01-02", periods=n, freq="1min")
+    phase = np.arange(n) % 24
+    mid = 100.0 + np.where(phase < 12, phase, 24 - phase) * 1.5 + np.arange(n) * 0.03
+    return pd.DataFrame({
+        "open": mid, "high": mid + 1.0, "low": mid - 1.0, "close": mid + 0.4,
+        "volume": 100.0,
+    }, index=idx)
+
+
+def _dump(result: dict) -> str:
+    return json.dumps(result, sort_keys=True)
+
+
+def _result(n: int, strokes: list[dict] | None = None) -> dict:
+    """最小 overlay 结果（供缓存测试的假 build）。"""
+    return {
+        "schema_version": "newchan_overlay_v2", "symbol": "CL", "tf": "1m", "detail": "full",
+        "lstar": None,
+        "strokes": strokes or [], "segments": [], "centers": [], "trends": [], "levels": [],
+        "macd": {"fast": 12, "slow": 26, "signal": 9, "series": [
+            {"time": t, "macd": 0.0, "signal": 0.0, "hist": 0.0} for t in range(n)
+        ]},
+    }
+
+
+def _apply(base: dict, resp: dict) -> dict:
+    """按标识字段把增量响应合并到 base（与前端 applyOverlayDelta 同语义）。"""
+    from newchan.overlay_cache import OVERLAY_STRUCTURE_KEYS
+
+    out = {**base, "lstar": resp["lstar"], "version": resp["version"]}
+    for kind, key in OVERLAY_STRUCTURE_KEYS.items():
+        items = base["macd"]["series"] if kind == "macd" else base[kind]
+        table = {it[key]: it for it in items}
+        for k in resp["removed"].get(kind, []):
+            del table[k]
+        for it in resp["changed"].get(kind, []):
+            table[it[key]] = it
+        merged = [table[k] for k in sorted(table)]
+        if kind == "macd":
+            out["macd"] = {**resp["macd"], "series": merged}
+        else:
+            out[kind] = merged
+    return out
+
+
+class TestOverlayState:
+    def test_append_matches_full(self):
+        df = _df()
+        state = OverlayState()
+        build_overlay_newchan(df.iloc[:180], state=state)
+        assert state.reused_bars == 0
+        got = build_overlay_newchan(df, state=state)
+        assert state.reused_bars == 180
+        assert _dump(got) == _dump(build_overlay_newchan(df))
+
+    def test_last_bar_update(self):
+        df = _df()
+        state = OverlayState()
+        build_overlay_newchan(df, state=state)
+        changed = df.copy()
+        changed.iloc[-1, changed.columns.get_loc("close")] += 2.0
+        got = build_overlay_newchan(changed, state=state)
+        assert state.reused_bars == len(df) - 1
+        assert _dump(got) == _dump(build_overlay_newchan(changed))
+
+    def test_rewritten_history_not_reused(self):
+        df = _df()
+        state = OverlayState()
+        build_overlay_newchan(df, state=state)
+        # limit 窗口滑动：首根即不同
+        got = build_overlay_newchan(df.iloc[5:], state=state)
+        assert state.reused_bars == 0
+        assert _dump(got) == _dump(build_overlay_newchan(df.iloc[5:]))
+
+    def test_macd_params_change(self):
+        df = _df()
+        state = OverlayState()
+        build_overlay_newchan(df, state=state)
+        got = build_overlay_newchan(df, macd_fast=6, state=state)
+        assert state.reused_bars == 0
+        assert _dump(got) == _dump(build_overlay_newchan(df, macd_fast=6))
+
+
+class TestOverlayCache:
+    def test_hit_and_rebuild(self):
+        cache = OverlayCache()
+        calls: list[OverlayState] = []
+
+        def build(state):
+            calls.append(state)
+            state.reused_bars = 7 if len(calls) > 1 else 0
+            return _result(len(calls))
+
+        assert cache.get_or_build("k", "a", build) == _result(1)
+        assert cache.get_or_build("k", "a", build) == _result(1)
+        assert cache.get_or_build("k", "b", build) == _result(2)
+        assert calls[0] is calls[1]
+        assert cache.version("k") == "b"
+        m = cache.metrics()
+        assert (m["hits"], m["builds"], m["incremental_builds"], m["reused_bars"]) == (1, 2, 1, 7)
+
+    def test_failed_build_keeps_entry(self):
+        cache = OverlayCache()
+        cache.get_or_build("k", "a", lambda s: _result(1))
+
+        def boom(state):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_build("k", "b", boom)
+        assert cache.version("k") == "a"
+        assert cache.get_or_build("k", "b", lambda s: _result(2)) == _result(2)
+
+    def test_lru(self):
+        cache = OverlayCache(max_entries=2)
+        for key in ("a", "b", "a", "c"):
+            cache.get_or_build(key, "v", lambda s: _result(0))
+        assert len(cache) == 2
+        assert cache.version("b") is None and cache.version("a") == "v"
+        assert cache.metrics()["evictions"] == 1
+        with pytest.raises(ValueError):
+            OverlayCache(max_entries=0)
+
+    def test_delta(self):
+        cache = OverlayCache(keep_versions=2)
+        s1 = [{"id": 0, "p1": 1.0}, {"id": 1, "p1": 2.0}]
+        s2 = [{"id": 0, "p1": 1.0}, {"id": 1, "p1": 2.5}, {"id": 2, "p1": 3.0}]
+        cache.get_or_build("k", "a", lambda s: _result(3, s1))
+        cache.get_or_build("k", "b", lambda s: _result(4, s2))
+        changed, removed = cache.delta("k", "a", "b")
+        assert changed["strokes"] == s2[1:]
+        assert [p["time"] for p in changed["macd"]] == [3]
+        assert removed == {}
+
+        cache.get_or_build("k", "c", lambda s: _result(2, s1[:1]))
+        changed, removed = cache.delta("k", "b", "c")
+        assert removed == {"strokes": [1, 2], "macd": [2, 3]}
+        # 只保留 2 个版本
+        assert cache.delta("k", "a", "c") is None
+        assert cache.delta("k", None, "c") is None
+        assert cache.delta("zz", "b", "c") is None
+        assert cache.metrics()["deltas"] == 2
+
+
+def _query(params: dict):
+    mock = MagicMock()
+    mock.get = lambda key, default="": params.get(key, default)
+    return mock
+
+
+def _bump(path, n: int) -> None:
+    _df(n).to_parquet(path)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+class TestOverlayRoute:
+    def test_version_and_incremental(self, tmp_path):
+        import newchan.server as srv
+        from newchan import cache as cache_mod
+        from newchan.bar_cache import FrameCache
+
+        path = tmp_path / "CL_1min_raw.parquet"
+        _df(180).to_parquet(path)
+        params = {"symbol": "CL", "tf": "1m"}
+
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path), \
+                patch.object(srv, "_frame_cache", FrameCache()), \
+                patch.object(srv, "_overlay_cache", OverlayCache()) as overlays, \
+                patch.object(srv, "request") as req:
+            req.query = _query(params)
+            req.headers = {}
+            first = json.loads(srv.api_newchan_overlay())
+            v1 = first["version"]
+            assert v1 == source_version(path.stat().st_mtime_ns)
+            assert srv.response.get_header("ETag") == f'"{v1}"'
+            assert first["strokes"]
+
+            params["version"] = v1
+            assert json.loads(srv.api_newchan_overlay()) == {"version": v1, "unchanged": True}
+            del params["version"]
+            assert json.loads(srv.api_newchan_overlay()) == first
+            assert overlays.metrics()["hits"] == 1
+
+            _bump(path, 200)
+            params["version"] = v1
+            second = json.loads(srv.api_newchan_overlay())
+            assert second["version"] != v1
+            assert len(second["macd"]["series"]) == 200
+            m = overlays.metrics()
+            assert m["builds"] == 2 and m["incremental_builds"] == 1 and m["reused_bars"] == 180
+
+    def test_etag_and_since_version(self, tmp_path):
+        import newchan.server as srv
+        from newchan import cache as cache_mod
+        from newchan.bar_cache import FrameCache
+
+        path = tmp_path / "CL_1min_raw.parquet"
+        _df(180).to_parquet(path)
+        params = {"symbol": "CL", "tf": "1m"}
+
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path), \
+                patch.object(srv, "_frame_cache", FrameCache()), \
+                patch.object(srv, "_overlay_cache", OverlayCache()), \
+                patch.object(srv, "request") as req:
+            req.query = _query(params)
+            req.headers = {}
+            first = json.loads(srv.api_newchan_overlay())
+            v1 = first["version"]
+
+            req.headers = {"If-None-Match": f'W/"x", "{v1}"'}
+            assert srv.api_newchan_overlay() == ""
+            assert srv.response.status_code == 304
+            req.headers = {}
+
+            _bump(path, 200)
+            params["since_version"] = v1
+            resp = json.loads(srv.api_newchan_overlay())
+            assert resp["delta"] is True and resp["base_version"] == v1
+            assert "strokes" not in resp
+            assert len(resp["changed"]["macd"]) == 20
+
+            del params["since_version"]
+            full = json.loads(srv.api_newchan_overlay())
+            assert full["version"] == resp["version"]
+            assert _dump(_apply(first, resp)) == _dump(full)
+
+            # 未保留的版本：回退为完整结果
+            params["since_version"] = "0"
+            assert "delta" not in json.loads(srv.api_newchan_overlay())
@@ -0,0 +1,150 @@
+"""overlay 视口 / 细节层级裁剪测试
+
+验证：
+  - overlay_viewport：只保留与视口相交的结构（含跨越视口边界的）；MACD 点按时间截取，
+    max_points 时 LTTB 选点；不修改输入
+  - zoom：0 全部、1 去掉笔、2 去掉线段、L+1 只留递归级别 ≥ L；超过最高层按最高层
+  - 自动层级：视口内结构数 ≤ max_items 的最细层级，历史变长时下发数量有界
+  - /api/newchan/overlay 视口参数：基于缓存的完整结果裁剪（不重建）；非法参数 400
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from newchan.overlay_cache import OverlayCache
+from newchan.overlay_lod import max_zoom, overlay_viewport
+
+
+def _span(i: int, width: int, **extra) -> dict:
+    return {"id": i, "t0": i * width, "t1": (i + 1) * width, **extra}
+
+
+def _result(n_bars: int) -> dict:
+    """等间隔的合成 overlay：笔 10 秒、线段 30 秒、级别 1 中枢 90 秒、级别 2 中枢 270 秒。"""
+    levels = [
+        {"level": 1, "n_moves": 0,
+         "centers": [_span(i, 90) for i in range(n_bars // 90)], "trends": []},
+        {"level": 2, "n_moves": 0,
+         "centers": [_span(i, 270) for i in range(n_bars // 270)],
+         "trends": [_span(i, 540) for i in range(n_bars // 540)]},
+    ]
+    return {
+        "schema_version": "newchan_overlay_v2", "symbol": "CL", "tf": "1m", "detail": "full",
+        "lstar": None,
+        "strokes": [_span(i, 10) for i in range(n_bars // 10)],
+        "segments": [_span(i, 30) for i in range(n_bars // 30)],
+        "centers": [_span(i, 90) for i in range(n_bars // 90)],
+        "trends": [_span(i, 180) for i in range(n_bars // 180)],
+        "levels": levels,
+        "macd": {"fast": 12, "slow": 26, "signal": 9, "series": [
+            {"time": t, "macd": float(np.sin(t / 50)), "signal": 0.0, "hist": float(np.cos(t / 30))}
+            for t in range(n_bars)
+        ]},
+    }
+
+
+def _ids(items: list[dict]) -> list[int]:
+    return [x["id"] for x in items]
+
+
+class TestViewport:
+    def test_intersection(self):
+        result = _result(2700)
+        before = copy.deepcopy(result)
+        out = overlay_viewport(result, 95, 205, zoom=0)
+        assert _ids(out["strokes"]) == list(range(9, 21))
+        assert _ids(out["segments"]) == [3, 4, 5, 6]
+        assert _ids(out["centers"]) == [1, 2]
+        assert [p["time"] for p in out["macd"]["series"]] == list(range(95, 206))
+        assert out["viewport"] == {
+            "from": 95, "to": 205, "zoom": 0, "max_zoom": 3, "auto": False, "items": out["viewport"]["items"],
+        }
+        assert result == before
+
+    def test_zoom_tiers(self):
+        result = _result(2700)
+        assert max_zoom(result) == 3
+        z1 = overlay_viewport(result, zoom=1)
+        assert not z1["strokes"] and len(z1["segments"]) == 90
+        z2 = overlay_viewport(result, zoom=2)
+        assert not z2["segments"] and len(z2["centers"]) == 30
+        assert [lvl["level"] for lvl in z2["levels"]] == [1, 2]
+        z3 = overlay_viewport(result, zoom=9)
+        assert z3["viewport"]["zoom"] == 3
+        assert not z3["centers"] and not z3["trends"]
+        assert [lvl["level"] for lvl in z3["levels"]] == [2]
+        with pytest.raises(ValueError):
+            overlay_viewport(result, zoom=-1)
+
+    def test_auto_zoom_bounded(self):
+        for n in (2700, 27000, 270000):
+            out = overlay_viewport(_result(n), max_items=500)
+            assert out["viewport"]["items"] <= 500 or out["viewport"]["zoom"] == 3
+        narrow = overlay_viewport(_result(270000), 0, 1000, max_items=500)
+        assert narrow["viewport"]["zoom"] == 0 and narrow["strokes"]
+
+    def test_macd_points(self):
+        out = overlay_viewport(_result(27000), 1000, 20000, max_points=300)
+        times = [p["time"] for p in out["macd"]["series"]]
+        assert len(times) <= 300 and times[0] == 1000 and times[-1] == 20000
+        assert times == sorted(times)
+
+
+def _df(n: int) -> pd.DataFrame:
+    idx = pd.date_range("2025-01-02", periods=n, freq="1min")
+    phase = np.arange(n) % 24
+    mid = 100.0 + np.where(phase < 12, phase, 24 - phase) * 1.5 + np.arange(n) * 0.03
+    return pd.DataFrame({
+        "open": mid, "high": mid + 1.0, "low": mid - 1.0, "close": mid + 0.4, "volume": 100.0,
+    }, index=idx)
+
+
+def _query(params: dict):
+    mock = MagicMock()
+    mock.get = lambda key, default="": params.get(key, default)
+    return mock
+
+
+class TestRoute:
+    def test_viewport_from_cache(self, tmp_path):
+        import newchan.server as srv
+        from newchan import cache as cache_mod
+        from newchan.bar_cache import FrameCache
+
+        df = _df(400)
+        df.to_parquet(tmp_path / "CL_1min_raw.parquet")
+        params = {"symbol": "CL", "tf": "1m"}
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path), \
+                patch.object(srv, "_frame_cache", FrameCache()), \
+                patch.object(srv, "_overlay_cache", OverlayCache()) as overlays, \
+                patch.object(srv, "request") as req:
+            req.query = _query(params)
+            req.headers = {}
+            full = json.loads(srv.api_newchan_overlay())
+            assert "viewport" not in full
+
+            t_from = int(df.index[100].timestamp())
+            t_to = int(df.index[200].timestamp())
+            params.update({"from": str(t_from), "to": str(t_to), "zoom": "0", "version": full["version"]})
+            part = json.loads(srv.api_newchan_overlay())
+            assert "unchanged" not in part and part["version"] == full["version"]
+            want = overlay_viewport(full, t_from, t_to, zoom=0)
+            assert part["strokes"] == want["strokes"] and part["viewport"] == want["viewport"]
+            assert 0 < len(part["strokes"]) < len(full["strokes"])
+            assert len(part["macd"]["series"]) == 101
+
+            params["zoom"] = "auto"
+            params["max_items"] = "1"
+            assert json.loads(srv.api_newchan_overlay())["viewport"]["auto"] is True
+            assert overlays.metrics()["builds"] == 1
+
+            params["zoom"] = "x"
+            assert "error" in json.loads(srv.api_newchan_overlay())
+            assert srv.response.status_code == 400
@@ -0,0 +1,182 @@
+"""自动播放调度测试
+
+验证：
+  - PlayPacer：低倍速一帧一根 bar；高倍速帧率受限、每帧按墙钟批量步进；积压有上限
+  - coalesce_events：同一笔的 extended 链合并（保留最初起点），屏障事件不跨越，
+    其余消息相对顺序不变
+  - ClientSender：max_fps 限制 flush 频率，一次 flush 发出全部积压
+  - 网关：高倍速播放的帧数远少于 bar 数，全部 bar 按序送达
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import newchan.gateway as gw
+from newchan.play_scheduler import PlayPacer, coalesce_events
+from newchan.ws_sender import ClientSender
+
+
+@pytest.fixture
+def bar_count() -> int:
+    return 200
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _ev(event_type: str, stroke_id: int, **payload) -> dict:
+    return {
+        "type": "event", "event_type": event_type, "tf": "", "stream_id": "",
+        "payload": {"stroke_id": stroke_id, **payload},
+    }
+
+
+def _ext(stroke_id: int, old_i1: int, new_i1: int) -> dict:
+    return _ev(
+        "stroke_extended", stroke_id,
+        old_i1=old_i1, old_p1=float(old_i1), new_i1=new_i1, new_p1=float(new_i1),
+    )
+
+
+class TestPlayPacer:
+    def test_low_speed_one_bar_per_frame(self):
+        clock = FakeClock()
+        pacer = PlayPacer(speed=2, max_fps=30, clock=clock)
+        assert pacer.interval == 0.5
+        for _ in range(4):
+            clock.now += pacer.interval
+            assert pacer.take() == 1
+
+    def test_high_speed_batches_by_wall_clock(self):
+        clock = FakeClock()
+        pacer = PlayPacer(speed=600, max_fps=30, clock=clock)
+        assert pacer.interval == 1 / 30
+        clock.now += pacer.interval
+        assert pacer.take() == 20
+        # 引擎耗时计入下一帧
+        clock.now += pacer.interval + 0.05
+        assert pacer.take() == 50
+        assert pacer.frames == 2 and pacer.bars == 70
+
+    def test_fractional_credit_carries_over(self):
+        clock = FakeClock()
+        pacer = PlayPacer(speed=45, max_fps=30, clock=clock)
+        taken = []
+        for _ in range(30):
+            clock.now += pacer.interval
+            taken.append(pacer.take())
+        assert set(taken) == {1, 2}
+        assert abs(sum(taken) - 45) <= 1
+
+    def test_lag_capped(self):
+        clock = FakeClock()
+        pacer = PlayPacer(speed=100, max_fps=30, max_lag_s=0.5, clock=clock)
+        clock.now += 10.0
+        assert pacer.take() == 50
+        assert pacer.lag_dropped == 950
+        clock.now += 0.01
+        assert pacer.take() == 1
+
+
+class TestCoalesceEvents:
+    def test_extended_chain_merged(self):
+        bar = {"type": "bar", "idx": 0}
+        msgs = [_ext(3, 10, 11), bar, _ext(3, 11, 12), _ext(3, 12, 13)]
+        out = coalesce_events(msgs)
+        assert len(out) == 2
+        assert out[0] is bar
+        merged = out[1]["payload"]
+        assert (merged["old_i1"], merged["new_i1"]) == (10, 13)
+        assert (merged["old_p1"], merged["new_p1"]) == (10.0, 13.0)
+
+    def test_barrier_not_crossed(self):
+        msgs = [
+            _ext(3, 10, 11),
+            _ev("stroke_settled", 3),
+            _ext(3, 11, 12),
+        ]
+        assert coalesce_events(msgs) == msgs
+
+    def test_streams_and_strokes_independent(self):
+        a1, a2 = _ext(1, 0, 1), _ext(1, 1, 2)
+        b1 = _ext(2, 5, 6)
+        other_tf = {**_ext(1, 7, 8), "tf": "5m"}
+        out = coalesce_events([a1, b1, other_tf, a2])
+        assert [m["payload"]["stroke_id"] for m in out] == [2, 1, 1]
+        assert out[1]["tf"] == "5m"
+        assert out[2]["payload"]["old_i1"] == 0
+
+    def test_candidate_keeps_latest(self):
+        msgs = [_ev("stroke_candidate", 4, i1=5), _ev("stroke_candidate", 4, i1=7)]
+        (out,) = coalesce_events(msgs)
+        assert out["payload"]["i1"] == 7
+
+
+class TestSenderFps:
+    def test_flushes_capped(self):
+        async def main():
+            sent: list[str] = []
+
+            async def send(frame: str) -> None:
+                sent.append(frame)
+
+            sender = ClientSender(send, maxsize=1000, max_fps=20)
+            sender.start()
+            loop = asyncio.get_running_loop()
+            t0 = loop.time()
+            for i in range(40):
+                sender.offer([f"f{i}"])
+                await asyncio.sleep(0.005)
+            await sender.join()
+            elapsed = loop.time() - t0
+            sender.close()
+            return sent, sender.metrics(), elapsed
+
+        sent, m, elapsed = asyncio.run(main())
+        assert sent == [f"f{i}" for i in range(40)]
+        assert m["max_fps"] == 20
+        assert m["items_sent"] == 40
+        # 20 fps 下每次 flush 至少间隔 50ms
+        assert m["flushes"] <= elapsed * 20 + 2
+        assert m["flushes"] < 40
+
+
+class TestGatewayPlay:
+    def test_high_speed_play_batches(self, client):
+        with client.websocket_connect("/ws/feed?fps=0") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "replay_start", "symbol": "CL", "tf": "1m"})
+            ws.receive_json()
+            ws.receive_json()
+            ws.send_json({"action": "replay_play", "speed": 2000})
+
+            bar_idx: list[int] = []
+            statuses = 0
+            while True:
+                m = ws.receive_json()
+                if m["type"] == "bar":
+                    bar_idx.append(m["idx"])
+                elif m["type"] == "replay_status" and m["mode"] != "playing" \
+                        and bar_idx:
+                    break
+                elif m["type"] == "replay_status":
+                    statuses += 1
+
+        assert bar_idx == list(range(200))
+        # 每帧一条状态：帧数远少于 bar 数
+        assert statuses < 100
+
+    def test_fps_negotiation(self):
+        assert gw._negotiate_fps(None) == gw.WS_MAX_FPS
+        assert gw._negotiate_fps("0") == 0
+        assert gw._negotiate_fps("15") == 15
+        assert gw._negotiate_fps("abc") == gw.WS_MAX_FPS
+        assert gw._negotiate_fps("-1") == gw.WS_MAX_FPS
@@ -0,0 +1,139 @@
+"""PortfolioReplay 多品种时间同步回放测试
+
+验证：
+  - 全局步进计划按时间戳归并，同时间戳按品种注册顺序
+  - 各品种事件与单独运行 RecursiveOrchestrator 一致，bus 全局有序
+  - seek 结果与从头步进一致（检查点恢复 / 当前位置前进 / 回退）
+  - 检查点数不超过 max_checkpoints（间隔加倍抽稀），抽稀后 seek 仍一致
+  - seek_ts、状态与 mode 语义
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from newchan.core.adapters import tf_to_stream_id
+from newchan.orchestrator.portfolio import PortfolioReplay
+from newchan.orchestrator.recursive import RecursiveOrchestrator
+from newchan.types import Bar
+from tests.conftest import zigzag_bars
+
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+SID_CL = tf_to_stream_id("CL", "1m").value
+SID_GC = tf_to_stream_id("GC", "2m").value
+
+
+def _streams() -> dict[str, list[Bar]]:
+    return {SID_CL: zigzag_bars(120), SID_GC: zigzag_bars(60, step_min=2, amp=3.0, offset=50.0)}
+
+
+def _reference_events(stream_id: str, bars: list[Bar]) -> list[tuple[str, str]]:
+    orch = RecursiveOrchestrator(stream_id=stream_id)
+    for bar in bars:
+        orch.process_bar(bar)
+    return [(te.tf, te.event.event_id) for te in orch.bus.drain()]
+
+
+class TestSchedule:
+    def test_global_timestamp_order(self):
+        replay = PortfolioReplay("pf", _streams())
+        ticks = replay.step(replay.total_bars)
+        assert len(ticks) == 180
+        ts = [t.bar.ts for t in ticks]
+        assert ts == sorted(ts)
+        # 同时间戳：CL 先于 GC
+        assert [(t.stream_id, t.bar_idx) for t in ticks[:3]] == [
+            (SID_CL, 0), (SID_GC, 0), (SID_CL, 1),
+        ]
+        assert replay.mode == "done"
+
+    def test_invalid_args(self):
+        with pytest.raises(ValueError):
+            PortfolioReplay("pf", {})
+        with pytest.raises(ValueError):
+            PortfolioReplay("pf", _streams(), checkpoint_every=-1)
+        with pytest.raises(ValueError):
+            PortfolioReplay("pf", _streams(), max_checkpoints=0)
+
+
+class TestEvents:
+    def test_per_stream_events_match_reference(self):
+        streams = _streams()
+        replay = PortfolioReplay("pf", streams)
+        replay.step(70)
+        replay.step(replay.total_bars)
+        tagged = replay.bus.drain()
+        for sid, bars in streams.items():
+            got = [(te.tf, te.event.event_id) for te in tagged if te.stream_id == sid]
+            assert got
+            assert got == _reference_events(sid, bars)
+
+    def test_bus_follows_global_order(self):
+        replay = PortfolioReplay("pf", _streams())
+        ticks = replay.step(replay.total_bars)
+        ts_of = {(t.stream_id, t.bar_idx): t.bar.ts for t in ticks}
+        tagged = replay.bus.drain()
+        times = [ts_of[(te.stream_id, te.event.bar_idx)] for te in tagged]
+        assert times == sorted(times)
+
+
+class TestSeek:
+    @pytest.mark.parametrize("checkpoint_every", [0, 25])
+    def test_seek_matches_linear_replay(self, checkpoint_every):
+        ref = PortfolioReplay("ref", _streams(), checkpoint_every=0)
+        ref_ticks = ref.step(ref.total_bars)
+
+        replay = PortfolioReplay("pf", _streams(), checkpoint_every=checkpoint_every)
+        replay.step(150)
+        for target in (130, 40, 99, 100, 179, 0, 60):
+            tick = replay.seek(target)
+            expected = ref_ticks[target]
+            assert (tick.seq, tick.stream_id, tick.bar_idx) == (
+                expected.seq, expected.stream_id, expected.bar_idx,
+            )
+            assert tick.snapshot.seg_snapshot.segments == expected.snapshot.seg_snapshot.segments
+            assert tick.snapshot.zs_snapshot.zhongshus == expected.snapshot.zs_snapshot.zhongshus
+            assert replay.current_idx == target + 1
+        # 跳转后继续步进与线性回放一致
+        replay.seek(99)
+        nxt = replay.step(1)[0]
+        assert nxt.snapshot.seg_snapshot.segments == ref_ticks[100].snapshot.seg_snapshot.segments
+
+    def test_checkpoints_recorded_and_seek_silent(self):
+        replay = PortfolioReplay("pf", _streams(), checkpoint_every=50)
+        replay.step(180)
+        assert replay.get_status()["checkpoints"] == 3
+        replay.bus.drain()
+        replay.seek(120)
+        assert replay.bus.count == 0
+        assert replay.get_status()["streams"] == {SID_CL: 81, SID_GC: 40}
+        assert replay.mode == "paused"
+
+    def test_checkpoints_bounded(self):
+        ref = PortfolioReplay("ref", _streams(), checkpoint_every=0)
+        ref_ticks = ref.step(ref.total_bars)
+
+        replay = PortfolioReplay("pf", _streams(), checkpoint_every=3, max_checkpoints=4)
+        for _ in range(replay.total_bars):
+            replay.step(1)
+            assert replay.get_status()["checkpoints"] <= 4
+        status = replay.get_status()
+        assert status["checkpoint_spacing"] == 48
+        assert sorted(replay._checkpoints) == [48, 96, 144]
+        for target in (170, 47, 100, 5):
+            tick = replay.seek(target)
+            assert tick.snapshot.seg_snapshot.segments == ref_ticks[target].snapshot.seg_snapshot.segments
+
+    def test_seek_ts(self):
+        replay = PortfolioReplay("pf", _streams())
+        tick = replay.seek_ts(BASE + timedelta(minutes=10, seconds=30))
+        # 10:00 处 CL/GC 都有 bar，GC 在后
+        assert (tick.stream_id, tick.bar_idx) == (SID_GC, 5)
+        assert replay.get_status()["streams"] == {SID_CL: 11, SID_GC: 6}
+        assert replay.seek_ts(BASE - timedelta(minutes=1)) is None
+        assert replay.current_idx == 0
@@ -8,7 +8,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from newchan.server import _df_to_records
+from newchan.server import _df_to_columns, _df_to_records, _iter_data_json, _page
 
 
 class TestDfToRecords:
@@ -72,6 +72,90 @@ class TestDfToRecords:
         assert records == []
 
 
+    def test_epoch_time(self):
+        dates = pd.date_range("2025-01-02 09:30", periods=2, freq="1min", tz="America/New_York")
+        df = pd.DataFrame({"close": [100.0, 101.0]}, index=dates)
+        records = _df_to_records(df, time_mode="epoch")
+        assert records[0]["time"] == int(dates[0].timestamp())
+        assert records[1]["time"] - records[0]["time"] == 60
+
+
+class TestDfToColumns:
+    def test_columns_match_records(self):
+        dates = pd.date_range("2025-01-02", periods=3, freq="1min")
+        df = pd.DataFrame(
+            {"open": [1.0, np.nan, 3.0], "close": [1.1234567, 2.0, 3.0]},
+            index=dates,
+        )
+        cols = _df_to_columns(df)
+        assert list(cols) == ["time", "open", "close"]
+        assert cols["open"] == [1.0, None, 3.0]
+        assert cols["close"][0] == 1.123457
+        records = _df_to_records(df)
+        assert [r["time"] for r in records] == cols["time"]
+
+    def test_empty(self):
+        df = pd.DataFrame(columns=["open"])
+        df.index = pd.DatetimeIndex([])
+        assert _df_to_columns(df) == {"time": [], "open": []}
+
+
+class TestStreamedJson:
+    @pytest.fixture
+    def df(self):
+        dates = pd.date_range("2025-01-02", periods=25, freq="1min")
+        return pd.DataFrame(
+            {"open": np.arange(25, dtype=float), "close": [np.nan] + [1.5] * 24},
+            index=dates,
+        )
+
+    @pytest.mark.parametrize("fmt", ["records", "columns"])
+    def test_chunks_reassemble(self, df, fmt):
+        with patch("newchan.server._CHUNK_ROWS", 7):
+            chunks = list(_iter_data_json(df, fmt, "str", {"count": 25}))
+        body = json.loads("".join(chunks))
+        assert body["count"] == 25
+        want = _df_to_columns(df) if fmt == "columns" else _df_to_records(df)
+        assert body["data"] == want
+        assert len(chunks) > 4
+
+    def test_no_extra(self, df):
+        body = json.loads("".join(_iter_data_json(df, "records", "epoch", {})))
+        assert list(body) == ["data"]
+
+
+class TestPage:
+    @pytest.fixture
+    def df(self):
+        dates = pd.date_range("2025-01-02", periods=20, freq="5min")
+        return pd.DataFrame({"close": np.arange(20, dtype=float)}, index=dates)
+
+    def _epoch(self, ts) -> str:
+        return str(int(pd.Timestamp(ts).timestamp()))
+
+    def test_matches_boolean_masks(self, df):
+        to_dt = df.index[12] + pd.Timedelta(minutes=2)
+        after_dt = df.index[3]
+        got = _page(df, to_ts=self._epoch(to_dt), after_ts=self._epoch(after_dt), count_back="5")
+        want = df[(df.index <= to_dt) & (df.index > after_dt)].iloc[-5:]
+        pd.testing.assert_frame_equal(got, want)
+
+    def test_exact_bounds(self, df):
+        got = _page(df, to_ts=self._epoch(df.index[5]))
+        assert got.index[-1] == df.index[5]
+        got = _page(df, after_ts=self._epoch(df.index[5]))
+        assert got.index[0] == df.index[6]
+
+    def test_count_back_larger_than_range(self, df):
+        got = _page(df, after_ts=self._epoch(df.index[15]), count_back="100")
+        assert len(got) == 4
+        assert len(_page(df)) == 20
+
+    def test_empty_range(self, df):
+        got = _page(df, to_ts=self._epoch(df.index[2]), after_ts=self._epoch(df.index[10]))
+        assert got.empty
+
+
 class TestJsonResp:
     @patch("newchan.server.response")
     def test_returns_json(self, mock_response):
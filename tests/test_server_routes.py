@@ -7,6 +7,7 @@ filesystem / network access occurs.
 from __future__ import annotations
 
 import json
+import threading
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
@@ -148,6 +149,59 @@ class TestApiOhlcv:
         result = _parse(api_ohlcv())
         assert result["count"] == 3
 
+    @patch("newchan.server.resample_ohlc")
+    @patch("newchan.server.load_df")
+    @patch("newchan.server.request")
+    def test_columns_format(self, mock_req, mock_load, mock_resample):
+        df = _make_ohlcv_df(4)
+        mock_req.query = _make_query({
+            "symbol": "CL", "interval": "1min", "tf": "1m",
+            "format": "columns", "time": "epoch",
+        })
+        mock_load.return_value = df
+        mock_resample.return_value = df
+
+        from newchan.server import api_ohlcv
+
+        result = _parse(api_ohlcv())
+        assert result["format"] == "columns"
+        assert result["count"] == 4
+        assert result["data"]["close"] == [1.0, 2.0, 3.0, 4.0]
+        assert result["data"]["time"][0] == int(df.index[0].timestamp())
+
+    @patch("newchan.server.resample_ohlc")
+    @patch("newchan.server.load_df")
+    @patch("newchan.server.request")
+    def test_unknown_format_returns_400(self, mock_req, mock_load, mock_resample):
+        df = _make_ohlcv_df(2)
+        mock_req.query = _make_query({"symbol": "CL", "format": "csv"})
+        mock_load.return_value = df
+        mock_resample.return_value = df
+
+        from newchan.server import api_ohlcv, response
+
+        result = _parse(api_ohlcv())
+        assert "error" in result
+        assert response.status_code == 400
+
+    @patch("newchan.server.resample_ohlc")
+    @patch("newchan.server.load_df")
+    @patch("newchan.server.request")
+    def test_large_result_streamed(self, mock_req, mock_load, mock_resample):
+        df = _make_ohlcv_df(10)
+        mock_req.query = _make_query({"symbol": "CL", "interval": "1min", "tf": "1m"})
+        mock_load.return_value = df
+        mock_resample.return_value = df
+
+        from newchan.server import api_ohlcv
+
+        with patch("newchan.server._STREAM_ROWS", 5), patch("newchan.server._CHUNK_ROWS", 3):
+            result = api_ohlcv()
+            assert not isinstance(result, str)
+            body = _parse("".join(result))
+        assert body["count"] == 10
+        assert [r["open"] for r in body["data"]] == list(range(1, 11))
+
     @patch("newchan.server.resample_ohlc")
     @patch("newchan.server.load_df")
     @patch("newchan.server.request")
@@ -196,7 +250,7 @@ class TestApiIndicator:
         assert "error" in result
         assert response.status_code == 404
 
-    @patch("newchan.server.compute_indicator")
+    @patch("newchan.server._indicator_cache.compute")
     @patch("newchan.server.resample_ohlc")
     @patch("newchan.server.load_df")
     @patch("newchan.server.request")
@@ -214,7 +268,7 @@ class TestApiIndicator:
         assert "data" in result
         assert len(result["data"]) == 5
 
-    @patch("newchan.server.compute_indicator")
+    @patch("newchan.server._indicator_cache.compute")
     @patch("newchan.server.resample_ohlc")
     @patch("newchan.server.load_df")
     @patch("newchan.server.request")
@@ -231,7 +285,7 @@ class TestApiIndicator:
         assert "error" in result
         assert response.status_code == 400
 
-    @patch("newchan.server.compute_indicator")
+    @patch("newchan.server._indicator_cache.compute")
     @patch("newchan.server.resample_ohlc")
     @patch("newchan.server.load_df")
     @patch("newchan.server.request")
@@ -263,34 +317,50 @@ class TestApiFetch:
         assert "error" in result
         assert response.status_code == 400
 
-    @patch("newchan.server.threading.Thread")
     @patch("newchan.server.request")
-    def test_starts_fetch_thread(self, mock_req, mock_thread_cls):
-        # Clear any leftover status from other tests
+    def test_submits_job(self, mock_req):
         import newchan.server as srv
-        srv._fetch_status.clear()
+        from newchan.fetch_jobs import FetchScheduler
 
-        mock_req.json = {"symbol": "CL", "interval": "1min", "start": "2024-01-01"}
-        mock_thread = MagicMock()
-        mock_thread_cls.return_value = mock_thread
+        release = threading.Event()
 
-        result = _parse(srv.api_fetch())
-        assert result["status"] == "running"
-        assert "task_id" in result
-        mock_thread.start.assert_called_once()
+        def fetch(symbol, interval, start, end):
+            release.wait(5)
+            return f"{symbol}_{interval}_raw", 0
 
-    @patch("newchan.server.request")
-    def test_already_running_returns_running(self, mock_req):
-        import newchan.server as srv
+        with patch.object(srv, "_fetch_jobs", FetchScheduler(fetch=fetch)) as jobs:
+            mock_req.json = {"symbol": "CL", "interval": "1min", "start": "2024-01-01", "end": "2024-02-01"}
+            result = _parse(srv.api_fetch())
+            assert result["status"] in ("queued", "running")
+            assert result["deduped"] is False
+            task_id = result["task_id"]
+
+            # 重复请求合并到同一任务
+            again = _parse(srv.api_fetch())
+            assert again["task_id"] == task_id and again["deduped"] is True
+
+            mock_req.query = _make_query({"task_id": task_id})
+            assert _parse(srv.api_fetch_status())["job_id"] == task_id
+            # 旧格式 task_id
+            mock_req.query = _make_query({"task_id": "CL_1min"})
+            assert _parse(srv.api_fetch_status())["job_id"] == task_id
 
-        srv._fetch_status["CL_1min"] = {"status": "running"}
-        mock_req.json = {"symbol": "CL", "interval": "1min"}
+            release.set()
+            assert jobs.join(5)
+            mock_req.query = _make_query({"task_id": task_id})
+            assert _parse(srv.api_fetch_status())["status"] == "done"
 
-        result = _parse(srv.api_fetch())
-        assert result["status"] == "running"
+    @patch("newchan.server.request")
+    def test_unknown_status_and_cancel(self, mock_req):
+        import newchan.server as srv
+        from newchan.fetch_jobs import FetchScheduler
 
-        # cleanup
-        srv._fetch_status.clear()
+        with patch.object(srv, "_fetch_jobs", FetchScheduler(fetch=lambda *a, **k: ("", 0))):
+            mock_req.query = _make_query({"task_id": "nope"})
+            assert _parse(srv.api_fetch_status()) == {"status": "unknown"}
+            mock_req.json = {"task_id": "nope"}
+            _parse(srv.api_fetch_cancel())
+            assert srv.response.status_code == 404
 
 
 # ===================================================================
@@ -416,7 +486,8 @@ class TestApiNewchanOverlay:
             from newchan.server import api_newchan_overlay
 
             result = _parse(api_newchan_overlay())
-            assert result == overlay_data
+            # 源文件无 mtime（未落盘）：不缓存，版本为 null
+            assert result == {**overlay_data, "version": None}
             mock_build.assert_called_once()
 
     @patch("newchan.server.resample_ohlc")
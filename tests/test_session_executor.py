@@ -0,0 +1,188 @@
+"""SessionExecutor 与可取消 seek 测试
+
+验证：
+  - 同会话串行、按提交顺序执行；不同会话并行
+  - 排队等待时间与计算时间分开统计
+  - drop_session：有调用在执行 / 排队时队列保留到最后一个离开，之后不残留；
+    删除后提交的调用仍与尚未唤醒的等待者串行
+  - run_latest：排队中的旧操作被放弃，执行中的旧 seek 协作中止
+  - ReplaySession / TFOrchestrator 的 seek 取消后状态自洽
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from newchan.bi_engine import BiEngine
+from newchan.orchestrator.timeframes import TFOrchestrator
+from newchan.replay import ReplaySession, SeekCancelled
+from newchan.session_executor import OperationSuperseded, SessionExecutor
+from tests.conftest import zigzag_bars
+
+
+class TestSessionExecutor:
+    def test_serial_per_session_parallel_across(self):
+        executor = SessionExecutor(max_workers=4)
+        order: list[str] = []
+        active: dict[str, int] = {}
+        overlap: list[bool] = []
+
+        def work(sid: str, tag: str) -> str:
+            active[sid] = active.get(sid, 0) + 1
+            overlap.append(active[sid] > 1)
+            time.sleep(0.02)
+            order.append(tag)
+            active[sid] -= 1
+            return tag
+
+        async def main():
+            t0 = time.perf_counter()
+            results = await asyncio.gather(
+                *(executor.run("a", work, "a", f"a{i}", kind="step") for i in range(3)),
+                *(executor.run("b", work, "b", f"b{i}", kind="step") for i in range(3)),
+            )
+            return results, time.perf_counter() - t0
+
+        results, elapsed = asyncio.run(main())
+        executor.shutdown()
+        assert results == ["a0", "a1", "a2", "b0", "b1", "b2"]
+        assert [t for t in order if t[0] == "a"] == ["a0", "a1", "a2"]
+        assert not any(overlap)
+        assert elapsed < 0.15  # 两个会话并行（串行需 ≥ 0.12）
+
+    def test_queue_wait_vs_compute(self):
+        executor = SessionExecutor(max_workers=2)
+
+        async def main():
+            await asyncio.gather(
+                executor.run("s", time.sleep, 0.05, kind="seek"),
+                executor.run("s", lambda: None, kind="step"),
+            )
+
+        asyncio.run(main())
+        m = executor.metrics()["ops"]
+        executor.shutdown()
+        assert m["seek"]["compute_ms_last"] >= 45
+        assert m["seek"]["queue_wait_ms_last"] < 20
+        assert m["step"]["queue_wait_ms_last"] >= 45
+        assert m["step"]["compute_ms_last"] < 20
+
+    def test_failed_counted(self):
+        executor = SessionExecutor(max_workers=1)
+
+        async def main():
+            with pytest.raises(ZeroDivisionError):
+                await executor.run("s", lambda: 1 / 0, kind="x")
+
+        asyncio.run(main())
+        assert executor.metrics()["ops"]["x"]["failed"] == 1
+        assert executor.metrics()["busy_sessions"] == 0
+
+    def test_drop_while_running_releases_when_idle(self):
+        executor = SessionExecutor(max_workers=4)
+        gate = threading.Event()
+        active = {"n": 0, "max": 0}
+
+        def work(tag: str) -> str:
+            active["n"] += 1
+            active["max"] = max(active["max"], active["n"])
+            gate.wait(5) if tag == "a" else time.sleep(0.01)
+            active["n"] -= 1
+            return tag
+
+        async def main():
+            first = asyncio.create_task(executor.run("s", work, "a"))
+            queued = asyncio.create_task(executor.run("s", work, "b"))
+            await asyncio.sleep(0.02)
+            executor.drop_session("s")
+            assert executor.busy("s")
+            late = asyncio.create_task(executor.run("s", work, "c"))
+            await asyncio.sleep(0)
+            gate.set()
+            return await asyncio.gather(first, queued, late)
+
+        assert asyncio.run(main()) == ["a", "b", "c"]
+        executor.shutdown()
+        assert active["max"] == 1
+        assert "s" not in executor._locks and "s" not in executor._queued
+        assert not executor._dropped
+
+    def test_drop_idle_and_cancelled_waiter(self):
+        executor = SessionExecutor(max_workers=2)
+        gate = threading.Event()
+
+        async def main():
+            await executor.run("idle", lambda: None)
+            executor.drop_session("idle")
+            running = asyncio.create_task(executor.run("s", gate.wait, 5))
+            waiter = asyncio.create_task(executor.run("s", lambda: None))
+            await asyncio.sleep(0.02)
+            executor.drop_session("s")
+            waiter.cancel()
+            await asyncio.sleep(0)
+            assert "s" in executor._locks  # 仍在执行
+            gate.set()
+            await running
+
+        asyncio.run(main())
+        executor.shutdown()
+        assert not executor._locks and not executor._queued and not executor._dropped
+
+
+class TestCancellableSeek:
+    def test_newer_seek_cancels_running_and_queued(self):
+        executor = SessionExecutor(max_workers=2)
+        session = ReplaySession("s", zigzag_bars(3000), BiEngine())
+        started = threading.Event()
+
+        def slow_seek(target: int, cancel: threading.Event):
+            started.set()
+            return session.seek(target, cancel=cancel)
+
+        async def main():
+            first = asyncio.create_task(executor.run_latest("s", "seek", slow_seek, 2999))
+            await asyncio.to_thread(started.wait, 5)
+            second = asyncio.create_task(executor.run_latest("s", "seek", session.seek, 2000))
+            await asyncio.sleep(0)
+            third = asyncio.create_task(executor.run_latest("s", "seek", session.seek, 50))
+            return await asyncio.gather(first, second, third, return_exceptions=True)
+
+        first, second, third = asyncio.run(main())
+        executor.shutdown()
+        assert isinstance(first, SeekCancelled)
+        assert isinstance(second, OperationSuperseded)
+        assert third.bar_idx == 50
+        assert session.current_idx == 51
+        assert executor.metrics()["ops"]["seek"]["cancelled"] == 2
+
+    def test_replay_session_cancel_state_consistent(self):
+        session = ReplaySession("s", zigzag_bars(100), BiEngine())
+        cancel = threading.Event()
+        cancel.set()
+        with pytest.raises(SeekCancelled) as exc:
+            session.seek(80, cancel=cancel)
+        assert exc.value.reached_idx == 0
+        assert session.current_idx == 0
+        # 未取消的 seek 不受影响
+        assert session.seek(80).bar_idx == 80
+
+    def test_tf_orchestrator_cancel_aligns_higher_tf(self):
+        bars = zigzag_bars(120)
+        orch = TFOrchestrator("s", bars, ["1m", "5m"])
+        calls = {"n": 0}
+
+        class StopAfter(threading.Event):
+            def is_set(self) -> bool:  # 第 40 根 bar 前置位
+                calls["n"] += 1
+                return calls["n"] > 40
+
+        with pytest.raises(SeekCancelled) as exc:
+            orch.seek(100, cancel=StopAfter())
+        assert exc.value.reached_idx == 40
+        assert orch.current_idx == 40
+        # 5m 对齐到 base 第 39 根（00:39）之前的最后一根 5m bar（00:35）
+        assert orch.sessions["5m"].current_idx == 8
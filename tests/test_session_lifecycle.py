@@ -0,0 +1,206 @@
+"""会话生命周期测试（TTL / 空闲 / 内存预算淘汰、落盘恢复、管理端点）
+
+验证：
+  - ttl 与无客户端空闲淘汰；有客户端的会话不按空闲淘汰；busy 会话不淘汰
+  - 内存预算超限时优先淘汰无客户端、再按 LRU
+  - 内存估算只在日志长度变化时刷新
+  - 落盘 → 恢复后引擎状态与步进位置不变；过期落盘删除；写盘期间会话被删除时丢弃文件
+  - 网关：巡检淘汰后访问透明恢复，管理端点列出会话与估算内存；
+    pickle 读写经引擎执行器（不在事件循环上），新建会话不同步等待巡检
+"""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+
+import newchan.gateway as gw
+from newchan.bi_engine import BiEngine
+from newchan.orchestrator.timeframes import TFOrchestrator
+from newchan.replay import ReplaySession
+from newchan.session_lifecycle import SessionLifecycle, estimate_session_bytes, write_state
+from tests.conftest import zigzag_bars
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 1000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _never(_sid: str) -> bool:
+    return False
+
+
+class TestEvictionPolicy:
+    def test_ttl_and_idle(self):
+        clock = FakeClock()
+        lc = SessionLifecycle(ttl_s=100, idle_s=10, clock=clock)
+        for sid in ("a", "b", "c"):
+            lc.register(sid)
+        clock.t += 20
+        lc.touch("c")
+        clients = {"b"}
+        got = lc.select_evictions(busy=_never, has_clients=lambda s: s in clients)
+        assert got == [("a", "idle")]
+
+        clock.t += 200
+        got = lc.select_evictions(busy=lambda s: s == "c", has_clients=lambda s: s in clients)
+        assert got == [("a", "ttl"), ("b", "ttl")]
+
+    def test_budget_prefers_clientless_then_lru(self):
+        clock = FakeClock()
+        lc = SessionLifecycle(ttl_s=1e9, idle_s=1e9, budget_bytes=250, clock=clock)
+        for sid in ("old_with_client", "new_no_client", "newest"):
+            lc.register(sid)
+            lc._meta[sid].nbytes = 100
+            clock.t += 1
+        got = lc.select_evictions(busy=_never, has_clients=lambda s: s == "old_with_client")
+        assert got == [("new_no_client", "budget")]
+
+    def test_estimate_grows_with_steps(self):
+        session = ReplaySession("s", zigzag_bars(80), BiEngine())
+        before = estimate_session_bytes(session)
+        session.step(40)
+        assert estimate_session_bytes(session) > before
+        orch = TFOrchestrator("o", zigzag_bars(80), ["1m", "5m"])
+        assert estimate_session_bytes(orch) > estimate_session_bytes(orch.base_session)
+
+    def test_size_refreshed_only_on_log_change(self):
+        lc = SessionLifecycle()
+        session = ReplaySession("s", zigzag_bars(80), BiEngine())
+        lc.register("s", session)
+        with patch("newchan.session_lifecycle.estimate_session_bytes", return_value=1) as est:
+            lc.update_size("s", session)
+            assert est.call_count == 0
+            session.step(5)
+            lc.update_size("s", session)
+            lc.update_size("s", session)
+            assert est.call_count == 1
+        assert lc.live_bytes == 1
+
+
+class TestSpill:
+    def test_spill_restore_roundtrip(self, tmp_path):
+        lc = SessionLifecycle(spill_dir=tmp_path)
+        session = ReplaySession("s", zigzag_bars(80), BiEngine())
+        session.step(30)
+        lc.register("s", session)
+        assert lc.spill("s", session)
+        assert lc.is_spilled("s") and (tmp_path / "s.pkl").exists()
+        assert lc.live_bytes == 0
+
+        restored = lc.restore("s")
+        assert not lc.is_spilled("s")
+        assert not (tmp_path / "s.pkl").exists()
+        assert restored.current_idx == 30
+        # 恢复后继续步进与未落盘会话一致
+        assert restored.step(1)[0].strokes == session.step(1)[0].strokes
+
+    def test_no_spill_dir(self):
+        lc = SessionLifecycle()
+        lc.register("s")
+        assert not lc.spill("s", object())
+
+    def test_split_spill_forgotten_meanwhile(self, tmp_path):
+        lc = SessionLifecycle(spill_dir=tmp_path)
+        lc.register("s")
+        path = lc.spill_target("s")
+        assert write_state(path, ReplaySession("s", zigzag_bars(5), BiEngine()))
+        lc.forget("s")
+        assert not lc.mark_spilled("s", path)
+        assert not path.exists()
+        assert lc.spill_target("gone") is None
+
+    def test_read_failure_forgets(self, tmp_path):
+        lc = SessionLifecycle(spill_dir=tmp_path)
+        lc.register("s")
+        path = lc.spill_target("s")
+        path.write_bytes(b"not a pickle")
+        assert lc.mark_spilled("s", path)
+        assert lc.restore("s") is None
+        assert "s" not in lc and not path.exists()
+
+    def test_expired_spills(self, tmp_path):
+        clock = FakeClock()
+        lc = SessionLifecycle(ttl_s=50, spill_dir=tmp_path, clock=clock)
+        lc.register("s")
+        lc.spill("s", ReplaySession("s", zigzag_bars(5), BiEngine()))
+        clock.t += 60
+        assert lc.expired_spills() == ["s"]
+        lc.forget("s")
+        assert not list(tmp_path.iterdir())
+
+
+@pytest.fixture
+def lifecycle(tmp_path):
+    """网关换用假时钟 + tmp_path 落盘目录的生命周期；返回 (clock, spill_dir)。"""
+    clock = FakeClock()
+    lc = SessionLifecycle(ttl_s=3600, idle_s=60, spill_dir=tmp_path, clock=clock)
+    with patch.object(gw, "_lifecycle", lc):
+        yield clock, tmp_path
+
+
+class TestGatewayLifecycle:
+    def test_idle_session_spilled_and_restored(self, lifecycle, client):
+        clock, spill_dir = lifecycle
+        sid = client.post("/api/replay/start", json={"symbol": "CL", "tf": "1m"}).json()["session_id"]
+        client.post("/api/replay/step", json={"session_id": sid, "count": 20})
+
+        listing = client.get("/api/admin/sessions").json()
+        row = next(s for s in listing["sessions"] if s["session_id"] == sid)
+        assert row["state"] == "live" and row["est_bytes"] > 0
+
+        clock.t += 120
+        listing = client.get("/api/admin/sessions", params={"sweep": True}).json()
+        row = next(s for s in listing["sessions"] if s["session_id"] == sid)
+        assert row["state"] == "spilled"
+        assert listing["evictions"]["idle"] >= 1
+        assert sid not in gw._sessions
+        assert (spill_dir / f"{sid}.pkl").exists()
+
+        status = client.get("/api/replay/status", params={"session_id": sid}).json()
+        assert status["current_idx"] == 20
+        r = client.post("/api/replay/step", json={"session_id": sid, "count": 1})
+        assert r.json()["bar_idx"] == 20
+        ops = client.get("/api/metrics/engine").json()["ops"]
+        assert ops["spill"]["count"] >= 1 and ops["restore"]["count"] >= 1
+
+    def test_multi_tf_session_restored(self, lifecycle, client):
+        clock, _ = lifecycle
+        sid = client.post("/api/replay/start", json={
+            "symbol": "CL", "tf": "1m", "timeframes": ["1m", "5m"],
+        }).json()["session_id"]
+        client.post("/api/replay/step", json={"session_id": sid, "count": 30})
+        clock.t += 120
+        client.get("/api/admin/sessions", params={"sweep": True})
+        assert sid not in gw._orchestrators
+        r = client.post("/api/replay/step", json={"session_id": sid, "count": 10})
+        assert r.json()["bar_idx"] == 39
+        assert gw._orchestrators[sid].sessions["5m"].current_idx > 0
+
+    def test_pickle_io_off_event_loop(self, lifecycle, client):
+        import threading
+
+        clock, _ = lifecycle
+        threads: list[str] = []
+        real_write, real_read = gw.write_state, gw.read_state
+
+        def write(*a):
+            threads.append(threading.current_thread().name)
+            return real_write(*a)
+
+        def read(*a):
+            threads.append(threading.current_thread().name)
+            return real_read(*a)
+
+        with patch.object(gw, "write_state", write), patch.object(gw, "read_state", read):
+            sid = client.post("/api/replay/start", json={"symbol": "CL", "tf": "1m"}).json()["session_id"]
+            clock.t += 120
+            client.get("/api/admin/sessions", params={"sweep": True})
+            assert client.get("/api/replay/status", params={"session_id": sid}).json()["current_idx"] == 0
+        assert len(threads) == 2
+        assert all(name.startswith("engine") for name in threads)
@@ -0,0 +1,129 @@
+"""共享回放计算测试
+
+验证：
+  - 同一时间线上的会话结果与独立 ReplaySession 完全一致
+  - 已被其他会话算过的位置 step / seek 不再计算；后退 seek 只截断引用
+  - seek 取消时停在已计算的位置
+  - 注册表按内容寻址、引用计数与空闲 LRU；落盘 → 恢复后重新挂接
+  - 网关：相同参数的会话共享时间线
+"""
+
+from __future__ import annotations
+
+import pickle
+import threading
+
+import pytest
+
+from newchan.bi_engine import BiEngine
+from newchan.replay import ReplaySession, SeekCancelled
+from newchan.shared_replay import SharedReplaySession, TimelineRegistry, bars_digest
+from tests.conftest import zigzag_bars
+
+
+def _strokes(snap):
+    return [(s.i0, s.i1, s.direction, s.confirmed) for s in snap.strokes]
+
+
+@pytest.fixture
+def bar_count() -> int:
+    return 120
+
+
+class TestSharedSessions:
+    def test_matches_independent_session(self):
+        registry = TimelineRegistry()
+        a = SharedReplaySession.on("a", registry.acquire(zigzag_bars(120), stroke_mode="wide"))
+        plain = ReplaySession("p", zigzag_bars(120), BiEngine(stroke_mode="wide"))
+        for got, want in zip(a.step(120), plain.step(120)):
+            assert got.bar_idx == want.bar_idx
+            assert _strokes(got) == _strokes(want)
+            assert [e.event_type for e in got.events] == [e.event_type for e in want.events]
+        assert a.mode == "done"
+
+    def test_second_session_reuses(self):
+        registry = TimelineRegistry()
+        tl = registry.acquire(zigzag_bars(120))
+        a = SharedReplaySession.on("a", tl)
+        b = SharedReplaySession.on("b", registry.acquire(zigzag_bars(120)))
+        assert b.timeline is tl and tl.refs == 2
+
+        a.step(100)
+        assert tl.computed_bars == 100
+        snaps = b.step(60)
+        assert tl.computed_bars == 100
+        assert snaps[-1] is a.event_log[59]
+
+        snap = b.seek(90)
+        assert tl.computed_bars == 100
+        assert snap is tl.log[90] and b.current_idx == 91 and len(b.event_log) == 91
+        b.seek(10)
+        assert b.current_idx == 11 and b.event_log[-1] is tl.log[10]
+        assert a.current_idx == 100  # 其他会话的游标不受影响
+
+        b.seek(110)
+        assert tl.computed_bars == 111
+
+    def test_seek_cancel_stops_at_reached(self):
+        registry = TimelineRegistry()
+        s = SharedReplaySession.on("s", registry.acquire(zigzag_bars(120)))
+        s.step(20)
+        cancel = threading.Event()
+        cancel.set()
+        with pytest.raises(SeekCancelled) as exc:
+            s.seek(100, cancel=cancel)
+        assert exc.value.reached_idx == 20
+        assert s.current_idx == 20 and len(s.event_log) == 20
+
+
+class TestRegistry:
+    def test_content_addressed(self):
+        registry = TimelineRegistry(keep_idle=1)
+        t1 = registry.acquire(zigzag_bars(120))
+        assert registry.acquire(zigzag_bars(120), stroke_mode="new") is not t1
+        assert registry.acquire(zigzag_bars(120, offset=101.0)) is not t1
+        assert bars_digest(zigzag_bars(120)) == bars_digest(zigzag_bars(120))
+
+        registry.release(t1)
+        assert registry.metrics()["idle"] == 1
+        assert registry.acquire(zigzag_bars(120)) is t1  # 空闲 LRU 复用
+        assert registry.hits == 1
+
+    def test_spill_and_reattach(self):
+        registry = TimelineRegistry()
+        tl = registry.acquire(zigzag_bars(120))
+        s = SharedReplaySession.on("s", tl)
+        s.step(50)
+        data = pickle.dumps(s)
+        plain = ReplaySession("p", zigzag_bars(120), BiEngine(stroke_mode="wide"))
+        plain.step(50)
+        assert len(data) < len(pickle.dumps(plain))
+
+        restored = pickle.loads(data)
+        assert restored.timeline is None and restored.event_log == []
+        registry.reattach(restored)
+        assert restored.timeline is tl and restored.current_idx == 50
+        assert restored.event_log[-1] is tl.log[49]
+
+        # 时间线已被丢弃：重新计算到游标处
+        other = TimelineRegistry()
+        again = pickle.loads(data)
+        other.reattach(again)
+        assert again.current_idx == 50
+        assert _strokes(again.event_log[-1]) == _strokes(tl.log[49])
+
+
+class TestGatewaySharing:
+    def test_sessions_share_timeline(self, client):
+        start = {"symbol": "CL", "tf": "1m", "stroke_mode": "wide"}
+        a = client.post("/api/replay/start", json=start).json()["session_id"]
+        b = client.post("/api/replay/start", json=start).json()["session_id"]
+        client.post("/api/replay/step", json={"session_id": a, "count": 80})
+
+        r = client.post("/api/replay/seek", json={"session_id": b, "target_idx": 70}).json()
+        assert r["bar_idx"] == 70
+        m = client.get("/api/metrics/timelines").json()
+        assert m["active"] == 1 and m["hits"] == 1
+        (tl,) = m["timelines"]
+        assert tl["refs"] == 2 and tl["computed_bars"] == 80
+        assert tl["reused_bars"] >= 71
@@ -0,0 +1,119 @@
+"""快照版本与增量快照测试
+
+验证：
+  - 内容相同的快照沿用版本号；未变化的结构在版本间共享对象
+  - diff 给出变化 / 删除的结构；超出保留范围的版本无法作为基准
+  - REST seek 携带 base_version 时返回增量，按协议合并后等于完整快照
+  - WS 客户端声明持有的版本后，seek 推送增量快照；未声明时推送完整快照
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from newchan.snapshot_delta import SnapshotVersions
+
+
+def _stroke(i0: int, i1: int, confirmed: bool = True) -> dict:
+    return {"i0": i0, "i1": i1, "confirmed": confirmed}
+
+
+def _apply(strokes: list[dict], delta: dict) -> list[dict]:
+    """客户端合并逻辑：按 i0 删除 / 覆盖后排序。"""
+    table = {s["i0"]: s for s in strokes}
+    for k in delta["removed"].get("strokes", []):
+        table.pop(k, None)
+    for s in delta["changed"].get("strokes", []):
+        table[s["i0"]] = s
+    return [table[k] for k in sorted(table)]
+
+
+@pytest.fixture
+def bar_count() -> int:
+    return 120
+
+
+class TestSnapshotVersions:
+    def test_commit_and_delta(self):
+        versions = SnapshotVersions()
+        v1 = versions.commit({"strokes": [_stroke(0, 5), _stroke(5, 9, False)]})
+        assert versions.commit({"strokes": [_stroke(0, 5), _stroke(5, 9, False)]}) == v1
+        v2 = versions.commit({"strokes": [_stroke(0, 5), _stroke(5, 11), _stroke(11, 14, False)]})
+        assert v2 == v1 + 1
+
+        changed, removed = versions.delta(v1, v2)
+        assert changed == {"strokes": [_stroke(5, 11), _stroke(11, 14, False)]}
+        assert removed == {}
+        changed, removed = versions.delta(v2, v1)
+        assert removed == {"strokes": [11]}
+        assert versions.delta(None, v2) is None
+
+    def test_unchanged_structures_shared(self):
+        versions = SnapshotVersions()
+        v1 = versions.commit({"strokes": [_stroke(0, 5)]})
+        v2 = versions.commit({"strokes": [_stroke(0, 5), _stroke(5, 8)]})
+        assert versions._versions[v1]["strokes"][0] is versions._versions[v2]["strokes"][0]
+
+    def test_keep_bound(self):
+        versions = SnapshotVersions(keep=2)
+        vs = [versions.commit({"strokes": [_stroke(0, i)]}) for i in range(1, 5)]
+        assert vs[0] not in versions and vs[-1] in versions
+        assert versions.delta(vs[0], vs[-1]) is None
+        with pytest.raises(ValueError):
+            SnapshotVersions(keep=0)
+
+
+class TestGatewayDelta:
+    def test_rest_seek_delta(self, client):
+        sid = client.post("/api/replay/start", json={"symbol": "CL"}).json()["session_id"]
+        first = client.post("/api/replay/seek", json={"session_id": sid, "target_idx": 80}).json()
+        snap = first["snapshot"]
+        assert snap["type"] == "snapshot" and snap["version"] >= 1
+
+        second = client.post("/api/replay/seek", json={
+            "session_id": sid, "target_idx": 100, "base_version": snap["version"],
+        }).json()
+        delta = second["snapshot"]
+        assert delta["type"] == "snapshot_delta"
+        assert delta["base_version"] == snap["version"]
+        assert len(delta["changed"].get("strokes", [])) < len(snap["strokes"])
+
+        full = client.post("/api/replay/seek", json={"session_id": sid, "target_idx": 100}).json()
+        assert full["snapshot"]["type"] == "snapshot"
+        assert full["snapshot"]["version"] == delta["version"]
+        assert _apply(snap["strokes"], delta) == full["snapshot"]["strokes"]
+
+    def test_unknown_base_falls_back_to_full(self, client):
+        sid = client.post("/api/replay/start", json={"symbol": "CL"}).json()["session_id"]
+        r = client.post("/api/replay/seek", json={
+            "session_id": sid, "target_idx": 50, "base_version": 999,
+        }).json()
+        assert r["snapshot"]["type"] == "snapshot"
+
+    def test_ws_seek_sends_delta_for_held_version(self, client):
+        def seek(ws, idx, base=None):
+            cmd = {"action": "replay_seek", "seek_idx": idx}
+            if base is not None:
+                cmd["base_version"] = base
+            ws.send_json(cmd)
+            while True:
+                msg = ws.receive_json()
+                if msg["type"] in ("snapshot", "snapshot_delta"):
+                    ws.receive_json()  # status
+                    return msg
+
+        with client.websocket_connect("/ws/feed") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "replay_start", "symbol": "CL", "tf": "1m"})
+            ws.receive_json()
+            ws.receive_json()
+            full = seek(ws, 80)
+            assert full["type"] == "snapshot"
+            # 服务端记得该客户端已持有 full 的版本
+            delta = seek(ws, 100)
+            assert delta["type"] == "snapshot_delta"
+            assert delta["base_version"] == full["version"]
+            assert "feed_seq" in delta
+            # 声明持有未知版本 → 完整快照
+            again = seek(ws, 60, base=12345)
+            assert again["type"] == "snapshot"
@@ -0,0 +1,120 @@
+"""品种搜索索引测试
+
+验证：
+  - search 与逐条拼接字符串做子串匹配的结果完全一致（含跨字段、中文、短查询），
+    且保持目录顺序
+  - resolve 精确解析不区分大小写，重复 symbol 取第一条；tf_to_stream_id 使用它
+  - /api/search：缓存品种索引在目录无变化时复用，新增缓存文件后刷新
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import time
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from newchan.core.adapters import tf_to_stream_id
+from newchan.core.symbol_catalog import SYMBOL_CATALOG
+from newchan.core.symbol_index import SymbolIndex, catalog_index
+
+
+def _linear(items: list[dict], query: str) -> list[dict]:
+    q = query.upper().strip()
+    if not q:
+        return []
+    return [
+        item for item in items
+        if q in f"{item['symbol']} {item['name']} {item['cn']} {item['exchange']}".upper()
+    ]
+
+
+def _synthetic(n: int) -> list[dict]:
+    rng = random.Random(7)
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    out = []
+    for i in range(n):
+        sym = "".join(rng.choice(letters) for _ in range(rng.randint(2, 5)))
+        out.append({
+            "symbol": sym, "type": "STK", "exchange": rng.choice(["NYSE", "NASDAQ", "CME"]),
+            "name": f"{sym.title()} Holdings {i}", "cn": f"测试{i % 97}号",
+        })
+    return out
+
+
+class TestSearch:
+    def test_matches_linear_scan(self):
+        index = catalog_index()
+        queries = [
+            "cl", "原油", "e-mini", "CL WTI", "nasdaq", "o", "  gold ", "ETF", "S&P 500",
+            "10-Year", "zzz", "", "罗素", "ME", "nymex",
+        ]
+        for item in SYMBOL_CATALOG:
+            queries += [item["symbol"], item["name"][1:4], item["cn"][:1]]
+        for q in queries:
+            assert index.search(q) == _linear(SYMBOL_CATALOG, q), q
+
+    def test_synthetic_catalog(self):
+        items = _synthetic(5000)
+        index = SymbolIndex(items)
+        rng = random.Random(11)
+        for _ in range(200):
+            text = f"{rng.choice(items)['name']} {rng.choice(items)['cn']}"
+            i = rng.randrange(len(text))
+            q = text[i:i + rng.randint(1, 6)]
+            assert index.search(q) == _linear(items, q), q
+        assert index.search("holdings", limit=3) == _linear(items, "holdings")[:3]
+
+    def test_typeahead_latency(self):
+        index = SymbolIndex(_synthetic(20000))
+        t0 = time.perf_counter()
+        for q in ("AB", "ABC", "XYZQ", "测试1", "HOLDINGS 123"):
+            index.search(q, limit=20)
+        assert (time.perf_counter() - t0) / 5 < 0.05
+
+
+class TestResolve:
+    def test_exact(self):
+        items = [
+            {"symbol": "CL", "type": "FUT", "exchange": "NYMEX", "name": "a", "cn": ""},
+            {"symbol": "CL", "type": "STK", "exchange": "X", "name": "b", "cn": ""},
+        ]
+        index = SymbolIndex(items)
+        assert index.resolve("cl") is items[0]
+        assert index.resolve("CLX") is None
+        assert index.resolve("") is None
+
+    def test_stream_id(self):
+        sid = tf_to_stream_id("gc", "5m")
+        assert (sid.instrument.inst_type, sid.instrument.exchange) == ("FUT", "COMEX")
+        sid = tf_to_stream_id("NOPE", "5m")
+        assert (sid.instrument.inst_type, sid.instrument.exchange) == ("STK", "UNKNOWN")
+
+
+class TestApiSearch:
+    def test_cached_index_refresh(self, tmp_path):
+        import newchan.server as srv
+        from newchan import cache as cache_mod
+
+        df = pd.DataFrame({"open": [1.0], "high": [1.0], "low": [1.0], "close": [1.0]},
+                          index=pd.date_range("2025-01-02", periods=1, freq="1min"))
+        df.to_parquet(tmp_path / "CLX_1min_raw.parquet")
+        query = MagicMock()
+        with patch.object(cache_mod, "_cache_dir", return_value=tmp_path), \
+                patch.object(srv, "_cached_index", None), \
+                patch.object(srv, "request") as req, \
+                patch.object(srv, "list_cached", wraps=cache_mod.list_cached) as listing:
+            req.query = query
+            query.get = lambda key, default="": {"q": "cl"}.get(key, default)
+            res = json.loads(srv.api_search())
+            assert [(r["symbol"], r["source"]) for r in res][:2] == [("CLX", "cache"), ("CL", "databento")]
+            json.loads(srv.api_search())
+            assert listing.call_count == 1
+
+            df.to_parquet(tmp_path / "CL_5min_raw.parquet")
+            res = json.loads(srv.api_search())
+            assert listing.call_count == 2
+            assert {r["symbol"] for r in res if r["source"] == "cache"} == {"CL", "CLX"}
+            assert "databento" not in {r["source"] for r in res if r["symbol"] == "CL"}
@@ -0,0 +1,140 @@
+"""UniverseOrchestrator 多品种分片测试
+
+验证：
+  - 分片结果与单 stream RecursiveOrchestrator 逐 bar 结果一致
+  - stream 固定在分片上，新 stream 分配到最空分片
+  - 结果按 stream 首次出现顺序合并，事件推入 bus
+  - 分片延迟按各自完成时刻计算，不被先等待的慢分片拉长
+  - migrate 迁移后引擎状态延续
+  - 进程池模式与 inline 模式一致
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from newchan.core.adapters import tf_to_stream_id
+from newchan.orchestrator.recursive import RecursiveOrchestrator
+from newchan.orchestrator.universe import UniverseOrchestrator
+from newchan.types import Bar
+from tests.conftest import zigzag_bars
+
+
+def _reference_events(stream_id: str, bars: list[Bar]) -> list[tuple[str, str]]:
+    orch = RecursiveOrchestrator(stream_id=stream_id)
+    for bar in bars:
+        orch.process_bar(bar)
+    return [(te.tf, te.event.event_id) for te in orch.bus.drain()]
+
+
+def _universe_events(uni: UniverseOrchestrator, stream_id: str) -> list[tuple[str, str]]:
+    return [
+        (te.tf, te.event.event_id)
+        for te in uni.bus.drain()
+        if te.stream_id == stream_id
+    ]
+
+
+SID_CL = tf_to_stream_id("CL", "1m").value
+SID_GC = tf_to_stream_id("GC", "1m").value
+SID_ES = tf_to_stream_id("ES", "1m").value
+
+
+class _DelayedShard:
+    """内联计算，但 delay 秒后才在另一线程交付结果（模拟慢分片）。"""
+
+    def __init__(self, inner, delay: float) -> None:
+        self._inner = inner
+        self._delay = delay
+
+    def submit(self, fn, *args) -> Future:
+        done = self._inner.submit(fn, *args)
+        fut: Future = Future()
+        threading.Timer(self._delay, lambda: fut.set_result(done.result())).start()
+        return fut
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._inner.shutdown(wait)
+
+
+class TestUniverseInline:
+    def test_matches_single_stream_orchestrator(self):
+        bars_cl, bars_gc = zigzag_bars(60), zigzag_bars(60, amp=3.0, offset=50.0)
+        uni = UniverseOrchestrator(n_workers=2, inline=True)
+        # 分两批、交错投递
+        for lo, hi in ((0, 25), (25, 60)):
+            tagged = []
+            for i in range(lo, hi):
+                tagged.append((SID_CL, bars_cl[i]))
+                tagged.append((SID_GC, bars_gc[i]))
+            uni.process(tagged)
+        all_tagged = uni.bus.drain()
+        for sid, bars in ((SID_CL, bars_cl), (SID_GC, bars_gc)):
+            got = [(te.tf, te.event.event_id) for te in all_tagged if te.stream_id == sid]
+            assert got
+            assert got == _reference_events(sid, bars)
+
+    def test_results_in_first_appearance_order(self):
+        uni = UniverseOrchestrator(n_workers=2, inline=True)
+        bar = zigzag_bars(1)[0]
+        results = uni.process([(SID_GC, bar), (SID_CL, bar), (SID_GC, bar)])
+        assert [r.stream_id for r in results] == [SID_GC, SID_CL]
+        assert results[0].bars == 2
+        assert results[0].last_bar_idx == 1
+
+    def test_streams_pinned_and_balanced(self):
+        uni = UniverseOrchestrator(n_workers=2, inline=True)
+        shards = [uni.shard_of(s) for s in (SID_CL, SID_GC, SID_ES)]
+        assert shards == [0, 1, 0]
+        assert uni.shard_of(SID_CL) == 0  # 再次查询不改变分配
+        stats = uni.shard_stats()
+        assert [s["streams"] for s in stats] == [2, 1]
+
+    def test_shard_stats_recorded(self):
+        uni = UniverseOrchestrator(n_workers=2, inline=True)
+        uni.process([(SID_CL, b) for b in zigzag_bars(10)])
+        stats = uni.shard_stats()
+        assert stats[0]["bars_processed"] == 10
+        assert stats[0]["batches"] == 1
+        assert stats[0]["compute_ms_total"] > 0
+        assert stats[1]["bars_processed"] == 0
+
+    def test_latency_not_inflated_by_slow_shard(self):
+        uni = UniverseOrchestrator(n_workers=2, inline=True)
+        uni._shards = [_DelayedShard(uni._shards[0], 0.3), _DelayedShard(uni._shards[1], 0.01)]
+        # CL 先出现 → 分片 0（慢，先被等待）；GC → 分片 1（快）
+        uni.process([(SID_CL, b) for b in zigzag_bars(5)] + [(SID_GC, b) for b in zigzag_bars(5)])
+        slow, fast = (s["last_latency_ms"] for s in uni.shard_stats())
+        assert slow >= 250
+        assert fast < 200
+
+    def test_migrate_preserves_state(self):
+        bars = zigzag_bars(50)
+        uni = UniverseOrchestrator(n_workers=2, inline=True)
+        uni.process([(SID_CL, b) for b in bars[:25]])
+        uni.migrate(SID_CL, 1)
+        assert uni.shard_of(SID_CL) == 1
+        results = uni.process([(SID_CL, b) for b in bars[25:]])
+        assert results[0].last_bar_idx == 49
+        assert _universe_events(uni, SID_CL) == _reference_events(SID_CL, bars)
+
+    def test_invalid_args(self):
+        with pytest.raises(ValueError):
+            UniverseOrchestrator(n_workers=0, inline=True)
+        uni = UniverseOrchestrator(n_workers=1, inline=True)
+        with pytest.raises(ValueError):
+            uni.migrate(SID_CL, 3)
+
+
+class TestUniverseProcessPool:
+    def test_process_pool_matches_reference(self):
+        bars = zigzag_bars(40)
+        with UniverseOrchestrator(n_workers=2) as uni:
+            uni.process([(SID_CL, b) for b in bars[:20]] + [(SID_GC, b) for b in bars[:20]])
+            uni.process([(SID_CL, b) for b in bars[20:]])
+            got = _universe_events(uni, SID_CL)
+            assert uni.shard_of(SID_CL) != uni.shard_of(SID_GC)
+        assert got == _reference_events(SID_CL, bars)
@@ -0,0 +1,96 @@
+"""ws_codec 推送格式协商与帧编码测试
+
+验证：
+  - negotiate：未知 / 不可用编码回退 json，batch 参数解析
+  - encode_frames：batch 合并多条消息，单条不包装
+  - 网关消息构造与 Pydantic 契约模型 model_dump 一致
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from newchan.contracts import ws_codec
+from newchan.contracts.ws_codec import FeedFormat, encode_frames, negotiate
+from newchan.contracts.ws_messages import WsBar, WsEvent
+from newchan.events import SegmentSettleV1, StrokeSettled
+from newchan.gateway import _bar_to_ws, _event_to_ws
+from newchan.types import Bar
+
+
+class TestNegotiate:
+    def test_defaults(self):
+        assert negotiate() == FeedFormat("json", False)
+
+    @pytest.mark.parametrize("flag,expected", [("1", True), ("true", True), ("0", False), ("", False)])
+    def test_batch_flag(self, flag, expected):
+        assert negotiate("json", flag).batch is expected
+
+    def test_unknown_encoding(self):
+        assert negotiate("protobuf", "1") == FeedFormat("json", True)
+
+    def test_msgpack_unavailable_falls_back(self):
+        with patch.object(ws_codec, "msgpack", None):
+            assert negotiate("msgpack").encoding == "json"
+
+    def test_msgpack_roundtrip(self):
+        pytest.importorskip("msgpack")
+        fmt = negotiate("MsgPack", True)
+        assert fmt.binary
+        frame = ws_codec.encode({"type": "bar", "v": None, "c": 1.5}, fmt)
+        assert isinstance(frame, bytes)
+        assert ws_codec.decode(frame) == {"type": "bar", "v": None, "c": 1.5}
+
+
+class TestEncodeFrames:
+    MSGS = [{"type": "bar", "idx": 0}, {"type": "replay_status", "current_idx": 1}]
+
+    def test_plain(self):
+        frames = encode_frames(self.MSGS)
+        assert [json.loads(f) for f in frames] == self.MSGS
+
+    def test_batch(self):
+        frames = encode_frames(self.MSGS, FeedFormat("json", True))
+        assert len(frames) == 1
+        assert json.loads(frames[0]) == {"type": "batch", "messages": self.MSGS}
+
+    def test_batch_single_message_unwrapped(self):
+        frames = encode_frames(self.MSGS[:1], FeedFormat("json", True))
+        assert json.loads(frames[0]) == self.MSGS[0]
+
+
+class TestGatewayMessageBuilders:
+    def test_event_matches_contract_model(self):
+        for ev in (
+            StrokeSettled(
+                bar_idx=3, bar_ts=1000.0, seq=2, event_id="x",
+                stroke_id=0, direction="up", i0=0, i1=5, p0=100.0, p1=110.0,
+            ),
+            SegmentSettleV1(
+                bar_idx=9, bar_ts=2000.0, seq=5, event_id="y",
+                segment_id=1, direction="down", s0=0, s1=2, ep0_price=1.0,
+                ep1_price=0.5, new_segment_s0=3, new_segment_direction="up",
+            ),
+        ):
+            d = _event_to_ws(ev, tf="5m", stream_id="s")
+            exclude = {"event_type", "bar_idx", "bar_ts", "seq", "event_id", "schema_version"}
+            ref = WsEvent(
+                event_type=ev.event_type, bar_idx=ev.bar_idx, bar_ts=ev.bar_ts,
+                seq=ev.seq, event_id=ev.event_id, schema_version=ev.schema_version,
+                payload={k: v for k, v in asdict(ev).items() if k not in exclude},
+                tf="5m", stream_id="s",
+            ).model_dump()
+            assert d == ref
+            assert list(d) == list(ref)
+
+    def test_bar_matches_contract_model(self):
+        bar = Bar(ts=datetime(2025, 1, 2, tzinfo=timezone.utc), open=1, high=2, low=0.5, close=1.5)
+        d = _bar_to_ws(bar, 7, tf="1m")
+        ref = WsBar(idx=7, ts=bar.ts.timestamp(), o=1, h=2, l=0.5, c=1.5, tf="1m").model_dump()
+        assert d == ref
+        assert type(d["o"]) is float
@@ -0,0 +1,167 @@
+"""WS 客户端发送队列测试
+
+验证：
+  - 慢客户端只积压自己的队列，快客户端照常收完全部帧
+  - drop：丢弃最旧的步进条目；控制消息不受影响
+  - coalesce：溢出后进入重同步，直到收到快照才恢复推送；cursor 随发送推进
+  - 网关：重同步快照从客户端 cursor 补发 bar；/api/metrics/ws 导出队列指标
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import newchan.gateway as gw
+from newchan.bi_engine import BiEngine
+from newchan.replay import ReplaySession
+from newchan.ws_sender import ClientSender, negotiate_overflow
+from tests.conftest import zigzag_bars
+
+
+class Sink:
+    """可阻塞的发送端：gate 未置位时 send 挂起。"""
+
+    def __init__(self, blocked: bool = False) -> None:
+        self.frames: list[str] = []
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def send(self, frame: str) -> None:
+        await self.gate.wait()
+        self.frames.append(frame)
+
+
+class TestClientSender:
+    def test_slow_client_does_not_block_fast(self):
+        async def main():
+            fast, slow = Sink(), Sink(blocked=True)
+            s_fast = ClientSender(fast.send, maxsize=8, policy="drop")
+            s_slow = ClientSender(slow.send, maxsize=8, policy="drop")
+            s_fast.start()
+            s_slow.start()
+            for i in range(200):
+                s_fast.offer([f"f{i}"])
+                s_slow.offer([f"f{i}"])
+                await asyncio.sleep(0)
+            await asyncio.wait_for(s_fast.join(), 1.0)
+            assert fast.frames == [f"f{i}" for i in range(200)]
+            assert s_slow.queue_depth <= 8
+            assert s_slow.dropped > 0
+            s_fast.close()
+            s_slow.close()
+
+        asyncio.run(main())
+
+    def test_drop_keeps_newest_and_control(self):
+        async def main():
+            sink = Sink(blocked=True)
+            sender = ClientSender(sink.send, maxsize=3, policy="drop")
+            sender.start()
+            sender.offer(["s0"])
+            await asyncio.sleep(0)  # s0 进入发送（挂起）
+            sender.offer_control(["ctl"])
+            for i in range(1, 8):
+                sender.offer([f"s{i}"])
+            sink.gate.set()
+            await sender.join()
+            assert sink.frames == ["s0", "ctl", "s5", "s6", "s7"]
+            assert sender.dropped == 4
+            m = sender.metrics()
+            assert m["items_sent"] == 5 and m["policy"] == "drop"
+            sender.close()
+
+        asyncio.run(main())
+
+    def test_coalesce_resync(self):
+        async def main():
+            sink = Sink(blocked=True)
+            sender = ClientSender(sink.send, maxsize=2)
+            sender.start()
+            sender.offer(["s0"], cursor={"": 1})
+            await asyncio.sleep(0)
+            assert sender.offer(["s1"], cursor={"": 2}) is False
+            assert sender.offer(["s2"], cursor={"": 3}) is False
+            assert sender.offer(["s3"], cursor={"": 4}) is True
+            assert sender.resyncing
+            assert sender.offer(["s4"]) is False  # 重同步期间丢弃
+            sender.offer_control(["ctl"])
+            sink.gate.set()
+            await sender.join()
+            assert sink.frames == ["s0", "ctl"]
+            assert sender.cursor == {"": 1}
+
+            sender.offer_resync(["snap"], cursor={"": 5})
+            sender.offer(["s5"], cursor={"": 6})
+            await sender.join()
+            assert sink.frames == ["s0", "ctl", "snap", "s5"]
+            assert sender.cursor == {"": 6}
+            assert sender.resyncs == 1 and sender.coalesced == 4
+            sender.close()
+
+        asyncio.run(main())
+
+    def test_send_failure_closes(self):
+        async def boom(frame):
+            raise RuntimeError("disconnected")
+
+        async def main():
+            sender = ClientSender(boom)
+            sender.start()
+            sender.offer(["x"])
+            await sender.join()
+            assert sender.closed
+            assert sender.offer(["y"]) is False
+
+        asyncio.run(main())
+
+    def test_negotiate_overflow(self):
+        assert negotiate_overflow("DROP") == "drop"
+        assert negotiate_overflow("bogus") == "coalesce"
+        assert negotiate_overflow(None, "drop") == "drop"
+        with pytest.raises(ValueError):
+            ClientSender(Sink().send, policy="bogus")
+
+
+class _Feed:
+    def __init__(self) -> None:
+        self.items: list = []
+
+    def publish(self, item) -> None:
+        self.items.append(item)
+
+
+class TestGatewayResync:
+    def test_resync_replays_bars_from_cursor(self):
+        async def main():
+            session = ReplaySession("s", zigzag_bars(80), BiEngine())
+            session.step(30)
+            sender = ClientSender(Sink().send)
+            sender.cursor = {"": 12}
+            feed = _Feed()
+            gw._publish_resync(feed, session, None, sender)
+            (item,) = feed.items
+            bars = [m for m in item.messages if m["type"] == "bar"]
+            assert [b["idx"] for b in bars] == list(range(12, 30))
+            assert [m["type"] for m in item.messages[-2:]] == ["snapshot", "replay_status"]
+            assert item.messages[-1]["current_idx"] == 30
+            assert item.cursor == {"": 30}
+
+        asyncio.run(main())
+
+    def test_ws_metrics_endpoint(self, client):
+        with client.websocket_connect("/ws/feed?overflow=drop") as ws:
+            assert ws.receive_json()["overflow"] == "drop"
+            ws.send_json({"action": "replay_start", "symbol": "CL", "tf": "1m"})
+            sid = ws.receive_json()["session_id"]
+            ws.receive_json()
+            ws.send_json({"action": "replay_step"})
+            while ws.receive_json()["type"] != "replay_status":
+                pass
+            body = client.get("/api/metrics/ws").json()
+            (client_metrics,) = body["sessions"][sid]
+            assert client_metrics["policy"] == "drop"
+            assert client_metrics["items_sent"] >= 3
+            assert body["max_queue"] == gw.WS_SEND_QUEUE